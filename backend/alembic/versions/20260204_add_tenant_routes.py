@@ -0,0 +1,99 @@
+"""add tenant routes
+
+Revision ID: 20260204_tenant_routes
+Revises: 20260203_add_critical_indexes
+Create Date: 2026-02-04
+
+Cria tabela tenant_routes para resolver o tenant de cada webhook
+(número WhatsApp, app Gupshup, instância Z-API) por índice único,
+em vez de varrer todos os tenants e comparar settings em Python.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+# revision identifiers, used by Alembic.
+revision = '20260204_tenant_routes'
+down_revision = '20260203_add_critical_indexes'
+branch_labels = None
+depends_on = None
+
+
+def table_exists(table_name: str) -> bool:
+    """Check if a table exists in the database."""
+    conn = op.get_bind()
+    result = conn.execute(text(
+        "SELECT EXISTS (SELECT FROM information_schema.tables WHERE table_name = :name)"
+    ), {"name": table_name})
+    return result.scalar()
+
+
+# Mesma normalização de tenant_routing_service.normalize_route_phone:
+# apenas dígitos, sem o código do Brasil (55) quando presente.
+NORMALIZED_PHONE_SQL = """
+    CASE
+        WHEN regexp_replace({col}, '\\D', '', 'g') LIKE '55%'
+         AND length(regexp_replace({col}, '\\D', '', 'g')) IN (12, 13)
+        THEN substring(regexp_replace({col}, '\\D', '', 'g') FROM 3)
+        ELSE regexp_replace({col}, '\\D', '', 'g')
+    END
+"""
+
+
+def upgrade() -> None:
+    """
+    Cria tenant_routes e popula a partir de tenants.settings e channels.config.
+    """
+
+    if not table_exists('tenant_routes'):
+        op.create_table(
+            'tenant_routes',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('tenant_id', sa.Integer(), nullable=False),
+            sa.Column('route_type', sa.String(30), nullable=False),
+            sa.Column('route_key', sa.String(150), nullable=False),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+            sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+            sa.ForeignKeyConstraint(['tenant_id'], ['tenants.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        op.create_index('ix_tenant_routes_tenant_id', 'tenant_routes', ['tenant_id'])
+        op.create_index('ix_tenant_routes_type_key', 'tenant_routes', ['route_type', 'route_key'], unique=True)
+        print("✅ Tabela tenant_routes criada")
+    else:
+        print("ℹ️ Tabela tenant_routes já existe")
+
+    # Backfill: números e identificadores já configurados
+    sources = [
+        ("phone", NORMALIZED_PHONE_SQL.format(col="t.settings->>'whatsapp_number'"), "tenants t"),
+        ("gupshup_app", "trim(t.settings->>'gupshup_app_name')", "tenants t"),
+        ("zapi_instance", "trim(t.settings->>'zapi_instance_id')", "tenants t"),
+        (
+            "phone",
+            NORMALIZED_PHONE_SQL.format(col="c.config->>'phone_number'"),
+            "channels c JOIN tenants t ON t.id = c.tenant_id AND c.type = 'whatsapp' AND c.active",
+        ),
+        (
+            "zapi_instance",
+            "trim(coalesce(c.config->>'instance_id', c.config->>'zapi_instance_id'))",
+            "channels c JOIN tenants t ON t.id = c.tenant_id AND c.type = 'whatsapp' AND c.active",
+        ),
+    ]
+
+    for route_type, key_expr, from_clause in sources:
+        op.execute(f"""
+            INSERT INTO tenant_routes (tenant_id, route_type, route_key)
+            SELECT DISTINCT ON (route_key) t.id, '{route_type}', {key_expr} AS route_key
+            FROM {from_clause}
+            WHERE t.active AND coalesce({key_expr}, '') <> ''
+            ORDER BY route_key, t.id
+            ON CONFLICT (route_type, route_key) DO NOTHING
+        """)
+
+    print("✅ tenant_routes populada")
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tenant_routes_type_key', table_name='tenant_routes')
+    op.drop_index('ix_tenant_routes_tenant_id', table_name='tenant_routes')
+    op.drop_table('tenant_routes')
@@ -0,0 +1,65 @@
+"""unique knowledge embedding source
+
+Revision ID: 20260205_knowledge_source_uq
+Revises: 20260204_tenant_routes
+Create Date: 2026-02-05
+
+Torna (tenant_id, source_type, source_id) único em knowledge_embeddings
+para que a indexação de FAQ grave lotes com INSERT ... ON CONFLICT.
+Duplicatas existentes são removidas mantendo a linha mais recente.
+"""
+from alembic import op
+from sqlalchemy import text
+
+# revision identifiers, used by Alembic.
+revision = '20260205_knowledge_source_uq'
+down_revision = '20260204_tenant_routes'
+branch_labels = None
+depends_on = None
+
+
+def index_exists(index_name: str) -> bool:
+    conn = op.get_bind()
+    result = conn.execute(text(
+        "SELECT EXISTS (SELECT FROM pg_indexes WHERE indexname = :name)"
+    ), {"name": index_name})
+    return result.scalar()
+
+
+def upgrade() -> None:
+    if index_exists('uq_knowledge_embeddings_source'):
+        print("ℹ️ Índice uq_knowledge_embeddings_source já existe")
+        return
+
+    op.execute("""
+        DELETE FROM knowledge_embeddings ke
+        USING knowledge_embeddings newer
+        WHERE ke.tenant_id = newer.tenant_id
+          AND ke.source_type = newer.source_type
+          AND ke.source_id = newer.source_id
+          AND ke.id < newer.id
+    """)
+
+    op.create_index(
+        'uq_knowledge_embeddings_source',
+        'knowledge_embeddings',
+        ['tenant_id', 'source_type', 'source_id'],
+        unique=True,
+    )
+
+    # O índice não-único equivalente fica redundante
+    if index_exists('idx_knowledge_embeddings_tenant_source_id'):
+        op.drop_index('idx_knowledge_embeddings_tenant_source_id', table_name='knowledge_embeddings')
+
+    print("✅ Índice único uq_knowledge_embeddings_source criado")
+
+
+def downgrade() -> None:
+    if not index_exists('idx_knowledge_embeddings_tenant_source_id'):
+        op.create_index(
+            'idx_knowledge_embeddings_tenant_source_id',
+            'knowledge_embeddings',
+            ['tenant_id', 'source_type', 'source_id'],
+        )
+    if index_exists('uq_knowledge_embeddings_source'):
+        op.drop_index('uq_knowledge_embeddings_source', table_name='knowledge_embeddings')
@@ -0,0 +1,87 @@
+"""tenant daily stats rollup
+
+Revision ID: 20260206_tenant_daily_stats
+Revises: 20260205_knowledge_source_uq
+Create Date: 2026-02-06
+
+Cria tenant_daily_stats (contadores diários por tenant) usada pelo
+dashboard CEO no lugar de COUNT/MAX por tenant em loop.
+A tabela é preenchida com o histórico de leads e mensagens; a partir
+daí é incrementada pelo listener de flush (tenant_stats_service).
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+# revision identifiers, used by Alembic.
+revision = '20260206_tenant_daily_stats'
+down_revision = '20260205_knowledge_source_uq'
+branch_labels = None
+depends_on = None
+
+
+def table_exists(table_name: str) -> bool:
+    conn = op.get_bind()
+    result = conn.execute(text(
+        "SELECT EXISTS (SELECT FROM information_schema.tables WHERE table_name = :name)"
+    ), {"name": table_name})
+    return result.scalar()
+
+
+def upgrade() -> None:
+    if table_exists('tenant_daily_stats'):
+        print("ℹ️ Tabela tenant_daily_stats já existe")
+        return
+
+    op.create_table(
+        'tenant_daily_stats',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('tenant_id', sa.Integer(), sa.ForeignKey('tenants.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('leads_created', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('messages_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('user_messages', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('assistant_messages', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('tokens_used', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('last_message_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.UniqueConstraint('tenant_id', 'day', name='uq_tenant_daily_stats_day'),
+    )
+    op.create_index('ix_tenant_daily_stats_day', 'tenant_daily_stats', ['day'])
+
+    # Backfill com o histórico (dia em UTC)
+    op.execute("""
+        INSERT INTO tenant_daily_stats (
+            tenant_id, day, leads_created, messages_count, user_messages,
+            assistant_messages, tokens_used, last_message_at
+        )
+        SELECT tenant_id, day,
+               SUM(leads_created), SUM(messages_count), SUM(user_messages),
+               SUM(assistant_messages), SUM(tokens_used), MAX(last_message_at)
+        FROM (
+            SELECT l.tenant_id, (l.created_at AT TIME ZONE 'UTC')::date AS day,
+                   1 AS leads_created, 0 AS messages_count, 0 AS user_messages,
+                   0 AS assistant_messages, 0 AS tokens_used,
+                   NULL::timestamptz AS last_message_at
+            FROM leads l
+            UNION ALL
+            SELECT l.tenant_id, (m.created_at AT TIME ZONE 'UTC')::date,
+                   0, 1,
+                   CASE WHEN m.role = 'user' THEN 1 ELSE 0 END,
+                   CASE WHEN m.role = 'assistant' THEN 1 ELSE 0 END,
+                   COALESCE(m.tokens_used, 0),
+                   m.created_at
+            FROM messages m
+            JOIN leads l ON l.id = m.lead_id
+        ) src
+        GROUP BY tenant_id, day
+    """)
+
+    print("✅ Tabela tenant_daily_stats criada e preenchida")
+
+
+def downgrade() -> None:
+    if table_exists('tenant_daily_stats'):
+        op.drop_index('ix_tenant_daily_stats_day', table_name='tenant_daily_stats')
+        op.drop_table('tenant_daily_stats')
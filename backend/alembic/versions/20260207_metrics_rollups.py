@@ -0,0 +1,152 @@
+"""metrics rollups for dashboard
+
+Revision ID: 20260207_metrics_rollups
+Revises: 20260206_tenant_daily_stats
+Create Date: 2026-02-07
+
+Estende tenant_daily_stats com os contadores do /dashboard/metrics
+(fora do horário, quentes, transferidos, engajados, tempo de resposta)
+e cria tenant_lead_counters (distribuição atual dos leads por status,
+qualificação, canal, origem e quentes aguardando).
+Ambas são recalculadas a partir do histórico.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+# revision identifiers, used by Alembic.
+revision = '20260207_metrics_rollups'
+down_revision = '20260206_tenant_daily_stats'
+branch_labels = None
+depends_on = None
+
+
+NEW_DAILY_COLUMNS = [
+    ('leads_after_hours', sa.Integer()),
+    ('leads_hot', sa.Integer()),
+    ('leads_handed_off', sa.Integer()),
+    ('leads_engaged', sa.Integer()),
+    ('response_time_seconds', sa.BigInteger()),
+    ('response_time_samples', sa.Integer()),
+]
+
+
+def table_exists(table_name: str) -> bool:
+    conn = op.get_bind()
+    result = conn.execute(text(
+        "SELECT EXISTS (SELECT FROM information_schema.tables WHERE table_name = :name)"
+    ), {"name": table_name})
+    return result.scalar()
+
+
+def column_exists(table_name: str, column_name: str) -> bool:
+    conn = op.get_bind()
+    result = conn.execute(text(
+        "SELECT EXISTS (SELECT FROM information_schema.columns "
+        "WHERE table_name = :table AND column_name = :column)"
+    ), {"table": table_name, "column": column_name})
+    return result.scalar()
+
+
+def upgrade() -> None:
+    for column_name, column_type in NEW_DAILY_COLUMNS:
+        if not column_exists('tenant_daily_stats', column_name):
+            op.add_column(
+                'tenant_daily_stats',
+                sa.Column(column_name, column_type, nullable=False, server_default='0'),
+            )
+
+    if not table_exists('tenant_lead_counters'):
+        op.create_table(
+            'tenant_lead_counters',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('tenant_id', sa.Integer(), sa.ForeignKey('tenants.id', ondelete='CASCADE'), nullable=False),
+            sa.Column('dimension', sa.String(20), nullable=False),
+            sa.Column('value', sa.String(50), nullable=False),
+            sa.Column('count', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+            sa.UniqueConstraint('tenant_id', 'dimension', 'value', name='uq_tenant_lead_counters_key'),
+        )
+
+    # Recalcula o rollup diário com as novas colunas
+    op.execute("DELETE FROM tenant_daily_stats")
+    op.execute("""
+        INSERT INTO tenant_daily_stats (
+            tenant_id, day, leads_created, leads_after_hours, leads_hot, leads_handed_off,
+            leads_engaged, response_time_seconds, response_time_samples, messages_count,
+            user_messages, assistant_messages, tokens_used, last_message_at
+        )
+        SELECT tenant_id, day,
+               SUM(leads_created), SUM(leads_after_hours), SUM(leads_hot), SUM(leads_handed_off),
+               SUM(leads_engaged), SUM(response_time_seconds), SUM(response_time_samples),
+               SUM(messages_count), SUM(user_messages), SUM(assistant_messages),
+               SUM(tokens_used), MAX(last_message_at)
+        FROM (
+            SELECT l.tenant_id, (l.created_at AT TIME ZONE 'UTC')::date AS day,
+                   1 AS leads_created,
+                   CASE WHEN EXTRACT(HOUR FROM l.created_at AT TIME ZONE 'UTC') < 8
+                          OR EXTRACT(HOUR FROM l.created_at AT TIME ZONE 'UTC') >= 22
+                          OR EXTRACT(ISODOW FROM l.created_at AT TIME ZONE 'UTC') >= 6
+                        THEN 1 ELSE 0 END AS leads_after_hours,
+                   CASE WHEN l.qualification IN ('quente', 'hot') THEN 1 ELSE 0 END AS leads_hot,
+                   CASE WHEN l.status = 'transferido' THEN 1 ELSE 0 END AS leads_handed_off,
+                   CASE WHEN (
+                       SELECT COUNT(*) FROM messages um
+                       WHERE um.lead_id = l.id AND um.role = 'user'
+                   ) >= 2 THEN 1 ELSE 0 END AS leads_engaged,
+                   0::bigint AS response_time_seconds, 0 AS response_time_samples,
+                   0 AS messages_count, 0 AS user_messages, 0 AS assistant_messages,
+                   0 AS tokens_used, NULL::timestamptz AS last_message_at
+            FROM leads l
+            UNION ALL
+            SELECT l.tenant_id, (l.created_at AT TIME ZONE 'UTC')::date,
+                   0, 0, 0, 0, 0,
+                   GREATEST(EXTRACT(EPOCH FROM m.created_at - l.created_at), 0)::bigint, 1,
+                   0, 0, 0, 0, NULL
+            FROM messages m
+            JOIN leads l ON l.id = m.lead_id
+            WHERE m.role = 'assistant'
+            UNION ALL
+            SELECT l.tenant_id, (m.created_at AT TIME ZONE 'UTC')::date,
+                   0, 0, 0, 0, 0, 0, 0,
+                   1,
+                   CASE WHEN m.role = 'user' THEN 1 ELSE 0 END,
+                   CASE WHEN m.role = 'assistant' THEN 1 ELSE 0 END,
+                   COALESCE(m.tokens_used, 0),
+                   m.created_at
+            FROM messages m
+            JOIN leads l ON l.id = m.lead_id
+        ) src
+        GROUP BY tenant_id, day
+    """)
+
+    op.execute("DELETE FROM tenant_lead_counters")
+    op.execute("""
+        INSERT INTO tenant_lead_counters (tenant_id, dimension, value, count, updated_at)
+        SELECT tenant_id, dimension, value, COUNT(*), now()
+        FROM (
+            SELECT tenant_id, 'status' AS dimension, COALESCE(status, '') AS value FROM leads
+            UNION ALL
+            SELECT tenant_id, 'qualification', COALESCE(qualification, '') FROM leads
+            UNION ALL
+            SELECT tenant_id, 'channel', COALESCE(channel_id::text, '') FROM leads
+            UNION ALL
+            SELECT tenant_id, 'source', COALESCE(source, '') FROM leads
+            UNION ALL
+            SELECT tenant_id, 'hot_waiting', '1' FROM leads
+            WHERE qualification IN ('quente', 'hot')
+              AND COALESCE(status, '') <> 'transferido'
+              AND assigned_seller_id IS NULL
+        ) src
+        GROUP BY tenant_id, dimension, value
+    """)
+
+    print("✅ Rollups de métricas (tenant_daily_stats + tenant_lead_counters) criados e preenchidos")
+
+
+def downgrade() -> None:
+    if table_exists('tenant_lead_counters'):
+        op.drop_table('tenant_lead_counters')
+    for column_name, _ in NEW_DAILY_COLUMNS:
+        if column_exists('tenant_daily_stats', column_name):
+            op.drop_column('tenant_daily_stats', column_name)
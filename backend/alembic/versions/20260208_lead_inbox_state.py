@@ -0,0 +1,98 @@
+"""lead inbox state
+
+Revision ID: 20260208_lead_inbox_state
+Revises: 20260207_metrics_rollups
+Create Date: 2026-02-08
+
+Adiciona em leads o estado do inbox do corretor (não lidas desde o
+take-over, data/preview/autor da última mensagem), mantido no flush
+por inbox_state_service, e o índice da paginação por cursor do
+/seller/inbox/leads. Os valores são preenchidos a partir de messages.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+# revision identifiers, used by Alembic.
+revision = '20260208_lead_inbox_state'
+down_revision = '20260207_metrics_rollups'
+branch_labels = None
+depends_on = None
+
+
+NEW_COLUMNS = [
+    ('inbox_unread_count', sa.Integer(), {'nullable': False, 'server_default': '0'}),
+    ('inbox_last_message_at', sa.DateTime(timezone=True), {'nullable': True}),
+    ('inbox_last_message_preview', sa.String(60), {'nullable': True}),
+    ('inbox_last_message_role', sa.String(20), {'nullable': True}),
+]
+
+
+def column_exists(table_name: str, column_name: str) -> bool:
+    conn = op.get_bind()
+    result = conn.execute(text(
+        "SELECT EXISTS (SELECT FROM information_schema.columns "
+        "WHERE table_name = :table AND column_name = :column)"
+    ), {"table": table_name, "column": column_name})
+    return result.scalar()
+
+
+def index_exists(index_name: str) -> bool:
+    conn = op.get_bind()
+    result = conn.execute(text(
+        "SELECT EXISTS (SELECT FROM pg_indexes WHERE indexname = :name)"
+    ), {"name": index_name})
+    return result.scalar()
+
+
+def upgrade() -> None:
+    for name, column_type, options in NEW_COLUMNS:
+        if not column_exists('leads', name):
+            op.add_column('leads', sa.Column(name, column_type, **options))
+
+    # Backfill: não lidas desde o take-over e última mensagem de cada lead
+    op.execute("""
+        UPDATE leads l SET
+            inbox_unread_count = s.unread,
+            inbox_last_message_at = s.last_at,
+            inbox_last_message_preview = CASE
+                WHEN length(s.last_content) > 50 THEN left(s.last_content, 50) || '...'
+                ELSE s.last_content
+            END,
+            inbox_last_message_role = s.last_role
+        FROM (
+            SELECT
+                b.id,
+                (SELECT COUNT(*) FROM messages m
+                  WHERE m.lead_id = b.id AND m.role = 'user'
+                    AND (b.seller_took_over_at IS NULL OR m.created_at > b.seller_took_over_at)
+                ) AS unread,
+                last.created_at AS last_at,
+                last.content AS last_content,
+                last.role AS last_role
+            FROM leads b
+            LEFT JOIN LATERAL (
+                SELECT created_at, content, role FROM messages m
+                 WHERE m.lead_id = b.id
+                 ORDER BY m.created_at DESC, m.id DESC
+                 LIMIT 1
+            ) last ON TRUE
+        ) s
+        WHERE l.id = s.id
+    """)
+
+    if not index_exists('ix_leads_seller_inbox'):
+        op.execute("""
+            CREATE INDEX ix_leads_seller_inbox
+            ON leads (assigned_seller_id, inbox_last_message_at DESC NULLS LAST, id DESC)
+        """)
+
+    print("✅ Estado do inbox adicionado em leads")
+
+
+def downgrade() -> None:
+    if index_exists('ix_leads_seller_inbox'):
+        op.drop_index('ix_leads_seller_inbox', table_name='leads')
+    for name, _, _ in reversed(NEW_COLUMNS):
+        if column_exists('leads', name):
+            op.drop_column('leads', name)
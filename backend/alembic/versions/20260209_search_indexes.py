@@ -0,0 +1,100 @@
+"""search indexes (tsvector + pg_trgm)
+
+Revision ID: 20260209_search_indexes
+Revises: 20260208_lead_inbox_state
+Create Date: 2026-02-09
+
+Busca indexada no lugar de ILIKE '%termo%':
+
+- Extensões unaccent e pg_trgm
+- immutable_unaccent(text): unaccent utilizável em índices
+- Configuração de texto pt_unaccent (portuguese + unaccent)
+- messages.search_vector (tsvector) + índice GIN
+- Índices trigram em leads: nome sem acento, telefone e e-mail
+
+messages.search_vector é criada vazia (sem reescrever a tabela);
+o histórico é indexado em lotes pelo search_backfill_job.
+Os índices são criados com CONCURRENTLY (fora da transação).
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import TSVECTOR
+
+# revision identifiers, used by Alembic.
+revision = '20260209_search_indexes'
+down_revision = '20260208_lead_inbox_state'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_messages_search_vector', "messages USING GIN (search_vector)"),
+    ('ix_messages_search_pending', "messages (id) WHERE search_vector IS NULL"),
+    ('ix_leads_name_trgm', "leads USING GIN (immutable_unaccent(lower(name)) gin_trgm_ops)"),
+    ('ix_leads_phone_trgm', "leads USING GIN (phone gin_trgm_ops)"),
+    ('ix_leads_email_trgm', "leads USING GIN (lower(email) gin_trgm_ops)"),
+]
+
+
+def column_exists(table_name: str, column_name: str) -> bool:
+    conn = op.get_bind()
+    result = conn.execute(text(
+        "SELECT EXISTS (SELECT FROM information_schema.columns "
+        "WHERE table_name = :table AND column_name = :column)"
+    ), {"table": table_name, "column": column_name})
+    return result.scalar()
+
+
+def config_exists(name: str) -> bool:
+    conn = op.get_bind()
+    result = conn.execute(text(
+        "SELECT EXISTS (SELECT FROM pg_ts_config WHERE cfgname = :name)"
+    ), {"name": name})
+    return result.scalar()
+
+
+def upgrade() -> None:
+    # 1. Extensões
+    op.execute('CREATE EXTENSION IF NOT EXISTS unaccent')
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    # 2. unaccent é STABLE; o wrapper com dicionário explícito pode ser IMMUTABLE
+    op.execute("""
+        CREATE OR REPLACE FUNCTION immutable_unaccent(text)
+        RETURNS text
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+        AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$
+    """)
+
+    # 3. Configuração portuguese + unaccent (stemming sem acentos)
+    if not config_exists('pt_unaccent'):
+        op.execute("CREATE TEXT SEARCH CONFIGURATION pt_unaccent (COPY = portuguese)")
+        op.execute("""
+            ALTER TEXT SEARCH CONFIGURATION pt_unaccent
+            ALTER MAPPING FOR hword, hword_part, word
+            WITH unaccent, portuguese_stem
+        """)
+
+    # 4. Coluna (nullable, sem default: não reescreve messages)
+    if not column_exists('messages', 'search_vector'):
+        op.add_column('messages', sa.Column('search_vector', TSVECTOR(), nullable=True))
+
+    # 5. Índices sem travar escrita
+    with op.get_context().autocommit_block():
+        for name, definition in INDEXES:
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {definition}")
+
+    print("✅ Índices de busca criados (histórico indexado pelo search_backfill_job)")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _ in reversed(INDEXES):
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+    if column_exists('messages', 'search_vector'):
+        op.drop_column('messages', 'search_vector')
+
+    op.execute("DROP TEXT SEARCH CONFIGURATION IF EXISTS pt_unaccent")
+    op.execute("DROP FUNCTION IF EXISTS immutable_unaccent(text)")
@@ -0,0 +1,56 @@
+"""lead summary checkpoint
+
+Revision ID: 20260210_lead_summary_checkpoint
+Revises: 20260209_search_indexes
+Create Date: 2026-02-10
+
+Adiciona leads.summary_message_id: última mensagem já incorporada ao
+conversation_summary. O resumo passa a ser atualizado de forma
+incremental (só mensagens depois do checkpoint).
+
+Backfill: resumos antigos cobriam as primeiras
+custom_data.summary_message_count mensagens do lead.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+# revision identifiers, used by Alembic.
+revision = '20260210_lead_summary_checkpoint'
+down_revision = '20260209_search_indexes'
+branch_labels = None
+depends_on = None
+
+
+def column_exists(table_name: str, column_name: str) -> bool:
+    conn = op.get_bind()
+    result = conn.execute(text(
+        "SELECT EXISTS (SELECT FROM information_schema.columns "
+        "WHERE table_name = :table AND column_name = :column)"
+    ), {"table": table_name, "column": column_name})
+    return result.scalar()
+
+
+def upgrade() -> None:
+    if not column_exists('leads', 'summary_message_id'):
+        op.add_column('leads', sa.Column('summary_message_id', sa.Integer(), nullable=True))
+
+    op.execute("""
+        UPDATE leads l SET summary_message_id = (
+            SELECT m.id FROM messages m
+             WHERE m.lead_id = l.id
+             ORDER BY m.id
+             OFFSET GREATEST((l.custom_data->>'summary_message_count')::int - 1, 0)
+             LIMIT 1
+        )
+        WHERE l.conversation_summary IS NOT NULL
+          AND l.summary_message_id IS NULL
+          AND l.custom_data ? 'summary_message_count'
+    """)
+
+    print("✅ Checkpoint do resumo adicionado em leads")
+
+
+def downgrade() -> None:
+    if column_exists('leads', 'summary_message_id'):
+        op.drop_column('leads', 'summary_message_id')
@@ -0,0 +1,63 @@
+"""lead message counters
+
+Revision ID: 20260211_lead_message_counters
+Revises: 20260210_lead_summary_checkpoint
+Create Date: 2026-02-11
+
+Adiciona em leads message_count e user_message_count, mantidos no
+flush por inbox_state_service (junto com inbox_last_message_at, a data
+da última mensagem), no lugar de count(Message.id) em cada leitura.
+Os valores são preenchidos a partir de messages.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+# revision identifiers, used by Alembic.
+revision = '20260211_lead_message_counters'
+down_revision = '20260210_lead_summary_checkpoint'
+branch_labels = None
+depends_on = None
+
+
+NEW_COLUMNS = [
+    ('message_count', sa.Integer(), {'nullable': False, 'server_default': '0'}),
+    ('user_message_count', sa.Integer(), {'nullable': False, 'server_default': '0'}),
+]
+
+
+def column_exists(table_name: str, column_name: str) -> bool:
+    conn = op.get_bind()
+    result = conn.execute(text(
+        "SELECT EXISTS (SELECT FROM information_schema.columns "
+        "WHERE table_name = :table AND column_name = :column)"
+    ), {"table": table_name, "column": column_name})
+    return result.scalar()
+
+
+def upgrade() -> None:
+    for name, column_type, options in NEW_COLUMNS:
+        if not column_exists('leads', name):
+            op.add_column('leads', sa.Column(name, column_type, **options))
+
+    op.execute("""
+        UPDATE leads l SET
+            message_count = c.total,
+            user_message_count = c.user_total
+        FROM (
+            SELECT lead_id,
+                   COUNT(*) AS total,
+                   COUNT(*) FILTER (WHERE role = 'user') AS user_total
+              FROM messages
+             GROUP BY lead_id
+        ) c
+        WHERE l.id = c.lead_id
+    """)
+
+    print("✅ Contadores de mensagens adicionados em leads")
+
+
+def downgrade() -> None:
+    for name, _, _ in reversed(NEW_COLUMNS):
+        if column_exists('leads', name):
+            op.drop_column('leads', name)
@@ -59,6 +59,7 @@ from src.api.routes import (
     appointments_router,
     manager_ai_router,
     templates_router,
+    search_router,
 )
 from src.api.routes.phoenix_routes import router as phoenix_router
 
@@ -66,9 +67,25 @@ from src.api.routes.phoenix_routes import router as phoenix_router
 from src.domain.entities import User, Tenant
 from src.domain.entities.enums import UserRole
 from src.infrastructure.services.auth_service import hash_password
+from src.infrastructure.services.tenant_stats_service import register_tenant_stats_listener
+from src.infrastructure.services.inbox_state_service import register_inbox_state_listener
+from src.infrastructure.services.search_service import register_search_listener
+from src.infrastructure.services.message_window_service import register_message_window_listener
 
 settings = get_settings()
 
+# Rollup tenant_daily_stats é incrementado a cada flush com Lead/Message novos
+register_tenant_stats_listener()
+
+# Estado do inbox do corretor (não lidas, última mensagem) mantido a cada flush
+register_inbox_state_listener()
+
+# Mensagens indexadas para busca full-text no próprio INSERT
+register_search_listener()
+
+# Janela de mensagens recentes por lead (Redis) atualizada a cada commit
+register_message_window_listener()
+
 
 # ============================================================
 # 🚀 Criar superadmin automaticamente
@@ -157,14 +174,41 @@ async def lifespan(app: FastAPI):
 
     await create_superadmin()
 
+    # Popula tabela de roteamento de webhooks (apenas se vazia)
+    try:
+        from src.infrastructure.services.tenant_routing_service import backfill_tenant_routes
+        async with async_session() as db:
+            await backfill_tenant_routes(db)
+    except Exception as e:
+        print(f"⚠️ Erro no backfill de rotas de tenant: {e}")
+
     # Inicia scheduler de jobs
     create_scheduler()
     start_scheduler()
 
+    # Subscriber pub/sub do SSE (eventos entre workers/réplicas)
+    from src.infrastructure.services.sse_service import sse_manager
+    await sse_manager.start()
+
+    # Fila de entrada: workers de processamento/envio dos webhooks
+    from src.infrastructure.queue import get_inbound_queue, start_inbound_queue, stop_inbound_queue
+    from src.application.use_cases.zapi_inbound import register_zapi_handlers
+    register_zapi_handlers(get_inbound_queue())
+    await start_inbound_queue()
+
     yield
 
-    # Para scheduler
-    stop_scheduler()
+    # Para de consumir a fila (jobs não confirmados voltam para outra réplica)
+    await stop_inbound_queue()
+
+    await sse_manager.stop()
+
+    # Para scheduler (aguarda jobs em andamento)
+    await stop_scheduler()
+
+    # Fecha pools HTTP compartilhados
+    from src.infrastructure.services.http_client_registry import close_http_clients
+    await close_http_clients()
 
 
 # ============================================================
@@ -303,6 +347,7 @@ app.include_router(opportunities_leads_router, prefix="/api/v1")
 app.include_router(appointments_router, prefix="/api/v1")
 app.include_router(manager_ai_router, prefix="/api/v1")
 app.include_router(templates_router, prefix="/api/v1")
+app.include_router(search_router, prefix="/api/v1")
 app.include_router(phoenix_router)  # Phoenix Engine (já tem prefix no router)
 
 # Admin
@@ -5,6 +5,9 @@ ADMIN: Dashboard CEO
 Métricas avançadas para visão executiva do negócio.
 Endpoints específicos para o SUPERADMIN/CEO.
 
+Contadores de leads e mensagens vêm do rollup diário tenant_daily_stats
+(consultas agrupadas por tenant/semana, sem loops de COUNT por tenant).
+
 ÚLTIMA ATUALIZAÇÃO: 2024-12-29
 """
 
@@ -16,8 +19,12 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 
 from src.infrastructure.database import get_db
-from src.domain.entities import Tenant, Lead, Message, User
+from src.domain.entities import Tenant, Lead, User, TenantDailyStats
 from src.api.routes.admin.deps import get_current_superadmin
+from src.infrastructure.services.tenant_stats_service import (
+    tenant_totals_query,
+    weekly_totals_query,
+)
 
 router = APIRouter(prefix="/admin/ceo", tags=["Admin - CEO Dashboard"])
 
@@ -40,6 +47,18 @@ def make_aware(dt: datetime) -> datetime:
     return dt
 
 
+async def get_last_activity_by_tenant(db: AsyncSession) -> dict[int, datetime]:
+    """Última mensagem de cada tenant (uma consulta agrupada no rollup)."""
+    result = await db.execute(
+        select(TenantDailyStats.tenant_id, func.max(TenantDailyStats.last_message_at))
+        .group_by(TenantDailyStats.tenant_id)
+    )
+    return {
+        tenant_id: make_aware(last_activity)
+        for tenant_id, last_activity in result.all()
+        if last_activity is not None
+    }
+
 
 # =============================================================================
 # SCHEMAS
@@ -175,32 +194,31 @@ async def get_ceo_metrics(
     active_clients = active_tenants_result.scalar() or 0
     inactive_clients = total_clients - active_clients
     
-    # Total de leads
-    total_leads_result = await db.execute(select(func.count(Lead.id)))
-    total_leads = total_leads_result.scalar() or 0
-    
-    # Leads esta semana
-    leads_week_result = await db.execute(
-        select(func.count(Lead.id)).where(Lead.created_at >= week_ago)
-    )
-    leads_this_week = leads_week_result.scalar() or 0
-    
-    # Leads este mês
-    leads_month_result = await db.execute(
-        select(func.count(Lead.id)).where(Lead.created_at >= month_ago)
-    )
-    leads_this_month = leads_month_result.scalar() or 0
-    
-    # Leads mês passado (para calcular crescimento)
-    leads_last_month_result = await db.execute(
-        select(func.count(Lead.id)).where(
-            and_(
-                Lead.created_at >= two_months_ago,
-                Lead.created_at < month_ago
-            )
+    # Leads e mensagens por período (uma consulta no rollup diário)
+    today = start_of_day.date()
+    stats = TenantDailyStats
+    totals_result = await db.execute(
+        select(
+            func.coalesce(func.sum(stats.leads_created), 0),
+            func.coalesce(func.sum(stats.leads_created).filter(stats.day > week_ago.date()), 0),
+            func.coalesce(func.sum(stats.leads_created).filter(stats.day > month_ago.date()), 0),
+            func.coalesce(func.sum(stats.leads_created).filter(
+                and_(stats.day > two_months_ago.date(), stats.day <= month_ago.date())
+            ), 0),
+            func.coalesce(func.sum(stats.messages_count), 0),
+            func.coalesce(func.sum(stats.messages_count).filter(stats.day > week_ago.date()), 0),
+            func.coalesce(func.sum(stats.tokens_used).filter(stats.day == today), 0),
         )
     )
-    leads_last_month = leads_last_month_result.scalar() or 0
+    (
+        total_leads,
+        leads_this_week,
+        leads_this_month,
+        leads_last_month,
+        total_messages,
+        messages_this_week,
+        tokens_today,
+    ) = (int(value) for value in totals_result.one())
     
     # Crescimento percentual
     if leads_last_month > 0:
@@ -208,28 +226,17 @@ async def get_ceo_metrics(
     else:
         leads_growth_percent = 100 if leads_this_month > 0 else 0
     
-    # Total de mensagens
-    total_messages_result = await db.execute(select(func.count(Message.id)))
-    total_messages = total_messages_result.scalar() or 0
-    
-    # Mensagens esta semana
-    messages_week_result = await db.execute(
-        select(func.count(Message.id)).where(Message.created_at >= week_ago)
+    # Qualificação e handoffs refletem o estado atual dos leads (uma consulta)
+    lead_state_result = await db.execute(
+        select(
+            func.count(Lead.id).filter(Lead.qualification == "quente"),
+            func.count(Lead.id).filter(Lead.status == "handed_off"),
+        )
     )
-    messages_this_week = messages_week_result.scalar() or 0
+    hot_leads, total_handoffs = lead_state_result.one()
     
     # Taxa de conversão média (leads quentes / total)
-    hot_leads_result = await db.execute(
-        select(func.count(Lead.id)).where(Lead.qualification == "quente")
-    )
-    hot_leads = hot_leads_result.scalar() or 0
     avg_conversion_rate = (hot_leads / total_leads * 100) if total_leads > 0 else 0
-    
-    # Total de handoffs
-    handoffs_result = await db.execute(
-        select(func.count(Lead.id)).where(Lead.status == "handed_off")
-    )
-    total_handoffs = handoffs_result.scalar() or 0
 
     # --------------------------------------------------------------------------
     # 2. SAÚDE DOS TENANTS
@@ -257,6 +264,7 @@ async def get_ceo_metrics(
     }
     
     estimated_mrr = 0.0
+    last_activity_by_tenant = await get_last_activity_by_tenant(db)
     
     # Verifica saúde e calcula MRR
     for t_id, t_active, t_plan in tenants_data:
@@ -264,15 +272,9 @@ async def get_ceo_metrics(
             estimated_mrr += PLAN_PRICES.get(t_plan, 297.00)
             
             # Saúde do tenant
-            last_msg_result = await db.execute(
-                select(func.max(Message.created_at))
-                .join(Lead, Message.lead_id == Lead.id)
-                .where(Lead.tenant_id == t_id)
-            )
-            last_activity_val = last_msg_result.scalar()
+            last_activity_val = last_activity_by_tenant.get(t_id)
             
             if last_activity_val:
-                last_activity_val = make_aware(last_activity_val)
                 if last_activity_val >= three_days_ago:
                     clients_healthy += 1
                 elif last_activity_val >= week_ago:
@@ -292,10 +294,6 @@ async def get_ceo_metrics(
     # Custo médio input/output gpt-4o-mini ~ USD 0.60 / 1M tokens => R$ 3.50 / 1M tokens
     COST_PER_TOKEN_BRL = 0.0000035  
     
-    tokens_today_result = await db.execute(
-        select(func.sum(Message.tokens_used)).where(Message.created_at >= start_of_day)
-    )
-    tokens_today = tokens_today_result.scalar() or 0
     burn_rate_today = tokens_today * COST_PER_TOKEN_BRL
     
     # Projetado mensal (Burn Rate do dia * 30 + Custos Fixos de Servidor)
@@ -384,56 +382,29 @@ async def get_clients_health(
     )
     tenants = tenants_result.scalars().all()
     
+    # Totais por tenant: uma consulta agrupada no rollup + uma nos leads
+    totals_result = await db.execute(tenant_totals_query(
+        since_week=week_ago.date() + timedelta(days=1),
+        since_month=month_ago.date() + timedelta(days=1),
+    ))
+    totals_by_tenant = {row.tenant_id: row for row in totals_result.all()}
+    
+    hot_leads_result = await db.execute(
+        select(Lead.tenant_id, func.count(Lead.id))
+        .where(Lead.qualification == "quente")
+        .group_by(Lead.tenant_id)
+    )
+    hot_leads_by_tenant = dict(hot_leads_result.all())
+    
     health_list = []
     
     for tenant in tenants:
-        # Total de leads
-        leads_total_result = await db.execute(
-            select(func.count(Lead.id)).where(Lead.tenant_id == tenant.id)
-        )
-        leads_total = leads_total_result.scalar() or 0
-        
-        # Leads esta semana
-        leads_week_result = await db.execute(
-            select(func.count(Lead.id)).where(
-                and_(
-                    Lead.tenant_id == tenant.id,
-                    Lead.created_at >= week_ago
-                )
-            )
-        )
-        leads_this_week = leads_week_result.scalar() or 0
-        
-        # Leads este mês
-        leads_month_result = await db.execute(
-            select(func.count(Lead.id)).where(
-                and_(
-                    Lead.tenant_id == tenant.id,
-                    Lead.created_at >= month_ago
-                )
-            )
-        )
-        leads_this_month = leads_month_result.scalar() or 0
-        
-        # Total de mensagens
-        messages_result = await db.execute(
-            select(func.count(Message.id))
-            .join(Lead, Message.lead_id == Lead.id)
-            .where(Lead.tenant_id == tenant.id)
-        )
-        messages_total = messages_result.scalar() or 0
-        
-        # Última atividade
-        last_activity_result = await db.execute(
-            select(func.max(Message.created_at))
-            .join(Lead, Message.lead_id == Lead.id)
-            .where(Lead.tenant_id == tenant.id)
-        )
-        last_activity = last_activity_result.scalar()
-        
-        # Converte para timezone-aware se necessário
-        if last_activity:
-            last_activity = make_aware(last_activity)
+        totals = totals_by_tenant.get(tenant.id)
+        leads_total = int(totals.leads_total or 0) if totals else 0
+        leads_this_week = int(totals.leads_week or 0) if totals else 0
+        leads_this_month = int(totals.leads_month or 0) if totals else 0
+        messages_total = int(totals.messages_total or 0) if totals else 0
+        last_activity = make_aware(totals.last_activity) if totals else None
         
         # Dias desde última atividade
         if last_activity:
@@ -442,15 +413,7 @@ async def get_clients_health(
             days_since = 999  # Nunca teve atividade
         
         # Taxa de conversão do tenant
-        hot_leads_result = await db.execute(
-            select(func.count(Lead.id)).where(
-                and_(
-                    Lead.tenant_id == tenant.id,
-                    Lead.qualification == "quente"
-                )
-            )
-        )
-        hot_leads = hot_leads_result.scalar() or 0
+        hot_leads = hot_leads_by_tenant.get(tenant.id, 0)
         conversion_rate = (hot_leads / leads_total * 100) if leads_total > 0 else 0
         
         # Determina status
@@ -506,19 +469,11 @@ async def get_alerts(
         )
     )
     tenants = tenants_result.scalars().all()
+    last_activity_by_tenant = await get_last_activity_by_tenant(db)
     
     for tenant in tenants:
         # Verifica última atividade
-        last_activity_result = await db.execute(
-            select(func.max(Message.created_at))
-            .join(Lead, Message.lead_id == Lead.id)
-            .where(Lead.tenant_id == tenant.id)
-        )
-        last_activity = last_activity_result.scalar()
-        
-        # Converte para timezone-aware se necessário
-        if last_activity:
-            last_activity = make_aware(last_activity)
+        last_activity = last_activity_by_tenant.get(tenant.id)
         
         if last_activity is None:
             alerts.append(Alert(
@@ -565,43 +520,25 @@ async def get_weekly_growth(
 ):
     """
     Retorna dados de crescimento semanal para gráfico.
+    
+    Semanas de calendário (segunda a domingo, UTC) agrupadas no rollup
+    diário; o label é o dia de início da semana.
     """
-    now = get_utc_now()
-    growth_data = []
+    today = get_utc_now().date()
+    current_week = today - timedelta(days=today.weekday())
+    first_week = current_week - timedelta(weeks=weeks - 1)
     
-    for i in range(weeks - 1, -1, -1):
-        week_start = now - timedelta(weeks=i+1)
-        week_end = now - timedelta(weeks=i)
-        
-        # Leads da semana
-        leads_result = await db.execute(
-            select(func.count(Lead.id)).where(
-                and_(
-                    Lead.created_at >= week_start,
-                    Lead.created_at < week_end
-                )
-            )
-        )
-        leads_count = leads_result.scalar() or 0
-        
-        # Mensagens da semana
-        messages_result = await db.execute(
-            select(func.count(Message.id)).where(
-                and_(
-                    Message.created_at >= week_start,
-                    Message.created_at < week_end
-                )
-            )
-        )
-        messages_count = messages_result.scalar() or 0
-        
-        # Formata label da semana
-        week_label = week_end.strftime("%d/%m")
-        
+    result = await db.execute(weekly_totals_query(since=first_week))
+    by_week = {row.week: row for row in result.all()}
+    
+    growth_data = []
+    for i in range(weeks):
+        week_start = first_week + timedelta(weeks=i)
+        row = by_week.get(week_start)
         growth_data.append(WeeklyGrowth(
-            week=week_label,
-            leads=leads_count,
-            messages=messages_count,
+            week=week_start.strftime("%d/%m"),
+            leads=int(row.leads or 0) if row else 0,
+            messages=int(row.messages or 0) if row else 0,
         ))
     
     return growth_data
@@ -629,6 +566,28 @@ async def get_scheduler_status(
         }
 
 
+@router.get("/inbound-queue-status")
+async def get_inbound_queue_status(
+    current_user: User = Depends(get_current_superadmin),
+):
+    """
+    Retorna status da fila de entrada (profundidade, retries, dead-letter).
+    """
+    try:
+        from src.infrastructure.queue import get_inbound_queue
+        status = await get_inbound_queue().get_status()
+        return {
+            "success": True,
+            **status
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e),
+            "running": False,
+        }
+
+
 @router.post("/trigger-follow-up")
 async def trigger_follow_up(
     current_user: User = Depends(get_current_superadmin),
@@ -736,17 +695,12 @@ async def get_churn_risk(
     tenants = tenants_result.scalars().all()
     
     churn_list = []
+    last_activity_by_tenant = await get_last_activity_by_tenant(db)
     
     for t in tenants:
         # Última atividade
-        last_msg_result = await db.execute(
-            select(func.max(Message.created_at))
-            .join(Lead, Message.lead_id == Lead.id)
-            .where(Lead.tenant_id == t.id)
-        )
-        last_activity = last_msg_result.scalar()
+        last_activity = last_activity_by_tenant.get(t.id)
         if last_activity:
-            last_activity = make_aware(last_activity)
             days_inactive = (now - last_activity).days
         else:
             days_inactive = 999
@@ -790,6 +744,21 @@ async def get_upsell_opportunities(
     )
     tenants = tenants_result.scalars().all()
     
+    # Mensagens e leads do mês por tenant (uma consulta agrupada no rollup)
+    month_result = await db.execute(
+        select(
+            TenantDailyStats.tenant_id,
+            func.sum(TenantDailyStats.messages_count),
+            func.sum(TenantDailyStats.leads_created),
+        )
+        .where(TenantDailyStats.day >= month_start.date())
+        .group_by(TenantDailyStats.tenant_id)
+    )
+    month_by_tenant = {
+        tenant_id: (int(messages or 0), int(leads or 0))
+        for tenant_id, messages, leads in month_result.all()
+    }
+    
     upsell_list = []
     
     # Limites fictícios dos planos para cálculo de %
@@ -805,17 +774,7 @@ async def get_upsell_opportunities(
         limit = PLAN_LIMITS.get(plan, 1000)
         
         # Volume do mês
-        msgs_month = await db.execute(
-            select(func.count(Message.id))
-            .join(Lead, Message.lead_id == Lead.id)
-            .where(
-                and_(
-                    Lead.tenant_id == t.id,
-                    Message.created_at >= month_start
-                )
-            )
-        )
-        msgs_count = msgs_month.scalar() or 0
+        msgs_count, leads_count = month_by_tenant.get(t.id, (0, 0))
         
         usage_percent = (msgs_count / limit) * 100
         
@@ -825,14 +784,6 @@ async def get_upsell_opportunities(
             if plan == "pro": suggested = "enterprise"
             if plan == "enterprise": suggested = "custom"
             
-            # Leads do mês
-            leads_month = await db.execute(
-                select(func.count(Lead.id)).where(
-                    and_(Lead.tenant_id == t.id, Lead.created_at >= month_start)
-                )
-            )
-            leads_count = leads_month.scalar() or 0
-            
             upsell_list.append(UpsellOpportunity(
                 id=t.id,
                 name=t.name,
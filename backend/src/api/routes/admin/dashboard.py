@@ -10,7 +10,7 @@ from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.infrastructure.database import get_db
-from src.domain.entities import Tenant, Lead, Message, User, Niche
+from src.domain.entities import Tenant, Lead, User, Niche
 from src.api.routes.admin.deps import get_current_superadmin
 
 router = APIRouter(prefix="/admin/dashboard", tags=["Admin - Dashboard"])
@@ -51,7 +51,7 @@ async def get_admin_dashboard(
     hot_leads = hot_leads.scalar() or 0
     
     # Total de mensagens
-    total_messages = await db.execute(select(func.count(Message.id)))
+    total_messages = await db.execute(select(func.sum(Lead.message_count)))
     total_messages = total_messages.scalar() or 0
     
     # Total de usuários
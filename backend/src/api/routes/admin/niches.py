@@ -12,6 +12,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 
 from src.infrastructure.database import get_db
+from src.infrastructure.services.redis_service import invalidate_tenant_cache
 from src.domain.entities import Niche, Tenant, User, AdminLog
 from src.api.routes.admin.deps import get_current_superadmin
 
@@ -177,6 +178,7 @@ async def create_niche(
     db.add(log)
     
     await db.commit()
+    await invalidate_tenant_cache()  # Nicho é compartilhado: invalida todos os tenants
     
     return {
         "success": True,
@@ -260,6 +262,7 @@ async def update_niche(
     db.add(log)
     
     await db.commit()
+    await invalidate_tenant_cache()  # Nicho é compartilhado: invalida todos os tenants
     
     return {"success": True, "changes": changes}
 
@@ -299,6 +302,7 @@ async def delete_niche(
     db.add(log)
     
     await db.commit()
+    await invalidate_tenant_cache()  # Nicho é compartilhado: invalida todos os tenants
     
     return {"success": True, "message": "Nicho desativado"}
 
@@ -442,6 +446,7 @@ Seja sempre educado, objetivo e focado em ajudar o cliente."""
     db.add(log)
     
     await db.commit()
+    await invalidate_tenant_cache()  # Nicho é compartilhado: invalida todos os tenants
     
     return {
         "success": True,
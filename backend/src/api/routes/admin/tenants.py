@@ -17,7 +17,12 @@ from pydantic import BaseModel, EmailStr
 
 from src.infrastructure.database import get_db
 from src.infrastructure.services.auth_service import hash_password
-from src.domain.entities import Tenant, User, Lead, Message, Channel, AdminLog, Seller
+from src.infrastructure.services.redis_service import invalidate_tenant_cache
+from src.infrastructure.services.tenant_routing_service import (
+    sync_tenant_routes,
+    invalidate_route_cache,
+)
+from src.domain.entities import Tenant, User, Lead, Channel, AdminLog, Seller
 from src.domain.entities.enums import UserRole
 from src.domain.entities.plan import Plan
 from src.domain.entities.tenant_subscription import TenantSubscription
@@ -233,10 +238,9 @@ async def get_tenant(
     )
     leads_count = leads_result.scalar() or 0
     
-    # Conta mensagens
+    # Conta mensagens (contadores dos leads)
     messages_result = await db.execute(
-        select(func.count(Message.id))
-        .join(Lead, Message.lead_id == Lead.id)
+        select(func.sum(Lead.message_count))
         .where(Lead.tenant_id == tenant.id)
     )
     messages_count = messages_result.scalar() or 0
@@ -521,6 +525,9 @@ async def create_tenant(
     )
     db.add(log)
     
+    # Rotas de webhook (número / instância Z-API → tenant)
+    await sync_tenant_routes(db, tenant.id)
+    
     await db.commit()
     
     # Monta webhook URL baseado no provider
@@ -736,7 +743,11 @@ async def update_tenant(
     )
     db.add(log)
     
+    if "settings" in changes or "active" in changes:
+        await sync_tenant_routes(db, tenant.id)
+    
     await db.commit()
+    await invalidate_tenant_cache(tenant.id)
     
     return {
         "success": True,
@@ -808,7 +819,10 @@ async def update_tenant_channel(
     )
     db.add(log)
     
+    await sync_tenant_routes(db, tenant.id)
+    
     await db.commit()
+    await invalidate_tenant_cache(tenant.id)
     
     return {
         "success": True,
@@ -1016,6 +1030,8 @@ async def delete_tenant(
         db.add(log)
 
         await db.commit()
+        invalidate_route_cache(tenant_id)
+        await invalidate_tenant_cache(tenant_id)
 
         return {"success": True, "message": f"Cliente '{tenant_name}' deletado permanentemente"}
     else:
@@ -1043,6 +1059,10 @@ async def delete_tenant(
         )
         db.add(log)
 
+        # Tenant inativo não recebe mais webhooks
+        await sync_tenant_routes(db, tenant.id)
+
         await db.commit()
+        await invalidate_tenant_cache(tenant.id)
 
         return {"success": True, "message": "Cliente desativado"}
\ No newline at end of file
@@ -62,6 +62,7 @@ RESPONSE_TIMEOUT = 30.0
 # =============================================================================
 
 from src.infrastructure.services.dialog360_service import Dialog360Service, GestorNotificationService
+from src.infrastructure.services.tenant_routing_service import get_tenant_by_phone
 
 
 # =============================================================================
@@ -99,34 +100,6 @@ def normalize_phone(phone: str) -> str:
     return phone.replace("+", "").replace("-", "").replace(" ", "").replace("(", "").replace(")", "")
 
 
-async def get_tenant_by_phone(db: AsyncSession, business_phone: str) -> Optional[Tenant]:
-    """Busca tenant pelo número do WhatsApp Business."""
-    # Tenta com o número exato
-    result = await db.execute(
-        select(Tenant).where(
-            Tenant.settings["whatsapp_number"].astext == business_phone,
-            Tenant.active == True
-        )
-    )
-    tenant = result.scalar_one_or_none()
-    
-    if tenant:
-        return tenant
-    
-    # Tenta sem código do país
-    if business_phone.startswith("55"):
-        phone_without_country = business_phone[2:]
-        result = await db.execute(
-            select(Tenant).where(
-                Tenant.settings["whatsapp_number"].astext == phone_without_country,
-                Tenant.active == True
-            )
-        )
-        tenant = result.scalar_one_or_none()
-    
-    return tenant
-
-
 async def get_product_for_lead(
     db: AsyncSession,
     lead: Lead,
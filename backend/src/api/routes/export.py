@@ -7,20 +7,26 @@ Endpoints para exportar dados em diferentes formatos.
 
 from datetime import datetime, timedelta
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 import io
+import os
 
 from src.infrastructure.database import get_db
 from src.domain.entities import Tenant, User
 from src.api.dependencies import get_current_user
 from src.infrastructure.services.export_service import (
-    export_to_excel,
-    export_to_csv,
+    EXPORT_FORMATS,
+    create_export_job,
     export_to_pdf,
+    get_export_job,
+    run_export_job,
+    stream_csv_export,
+    stream_excel_export,
+    stream_export_job,
 )
 
 router = APIRouter(prefix="/export", tags=["Export"])
@@ -35,6 +41,11 @@ class ExportRequest(BaseModel):
     include_leads: bool = True
 
 
+class ExportJobRequest(ExportRequest):
+    """Request para exportação em background (tenants grandes)."""
+    format: str = "csv"  # csv, excel
+
+
 def get_date_range(period: str, start_date: str = None, end_date: str = None):
     """Calcula range de datas baseado no período."""
     now = datetime.now()
@@ -74,6 +85,8 @@ async def export_excel(
     - Múltiplas abas: Resumo e Leads
     - Formatação profissional
     - Filtros e formatação condicional
+    - Leads lidos em lotes e gravados em disco (memória constante);
+      para tenants muito grandes prefira POST /export/jobs
     """
     
     # Busca tenant do usuário
@@ -88,29 +101,21 @@ async def export_excel(
     # Calcula datas
     start, end = get_date_range(period, start_date, end_date)
     
-    try:
-        # Gera Excel
-        excel_bytes = await export_to_excel(
-            db=db,
+    # Nome do arquivo
+    date_str = datetime.now().strftime("%Y%m%d_%H%M")
+    filename = f"velaris_{tenant.slug}_{date_str}.xlsx"
+    
+    return StreamingResponse(
+        stream_excel_export(
             tenant=tenant,
             start_date=start,
             end_date=end,
             include_metrics=include_metrics,
             include_leads=include_leads,
-        )
-        
-        # Nome do arquivo
-        date_str = datetime.now().strftime("%Y%m%d_%H%M")
-        filename = f"velaris_{tenant.slug}_{date_str}.xlsx"
-        
-        return StreamingResponse(
-            io.BytesIO(excel_bytes),
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
-        )
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao gerar Excel: {str(e)}")
+        ),
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
 
 
 @router.get("/csv")
@@ -127,6 +132,7 @@ async def export_csv(
     - Formato simples para importação em outros sistemas
     - Separador: ponto e vírgula (;)
     - Encoding: UTF-8 com BOM
+    - Enviado em streaming, lote a lote (memória constante)
     """
     
     # Busca tenant
@@ -141,27 +147,15 @@ async def export_csv(
     # Calcula datas
     start, end = get_date_range(period, start_date, end_date)
     
-    try:
-        # Gera CSV
-        csv_bytes = await export_to_csv(
-            db=db,
-            tenant=tenant,
-            start_date=start,
-            end_date=end,
-        )
-        
-        # Nome do arquivo
-        date_str = datetime.now().strftime("%Y%m%d_%H%M")
-        filename = f"velaris_{tenant.slug}_{date_str}.csv"
-        
-        return StreamingResponse(
-            io.BytesIO(csv_bytes),
-            media_type="text/csv; charset=utf-8",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
-        )
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao gerar CSV: {str(e)}")
+    # Nome do arquivo
+    date_str = datetime.now().strftime("%Y%m%d_%H%M")
+    filename = f"velaris_{tenant.slug}_{date_str}.csv"
+    
+    return StreamingResponse(
+        stream_csv_export(tenant=tenant, start_date=start, end_date=end),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
 
 
 @router.get("/pdf")
@@ -251,14 +245,123 @@ async def export_preview(
     start, end = get_date_range(period)
     
     # Busca dados
-    leads = await get_leads_for_export(db, tenant.id, start, end)
     metrics = await get_metrics_for_export(db, tenant.id, start, end)
+    leads = await get_leads_for_export(db, tenant.id, start, end, limit=5)  # Apenas 5 leads como amostra
     
     return {
         "period": period,
         "start_date": start.isoformat() if start else None,
         "end_date": end.isoformat() if end else None,
-        "total_leads": len(leads),
+        "total_leads": metrics["total_leads"],
         "metrics": metrics,
-        "sample_leads": leads[:5],  # Apenas 5 leads como amostra
-    }
\ No newline at end of file
+        "sample_leads": leads,
+    }
+
+
+# ============================================
+# EXPORTAÇÃO EM BACKGROUND
+# ============================================
+
+def _job_response(job: dict) -> dict:
+    return {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "format": job["format"],
+        "filename": job["filename"],
+        "rows": job["rows"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "finished_at": job["finished_at"],
+        "download_url": f"/api/v1/export/jobs/{job['job_id']}/download" if job["status"] == "done" else None,
+    }
+
+
+async def _get_tenant_job(job_id: str, user: User) -> dict:
+    job = await get_export_job(job_id)
+    if not job or job["tenant_id"] != user.tenant_id:
+        raise HTTPException(status_code=404, detail="Exportação não encontrada")
+    return job
+
+
+@router.post("/jobs", status_code=202)
+async def create_export_job_endpoint(
+    request: ExportJobRequest,
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Agenda uma exportação CSV/Excel em background.
+
+    Acompanhe em GET /export/jobs/{job_id}; quando status = "done",
+    baixe o arquivo em download_url (válido por algumas horas).
+    """
+    if request.format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Formato inválido: {request.format} (csv, excel)")
+
+    result = await db.execute(
+        select(Tenant).where(Tenant.id == current_user.tenant_id)
+    )
+    tenant = result.scalar_one_or_none()
+    
+    if not tenant:
+        raise HTTPException(status_code=404, detail="Tenant não encontrado")
+
+    if request.format == "csv" and not request.include_leads:
+        raise HTTPException(status_code=400, detail="CSV contém apenas a lista de leads (use include_leads=true)")
+
+    start, end = get_date_range(request.period, request.start_date, request.end_date)
+
+    job = await create_export_job(
+        tenant=tenant,
+        user_id=current_user.id,
+        export_format=request.format,
+        start_date=start,
+        end_date=end,
+        include_metrics=request.include_metrics,
+        include_leads=request.include_leads,
+    )
+    background_tasks.add_task(run_export_job, job["job_id"])
+
+    return _job_response(job)
+
+
+@router.get("/jobs/{job_id}")
+async def get_export_job_endpoint(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+):
+    """Status de uma exportação em background."""
+    job = await _get_tenant_job(job_id, current_user)
+    return _job_response(job)
+
+
+@router.get("/jobs/{job_id}/download")
+async def download_export_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Baixa o arquivo de uma exportação concluída.
+
+    O arquivo fica no disco da réplica que rodou o job; em outra réplica
+    (ou após restart) a exportação é refeita em streaming.
+    """
+    job = await _get_tenant_job(job_id, current_user)
+
+    if job["status"] != "done":
+        raise HTTPException(status_code=409, detail=f"Exportação ainda não concluída (status: {job['status']})")
+
+    if os.path.exists(job["path"]):
+        return FileResponse(job["path"], media_type=job["media_type"], filename=job["filename"])
+
+    tenant = await db.get(Tenant, job["tenant_id"])
+    if not tenant:
+        raise HTTPException(status_code=404, detail="Tenant não encontrado")
+
+    return StreamingResponse(
+        stream_export_job(job, tenant),
+        media_type=job["media_type"],
+        headers={"Content-Disposition": f"attachment; filename={job['filename']}"},
+    )
\ No newline at end of file
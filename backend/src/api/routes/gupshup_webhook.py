@@ -24,7 +24,6 @@ CONFIGURAÇÃO NO GUPSHUP:
 import logging
 from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, Request, Header, BackgroundTasks
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.infrastructure.database import get_db
@@ -36,6 +35,10 @@ from src.infrastructure.services.gupshup_service import (
     ParsedIncomingMessage,
     build_gupshup_service_from_settings,  # MULTI-TENANT
 )
+from src.infrastructure.services.tenant_routing_service import (
+    get_tenant_by_phone,
+    get_tenant_by_gupshup_app,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -46,57 +49,6 @@ router = APIRouter(prefix="/webhook", tags=["Webhook Gupshup"])
 # HELPERS
 # ==========================================
 
-async def get_tenant_by_phone(
-    db: AsyncSession,
-    phone_number: str,
-) -> Optional[Tenant]:
-    """
-    Busca tenant pelo número de WhatsApp configurado.
-    
-    settings.whatsapp_number = "5511999999999"
-    """
-    result = await db.execute(
-        select(Tenant).where(Tenant.active == True)
-    )
-    tenants = result.scalars().all()
-
-    for tenant in tenants:
-        settings = tenant.settings or {}
-        tenant_whatsapp = settings.get("whatsapp_number", "")
-
-        tenant_digits = "".join(filter(str.isdigit, tenant_whatsapp))
-        phone_digits = "".join(filter(str.isdigit, phone_number))
-
-        if tenant_digits and tenant_digits == phone_digits:
-            return tenant
-
-    return None
-
-
-async def get_tenant_by_gupshup_app(
-    db: AsyncSession,
-    app_name: str,
-) -> Optional[Tenant]:
-    """
-    Busca tenant pelo nome do app no Gupshup.
-    
-    settings.gupshup_app_name = "meu-app"
-    """
-    result = await db.execute(
-        select(Tenant).where(Tenant.active == True)
-    )
-    tenants = result.scalars().all()
-
-    for tenant in tenants:
-        settings = tenant.settings or {}
-        tenant_app = settings.get("gupshup_app_name", "")
-
-        if tenant_app and tenant_app == app_name:
-            return tenant
-
-    return None
-
-
 async def send_response_async(
     gupshup: GupshupService,
     to: str,
@@ -658,21 +658,9 @@ async def list_pending_handoff_leads(
             seller = seller_result.scalar_one_or_none()
             seller_name = seller.name if seller else None
         
-        # Conta mensagens
-        from src.domain.entities import Message
-        msg_count_result = await db.execute(
-            select(Message.id).where(Message.lead_id == lead.id)
-        )
-        message_count = len(msg_count_result.scalars().all())
-        
-        # Busca última mensagem
-        last_msg_result = await db.execute(
-            select(Message.created_at)
-            .where(Message.lead_id == lead.id)
-            .order_by(Message.created_at.desc())
-            .limit(1)
-        )
-        last_message_at = last_msg_result.scalar_one_or_none()
+        # Contagem e última mensagem (mantidas no lead a cada flush)
+        message_count = lead.message_count or 0
+        last_message_at = lead.inbox_last_message_at
         
         # Dados específicos do nicho (empreendimento para imobiliário, etc)
         empreendimento_nome = None
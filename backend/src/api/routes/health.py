@@ -298,10 +298,11 @@ async def health_check_detailed(db: AsyncSession = Depends(get_db)):
         
         # OpenAI
         try:
-            from src.infrastructure.llm import LLMFactory
+            from src.infrastructure.llm import LLMFactory, get_embedding_cache
             provider = LLMFactory.get_provider()
             if provider:
                 health_data["checks"]["openai"] = {"status": "configured", "model": settings.openai_model}
+                health_data["checks"]["embedding_cache"] = get_embedding_cache().get_stats()
             else:
                 health_data["checks"]["openai"] = {"status": "not_configured"}
                 health_data["warnings"].append("OpenAI not configured")
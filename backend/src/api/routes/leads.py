@@ -32,6 +32,7 @@ from src.api.dependencies import get_current_user, get_current_tenant
 # Import correto
 from src.infrastructure.services import assign_lead_to_seller
 from src.infrastructure.services.sales_advisor_service import SalesAdvisorService
+from src.infrastructure.services.search_service import lead_search_filter
 
 logger = logging.getLogger(__name__)
 
@@ -150,9 +151,10 @@ async def list_leads(
         count_query = count_query.where(Lead.qualification == qualification)
 
     if search:
-        s = f"%{search}%"
-        query = query.where((Lead.name.ilike(s)) | (Lead.phone.ilike(s)) | (Lead.email.ilike(s)))
-        count_query = count_query.where((Lead.name.ilike(s)) | (Lead.phone.ilike(s)) | (Lead.email.ilike(s)))
+        # Usa os índices trigram (nome sem acento, telefone, e-mail)
+        search_filter = lead_search_filter(search)
+        query = query.where(search_filter)
+        count_query = count_query.where(search_filter)
 
     total = (await db.execute(count_query)).scalar() or 0
     offset = (page - 1) * per_page
@@ -13,6 +13,12 @@ CORREÇÕES V2.0:
 ✅ Crescimento pode ser negativo
 ✅ Campo assigned_seller_id (não assigned_to)
 ✅ Endpoint correto (/dashboard/metrics)
+
+ROLLUPS:
+/dashboard/metrics lê os rollups mantidos pelo tenant_stats_service
+(tenant_daily_stats + tenant_lead_counters) e as métricas de fundo
+em cache (tópicos, tempo de qualificação), em vez de ~20 agregações
+nas tabelas leads/messages a cada polling do gestor.
 """
 
 from datetime import datetime, timedelta, timezone
@@ -21,12 +27,23 @@ from sqlalchemy import select, func, and_, case, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.infrastructure.database import get_db
-from src.domain.entities import Lead, Tenant, LeadEvent, Message, User, Opportunity
+from src.domain.entities import Lead, Tenant, LeadEvent, User, Opportunity
 from src.domain.entities.enums import LeadStatus
 from src.api.dependencies import get_current_user
 from src.api.schemas import DashboardMetrics, LeadsByPeriod
-import re
-from collections import Counter
+from src.domain.entities.tenant_daily_stats import (
+    COUNTER_CHANNEL,
+    COUNTER_HOT_WAITING,
+    COUNTER_QUALIFICATION,
+    COUNTER_SOURCE,
+    COUNTER_STATUS,
+)
+from src.infrastructure.services.tenant_stats_service import (
+    HOT_QUALIFICATIONS,
+    get_background_metrics,
+    get_lead_counters,
+    tenant_period_query,
+)
 
 router = APIRouter(prefix="/dashboard", tags=["Dashboard"])  # ✅ CORRIGIDO!
 
@@ -35,17 +52,6 @@ router = APIRouter(prefix="/dashboard", tags=["Dashboard"])  # ✅ CORRIGIDO!
 # HELPERS - FUNÇÕES AUXILIARES
 # ============================================
 
-def is_after_hours(dt: datetime) -> bool:
-    """
-    Verifica se está fora do horário comercial.
-    
-    ✅ CORRIGIDO: Agora usa 8h-22h (mais realista)
-    """
-    hour = dt.hour
-    weekday = dt.weekday()
-    return hour < 8 or hour >= 22 or weekday >= 5  # ✅ 22h ao invés de 18h
-
-
 def calculate_time_saved(total_leads: int) -> dict:
     """
     ✅ CORRIGIDO: Calcula tempo/dinheiro economizado pela IA.
@@ -96,21 +102,64 @@ def get_date_ranges():
         "last_month_start": last_month_start,
     }
 
-def extract_topics(messages: list[str]) -> list[dict]:
-    """Extrai tópicos frequentes das mensagens (simples heatmap)."""
-    # Lista de stopwords simples
-    stopwords = {'a', 'o', 'e', 'de', 'do', 'da', 'em', 'um', 'para', 'com', 'não', 'uma', 'os', 'as', 'no', 'na', 'por', 'mais', 'como', 'me', 'meu', 'minha', 'tem', 'quero', 'sou', 'vcs', 'vocês', 'boa', 'tarde', 'dia', 'noite', 'ola', 'olá', 'oi'}
-    
-    words = []
-    for msg in messages:
-        # Limpar e tokenizar
-        clean_msg = re.sub(r'[^\w\s]', '', msg.lower())
-        for word in clean_msg.split():
-            if len(word) > 3 and word not in stopwords:
-                words.append(word)
-    
-    most_common = Counter(words).most_common(10)
-    return [{"topic": word, "count": count} for word, count in most_common]
+def group_qualifications(counts: dict) -> dict:
+    """Agrupa qualificações (pt/en) em quente/morno/frio."""
+    by_qualification = {"quente": 0, "morno": 0, "frio": 0}
+    for qual, count in counts.items():
+        if qual in ["hot", "quente"]:
+            by_qualification["quente"] += count
+        elif qual in ["warm", "morno"]:
+            by_qualification["morno"] += count
+        else:
+            by_qualification["frio"] += count
+    return by_qualification
+
+
+async def _get_seller_lead_metrics(db: AsyncSession, filters: list, dates: dict) -> tuple:
+    """
+    Métricas dos leads atribuídos a um vendedor (conjunto pequeno,
+    lido direto da tabela leads em duas consultas agregadas).
+    """
+    utc_created = func.timezone("UTC", Lead.created_at)
+    after_hours = or_(
+        func.extract("hour", utc_created) < 8,
+        func.extract("hour", utc_created) >= 22,
+        func.extract("isodow", utc_created) >= 6,
+    )
+    month = Lead.created_at >= dates["month_start"]
+
+    totals_result = await db.execute(
+        select(
+            func.count(Lead.id),
+            func.count(Lead.id).filter(Lead.created_at >= dates["today_start"]),
+            func.count(Lead.id).filter(Lead.created_at >= dates["week_start"]),
+            func.count(Lead.id).filter(month),
+            func.count(Lead.id).filter(and_(
+                Lead.created_at >= dates["last_week_start"],
+                Lead.created_at < dates["week_start"],
+            )),
+            func.count(Lead.id).filter(and_(month, after_hours)),
+            func.count(Lead.id).filter(and_(
+                Lead.qualification.in_(HOT_QUALIFICATIONS),
+                Lead.status != LeadStatus.HANDED_OFF.value,
+            )),
+        ).where(and_(*filters))
+    )
+    totals = [int(value or 0) for value in totals_result.one()]
+
+    grouped_result = await db.execute(
+        select(Lead.status, Lead.qualification, func.count(Lead.id))
+        .where(and_(*filters))
+        .group_by(Lead.status, Lead.qualification)
+    )
+    by_status: dict = {}
+    qualification_counts: dict = {}
+    for status, qualification, count in grouped_result.all():
+        by_status[status] = by_status.get(status, 0) + count
+        if qualification:
+            qualification_counts[qualification] = qualification_counts.get(qualification, 0) + count
+
+    return (*totals, by_status, qualification_counts)
 
 
 # ============================================
@@ -166,250 +215,108 @@ async def get_dashboard_metrics(
         # Períodos de tempo
         dates = get_date_ranges()
 
-        # =============================================
-        # TOTAIS BÁSICOS (COM FILTRO DE SELLER)
-        # =============================================
-
-        # Query base com filtro opcional de seller
+        # Filtros base (usados apenas na visão do vendedor)
         base_query_filters = [Lead.tenant_id == tenant_id]
         if seller_filter:
             # IMPORTANTE: Vendedor só vê leads ATRIBUÍDOS a ele (não None)
             base_query_filters.append(Lead.assigned_seller_id == seller_filter)
             base_query_filters.append(Lead.assigned_seller_id.isnot(None))
 
-        total_result = await db.execute(
-            select(func.count(Lead.id)).where(and_(*base_query_filters))
-        )
-        total_leads = total_result.scalar() or 0
-        
-        today_result = await db.execute(
-            select(func.count(Lead.id))
-            .where(and_(*base_query_filters))
-            .where(Lead.created_at >= dates["today_start"])
-        )
-        leads_today = today_result.scalar() or 0
+        today = dates["today_start"].date()
+        week_start = dates["week_start"].date()
+        month_start = dates["month_start"].date()
+        last_week_start = dates["last_week_start"].date()
 
-        week_result = await db.execute(
-            select(func.count(Lead.id))
-            .where(and_(*base_query_filters))
-            .where(Lead.created_at >= dates["week_start"])
+        # =============================================
+        # ROLLUP DIÁRIO DO TENANT (1 consulta)
+        # =============================================
+        period_result = await db.execute(
+            tenant_period_query(tenant_id, today, week_start, month_start, last_week_start)
         )
-        leads_this_week = week_result.scalar() or 0
+        period = period_result.one()
 
-        month_result = await db.execute(
-            select(func.count(Lead.id))
-            .where(and_(*base_query_filters))
-            .where(Lead.created_at >= dates["month_start"])
-        )
-        leads_this_month = month_result.scalar() or 0
-        
         # =============================================
-        # ECONOMIA DE TEMPO/DINHEIRO (✅ CORRIGIDO!)
+        # DISTRIBUIÇÃO ATUAL DOS LEADS (1 consulta)
         # =============================================
-        time_saved = calculate_time_saved(leads_this_month)
-        
+        counters = await get_lead_counters(db, tenant_id)
+
+        by_channel = {value or "direct": count for value, count in counters[COUNTER_CHANNEL].items()}
+        by_source = {value or "organico": count for value, count in counters[COUNTER_SOURCE].items()}
+        tenant_total_leads = sum(counters[COUNTER_STATUS].values())
+        converted_leads = counters[COUNTER_STATUS].get(LeadStatus.HANDED_OFF.value, 0)
+
+        if seller_filter:
+            # Vendedor: totais e distribuição apenas dos leads atribuídos a ele
+            (
+                total_leads,
+                leads_today,
+                leads_this_week,
+                leads_this_month,
+                leads_last_week,
+                after_hours_count,
+                hot_leads_waiting,
+                by_status,
+                qualification_counts,
+            ) = await _get_seller_lead_metrics(db, base_query_filters, dates)
+        else:
+            total_leads = tenant_total_leads
+            leads_today = int(period.leads_today)
+            leads_this_week = int(period.leads_week)
+            leads_this_month = int(period.leads_month)
+            leads_last_week = int(period.leads_last_week)
+            after_hours_count = int(period.after_hours_month)
+            hot_leads_waiting = counters[COUNTER_HOT_WAITING].get("1", 0)
+            by_status = dict(counters[COUNTER_STATUS])
+            qualification_counts = {
+                value: count for value, count in counters[COUNTER_QUALIFICATION].items() if value
+            }
+
+        by_qualification = group_qualifications(qualification_counts)
+
         # =============================================
-        # LEADS FORA DO HORÁRIO (✅ OTIMIZADO!)
+        # ECONOMIA DE TEMPO/DINHEIRO
         # =============================================
-        all_leads_month = await db.execute(
-            select(Lead.created_at)
-            .where(and_(*base_query_filters))
-            .where(Lead.created_at >= dates["month_start"])
-        )
-        
-        after_hours_count = 0
-        for row in all_leads_month:
-            if row.created_at and is_after_hours(row.created_at):
-                after_hours_count += 1
-        
+        time_saved = calculate_time_saved(leads_this_month)
+
         # =============================================
-        # CRESCIMENTO VS SEMANA/MÊS ANTERIOR (✅ CORRIGIDO!)
+        # CRESCIMENTO VS SEMANA ANTERIOR (pode ser negativo)
         # =============================================
-        last_week_result = await db.execute(
-            select(func.count(Lead.id))
-            .where(and_(*base_query_filters))
-            .where(Lead.created_at >= dates["last_week_start"])
-            .where(Lead.created_at < dates["week_start"])
-        )
-        leads_last_week = last_week_result.scalar() or 0
-        
-        # ✅ PODE SER NEGATIVO AGORA!
         if leads_last_week > 0:
             growth_percentage = ((leads_this_week - leads_last_week) / leads_last_week) * 100
         else:
             growth_percentage = 100 if leads_this_week > 0 else 0
-        
-        # =============================================
-        # POR QUALIFICAÇÃO
-        # =============================================
-        qual_result = await db.execute(
-            select(Lead.qualification, func.count(Lead.id))
-            .where(and_(*base_query_filters))
-            .where(Lead.qualification.isnot(None))
-            .group_by(Lead.qualification)
-        )
-        
-        by_qualification = {}
-        for row in qual_result.all():
-            qual = row[0] or "frio"
-            if qual in ["hot", "quente"]:
-                by_qualification["quente"] = by_qualification.get("quente", 0) + row[1]
-            elif qual in ["warm", "morno"]:
-                by_qualification["morno"] = by_qualification.get("morno", 0) + row[1]
-            else:
-                by_qualification["frio"] = by_qualification.get("frio", 0) + row[1]
-        
-        by_qualification.setdefault("quente", 0)
-        by_qualification.setdefault("morno", 0)
-        by_qualification.setdefault("frio", 0)
-        
-        # =============================================
-        # POR STATUS
-        # =============================================
-        status_result = await db.execute(
-            select(Lead.status, func.count(Lead.id))
-            .where(and_(*base_query_filters))
-            .group_by(Lead.status)
-        )
-        by_status = {row[0]: row[1] for row in status_result.all()}
 
         # =============================================
-        # LEADS QUENTES AGUARDANDO (✅ CORRIGIDO + FILTRO SELLER!)
-        # =============================================
-        hot_waiting_filters = list(base_query_filters)  # Copia os filtros base
-        hot_waiting_filters.extend([
-            or_(
-                Lead.qualification == "quente",
-                Lead.qualification == "hot"
-            ),
-            Lead.status != LeadStatus.HANDED_OFF.value,
-            Lead.assigned_seller_id.is_(None) if not seller_filter else True == True  # Se é seller, ignora esse filtro
-        ])
-        hot_waiting_result = await db.execute(
-            select(func.count(Lead.id)).where(and_(*hot_waiting_filters))
-        )
-        hot_leads_waiting = hot_waiting_result.scalar() or 0
-        
-        # =============================================
-        # VELOCIDADE DE RESPOSTA
+        # VELOCIDADE DE RESPOSTA / ENGAJAMENTO / CONVERSÃO
         # =============================================
-        avg_response_result = await db.execute(
-            select(func.avg(
-                func.extract('epoch', Message.created_at) - 
-                func.extract('epoch', Lead.created_at)
-            ))
-            .join(Lead, Message.lead_id == Lead.id)
-            .where(Lead.tenant_id == tenant_id)
-            .where(Message.role == "assistant")
-            .where(Lead.created_at >= dates["month_start"])
+        response_samples = int(period.response_samples_month)
+        avg_response_time_minutes = (
+            round(int(period.response_seconds_month) / response_samples / 60, 1)
+            if response_samples else 2.0
         )
-        avg_seconds = avg_response_result.scalar()
-        avg_response_time_minutes = round((avg_seconds / 60), 1) if avg_seconds else 2.0
-        
-        # =============================================
-        # TAXA DE ENGAJAMENTO (✅ CORRIGIDO!)
-        # =============================================
+
         # Leads com 2+ mensagens (conversa real)
-        engaged_result = await db.execute(
-            select(Lead.id)
-            .join(Message, Message.lead_id == Lead.id)
-            .where(Lead.tenant_id == tenant_id)
-            .where(Message.role == "user")
-            .where(Lead.created_at >= dates["month_start"])
-            .group_by(Lead.id)
-            .having(func.count(Message.id) >= 2)  # ✅ CORRIGIDO!
-        )
-        engaged_leads = len(engaged_result.all())
+        engaged_leads = int(period.engaged_month)
         engagement_rate = (engaged_leads / leads_this_month * 100) if leads_this_month > 0 else 0
-        
-        # =============================================
-        # POR CANAL E SOURCE
-        # =============================================
-        channel_result = await db.execute(
-            select(Lead.channel_id, func.count(Lead.id))
-            .where(Lead.tenant_id == tenant_id)
-            .group_by(Lead.channel_id)
-        )
-        by_channel = {str(row[0] or "direct"): row[1] for row in channel_result.all()}
-        
-        source_result = await db.execute(
-            select(Lead.source, func.count(Lead.id))
-            .where(Lead.tenant_id == tenant_id)
-            .group_by(Lead.source)
-        )
-        by_source = {row[0] or "organico": row[1] for row in source_result.all()}
-        
-        # =============================================
-        # TAXA DE CONVERSÃO
-        # =============================================
-        converted_result = await db.execute(
-            select(func.count(Lead.id))
-            .where(Lead.tenant_id == tenant_id)
-            .where(Lead.status == LeadStatus.HANDED_OFF.value)
-        )
-        converted_leads = converted_result.scalar() or 0
-        
+
         conversion_rate = (converted_leads / total_leads * 100) if total_leads > 0 else 0
-        
-        # =============================================
-        # TEMPO MÉDIO DE QUALIFICAÇÃO
-        # =============================================
-        avg_time_result = await db.execute(
-            select(func.avg(
-                func.extract('epoch', Lead.updated_at) - 
-                func.extract('epoch', Lead.created_at)
-            ))
-            .where(Lead.tenant_id == tenant_id)
-            .where(Lead.qualification.isnot(None))
-        )
-        avg_qual_seconds = avg_time_result.scalar()
-        avg_qualification_time_hours = round((avg_qual_seconds / 3600), 2) if avg_qual_seconds else 1.0
 
         # =============================================
-        # FUNIL DE CONVERSÃO (NOVO)
+        # FUNIL DE CONVERSÃO
         # =============================================
-        # Estágios do Funil:
-        # 1. Total (leads_this_month)
-        # 2. Engajados (engaged_leads)
-        # 3. Qualificados (leads_hot_month)
-        # 4. Convertidos/Handoff (converted_month)
-
-        leads_hot_month_result = await db.execute(
-            select(func.count(Lead.id))
-            .where(Lead.tenant_id == tenant_id)
-            .where(Lead.created_at >= dates["month_start"])
-            .where(or_(Lead.qualification == "quente", Lead.qualification == "hot"))
-        )
-        leads_hot_month = leads_hot_month_result.scalar() or 0
-
-        converted_month_result = await db.execute(
-            select(func.count(Lead.id))
-            .where(Lead.tenant_id == tenant_id)
-            .where(Lead.created_at >= dates["month_start"])
-            .where(Lead.status == LeadStatus.HANDED_OFF.value)
-        )
-        converted_month = converted_month_result.scalar() or 0
-
         funnel_data = {
             "total": leads_this_month,
             "engaged": engaged_leads,
-            "qualified": leads_hot_month,
-            "converted": converted_month
+            "qualified": int(period.hot_month),
+            "converted": int(period.handed_off_month),
         }
 
         # =============================================
-        # EXTRAÇÃO DE TÓPICOS (HEATMAP)
+        # TÓPICOS E TEMPO DE QUALIFICAÇÃO (cache, recalculado em background)
         # =============================================
-        recent_msgs_result = await db.execute(
-            select(Message.content)
-            .join(Lead, Message.lead_id == Lead.id)
-            .where(Lead.tenant_id == tenant_id)
-            .where(Message.role == "user")
-            .where(Lead.created_at >= dates["month_start"])
-            .limit(200)
-        )
-        recent_msgs = [row[0] for row in recent_msgs_result.all()]
-        top_topics = extract_topics(recent_msgs)
+        background = await get_background_metrics(tenant_id) or {}
+        top_topics = background.get("top_topics", [])
+        avg_qualification_time_hours = background.get("avg_qualification_time_hours", 1.0)
         
         # =============================================
         # RESPOSTA FINAL
@@ -22,6 +22,7 @@ from src.infrastructure.services import (
     get_reengagement_message,
     DEFAULT_REENGAGEMENT_CONFIG,
 )
+from src.infrastructure.services.redis_service import invalidate_tenant_cache
 
 router = APIRouter(prefix="/reengagement", tags=["Reengagement"])
 
@@ -92,10 +93,10 @@ async def update_reengagement_config(
         raise HTTPException(status_code=400, detail="Máximo de tentativas deve ser entre 1 e 10")
     
     # Salva
-    settings["reengagement"] = new_config
-    tenant.settings = settings
+    tenant.settings = {**settings, "reengagement": new_config}
     
     await db.commit()
+    await invalidate_tenant_cache(tenant.id)
     
     return {
         "success": True,
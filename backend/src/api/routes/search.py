@@ -0,0 +1,90 @@
+"""
+ROTAS: BUSCA
+============
+Busca indexada em mensagens (full-text) e leads (trigram).
+
+- GET /search/messages: ranking por relevância ou data, trecho
+  destacado (<mark>) e paginação por cursor
+- GET /search/leads: nome (aproximado), telefone ou e-mail
+
+Vendedores buscam apenas nos leads atribuídos a eles.
+"""
+
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.api.dependencies import get_current_tenant, get_current_user
+from src.domain.entities import Seller, Tenant, User
+from src.domain.entities.enums import UserRole
+from src.infrastructure.database import get_db
+from src.infrastructure.services.search_service import (
+    ORDER_RECENT,
+    ORDER_RELEVANCE,
+    search_leads,
+    search_messages,
+)
+
+router = APIRouter(prefix="/search", tags=["Busca"])
+
+
+async def _seller_scope(db: AsyncSession, user: User, tenant: Tenant) -> Optional[int]:
+    """
+    seller_id que restringe a busca (None = tenant inteiro).
+    Vendedor sem cadastro de seller não enxerga nenhum lead (-1).
+    """
+    if user.role != UserRole.SELLER:
+        return None
+
+    result = await db.execute(
+        select(Seller.id).where(Seller.user_id == user.id, Seller.tenant_id == tenant.id)
+    )
+    seller_id = result.scalar_one_or_none()
+    return seller_id if seller_id is not None else -1
+
+
+@router.get("/messages")
+async def search_messages_endpoint(
+    q: str = Query(..., min_length=2, max_length=200),
+    lead_id: Optional[int] = None,
+    order: str = Query(ORDER_RELEVANCE, pattern=f"^({ORDER_RELEVANCE}|{ORDER_RECENT})$"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    current_tenant: Tenant = Depends(get_current_tenant),
+):
+    """Busca full-text nas conversas (português, sem diferenciar acentos)."""
+    seller_id = await _seller_scope(db, current_user, current_tenant)
+
+    try:
+        page = await search_messages(
+            db, current_tenant.id, q,
+            seller_id=seller_id, lead_id=lead_id, order=order, limit=limit, cursor=cursor,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    return {"results": page.items, "next_cursor": page.next_cursor}
+
+
+@router.get("/leads")
+async def search_leads_endpoint(
+    q: str = Query(..., min_length=2, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    current_tenant: Tenant = Depends(get_current_tenant),
+):
+    """Busca leads por nome, telefone ou e-mail, do mais relevante ao menos."""
+    seller_id = await _seller_scope(db, current_user, current_tenant)
+
+    try:
+        page = await search_leads(db, current_tenant.id, q, seller_id=seller_id, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    return {"results": page.items, "next_cursor": page.next_cursor}
@@ -16,9 +16,11 @@ NOVO FLUXO (handoff_mode = "crm_inbox"):
 Fluxo antigo (handoff_mode = "whatsapp_pessoal") continua funcionando normalmente.
 """
 
+import base64
+import binascii
 from datetime import datetime
-from typing import List, Optional, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from typing import List, Optional, Dict, Any, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status, UploadFile, File, Form
 from fastapi.responses import StreamingResponse
 from sqlalchemy import select, and_, or_, func, update as sql_update
 from sqlalchemy.orm import selectinload
@@ -32,10 +34,17 @@ from src.domain.entities.response_template import ResponseTemplate
 from src.domain.entities.enums import UserRole, LeadStatus
 from src.infrastructure.database import async_session
 from src.infrastructure.services.whatsapp_service import send_whatsapp_message, get_profile_picture
+from src.infrastructure.services import search_service
+from src.infrastructure.services.search_service import ORDER_RECENT, ORDER_RELEVANCE
 
 # Imports condicionais - permite deploy mesmo se dependencies faltarem
 try:
-    from src.infrastructure.services.sse_service import event_stream_generator, broadcast_new_message, broadcast_lead_updated
+    from src.infrastructure.services.sse_service import (
+        event_stream_generator,
+        tenant_event_stream_generator,
+        broadcast_new_message,
+        broadcast_lead_updated,
+    )
     from src.infrastructure.services.storage_service import storage_service
     from src.infrastructure.services.template_interpolation_service import template_service
     from src.infrastructure.services.message_status_service import message_status_service
@@ -43,6 +52,7 @@ try:
 except ImportError as e:
     print(f"⚠️  Advanced features disabled: {e}")
     event_stream_generator = None
+    tenant_event_stream_generator = None
     broadcast_new_message = None
     broadcast_lead_updated = None
     storage_service = None
@@ -53,6 +63,8 @@ except ImportError as e:
 
 router = APIRouter(prefix="/seller/inbox", tags=["Seller Inbox"])
 
+INBOX_PAGE_SIZE = 100  # Página padrão quando o cliente pagina só pelo cursor
+
 
 # ==========================================
 # SCHEMAS
@@ -215,18 +227,34 @@ async def get_seller_from_user(user: User) -> Seller:
         return seller
 
 
-def get_last_message_preview(messages: List[Message]) -> Optional[str]:
-    """Retorna preview da última mensagem."""
-    if not messages:
-        return None
+def encode_inbox_cursor(last_message_at: Optional[datetime], lead_id: int) -> str:
+    """Cursor opaco da paginação do inbox: (última mensagem, id) do último item."""
+    stamp = last_message_at.isoformat() if last_message_at else ""
+    return base64.urlsafe_b64encode(f"{stamp}|{lead_id}".encode()).decode()
+
 
-    last = messages[-1]
-    preview = last.content[:50]
+def decode_inbox_cursor(cursor: str) -> Tuple[Optional[datetime], int]:
+    """Inverso de encode_inbox_cursor (ValueError se inválido)."""
+    try:
+        stamp, lead_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return (datetime.fromisoformat(stamp) if stamp else None), int(lead_id)
+    except (ValueError, UnicodeDecodeError, binascii.Error) as e:
+        raise ValueError(f"Cursor inválido: {cursor}") from e
 
-    if len(last.content) > 50:
-        preview += "..."
 
-    return preview
+def inbox_keyset_filter(last_message_at: Optional[datetime], lead_id: int):
+    """
+    Leads depois do cursor na ordem do inbox
+    (inbox_last_message_at DESC NULLS LAST, id DESC).
+    """
+    if last_message_at is None:
+        return and_(Lead.inbox_last_message_at.is_(None), Lead.id < lead_id)
+
+    return or_(
+        Lead.inbox_last_message_at < last_message_at,
+        and_(Lead.inbox_last_message_at == last_message_at, Lead.id < lead_id),
+        Lead.inbox_last_message_at.is_(None),
+    )
 
 
 # ==========================================
@@ -235,29 +263,48 @@ def get_last_message_preview(messages: List[Message]) -> Optional[str]:
 
 @router.get("/leads", response_model=List[InboxLeadResponse])
 async def list_inbox_leads(
+    response: Response,
     current_user: User = Depends(get_current_user),
     status_filter: Optional[str] = None,
     attended_filter: Optional[str] = None,  # "ai", "seller", "all"
+    limit: Optional[int] = Query(None, ge=1, le=200),
+    cursor: Optional[str] = None,
 ):
     """
-    Lista leads atribuídos ao corretor logado.
+    Lista leads atribuídos ao corretor logado, da conversa mais recente
+    para a mais antiga.
 
     Filtros:
     - status_filter: Filtrar por status do lead (novo, qualificado, etc)
     - attended_filter: "ai" (ainda com IA), "seller" (já assumido), "all"
+
+    Paginação por cursor (opcional):
+    - limit: quantidade de leads por página (padrão 100 quando há cursor)
+    - cursor: valor do header X-Next-Cursor da página anterior
+      (header ausente = última página)
+    - sem limit nem cursor: todos os leads, como antes da paginação
     """
 
     seller = await get_seller_from_user(current_user)
 
+    try:
+        after = decode_inbox_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    if limit is None and cursor:
+        limit = INBOX_PAGE_SIZE
+
     async with async_session() as session:
-        # Query base: leads atribuídos ao seller
+        # Query base: leads atribuídos ao seller (estado do inbox já denormalizado no lead)
         query = (
             select(Lead)
             .where(Lead.assigned_seller_id == seller.id)
             .where(Lead.tenant_id == current_user.tenant_id)
-            .options(selectinload(Lead.messages))
-            .order_by(Lead.updated_at.desc())
+            .order_by(Lead.inbox_last_message_at.desc().nulls_last(), Lead.id.desc())
         )
+        if limit is not None:
+            query = query.limit(limit + 1)
 
         # Filtro por status
         if status_filter:
@@ -267,23 +314,20 @@ async def list_inbox_leads(
         if attended_filter and attended_filter != "all":
             query = query.where(Lead.attended_by == attended_filter)
 
+        if after:
+            query = query.where(inbox_keyset_filter(*after))
+
         result = await session.execute(query)
         leads = result.scalars().all()
 
+        if limit is not None and len(leads) > limit:
+            leads = leads[:limit]
+            last = leads[-1]
+            response.headers["X-Next-Cursor"] = encode_inbox_cursor(last.inbox_last_message_at, last.id)
+
         # Monta response
         inbox_leads = []
         for lead in leads:
-            # Conta mensagens não lidas (mensagens após o corretor assumir ou últimas 24h)
-            unread_count = 0
-            if lead.seller_took_over_at:
-                unread_count = len([
-                    m for m in lead.messages
-                    if m.created_at > lead.seller_took_over_at and m.role == "user"
-                ])
-            else:
-                # Se ainda não assumiu, conta mensagens do lead (user)
-                unread_count = len([m for m in lead.messages if m.role == "user"])
-
             inbox_leads.append(InboxLeadResponse(
                 id=lead.id,
                 name=lead.name or "Lead",
@@ -291,9 +335,9 @@ async def list_inbox_leads(
                 status=lead.status,
                 qualification=lead.qualification,
                 attended_by=lead.attended_by or "ai",
-                unread_messages=unread_count,
-                last_message_at=lead.messages[-1].created_at if lead.messages else None,
-                last_message_preview=get_last_message_preview(lead.messages),
+                unread_messages=lead.inbox_unread_count or 0,
+                last_message_at=lead.inbox_last_message_at,
+                last_message_preview=lead.inbox_last_message_preview,
                 city=lead.custom_data.get("city") if lead.custom_data else None,
                 interest=lead.custom_data.get("interest") if lead.custom_data else None,
                 budget=lead.custom_data.get("budget") if lead.custom_data else None,
@@ -816,6 +860,32 @@ async def stream_lead_events(
     )
 
 
+@router.get("/stream")
+async def stream_tenant_events(
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Server-Sent Events de todos os leads do tenant (painel de gestores).
+
+    Corretores usam o stream por lead, restrito aos seus leads.
+    """
+    if current_user.role == UserRole.SELLER:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Stream do tenant disponível apenas para gestores"
+        )
+
+    return StreamingResponse(
+        tenant_event_stream_generator(current_user.tenant_id),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+
 # ============================================
 # 2-6. TEMPLATES DE RESPOSTAS RÁPIDAS
 # ============================================
@@ -1244,7 +1314,7 @@ async def archive_lead(
         await session.commit()
 
         # Broadcast atualização
-        await broadcast_lead_updated(lead_id, {"archived": True})
+        await broadcast_lead_updated(lead_id, {"archived": True}, tenant_id=current_user.tenant_id)
 
         return {
             "success": True,
@@ -1281,7 +1351,7 @@ async def unarchive_lead(
         await session.commit()
 
         # Broadcast
-        await broadcast_lead_updated(lead_id, {"archived": False})
+        await broadcast_lead_updated(lead_id, {"archived": False}, tenant_id=current_user.tenant_id)
 
         return {
             "success": True,
@@ -1379,7 +1449,7 @@ async def get_seller_metrics(
         total_messages_sent = messages_sent_result.scalar() or 0
 
         messages_received_result = await session.execute(
-            select(func.sum(Lead.total_lead_messages))
+            select(func.sum(Lead.user_message_count))
             .where(Lead.assigned_seller_id == seller.id)
             .where(Lead.tenant_id == current_user.tenant_id)
         )
@@ -1430,46 +1500,30 @@ async def get_seller_metrics(
 
 @router.get("/search")
 async def search_messages(
-    q: str,
+    q: str = Query(..., min_length=2, max_length=200),
     current_user: User = Depends(get_current_user),
-    limit: int = 50
+    limit: int = Query(50, ge=1, le=100),
+    order: str = Query(ORDER_RECENT, pattern=f"^({ORDER_RELEVANCE}|{ORDER_RECENT})$"),
+    cursor: Optional[str] = None,
 ):
     """
-    Busca full-text em mensagens do vendedor.
+    Busca full-text em mensagens do vendedor (índice tsvector).
 
-    Retorna mensagens + dados do lead.
+    Retorna mensagens + trecho destacado + dados do lead.
+    Mais resultados: repetir a busca com cursor=next_cursor.
     """
     seller = await get_seller_from_user(current_user)
 
     async with async_session() as session:
-        # Busca mensagens
-        result = await session.execute(
-            select(Message, Lead)
-            .join(Lead, Message.lead_id == Lead.id)
-            .where(Lead.assigned_seller_id == seller.id)
-            .where(Lead.tenant_id == current_user.tenant_id)
-            .where(Message.content.ilike(f"%{q}%"))
-            .order_by(Message.created_at.desc())
-            .limit(limit)
-        )
-        rows = result.all()
+        try:
+            page = await search_service.search_messages(
+                session, current_user.tenant_id, q,
+                seller_id=seller.id, order=order, limit=limit, cursor=cursor,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
-        return {
-            "results": [
-                {
-                    "message_id": msg.id,
-                    "content": msg.content,
-                    "role": msg.role,
-                    "created_at": msg.created_at,
-                    "lead": {
-                        "id": lead.id,
-                        "name": lead.name,
-                        "phone": lead.phone
-                    }
-                }
-                for msg, lead in rows
-            ]
-        }
+        return {"results": page.items, "next_cursor": page.next_cursor}
 
 
 # ============================================
@@ -22,6 +22,7 @@ from pydantic import BaseModel, Field
 from typing import Optional
 
 from src.infrastructure.database import get_db
+from src.infrastructure.services.redis_service import invalidate_tenant_cache
 from src.domain.entities import Tenant, User
 from src.api.dependencies import get_current_user, get_current_tenant
 from src.config import get_settings as app_settings
@@ -100,6 +101,7 @@ DEFAULT_SETTINGS = {
         "custom_rules": [],
         "greeting_message": "",
         "farewell_message": "",
+        "history_token_budget": 0,  # Tokens de histórico por turno (0 = padrão do sistema)
     },
 
     # =========================================================================
@@ -977,6 +979,7 @@ async def update_settings(
         
         await db.commit()
         await db.refresh(tenant)
+        await invalidate_tenant_cache(tenant.id)
         
         logger.info(f"Commit realizado com sucesso!")
         logger.info(f"Identity salva: {tenant.settings.get('identity', {}).get('description', 'vazio')[:50]}")
@@ -1074,6 +1077,7 @@ async def update_identity_settings(
     
     await db.commit()
     await db.refresh(tenant)
+    await invalidate_tenant_cache(tenant.id)
     
     return {
         "success": True,
@@ -1634,6 +1638,7 @@ async def update_features(
 
         await db.commit()
         await db.refresh(tenant)
+        await invalidate_tenant_cache(tenant.id)
 
         logger.info(f"✅ Features salvas com sucesso!")
 
@@ -17,6 +17,7 @@ from pydantic import BaseModel, Field
 from src.api.dependencies import get_current_user, get_current_tenant, get_db
 from src.domain.entities.models import User, Tenant
 from src.domain.entities.enums import UserRole
+from src.infrastructure.services.redis_service import invalidate_tenant_cache
 
 from src.services.entitlements import EntitlementResolver
 from src.services.feature_flags import FeatureFlagService
@@ -243,6 +244,8 @@ async def update_flags(
         user_agent=user_agent
     )
 
+    await invalidate_tenant_cache(tenant_id)
+
     logger.info(f"✅ Flags atualizados com sucesso para tenant {tenant_id}")
 
     return {
@@ -346,6 +349,7 @@ async def create_override(
 
     await db.commit()
     await db.refresh(override)
+    await invalidate_tenant_cache(target_tenant_id)
 
     logger.info(f"✅ Override criado/atualizado: {payload.override_key} para tenant {target_tenant_id}")
 
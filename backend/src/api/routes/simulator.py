@@ -674,5 +674,9 @@ async def compare_prompts(
         "has_imovel_portal": prompt_result.has_imovel_portal,
         "has_lead_context": prompt_result.has_lead_context,
         "warnings": prompt_result.warnings,
+        "static_prefix_length": prompt_result.static_prefix_length,
+        "prefix_tokens": prompt_result.prefix_tokens,
+        "suffix_tokens": prompt_result.suffix_tokens,
+        "section_tokens": prompt_result.section_tokens,
         "full_prompt": prompt_result.system_prompt,
     }
\ No newline at end of file
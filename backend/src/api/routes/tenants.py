@@ -16,6 +16,8 @@ from pydantic import BaseModel
 from typing import Literal
 
 from src.infrastructure.database import get_db
+from src.infrastructure.services.redis_service import invalidate_tenant_cache
+from src.infrastructure.services.tenant_routing_service import sync_tenant_routes
 from src.domain.entities import Tenant, User, Channel, Niche  # ← Adicionado Niche
 from src.api.schemas import TenantCreate, TenantResponse, NicheInfo
 from src.api.dependencies import get_current_user
@@ -95,6 +97,8 @@ async def create_tenant(
     )
     db.add(channel)
     
+    await sync_tenant_routes(db, tenant.id)
+    
     await db.commit()
     await db.refresh(tenant)
     
@@ -152,8 +156,13 @@ async def update_tenant(
         if field in allowed_fields and hasattr(tenant, field):
             setattr(tenant, field, value)
 
+    # Número / app do Gupshup / ativo definem as rotas dos webhooks
+    if "settings" in payload or "active" in payload:
+        await sync_tenant_routes(db, tenant.id)
+
     await db.commit()
     await db.refresh(tenant)
+    await invalidate_tenant_cache(tenant.id)
 
     return TenantResponse.model_validate(tenant)
 
@@ -234,6 +243,7 @@ async def configure_handoff_mode(
     flag_modified(tenant, "settings")
 
     await db.commit()
+    await invalidate_tenant_cache(tenant.id)
 
     # Monta mensagem explicativa
     messages = {
@@ -14,6 +14,7 @@ import logging
 from src.infrastructure.database import get_db
 from src.domain.entities import Lead, Message, Tenant
 from src.infrastructure.services import chat_completion
+from src.infrastructure.services.tenant_routing_service import get_tenant_by_phone
 from src.domain.prompts import get_niche_config
 
 logger = logging.getLogger(__name__)
@@ -55,11 +56,14 @@ async def twilio_webhook(
         logger.info(f"📱 Mensagem Twilio: {from_number} -> {to_number}: {body}")
         print(f"📱 Mensagem Twilio: {from_number} -> {to_number}: {body}")
         
-        # Buscar tenant pelo canal (ou usar o primeiro tenant para teste)
-        tenant_result = await db.execute(
-            select(Tenant).where(Tenant.active == True).limit(1)
-        )
-        tenant = tenant_result.scalar_one_or_none()
+        # Buscar tenant pelo número de destino (ou usar o primeiro tenant no sandbox)
+        tenant = await get_tenant_by_phone(db, to_number)
+
+        if not tenant:
+            tenant_result = await db.execute(
+                select(Tenant).where(Tenant.active == True).limit(1)
+            )
+            tenant = tenant_result.scalar_one_or_none()
         
         if not tenant:
             logger.error("Nenhum tenant ativo encontrado")
@@ -4,33 +4,32 @@ ROTAS Z-API - Webhooks (VERSÃO CORRIGIDA - SEM DUPLICAÇÃO)
 Recebe eventos do Z-API (mensagens, status, conexao)
 
 CORREÇÕES:
-- Deduplicação robusta por messageId
-- Fallback para mensagens sem messageId
-- Locks por telefone para prevenir race conditions
+- Deduplicação por messageId (SET NX no Redis, vale entre réplicas)
+- Fallback para mensagens sem messageId (hash de telefone + conteúdo)
+- Webhook só enfileira e responde; processamento, "digitando" e envio
+  rodam nos workers da fila de entrada (ver use_cases/zapi_inbound.py)
+- Fila por conversa: mensagens do mesmo telefone processadas em ordem
 - Código limpo e organizado
 
 Documentacao: https://developer.z-api.io/webhooks/introduction
 """
 
 import logging
-import asyncio
-import hashlib
-import base64
-from datetime import datetime, timezone, timedelta
-from collections import defaultdict
 from fastapi import APIRouter, Request, Depends, BackgroundTasks
+from fastapi.responses import JSONResponse
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.infrastructure.database import get_db
 from src.domain.entities import Tenant, Channel
-from src.application.use_cases.process_message import process_message
-from src.infrastructure.services import (
-    transcribe_audio_url,
-    analyze_property_image,
-)
+from src.application.use_cases.zapi_inbound import enqueue_zapi_message, raw_content_signature
 from src.infrastructure.services.zapi_service import get_zapi_client
-from src.infrastructure.services.tts_service import get_tts_service
+from src.infrastructure.services.tenant_routing_service import get_tenant_by_zapi_instance
+from src.infrastructure.services.webhook_idempotency_service import (
+    claim_message,
+    release_message,
+    webhook_idempotency_key,
+)
 
 # Import condicional do message_status_service (novas features)
 try:
@@ -44,79 +43,6 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/zapi", tags=["Z-API Webhooks"])
 
 
-# ════════════════════════════════════════════════════════════════
-# SISTEMA DE DEDUPLICAÇÃO (SIMPLIFICADO E ROBUSTO)
-# ════════════════════════════════════════════════════════════════
-
-# Cache de messageIds processados (últimos 10 minutos)
-_processed_messages = {}  # {messageId: timestamp}
-_message_cache_lock = asyncio.Lock()
-
-# Cache de mensagens sem messageId (fallback - últimos 2 minutos)
-_fallback_cache = {}  # {phone:content_hash: timestamp}
-_fallback_cache_lock = asyncio.Lock()
-
-# Locks por telefone (previne race conditions)
-_phone_locks = defaultdict(asyncio.Lock)
-
-
-async def _cleanup_message_cache():
-    """Remove messageIds processados há mais de 10 minutos."""
-    async with _message_cache_lock:
-        now = datetime.now(timezone.utc)
-        to_remove = [
-            msg_id for msg_id, timestamp in _processed_messages.items()
-            if (now - timestamp).total_seconds() > 600  # 10 minutos
-        ]
-        for msg_id in to_remove:
-            del _processed_messages[msg_id]
-        
-        if to_remove:
-            logger.debug(f"🧹 Cache limpo: {len(to_remove)} messageIds removidos")
-
-
-async def _cleanup_fallback_cache():
-    """Remove mensagens do fallback cache após 2 minutos."""
-    async with _fallback_cache_lock:
-        now = datetime.now(timezone.utc)
-        to_remove = [
-            key for key, timestamp in _fallback_cache.items()
-            if (now - timestamp).total_seconds() > 120  # 2 minutos
-        ]
-        for key in to_remove:
-            del _fallback_cache[key]
-        
-        if to_remove:
-            logger.debug(f"🧹 Fallback cache limpo: {len(to_remove)} entradas removidas")
-
-
-def _generate_fallback_key(phone: str, content: str) -> str:
-    """Gera chave única para mensagens sem messageId."""
-    # Hash simples: phone + primeiros 100 chars da mensagem
-    key_data = f"{phone}:{content[:100]}"
-    return hashlib.md5(key_data.encode()).hexdigest()
-
-
-async def _is_duplicate_fallback(phone: str, content: str) -> bool:
-    """
-    Verifica duplicação para mensagens sem messageId (fallback).
-    Usa hash de phone + conteúdo (sem timestamp).
-    """
-    async with _fallback_cache_lock:
-        key = _generate_fallback_key(phone, content)
-        
-        if key in _fallback_cache:
-            return True
-        
-        # Registra como processado
-        _fallback_cache[key] = datetime.now(timezone.utc)
-        
-        # Limpa cache antigo (async)
-        asyncio.create_task(_cleanup_fallback_cache())
-        
-        return False
-
-
 # ============================================
 # WEBHOOK: MENSAGEM RECEBIDA
 # ============================================
@@ -165,296 +91,87 @@ async def zapi_receive_message(
         # ════════════════════════════════════════════════════════════════
         # NOVO PASSO 2: BUSCA TENANT (NECESSÁRIO PARA CONTEXTO DE TRANSCRIÇÃO)
         # ════════════════════════════════════════════════════════════════
-        result = await db.execute(
+        # Resolve pelo instanceId (lookup indexado + cache local)
+        tenant = await get_tenant_by_zapi_instance(db, payload.get("instanceId"))
+
+        channel_query = (
             select(Channel)
             .where(Channel.type == "whatsapp")
             .where(Channel.active == True)
         )
+        if tenant:
+            channel_query = channel_query.where(Channel.tenant_id == tenant.id)
+
+        result = await db.execute(channel_query.limit(1))
         channel = result.scalar_one_or_none()
         
         if not channel:
             logger.error("Nenhum canal WhatsApp ativo encontrado")
             return {"status": "error", "reason": "no_channel"}
         
-        result = await db.execute(
-            select(Tenant)
-            .where(Tenant.id == channel.tenant_id)
-            .where(Tenant.active == True)
-        )
-        tenant = result.scalar_one_or_none()
+        if not tenant:
+            # Legado: instância sem rota cadastrada, usa o tenant do canal ativo
+            result = await db.execute(
+                select(Tenant)
+                .where(Tenant.id == channel.tenant_id)
+                .where(Tenant.active == True)
+            )
+            tenant = result.scalar_one_or_none()
         
         if not tenant:
             logger.error(f"Tenant nao encontrado para channel {channel.id}")
             return {"status": "error", "reason": "no_tenant"}
 
         # ════════════════════════════════════════════════════════════════
-        # PASSO 3: EXTRAI DADOS DA MENSAGEM
+        # PASSO 3: VALIDA CONTEÚDO (SEM PROCESSAR MÍDIA)
         # ════════════════════════════════════════════════════════════════
         
         phone = payload.get("phone")
-        sender_name = payload.get("pushName") or payload.get("senderName")
-        instance_id = payload.get("instanceId")
         message_id = payload.get("messageId")
+        content_signature = raw_content_signature(payload)
         
-        # Extrai texto da mensagem (pode vir em diferentes formatos)
-        message_text = None
-        
-        if payload.get("text"):
-            message_text = payload["text"].get("message")
-        elif payload.get("image"):
-            image_url = payload["image"].get("imageUrl")
-            caption = payload["image"].get("caption") or ""
-            
-            if image_url:
-                logger.info(f"📸 Imagem detectada! Analisando com GPT-4o Vision...")
-                analysis = await analyze_property_image(image_url)
-                message_text = f"[Imagem: {analysis}] {caption}".strip()
-            else:
-                message_text = caption or "[Imagem recebida]"
-        elif payload.get("audio"):
-            audio_url = payload["audio"].get("audioUrl")
-            if audio_url:
-                logger.info(f"🎙️ Áudio detectado! Iniciando transcrição Whisper...")
-                
-                # Build context-aware prompt for Whisper
-                whisper_prompt = "Industrial, São Luís, Mathias Velho, Harmonia, Mato Grande, Fátima, Rio Branco, Ilha das Garças, Centro, Marechal Rondon, Nossa Senhora das Graças, Niterói, Brigadeira, São José, Igara, Guajuviras, Estância Velha, Olaria, Canoas, Rio Grande do Sul, imobiliária, corretor, apartamento, casa, FGTS, financiamento."
-                if tenant and tenant.settings:
-                    company_name = tenant.settings.get("company_name", "")
-                    if company_name:
-                        whisper_prompt = f"{company_name}, {whisper_prompt}"
-                
-                transcription = await transcribe_audio_url(audio_url, prompt=whisper_prompt)
-                if transcription:
-                    message_text = transcription
-                    logger.info(f"✅ Áudio transcrito: {message_text[:50]}...")
-                else:
-                    message_text = "[Áudio recebido (falha na transcrição)]"
-            else:
-                message_text = "[Áudio recebido]"
-        elif payload.get("document"):
-            message_text = payload["document"].get("caption") or "[Documento recebido]"
-        elif payload.get("video"):
-            message_text = payload["video"].get("caption") or "[Video recebido]"
-        elif payload.get("sticker"):
-            message_text = "[Sticker recebido]"
-        elif payload.get("location"):
-            message_text = "[Localizacao recebida]"
-        elif payload.get("contact"):
-            message_text = "[Contato recebido]"
-        elif payload.get("buttonsResponseMessage"):
-            message_text = payload["buttonsResponseMessage"].get("selectedButtonId") or "[Botao clicado]"
-        elif payload.get("listResponseMessage"):
-            message_text = payload["listResponseMessage"].get("title") or "[Opcao selecionada]"
-        
-        if not phone or not message_text:
-            logger.warning(f"Payload incompleto: phone={phone}, text={message_text}")
+        if not phone or not content_signature:
+            logger.warning(f"Payload incompleto: phone={phone}, content={content_signature}")
             return {"status": "ignored", "reason": "incomplete_payload"}
         
         # ════════════════════════════════════════════════════════════════
         # PASSO 4: DEDUPLICAÇÃO (PRIORIDADE: messageId)
         # ════════════════════════════════════════════════════════════════
         
-        if message_id:
-            # Usa messageId (método confiável)
-            async with _message_cache_lock:
-                if message_id in _processed_messages:
-                    logger.info(f"✅ Webhook duplicado bloqueado (messageId): {message_id}")
-                    return {"status": "ok", "message": "already_processed"}
-                
-                # Marca como processado
-                _processed_messages[message_id] = datetime.now(timezone.utc)
-            
-            # Limpa cache antigo (async, não bloqueia)
-            asyncio.create_task(_cleanup_message_cache())
-        
-        else:
-            # Fallback: usa hash de phone + conteúdo (sem messageId)
+        if not message_id:
             logger.warning("⚠️ Webhook sem messageId - usando fallback")
-            
-            is_duplicate = await _is_duplicate_fallback(phone, message_text)
-            if is_duplicate:
-                logger.warning(f"⚠️ Webhook duplicado detectado (fallback): {phone}")
-                return {"status": "ok", "message": "already_processed_fallback"}
-        
-        logger.info(f"🏢 Processando para tenant: {tenant.slug}")
+
+        idempotency_key, idempotency_ttl = webhook_idempotency_key("zapi", message_id, phone, content_signature)
+
+        if not await claim_message(idempotency_key, idempotency_ttl):
+            if message_id:
+                logger.info(f"✅ Webhook duplicado bloqueado (messageId): {message_id}")
+                return {"status": "ok", "message": "already_processed"}
+            logger.warning(f"⚠️ Webhook duplicado detectado (fallback): {phone}")
+            return {"status": "ok", "message": "already_processed_fallback"}
         
         # ════════════════════════════════════════════════════════════════
-        # PASSO 5: LOCK POR TELEFONE + PROCESSA MENSAGEM
+        # PASSO 5: ENFILEIRA (PROCESSAMENTO E ENVIO NOS WORKERS)
         # ════════════════════════════════════════════════════════════════
         
-        async with _phone_locks[phone]:
-            logger.info(f"🔒 Lock adquirido para {phone}")
-            
-            try:
-                result = await asyncio.wait_for(
-                    process_message(
-                        db=db,
-                        tenant_slug=tenant.slug,
-                        channel_type="whatsapp",
-                        external_id=phone,
-                        content=message_text,
-                        sender_name=sender_name,
-                        sender_phone=phone,
-                        external_message_id=message_id,
-                    ),
-                    timeout=30.0
-                )
-                
-                logger.info(f"✅ Processamento concluído para {phone}")
-                
-            except asyncio.TimeoutError:
-                logger.error(f"⏱️ Timeout processando mensagem de {phone}")
-                return {
-                    "status": "error",
-                    "reason": "processing_timeout",
-                    "message": "Processamento excedeu 30 segundos"
-                }
-            
-            finally:
-                logger.info(f"🔓 Lock liberado para {phone}")
+        try:
+            job_id = await enqueue_zapi_message(tenant, channel, payload)
+        except Exception as e:
+            # Sem fila: libera a chave e pede retry ao provedor
+            logger.error(f"❌ Erro ao enfileirar mensagem de {phone}: {e}")
+            await release_message(idempotency_key)
+            return JSONResponse(
+                status_code=503,
+                content={"status": "error", "reason": "queue_unavailable"},
+            )
         
-        # ════════════════════════════════════════════════════════════════
-        # PASSO 6: ENVIA RESPOSTA (COM VOICE-FIRST)
-        # ════════════════════════════════════════════════════════════════
-
-        if result.get("reply"):
-            zapi_instance = None
-            zapi_token = None
-
-            if channel.config:
-                zapi_instance = channel.config.get("instance_id") or channel.config.get("zapi_instance_id")
-                zapi_token = channel.config.get("token") or channel.config.get("zapi_token")
-
-            zapi = get_zapi_client(instance_id=zapi_instance, token=zapi_token)
-
-            typing_delay = result.get("typing_delay", 2)
-            if typing_delay > 0:
-                logger.info(f"💬 Aguardando {typing_delay}s (simulando digitação)...")
-                await asyncio.sleep(min(typing_delay, 5))
-
-            # ════════════════════════════════════════════════════════════════
-            # 🎙️ VOICE-FIRST: Verifica se deve responder com áudio
-            # ════════════════════════════════════════════════════════════════
-            is_audio_message = payload.get("audio") is not None
-            voice_settings = (tenant.settings or {}).get("voice_response", {})
-            voice_enabled = voice_settings.get("enabled", False)
-            always_audio = voice_settings.get("always_audio", False)
-            max_chars = voice_settings.get("max_chars_for_audio", 500)
-
-            logger.info(f"🔍 Voice check: enabled={voice_enabled}, is_audio={is_audio_message}, always={always_audio}, settings={voice_settings}")
-
-            reply_text = result["reply"]
-            should_send_audio = False
-
-            # Decide se envia áudio
-            if voice_enabled:
-                if always_audio or is_audio_message:
-                    # Só envia áudio se a resposta não for muito longa
-                    if len(reply_text) <= max_chars:
-                        should_send_audio = True
-                        logger.info(f"🎙️ Voice-First ATIVADO: Respondendo com áudio")
-                    else:
-                        logger.info(f"🎙️ Resposta muito longa ({len(reply_text)} chars), enviando texto")
-                else:
-                    logger.info(f"🎙️ Voice desabilitado: always_audio={always_audio}, is_audio={is_audio_message}")
-
-            if should_send_audio:
-                # Gera áudio com TTS (detecta provedor automaticamente)
-                try:
-                    voice = voice_settings.get("voice", "camila")  # Padrão: voz brasileira
-                    speed = voice_settings.get("speed", 0.95)
-
-                    # Detecta qual provedor usar baseado na voz
-                    GOOGLE_VOICES = ["camila", "vitoria", "ricardo", "ana", "carlos"]
-                    provider = "google" if voice in GOOGLE_VOICES else "openai"
-
-                    logger.info(f"🎤 Iniciando TTS ({provider}): voz={voice}, speed={speed}, chars={len(reply_text)}")
-
-                    if provider == "google":
-                        from src.infrastructure.services.google_tts_service import get_google_tts_service
-                        tts = get_google_tts_service()
-                        audio_bytes = await tts.generate_audio_bytes(
-                            text=reply_text,
-                            voice=voice,
-                            speed=speed,
-                        )
-                    else:
-                        tts = get_tts_service()
-                        audio_bytes = await tts.generate_audio_bytes(
-                            text=reply_text,
-                            voice=voice,
-                            speed=speed,
-                            output_format="mp3"
-                        )
-
-                    logger.info(f"✅ TTS retornou {len(audio_bytes) if audio_bytes else 0} bytes")
-
-                    if audio_bytes:
-                        # Converte para base64
-                        audio_b64 = base64.b64encode(audio_bytes).decode("utf-8")
-
-                        # Envia áudio
-                        send_result = await zapi.send_audio_base64(
-                            phone=phone,
-                            audio_base64=audio_b64,
-                            mime_type="audio/mpeg"
-                        )
-
-                        if send_result.get("success"):
-                            logger.info(f"✅ Áudio enviado com sucesso para {phone}")
-                        else:
-                            # Fallback: envia como texto
-                            logger.warning(f"⚠️ Falha no áudio, enviando texto: {send_result.get('error')}")
-                            send_result = await zapi.send_text(
-                                phone=phone,
-                                message=reply_text,
-                                delay_message=2
-                            )
-                    else:
-                        # Fallback: envia como texto
-                        logger.warning("⚠️ TTS retornou vazio, enviando texto")
-                        send_result = await zapi.send_text(
-                            phone=phone,
-                            message=reply_text,
-                            delay_message=2
-                        )
-
-                except Exception as e:
-                    logger.error(f"❌ Erro no TTS: {e}, enviando texto")
-                    send_result = await zapi.send_text(
-                        phone=phone,
-                        message=reply_text,
-                        delay_message=2
-                    )
-            else:
-                # Envia resposta normal (texto)
-                send_result = await zapi.send_text(
-                    phone=phone,
-                    message=reply_text,
-                    delay_message=2
-                )
-
-            if not send_result.get("success"):
-                logger.error(f"❌ Erro enviando resposta: {send_result.get('error')}")
-
-            # 🚀 Se houver localização, envia o GPS
-            location = result.get("location")
-            if location:
-                logger.info(f"📍 Disparando GPS para {phone}...")
-                await zapi.send_location(
-                    phone=phone,
-                    latitude=location["latitude"],
-                    longitude=location["longitude"],
-                    title=location["title"],
-                    address=location["address"]
-                )
+        if job_id is None:
+            # Entrou no grupo de mensagens seguidas que já tem flush agendado
+            return {"status": "queued", "coalesced": True}
         
-        return {
-            "status": "processed",
-            "lead_id": result.get("lead_id"),
-            "is_new": result.get("is_new_lead"),
-            "qualification": result.get("qualification"),
-        }
+        logger.info(f"📬 Mensagem de {phone} enfileirada para {tenant.slug} (job {job_id})")
+        
+        return {"status": "queued", "job_id": job_id}
         
     except Exception as e:
         logger.error(f"❌ Erro no webhook Z-API receive: {e}", exc_info=True)
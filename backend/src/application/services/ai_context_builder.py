@@ -5,6 +5,9 @@ AI CONTEXT BUILDER - FONTE ÚNICA DE VERDADE (V2)
 CORREÇÃO: Prioriza contexto do imóvel e lead sobre o prompt base.
 Quando trunca, corta o prompt base (menos importante), não os contextos dinâmicos.
 
+V3: o prompt base vira um prefixo estável (cacheável pelo provedor) e os
+contextos da conversa vão depois dele (ver prompt_compiler.py).
+
 ÚLTIMA ATUALIZAÇÃO: 2025-01-XX
 """
 
@@ -14,6 +17,8 @@ from dataclasses import dataclass, field
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 
+from .prompt_compiler import estimate_tokens, get_static_prefix, truncate_prompt
+
 logger = logging.getLogger(__name__)
 
 # =============================================================================
@@ -48,6 +53,8 @@ class AIContext:
     out_of_scope_message: str = ""
     custom_prompt: Optional[str] = None
     niche_template: Optional[str] = None
+    # Identifica (tenant, versão dos settings/nicho) para o cache do prefixo do prompt
+    cache_key: Optional[str] = None
 
 
 @dataclass
@@ -102,6 +109,13 @@ class PromptBuildResult:
     has_lead_profile: bool = False
     has_rag_context: bool = False
     warnings: List[str] = field(default_factory=list)
+    # Prefixo estável (cacheável pelo provedor) + sufixo dinâmico
+    static_prefix_length: int = 0
+    prefix_cache_hit: bool = False
+    prefix_stable: bool = True
+    prefix_tokens: int = 0
+    suffix_tokens: int = 0
+    section_tokens: Dict[str, int] = field(default_factory=dict)
 
 
 # =============================================================================
@@ -502,143 +516,113 @@ def build_complete_prompt(
     """
     Constrói o prompt completo para a IA.
     
-    V2: PRIORIZA CONTEXTOS DINÂMICOS!
+    V3: PREFIXO ESTÁVEL + SUFIXO DINÂMICO (cache de prompt do provedor)
     
-    Ordem de prioridade (do mais importante para menos):
-    1. Contexto do imóvel de portal (CRÍTICO - cliente perguntou sobre isso!)
-    2. Contexto do lead (evita perguntas burras)
-    3. Contexto do produto/serviço
-    4. Prompt base do nicho (TRUNCÁVEL se necessário)
-    5. Instruções de segurança
-    """
-    from src.domain.prompts import build_system_prompt
+    1. Prefixo: prompt base do tenant/nicho, idêntico entre turnos
+       (compilado uma vez por versão, ver prompt_compiler)
+    2. Sufixo: contextos desta conversa, na ordem de prioridade:
+       imóvel de portal → produto → lead → perfil → RAG
+       + instruções de segurança e aviso de simulação
     
+    Os contextos dinâmicos nunca são truncados: se não couberem, o base é
+    encurtado só neste turno (prefix_stable=False).
+    """
     warnings = []
     
     # =========================================================================
-    # PASSO 1: Constrói contextos dinâmicos PRIMEIRO (são prioritários!)
+    # PASSO 1: Constrói contextos dinâmicos (são prioritários!)
     # =========================================================================
-    dynamic_parts = []
+    sections: Dict[str, str] = {}
     
     # Contexto do imóvel de portal (MAIS IMPORTANTE!)
     if imovel_portal:
-        imovel_context = build_imovel_portal_context(imovel_portal)
-        dynamic_parts.append(imovel_context)
+        sections["imovel_portal"] = build_imovel_portal_context(imovel_portal)
         logger.info(f"✅ Contexto imóvel portal adicionado: {imovel_portal.codigo}")
     
     # Contexto do produto
     if product:
-        prod_context = build_product_context(product)
-        dynamic_parts.append(prod_context)
-        dynamic_parts.append(f"⚠️ Cliente interessado em {product.name}. Use as informações acima!")
+        sections["product"] = "\n".join([
+            build_product_context(product),
+            f"⚠️ Cliente interessado em {product.name}. Use as informações acima!",
+        ])
         logger.info(f"✅ Contexto produto adicionado: {product.name}")
     
     # Contexto do lead
     if lead_context:
-        lead_info = build_lead_info_context(lead_context)
-        dynamic_parts.append(lead_info)
+        sections["lead"] = build_lead_info_context(lead_context)
         logger.info(f"✅ Contexto lead adicionado: {lead_context.lead_id}")
 
     # Perfil progressivo do lead (memória de longo prazo)
     if lead_profile:
         profile_context = build_lead_profile_context(lead_profile)
         if profile_context:
-            dynamic_parts.append(profile_context)
+            sections["lead_profile"] = profile_context
             logger.info("✅ Perfil progressivo do lead adicionado")
 
     # Contexto RAG (base de conhecimento)
     if rag_context:
-        dynamic_parts.append(rag_context)
+        sections["rag"] = rag_context
         logger.info("✅ Contexto RAG adicionado")
     
-    # Calcula espaço usado pelos contextos dinâmicos
-    dynamic_context = "\n".join(dynamic_parts)
+    dynamic_context = "\n".join(sections.values())
     dynamic_length = len(dynamic_context)
     
-    logger.info(f"📊 Contextos dinâmicos: {dynamic_length} chars")
-    
-    # =========================================================================
-    # PASSO 2: Calcula espaço disponível para prompt base
-    # =========================================================================
-    available_for_base = MAX_PROMPT_LENGTH - dynamic_length - 500  # 500 de margem
-    
-    if available_for_base < 5000:
-        available_for_base = 5000  # Mínimo para o prompt base funcionar
-        warnings.append(f"Espaço limitado para prompt base: {available_for_base} chars")
-    
-    logger.info(f"📊 Espaço disponível para prompt base: {available_for_base} chars")
-    
     # =========================================================================
-    # PASSO 3: Constrói prompt base (TRUNCA SE NECESSÁRIO)
+    # PASSO 2: Sufixo dinâmico (contextos + instruções desta chamada)
     # =========================================================================
-    base_prompt = build_system_prompt(
-        niche_id=ai_context.niche_id,
-        company_name=ai_context.company_name,
-        tone=ai_context.tone,
-        custom_questions=ai_context.custom_questions,
-        custom_rules=ai_context.custom_rules,
-        custom_prompt=ai_context.custom_prompt,
-        faq_items=ai_context.faq_items,
-        scope_description=ai_context.scope_description,
-        lead_context=None,  # Já adicionamos separadamente
-        identity=ai_context.identity,
-        scope_config=ai_context.scope_config,
-        niche_template=ai_context.niche_template,
-    )
-    
-    original_base_length = len(base_prompt)
-    
-    # Trunca o prompt base se necessário (NÃO os contextos dinâmicos!)
-    if len(base_prompt) > available_for_base:
-        logger.warning(f"⚠️ Truncando prompt BASE de {len(base_prompt)} para {available_for_base} chars")
-        warnings.append(f"Prompt base truncado de {len(base_prompt)} para {available_for_base} chars")
-        
-        # Trunca preservando a estrutura
-        base_prompt = base_prompt[:available_for_base]
-        
-        # Tenta cortar em um ponto lógico (última quebra de linha)
-        last_newline = base_prompt.rfind('\n')
-        if last_newline > available_for_base - 500:
-            base_prompt = base_prompt[:last_newline]
-    
-    # PASSO 4: Monta prompt final (CONTEXTOS DINÂMICOS VÊM PRIMEIRO!)
-    # =========================================================================
-    # CORREÇÃO CRÍTICA: Contextos dinâmicos ANTES do prompt base!
-    # GPT models dão mais peso ao INÍCIO do prompt.
-    # Ordem: Dinâmicos → Base → Segurança
+    suffix_parts = []
 
-    prompt_parts = []
-
-    # 1. CONTEXTOS DINÂMICOS PRIMEIRO (maior prioridade na atenção da IA)
     if dynamic_context:
-        prompt_parts.append("=" * 80)
-        prompt_parts.append("🔥 CONTEXTO ESPECÍFICO DESTA CONVERSA - LEIA PRIMEIRO!")
-        prompt_parts.append("=" * 80)
-        prompt_parts.append(dynamic_context)
-        prompt_parts.append("\n" + "=" * 80)
-        prompt_parts.append("⚠️ USE AS INFORMAÇÕES ACIMA PARA RESPONDER!")
-        prompt_parts.append("=" * 80)
-        prompt_parts.append("\n")
-
-    # 2. PROMPT BASE (regras gerais)
-    prompt_parts.append(base_prompt)
+        suffix_parts.append("\n" + "=" * 80)
+        suffix_parts.append("🔥 CONTEXTO ESPECÍFICO DESTA CONVERSA - PRIORIDADE MÁXIMA!")
+        suffix_parts.append("=" * 80)
+        suffix_parts.append(dynamic_context)
+        suffix_parts.append("\n" + "=" * 80)
+        suffix_parts.append("⚠️ USE AS INFORMAÇÕES ACIMA PARA RESPONDER!")
+        suffix_parts.append("=" * 80)
     
     # Instruções de segurança (compactas)
     if include_security and ai_context.scope_description:
         if not product and not imovel_portal:
-            security = build_security_instructions(
+            sections["security"] = build_security_instructions(
                 company_name=ai_context.company_name,
                 scope_description=ai_context.scope_description,
                 out_of_scope_message=ai_context.out_of_scope_message,
             )
-            prompt_parts.append(security)
+            suffix_parts.append(sections["security"])
     
     # Aviso de simulação
     if is_simulation:
-        prompt_parts.append("\n🧪 MODO SIMULAÇÃO - Responda como faria com cliente real.")
+        sections["simulation"] = "\n🧪 MODO SIMULAÇÃO - Responda como faria com cliente real."
+        suffix_parts.append(sections["simulation"])
     
-    # Junta tudo
-    final_prompt = "\n".join(prompt_parts)
+    dynamic_suffix = "\n".join(suffix_parts)
+    
+    # =========================================================================
+    # PASSO 3: Prefixo estável (do cache, a não ser que o sufixo não caiba)
+    # =========================================================================
+    prefix, cache_hit = get_static_prefix(ai_context, MAX_BASE_PROMPT)
+    base_prompt = prefix.text
+    prefix_stable = True
+    
+    available_for_base = MAX_PROMPT_LENGTH - len(dynamic_suffix) - 500  # 500 de margem
+    if available_for_base < 5000:
+        available_for_base = 5000  # Mínimo para o prompt base funcionar
+        if len(base_prompt) > available_for_base:
+            warnings.append(f"Espaço limitado para prompt base: {available_for_base} chars")
+    
+    if len(base_prompt) > available_for_base:
+        logger.warning(f"⚠️ Truncando prompt BASE de {len(base_prompt)} para {available_for_base} chars (fora do cache)")
+        warnings.append(f"Prompt base truncado de {len(base_prompt)} para {available_for_base} chars")
+        base_prompt = truncate_prompt(base_prompt, available_for_base)
+        prefix_stable = False
+    elif prefix.truncated:
+        warnings.append(f"Prompt base truncado de {prefix.original_length} para {len(base_prompt)} chars")
+    
+    # =========================================================================
+    # PASSO 4: Monta prompt final (PREFIXO → SUFIXO)
+    # =========================================================================
+    final_prompt = f"{base_prompt}\n{dynamic_suffix}" if dynamic_suffix else base_prompt
     
     # Verificação final
     if len(final_prompt) > MAX_PROMPT_LENGTH:
@@ -647,9 +631,16 @@ def build_complete_prompt(
         # Trunca forçado (último recurso)
         final_prompt = final_prompt[:MAX_PROMPT_LENGTH]
     
+    # Tokens por seção (o prefixo estável já vem contado do cache)
+    prefix_tokens = prefix.tokens if prefix_stable else estimate_tokens(base_prompt)
+    section_tokens = {"base": prefix_tokens}
+    section_tokens.update({name: estimate_tokens(text) for name, text in sections.items()})
+    suffix_tokens = estimate_tokens(dynamic_suffix)
+    
     logger.info(f"📝 Prompt FINAL: {len(final_prompt)} chars | "
-                f"Base: {original_base_length}→{len(base_prompt)} | "
-                f"Dinâmico: {dynamic_length} | "
+                f"Prefixo: {len(base_prompt)} chars/{prefix_tokens} tokens "
+                f"(cache: {cache_hit}, estável: {prefix_stable}) | "
+                f"Dinâmico: {dynamic_length} chars/{suffix_tokens} tokens | "
                 f"Imóvel: {bool(imovel_portal)} | Prod: {bool(product)} | "
                 f"Lead: {bool(lead_context)} | Sim: {is_simulation}")
     
@@ -663,6 +654,12 @@ def build_complete_prompt(
         has_lead_profile=bool(lead_profile),
         has_rag_context=bool(rag_context),
         warnings=warnings,
+        static_prefix_length=len(base_prompt),
+        prefix_cache_hit=cache_hit,
+        prefix_stable=prefix_stable,
+        prefix_tokens=prefix_tokens,
+        suffix_tokens=suffix_tokens,
+        section_tokens=section_tokens,
     )
 
 
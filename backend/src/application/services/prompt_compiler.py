@@ -0,0 +1,127 @@
+"""
+PROMPT COMPILER - Prefixo Estável + Sufixo Dinâmico
+===================================================
+
+O cache automático de prompt da OpenAI só reaproveita prefixos idênticos
+(a partir de ~1024 tokens). O system prompt colocava os contextos da
+conversa (imóvel, lead, perfil, RAG) ANTES do prompt base e truncava o
+base conforme o tamanho deles: o prefixo mudava a cada turno e nenhuma
+chamada aproveitava o cache.
+
+Agora o system prompt tem duas partes:
+
+1. Prefixo estático: prompt base do tenant/nicho, compilado uma vez por
+   (tenant, template do nicho, versão dos settings) e guardado aqui
+2. Sufixo dinâmico: contextos desta conversa, sempre depois do prefixo
+
+A chave do prefixo vem do AIContext.cache_key (preenchida pelo
+TenantRuntimeContext com a versão do tenant); sem ela, usa um hash do
+conteúdo do AIContext (simulador, testes).
+
+Tokens: tokenizer local (src/infrastructure/llm/tokenizer.py).
+"""
+
+import hashlib
+import json
+import logging
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING, Tuple
+
+from src.infrastructure.llm.tokenizer import estimate_tokens
+
+if TYPE_CHECKING:
+    from .ai_context_builder import AIContext
+
+logger = logging.getLogger(__name__)
+
+PREFIX_CACHE_SIZE = 512
+
+
+# =============================================================================
+# PREFIXO ESTÁTICO
+# =============================================================================
+
+@dataclass(frozen=True)
+class StaticPrefix:
+    """Prompt base compilado de um tenant (idêntico entre turnos)."""
+
+    key: str
+    text: str
+    tokens: int
+    original_length: int  # Antes de truncar
+
+    @property
+    def truncated(self) -> bool:
+        return self.original_length > len(self.text)
+
+
+def truncate_prompt(text: str, max_chars: int) -> str:
+    """Trunca preservando a estrutura (corta na última quebra de linha, se próxima)."""
+    if len(text) <= max_chars:
+        return text
+    truncated = text[:max_chars]
+    last_newline = truncated.rfind("\n")
+    if last_newline > max_chars - 500:
+        truncated = truncated[:last_newline]
+    return truncated
+
+
+def prefix_cache_key(ai_context: "AIContext") -> str:
+    if ai_context.cache_key:
+        return ai_context.cache_key
+    payload = json.dumps(asdict(ai_context), sort_keys=True, default=str, ensure_ascii=False)
+    return "sha1:" + hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def compile_static_prefix(ai_context: "AIContext", max_chars: int, key: str = "") -> StaticPrefix:
+    """Monta o prompt base (persona, regras, FAQ, template do nicho) do tenant."""
+    from src.domain.prompts import build_system_prompt
+
+    base_prompt = build_system_prompt(
+        niche_id=ai_context.niche_id,
+        company_name=ai_context.company_name,
+        tone=ai_context.tone,
+        custom_questions=ai_context.custom_questions,
+        custom_rules=ai_context.custom_rules,
+        custom_prompt=ai_context.custom_prompt,
+        faq_items=ai_context.faq_items,
+        scope_description=ai_context.scope_description,
+        lead_context=None,  # Contexto do lead vai no sufixo dinâmico
+        identity=ai_context.identity,
+        scope_config=ai_context.scope_config,
+        niche_template=ai_context.niche_template,
+    )
+
+    text = truncate_prompt(base_prompt, max_chars)
+    if len(text) < len(base_prompt):
+        logger.warning(f"⚠️ Prompt base de {ai_context.company_name} truncado de {len(base_prompt)} para {len(text)} chars")
+
+    return StaticPrefix(key=key, text=text, tokens=estimate_tokens(text), original_length=len(base_prompt))
+
+
+# chave -> prefixo (LRU)
+_prefix_cache: "OrderedDict[str, StaticPrefix]" = OrderedDict()
+
+
+def get_static_prefix(ai_context: "AIContext", max_chars: int) -> Tuple[StaticPrefix, bool]:
+    """
+    Prefixo estático do tenant, compilado uma vez por versão.
+
+    Returns:
+        (prefixo, veio_do_cache)
+    """
+    key = f"{prefix_cache_key(ai_context)}:{max_chars}"
+
+    cached = _prefix_cache.get(key)
+    if cached is not None:
+        _prefix_cache.move_to_end(key)
+        return cached, True
+
+    prefix = compile_static_prefix(ai_context, max_chars, key=key)
+    _prefix_cache[key] = prefix
+    while len(_prefix_cache) > PREFIX_CACHE_SIZE:
+        _prefix_cache.popitem(last=False)
+
+    logger.info(f"🧱 Prefixo do prompt compilado ({prefix.tokens} tokens, chave {key})")
+    return prefix, False
@@ -0,0 +1,127 @@
+"""
+STAGE GRAPH - Execução Concorrente de Etapas Independentes
+==========================================================
+
+Declara etapas de I/O com suas dependências e executa ao mesmo tempo
+tudo que não depende entre si. Cada etapa tem timeout próprio: falha ou
+timeout devolvem o valor padrão da etapa (degradação), sem travar as
+outras nem o fluxo principal.
+
+Uso:
+    graph = StageGraph([
+        Stage("imovel", buscar_imovel, timeout=8),
+        Stage("rag", buscar_rag, depends_on=("imovel",), timeout=5),
+    ]).start()
+
+    imovel = await graph.get("imovel")   # espera só esta etapa
+    ...
+    graph.cancel()                       # retorno antecipado
+
+Cada etapa recebe um dict com os resultados das suas dependências.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Stage:
+    """Etapa do grafo."""
+
+    name: str
+    run: Callable[[Dict[str, Any]], Awaitable[Any]]
+    depends_on: Tuple[str, ...] = ()
+    timeout: float = 5.0
+    default: Any = None
+
+
+class StageGraph:
+    """Executa etapas respeitando dependências, com timeout e fallback por etapa."""
+
+    def __init__(self, stages: List[Stage], label: str = "stages"):
+        self.label = label
+        self.stages: Dict[str, Stage] = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Etapa duplicada: {stage.name}")
+            self.stages[stage.name] = stage
+
+        self._order = self._topological_order()
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+        self.timings: Dict[str, float] = {}   # etapa -> ms
+        self.failures: Dict[str, str] = {}    # etapa -> motivo (timeout / erro)
+
+    def _topological_order(self) -> List[str]:
+        order: List[str] = []
+        state: Dict[str, str] = {}
+
+        def visit(name: str, path: List[str]):
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"Ciclo entre etapas: {' → '.join(path + [name])}")
+            stage = self.stages.get(name)
+            if stage is None:
+                raise ValueError(f"Etapa desconhecida: {name} (dependência de {path[-1]})")
+
+            state[name] = "visiting"
+            for dependency in stage.depends_on:
+                visit(dependency, path + [name])
+            state[name] = "done"
+            order.append(name)
+
+        for name in self.stages:
+            visit(name, [])
+        return order
+
+    # =========================================================================
+    # EXECUÇÃO
+    # =========================================================================
+
+    def start(self) -> "StageGraph":
+        """Dispara todas as etapas (as dependentes aguardam as suas dependências)."""
+        if not self._tasks:
+            for name in self._order:
+                self._tasks[name] = asyncio.create_task(
+                    self._run(self.stages[name]), name=f"{self.label}:{name}"
+                )
+        return self
+
+    async def _run(self, stage: Stage) -> Any:
+        dependencies = {name: await self._tasks[name] for name in stage.depends_on}
+
+        started = time.perf_counter()
+        try:
+            return await asyncio.wait_for(stage.run(dependencies), timeout=stage.timeout)
+        except asyncio.TimeoutError:
+            self.failures[stage.name] = "timeout"
+            logger.warning(f"⏱️ [{self.label}] Etapa '{stage.name}' excedeu {stage.timeout}s, seguindo sem ela")
+        except Exception as e:
+            self.failures[stage.name] = f"{type(e).__name__}: {e}"
+            logger.warning(f"⚠️ [{self.label}] Etapa '{stage.name}' falhou, seguindo sem ela: {e}")
+        finally:
+            self.timings[stage.name] = round((time.perf_counter() - started) * 1000, 1)
+
+        return stage.default
+
+    async def get(self, name: str) -> Any:
+        """Resultado de uma etapa (aguarda só ela e suas dependências)."""
+        self.start()
+        return await self._tasks[name]
+
+    async def wait_all(self) -> Dict[str, Any]:
+        self.start()
+        results = await asyncio.gather(*self._tasks.values())
+        return dict(zip(self._tasks.keys(), results))
+
+    def cancel(self):
+        """Cancela as etapas ainda em andamento."""
+        for task in self._tasks.values():
+            if not task.done():
+                task.cancel()
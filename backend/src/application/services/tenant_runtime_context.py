@@ -0,0 +1,240 @@
+"""
+TENANT RUNTIME CONTEXT - Cache Quente do Contexto do Tenant
+===========================================================
+
+Toda mensagem recebida buscava Tenant (por slug), Channel e o template
+do Niche, e recalculava extract_ai_context sobre o JSON de settings.
+O TenantRuntimeContext guarda isso compilado, por tenant:
+
+1. Cache local do processo (já compilado)
+2. Redis (opcional, linhas cruas): réplica fria não vai ao banco
+3. Banco: grava nos dois níveis
+
+Versão: redis_service.invalidate_tenant_cache(tenant_id) incrementa a
+versão do tenant (sem tenant_id, a versão global, usada quando um
+nicho muda). Uma entrada só vale na versão em que foi montada; a
+checagem custa um MGET no Redis (ou um dict, sem Redis). O TTL dos dois
+níveis limita o caso raro de leitura concorrente com uma alteração.
+
+Tenant e Channel são devolvidos anexados à sessão com merge(load=False),
+sem query, e podem ser usados normalmente no fluxo.
+"""
+
+import copy
+import logging
+import time
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+
+from src.domain.entities import Tenant, Channel, Niche
+from src.infrastructure.services.redis_service import (
+    cache_get_json,
+    cache_set,
+    get_tenant_cache_version,
+)
+
+from .ai_context_builder import AIContext, extract_ai_context
+
+logger = logging.getLogger(__name__)
+
+LOCAL_TTL_SECONDS = 300
+REDIS_TTL_SECONDS = LOCAL_TTL_SECONDS
+
+
+def runtime_context_key(tenant_slug: str) -> str:
+    """Gera chave de cache do contexto do tenant no Redis."""
+    return f"tenant:slug:{tenant_slug}:runtime"
+
+
+# =============================================================================
+# LINHAS (COLUNAS ↔ DICT)
+# =============================================================================
+
+def _row_to_dict(obj) -> Dict[str, Any]:
+    return {attr.key: getattr(obj, attr.key) for attr in inspect(type(obj)).column_attrs}
+
+
+def _encode_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        key: value.isoformat() if isinstance(value, (datetime, date)) else value
+        for key, value in row.items()
+    }
+
+
+def _decode_row(model, data: Dict[str, Any]) -> Dict[str, Any]:
+    row = dict(data)
+    for column in model.__table__.columns:
+        value = row.get(column.key)
+        if not isinstance(value, str):
+            continue
+        try:
+            python_type = column.type.python_type
+        except NotImplementedError:
+            continue
+        if python_type is datetime:
+            row[column.key] = datetime.fromisoformat(value)
+        elif python_type is date:
+            row[column.key] = date.fromisoformat(value)
+    return row
+
+
+async def _attach(db: AsyncSession, model, row: Dict[str, Any]):
+    """Instância persistente na sessão, a partir das colunas cacheadas (sem query)."""
+    obj = model(**{
+        key: copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+        for key, value in row.items()
+    })
+    make_transient_to_detached(obj)
+    return await db.merge(obj, load=False)
+
+
+# =============================================================================
+# CONTEXTO
+# =============================================================================
+
+@dataclass
+class TenantRuntimeContext:
+    """Contexto compilado do tenant (somente leitura)."""
+
+    version: Tuple[int, int]
+    tenant_row: Dict[str, Any]
+    channel_rows: Dict[str, Dict[str, Any]]  # tipo -> canal ativo
+    niche_slug: str
+    niche_template: Optional[str]
+    ai_context: AIContext
+    loaded_at: float
+
+    @property
+    def tenant_id(self) -> int:
+        return self.tenant_row["id"]
+
+    async def attach_tenant(self, db: AsyncSession) -> Tenant:
+        return await _attach(db, Tenant, self.tenant_row)
+
+    async def attach_channel(self, db: AsyncSession, channel_type: str) -> Optional[Channel]:
+        row = self.channel_rows.get(channel_type)
+        if row is None:
+            return None
+        return await _attach(db, Channel, row)
+
+
+def _compile(
+    version: Tuple[int, int],
+    tenant_row: Dict[str, Any],
+    channel_rows: Dict[str, Dict[str, Any]],
+    niche_template: Optional[str],
+) -> TenantRuntimeContext:
+    settings = tenant_row.get("settings") or {}
+    ai_context = extract_ai_context(tenant_row["name"], settings, niche_template=niche_template)
+    # Mesma versão = mesmo prefixo de prompt (ver prompt_compiler)
+    ai_context.cache_key = f"tenant:{tenant_row['id']}:v{version[0]}.{version[1]}"
+
+    return TenantRuntimeContext(
+        version=version,
+        tenant_row=tenant_row,
+        channel_rows=channel_rows,
+        niche_slug=_niche_slug(settings),
+        niche_template=niche_template,
+        ai_context=ai_context,
+        loaded_at=time.monotonic(),
+    )
+
+
+def _niche_slug(settings: Dict[str, Any]) -> str:
+    return settings.get("basic", {}).get("niche") or settings.get("niche") or "services"
+
+
+# slug -> contexto compilado
+_local_contexts: Dict[str, TenantRuntimeContext] = {}
+
+
+async def _load_from_db(db: AsyncSession, tenant_slug: str) -> Optional[Dict[str, Any]]:
+    """Linhas cruas do tenant ativo, canais ativos e template do nicho."""
+    result = await db.execute(
+        select(Tenant).where(Tenant.slug == tenant_slug).where(Tenant.active == True)
+    )
+    tenant = result.scalar_one_or_none()
+    if not tenant:
+        return None
+
+    # Lida logo após o tenant: uma alteração concorrente deixa a entrada
+    # com versão antiga (recarregada na próxima mensagem)
+    version = await get_tenant_cache_version(tenant.id)
+
+    result = await db.execute(
+        select(Channel)
+        .where(Channel.tenant_id == tenant.id)
+        .where(Channel.active == True)
+        .order_by(Channel.id)
+    )
+    channel_rows: Dict[str, Dict[str, Any]] = {}
+    for channel in result.scalars():
+        channel_rows.setdefault(channel.type, _row_to_dict(channel))
+
+    result = await db.execute(
+        select(Niche.prompt_template).where(Niche.slug == _niche_slug(tenant.settings or {}))
+    )
+
+    return {
+        "version": list(version),
+        "tenant": _row_to_dict(tenant),
+        "channels": channel_rows,
+        "niche_template": result.scalar_one_or_none(),
+    }
+
+
+async def get_tenant_runtime_context(db: AsyncSession, tenant_slug: str) -> Optional[TenantRuntimeContext]:
+    """
+    Contexto do tenant ativo pelo slug (None se não existe/inativo).
+
+    Uso:
+        runtime = await get_tenant_runtime_context(db, tenant_slug)
+        tenant = await runtime.attach_tenant(db)
+        channel = await runtime.attach_channel(db, "whatsapp")
+    """
+    entry = _local_contexts.get(tenant_slug)
+    if entry is not None and time.monotonic() - entry.loaded_at < LOCAL_TTL_SECONDS:
+        if await get_tenant_cache_version(entry.tenant_id) == entry.version:
+            return entry
+
+    # Redis: linhas cruas de outra réplica, se ainda na versão atual
+    cached = await cache_get_json(runtime_context_key(tenant_slug))
+    if cached:
+        try:
+            version = tuple(cached["version"])
+            if await get_tenant_cache_version(cached["tenant"]["id"]) == version:
+                entry = _compile(
+                    version,
+                    _decode_row(Tenant, cached["tenant"]),
+                    {kind: _decode_row(Channel, row) for kind, row in cached["channels"].items()},
+                    cached["niche_template"],
+                )
+                _local_contexts[tenant_slug] = entry
+                return entry
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning(f"⚠️ Contexto do tenant {tenant_slug} inválido no Redis, recarregando: {e}")
+
+    data = await _load_from_db(db, tenant_slug)
+    if data is None:
+        _local_contexts.pop(tenant_slug, None)
+        return None
+
+    entry = _compile(tuple(data["version"]), data["tenant"], data["channels"], data["niche_template"])
+    _local_contexts[tenant_slug] = entry
+
+    await cache_set(
+        runtime_context_key(tenant_slug),
+        {
+            **data,
+            "tenant": _encode_row(data["tenant"]),
+            "channels": {kind: _encode_row(row) for kind, row in data["channels"].items()},
+        },
+        ttl=REDIS_TTL_SECONDS,
+    )
+    logger.info(f"🧊 Contexto do tenant {tenant_slug} carregado do banco (versão {entry.version})")
+    return entry
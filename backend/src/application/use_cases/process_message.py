@@ -13,6 +13,13 @@ MELHORIAS V2.0:
 ✅ Formatação de preço BR
 ✅ Logging estruturado
 ✅ Métricas de performance
+
+TRANSAÇÕES EM FASES (não segura conexão do pool durante a IA):
+1. Contexto: carrega/atualiza lead, grava a mensagem do usuário → commit
+2. IA + tools: sem transação aberta (RAG e tools usam sessões curtas)
+3. Persistência: recarrega o lead (FOR UPDATE) e compara a versão
+   (updated_at) lida na fase 1; se mudou no meio (corretor assumiu,
+   lead transferido), descarta a resposta da IA
 """
 
 import logging
@@ -24,8 +31,8 @@ import re
 import json
 
 from datetime import datetime, timezone
-from typing import Optional, Dict, Any
-from sqlalchemy import select, func
+from typing import Optional, Dict, Any, List
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm.attributes import flag_modified
 
@@ -40,6 +47,7 @@ from src.domain.entities import (
     Tenant, Lead, Message, Channel, LeadEvent, Notification, Product, Niche
 )
 from src.domain.entities.enums import LeadStatus, EventType
+from src.infrastructure.database import async_session
 
 from src.infrastructure.services import (
     extract_lead_data,
@@ -59,7 +67,6 @@ from src.infrastructure.services.openai_service import (
 )
 
 from src.application.services.ai_context_builder import (
-    extract_ai_context,
     build_complete_prompt,
     lead_to_context,
     product_to_context,
@@ -68,6 +75,8 @@ from src.application.services.ai_context_builder import (
 
 from src.domain.services.lead_profile_extractor import extract_lead_profile
 
+from src.application.services.stage_graph import Stage, StageGraph
+from src.application.services.tenant_runtime_context import get_tenant_runtime_context
 from src.application.services.message_security import (
     check_jailbreak_attempt,
     check_spam_repetition,
@@ -90,6 +99,10 @@ from src.infrastructure.services.audit_service import (
     log_message_received,
     log_ai_action,
 )
+from src.infrastructure.services.conversation_summary_service import (
+    get_effective_history,
+    history_token_budget,
+)
 from src.config import FALLBACK_RESPONSES, get_settings
 from src.infrastructure.services.lgpd_service import (
     detect_lgpd_request,
@@ -375,13 +388,13 @@ async def get_conversation_history(
     db: AsyncSession,
     lead_id: int,
     limit: int = settings.max_conversation_history,
+    token_budget: Optional[int] = None,
 ) -> list[dict]:
     """
     Busca histórico de mensagens do lead.
     
-    ✨ NOVO: Agora usa resumo automático para conversas longas!
-    - Se <50 mensagens: retorna todas
-    - Se >=50: retorna resumo + últimas 30
+    ✨ Resumo incremental + mensagens recentes dentro do orçamento de tokens
+    (no máximo `limit` mensagens literais). Ver conversation_summary_service.
     """
     try:
         # Busca lead para verificar se tem resumo
@@ -395,8 +408,7 @@ async def get_conversation_history(
             return []
         
         # Usa novo serviço de histórico efetivo
-        from src.infrastructure.services.conversation_summary_service import get_effective_history
-        return await get_effective_history(db, lead, max_recent_messages=limit)
+        return await get_effective_history(db, lead, token_budget=token_budget, max_recent_messages=limit)
         
     except Exception as e:
         logger.error(f"Erro ao buscar histórico: {e}")
@@ -412,24 +424,27 @@ async def get_conversation_history(
 
 
 async def count_lead_messages(db: AsyncSession, lead_id: int) -> int:
-    """Conta total de mensagens do lead."""
+    """Total de mensagens do lead (Lead.message_count, mantido no flush)."""
     try:
-        result = await db.execute(
-            select(func.count(Message.id)).where(Message.lead_id == lead_id)
-        )
+        result = await db.execute(select(Lead.message_count).where(Lead.id == lead_id))
         return result.scalar() or 0
     except Exception as e:
         logger.error(f"Erro ao contar mensagens: {e}")
         return 0
 
 
-async def detect_property_context(
+async def lookup_property_context(
     db: AsyncSession,
     content: str,
     lead: Lead,
     history: list[dict],
-) -> Optional[Dict]:
-    """Detecta contexto de imóvel (portal) para nichos imobiliários."""
+) -> tuple[Optional[Dict], Optional[Product]]:
+    """
+    Detecta contexto de imóvel (portal) para nichos imobiliários.
+
+    Só consulta (portal e produto local); não altera o lead, então pode
+    rodar em paralelo com o fluxo principal. Ver apply_property_context.
+    """
     logger.info(f"🏠 Detectando contexto imobiliário")
     
     codigo_na_mensagem = extrair_codigo_imovel(content)
@@ -467,70 +482,75 @@ async def detect_property_context(
                     logger.info(f"✅ Encontrado no histórico: {imovel_portal.get('codigo')}")
                     break
     
-    if imovel_portal:
-        logger.info(f"💾 Salvando imóvel: {imovel_portal.get('codigo')}")
-        
-        if not lead.custom_data:
-            lead.custom_data = {}
-        
-        # --- NOVO: BUSCA PRODUTO CORRESPONDENTE NO BANCO ---
-        # Busca se existe um produto cadastrado com esse código para pegar o corretor
-        codigo = str(imovel_portal.get("codigo"))
+    if not imovel_portal:
+        return None, None
+
+    # --- NOVO: BUSCA PRODUTO CORRESPONDENTE NO BANCO ---
+    # Busca se existe um produto cadastrado com esse código para pegar o corretor
+    codigo = str(imovel_portal.get("codigo"))
+    res_prod = await db.execute(
+        select(Product).where(
+            Product.tenant_id == lead.tenant_id,
+            Product.slug == codigo
+        )
+    )
+    product_obj = res_prod.scalar_one_or_none()
+    if product_obj:
+        logger.info(f"✅ Produto encontrado pelo slug: {product_obj.name}")
+    
+    # Se não achou pelo slug, tenta nos atributos
+    if not product_obj:
         res_prod = await db.execute(
             select(Product).where(
                 Product.tenant_id == lead.tenant_id,
-                Product.slug == codigo
+                Product.attributes["codigo"].astext == codigo
             )
         )
         product_obj = res_prod.scalar_one_or_none()
         if product_obj:
-            logger.info(f"✅ Produto encontrado pelo slug: {product_obj.name}")
-        
-        # Se não achou pelo slug, tenta nos atributos
-        if not product_obj:
-            res_prod = await db.execute(
-                select(Product).where(
-                    Product.tenant_id == lead.tenant_id,
-                    Product.attributes["codigo"].astext == codigo
-                )
-            )
-            product_obj = res_prod.scalar_one_or_none()
-            if product_obj:
-                logger.info(f"✅ Produto encontrado pelos atributos: {product_obj.name}")
-            else:
-                logger.warning(f"⚠️ Nenhum produto local encontrado para o código {codigo}")
-
-        # Armazena dados do imóvel
-        lead.custom_data["imovel_portal"] = {
-            "codigo": codigo,
-            "titulo": imovel_portal.get("titulo"),
-            "tipo": imovel_portal.get("tipo"),
-            "regiao": imovel_portal.get("regiao"),
-            "quartos": imovel_portal.get("quartos"),
-            "banheiros": imovel_portal.get("banheiros"),
-            "vagas": imovel_portal.get("vagas"),
-            "metragem": imovel_portal.get("metragem"),
-            "preco": imovel_portal.get("preco"),
-            "descricao": imovel_portal.get("descricao", ""),
-            "corretor_nome": imovel_portal.get("corretor_nome"),
-            "corretor_whatsapp": imovel_portal.get("corretor_whatsapp"),
-        }
+            logger.info(f"✅ Produto encontrado pelos atributos: {product_obj.name}")
+        else:
+            logger.warning(f"⚠️ Nenhum produto local encontrado para o código {codigo}")
+
+    return imovel_portal, product_obj
+
+
+def apply_property_context(lead: Lead, imovel_portal: Dict, product_obj: Optional[Product]):
+    """Grava no lead o imóvel detectado (e o corretor do produto local)."""
+    logger.info(f"💾 Salvando imóvel: {imovel_portal.get('codigo')}")
+
+    if not lead.custom_data:
+        lead.custom_data = {}
+
+    # Armazena dados do imóvel
+    lead.custom_data["imovel_portal"] = {
+        "codigo": str(imovel_portal.get("codigo")),
+        "titulo": imovel_portal.get("titulo"),
+        "tipo": imovel_portal.get("tipo"),
+        "regiao": imovel_portal.get("regiao"),
+        "quartos": imovel_portal.get("quartos"),
+        "banheiros": imovel_portal.get("banheiros"),
+        "vagas": imovel_portal.get("vagas"),
+        "metragem": imovel_portal.get("metragem"),
+        "preco": imovel_portal.get("preco"),
+        "descricao": imovel_portal.get("descricao", ""),
+        "corretor_nome": imovel_portal.get("corretor_nome"),
+        "corretor_whatsapp": imovel_portal.get("corretor_whatsapp"),
+    }
+    
+    # Se encontrou o produto, associa ao lead e pega dados do corretor
+    if product_obj:
+        lead.custom_data["product_id"] = product_obj.id
+        lead.custom_data["product_name"] = product_obj.name
         
-        # Se encontrou o produto, associa ao lead e pega dados do corretor
-        if product_obj:
-            lead.custom_data["product_id"] = product_obj.id
-            lead.custom_data["product_name"] = product_obj.name
-            
-            # Se o produto tem corretor nos atributos, salva no lead para facilitar
-            if product_obj.attributes:
-                lead.custom_data["corretor_nome"] = product_obj.attributes.get("corretor_nome")
-                lead.custom_data["corretor_whatsapp"] = product_obj.attributes.get("corretor_whatsapp")
-                lead.custom_data["whatsapp_notification"] = product_obj.attributes.get("whatsapp_notification")
+        # Se o produto tem corretor nos atributos, salva no lead para facilitar
+        if product_obj.attributes:
+            lead.custom_data["corretor_nome"] = product_obj.attributes.get("corretor_nome")
+            lead.custom_data["corretor_whatsapp"] = product_obj.attributes.get("corretor_whatsapp")
+            lead.custom_data["whatsapp_notification"] = product_obj.attributes.get("whatsapp_notification")
 
-        lead.custom_data["contexto_ativo"] = "imovel_portal"
-        flag_modified(lead, "custom_data")
-    
-    return imovel_portal
+    lead.custom_data["contexto_ativo"] = "imovel_portal"
+    flag_modified(lead, "custom_data")
 
 
 def detect_warm_lead_signals(content: str, history_len: int = 0) -> bool:
@@ -588,6 +608,206 @@ def detect_hot_lead_signals(content: str) -> bool:
     return False
 
 
+# =============================================================================
+# CONTEXTO EM PARALELO (STAGE GRAPH)
+# =============================================================================
+
+# Timeouts por etapa (segundos): estourou, segue sem aquele contexto
+PROPERTY_STAGE_TIMEOUT = 8.0  # Portal externo + produto local
+PROPERTY_SEARCH_STAGE_TIMEOUT = 6.0
+RAG_STAGE_TIMEOUT = 6.0  # Embedding + busca vetorial
+SENTIMENT_STAGE_TIMEOUT = 1.0
+
+NEUTRAL_SENTIMENT = {
+    "sentiment": "neutral",
+    "confidence": 0.5,
+    "tone_adjustment": None,
+    "detected_signals": None,
+}
+
+
+def build_context_stages(
+    tenant: Tenant,
+    lead: Lead,
+    content: str,
+    history: list[dict],
+    product_detected: Optional[Product],
+) -> StageGraph:
+    """
+    Etapas de contexto que não dependem entre si (nem do fluxo principal).
+
+    imovel_portal ─┬─ imoveis_sugeridos
+                   └─ rag
+    sentiment
+
+    Cada etapa com banco usa sessão própria e curta (uma AsyncSession não
+    executa queries em paralelo).
+    """
+
+    async def imovel_stage(_):
+        async with async_session() as stage_db:
+            return await lookup_property_context(stage_db, content, lead, history)
+
+    async def property_search_stage(deps):
+        imovel_portal, _ = deps["imovel_portal"]
+        if imovel_portal:
+            return []
+
+        async with async_session() as stage_db:
+            # 1. Tira por critérios (bairro, preço, quartos)
+            imoveis = await buscar_imoveis_por_criterios(content, db=stage_db, tenant_id=tenant.id)
+
+            # 2. SE não achou por critérios, TENTA BUSCA SEMÂNTICA (RAG)
+            if not imoveis and len(content.strip()) > 10:
+                logger.info("🧠 Critérios não retornaram nada. Iniciando busca semântica...")
+                imoveis = await buscar_imoveis_semantico(content, db=stage_db, tenant_id=tenant.id)
+        return imoveis
+
+    async def rag_stage(deps):
+        # Busca RAG apenas se NÃO tem imóvel específico ou produto (evita poluir contexto)
+        imovel_portal, _ = deps["imovel_portal"]
+        if imovel_portal or product_detected:
+            return None
+
+        from src.infrastructure.services.knowledge_rag_service import (
+            search_knowledge,
+            build_rag_context,
+        )
+
+        async with async_session() as stage_db:
+            rag_results = await search_knowledge(
+                db=stage_db,
+                tenant_id=tenant.id,
+                query=content,
+                top_k=3,
+                min_similarity=0.6,
+                source_types=["faq", "document", "rule"],
+            )
+
+        if not rag_results:
+            return None
+        logger.info(f"📚 RAG: {len(rag_results)} resultados relevantes encontrados")
+        return build_rag_context(rag_results)
+
+    async def sentiment_stage(_):
+        return await detect_sentiment(content)
+
+    return StageGraph([
+        Stage("imovel_portal", imovel_stage, timeout=PROPERTY_STAGE_TIMEOUT, default=(None, None)),
+        Stage("imoveis_sugeridos", property_search_stage, depends_on=("imovel_portal",),
+              timeout=PROPERTY_SEARCH_STAGE_TIMEOUT, default=[]),
+        Stage("rag", rag_stage, depends_on=("imovel_portal",), timeout=RAG_STAGE_TIMEOUT),
+        Stage("sentiment", sentiment_stage, timeout=SENTIMENT_STAGE_TIMEOUT, default=NEUTRAL_SENTIMENT),
+    ], label=f"lead {lead.id}")
+
+
+# =============================================================================
+# MENSAGENS DO USUÁRIO
+# =============================================================================
+
+def build_user_messages(
+    lead_id: int,
+    content: str,
+    external_message_id: Optional[str],
+    coalesced_messages: Optional[List[Dict[str, Any]]] = None,
+) -> List[Message]:
+    """
+    Mensagens do usuário a gravar no turno.
+
+    Num turno agrupado (várias mensagens seguidas), cada fragmento vira
+    uma Message com seu próprio external_id; a IA recebe o texto unido.
+    Os fragmentos já chegam sanitizados pelo security check (passo 3).
+    """
+    if not coalesced_messages:
+        return [Message(
+            lead_id=lead_id,
+            role="user",
+            content=content,
+            tokens_used=0,
+            external_id=external_message_id,
+        )]
+
+    return [
+        Message(
+            lead_id=lead_id,
+            role="user",
+            content=fragment["content"],
+            tokens_used=0,
+            external_id=fragment.get("external_id"),
+        )
+        for fragment in coalesced_messages
+    ]
+
+
+async def turn_already_answered(
+    db: AsyncSession,
+    lead_id: int,
+    external_message_id: str,
+) -> Optional[bool]:
+    """
+    Situação de uma mensagem já recebida (retry do webhook ou da fila).
+
+    None: ainda não gravada. True: já há resposta depois dela.
+    False: gravada sem resposta (falha ou timeout depois do commit da
+    fase 1); o retry retoma o turno sem gravar a mensagem de novo.
+    """
+    result = await db.execute(
+        select(Message.id).where(Message.lead_id == lead_id, Message.external_id == external_message_id)
+    )
+    message_id = result.scalar_one_or_none()
+    if message_id is None:
+        return None
+
+    result = await db.execute(
+        select(Message.id)
+        .where(Message.lead_id == lead_id, Message.id > message_id, Message.role != "user")
+        .limit(1)
+    )
+    return result.scalar_one_or_none() is not None
+
+
+# =============================================================================
+# CONCORRÊNCIA ENTRE FASES (LOCK OTIMISTA DO LEAD)
+# =============================================================================
+
+async def get_lead_version(db: AsyncSession, lead_id: int):
+    """
+    Versão do lead (updated_at) ao fim da fase de contexto.
+
+    Lida do banco (e não do objeto) porque o onupdate do updated_at
+    expira o atributo no flush.
+    """
+    result = await db.execute(select(Lead.updated_at).where(Lead.id == lead_id))
+    return result.scalar_one()
+
+
+async def reload_lead_for_update(db: AsyncSession, lead_id: int, expected_version) -> tuple[Lead, bool]:
+    """
+    Recarrega o lead com lock de linha para a fase de persistência.
+
+    Returns:
+        (lead com o estado atual do banco, True se outro processo alterou
+        o lead desde a fase de contexto)
+    """
+    result = await db.execute(
+        select(Lead)
+        .where(Lead.id == lead_id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+    lead = result.scalar_one()
+    return lead, lead.updated_at != expected_version
+
+
+def lead_ai_blocked_reason(lead: Lead) -> Optional[str]:
+    """Motivo pelo qual a IA não deve responder este lead (None = pode responder)."""
+    if lead.status == LeadStatus.HANDED_OFF.value or lead.handed_off_at is not None:
+        return "transferido"
+    if lead.attended_by == "seller":
+        return "corretor_atendendo"
+    return None
+
+
 # =============================================================================
 # FUNÇÕES DE IA COM RETRY E TIMEOUT
 # =============================================================================
@@ -659,8 +879,15 @@ async def process_message(
     source: str = "organico",
     campaign: str = None,
     external_message_id: str = None, # ✨ NOVO: Idempotência
+    coalesced_messages: Optional[List[Dict[str, Any]]] = None,
 ) -> dict:
-    """Processa uma mensagem recebida de um lead."""
+    """
+    Processa uma mensagem recebida de um lead.
+
+    `coalesced_messages` ([{"content", "external_id"}, ...]) indica um turno
+    agrupado: `content` é o texto unido enviado à IA e cada fragmento é
+    gravado como uma Message (external_message_id = id do último).
+    """
     
     # ⏱️ MÉTRICA: Marca início
     start_time = time.time()
@@ -724,17 +951,30 @@ async def process_message(
             "security_blocked": True,
         }
     content = security_result.sanitized_content
+
+    # Fragmentos de um turno agrupado são gravados um a um: passam pela
+    # mesma sanitização do texto unido antes de chegar ao banco
+    if coalesced_messages:
+        coalesced_messages = [
+            {
+                **fragment,
+                "content": run_security_check(
+                    content=fragment["content"],
+                    sender_id=sender_phone or external_id,
+                    tenant_id=None,
+                ).sanitized_content,
+            }
+            for fragment in coalesced_messages
+        ]
     
     # =========================================================================
     # 4. BUSCA TENANT E CANAL
     # =========================================================================
-    # ✅ OTIMIZAÇÃO: Busca tenant primeiro (necessário para buscar channel)
-    result = await db.execute(
-        select(Tenant).where(Tenant.slug == tenant_slug).where(Tenant.active == True)
-    )
-    tenant = result.scalar_one_or_none()
+    # ✅ OTIMIZAÇÃO: Contexto do tenant em cache (tenant, canais, template do
+    # nicho, ai_context), invalidado por invalidate_tenant_cache
+    runtime = await get_tenant_runtime_context(db, tenant_slug)
 
-    if not tenant:
+    if not runtime:
         logger.error(f"❌ Tenant não encontrado: {tenant_slug}")
         return {
             "success": False,
@@ -742,17 +982,8 @@ async def process_message(
             "reply": FALLBACK_RESPONSES["error"]
         }
 
-    # Busca channel (depende do tenant.id)
-    result = await db.execute(
-        select(Channel)
-        .where(Channel.tenant_id == tenant.id)
-        .where(Channel.type == channel_type)
-        .where(Channel.active == True)
-    )
-    channel = result.scalar_one_or_none()
-
-    # 💡 NOTA: Não paralelizamos tenant+channel porque channel precisa de tenant.id
-    # Se tentássemos paralelizar, channel falharia por não ter o tenant_id ainda.
+    tenant = await runtime.attach_tenant(db)
+    channel = await runtime.attach_channel(db, channel_type)
     
     # =========================================================================
     # 5. VERIFICAÇÃO DE HORÁRIO COMERCIAL
@@ -798,25 +1029,38 @@ async def process_message(
     # 8. PRÉ-CARREGA HISTÓRICO E CONTAGEM
     # =========================================================================
     # 🕵️ CHECK IDEMPOTÊNCIA (Evita responder 2x a mesma msg do WhatsApp)
+    resuming_turn = False
     if external_message_id:
-        result = await db.execute(
-            select(Message).where(Message.lead_id == lead.id, Message.external_id == external_message_id)
-        )
-        if result.scalar_one_or_none():
+        answered = await turn_already_answered(db, lead.id, external_message_id)
+        if answered:
             logger.warning(f"♻️ Mensagem duplicada ignorada: {external_message_id}")
             return {
                 "success": True,
                 "reply": None,
                 "idempotency_skip": True
             }
+        if answered is False:
+            logger.warning(f"♻️ Retomando turno sem resposta: {external_message_id}")
+            resuming_turn = True
 
-    # ✅ OTIMIZAÇÃO: Busca histórico e conta mensagens em PARALELO (não sequencial)
-    # Reduz de 2 queries sequenciais (100ms + 50ms = 150ms) para
-    # 2 queries paralelas (max(100ms, 50ms) = 100ms) = 33% mais rápido
-    history, message_count = await asyncio.gather(
-        get_conversation_history(db, lead.id),
-        count_lead_messages(db, lead.id),
+    # Mensagens do usuário deste turno (já gravadas se for retomada)
+    user_messages = [] if resuming_turn else build_user_messages(
+        lead.id, content, external_message_id, coalesced_messages
     )
+
+    # ✅ OTIMIZAÇÃO: Histórico vem da janela em cache (Redis, write-through
+    # no commit) e o total de mensagens é coluna do lead: nenhum count no hit
+    history = await get_effective_history(
+        db, lead, token_budget=history_token_budget(tenant.settings)
+    )
+    message_count = lead.message_count or 0
+
+    if resuming_turn:
+        # O turno já está no fim do histórico; a mensagem atual entra no passo 20
+        pending = 0
+        while pending < len(history) and history[-1 - pending].get("role") == "user":
+            pending += 1
+        history = history[:len(history) - pending]
     
     # 📊 LOGGING ESTRUTURADO
     logger.info(f"""
@@ -881,14 +1125,7 @@ async def process_message(
     if lgpd_request:
         logger.info(f"🔒 LGPD request: {lgpd_request}")
         
-        user_message = Message(
-            lead_id=lead.id, 
-            role="user", 
-            content=content, 
-            tokens_used=0,
-            external_id=external_message_id
-        )
-        db.add(user_message)
+        db.add_all(user_messages)
         
         lgpd_reply = get_lgpd_response(lgpd_request, tenant_name=settings["company_name"])
         
@@ -910,14 +1147,7 @@ async def process_message(
     if lead.status == LeadStatus.HANDED_OFF.value or lead.handed_off_at is not None:
         logger.warning(f"⚠️ Lead {lead.id} já foi transferido! Ignorando mensagem.")
 
-        user_message = Message(
-            lead_id=lead.id,
-            role="user",
-            content=content,
-            tokens_used=0,
-            external_id=external_message_id
-        )
-        db.add(user_message)
+        db.add_all(user_messages)
         await db.commit()
 
         return {
@@ -938,14 +1168,7 @@ async def process_message(
         logger.warning(f"⚠️ Lead {lead.id} sendo atendido por corretor no CRM! IA não responde.")
 
         # Salva mensagem do usuário normalmente
-        user_message = Message(
-            lead_id=lead.id,
-            role="user",
-            content=content,
-            tokens_used=0,
-            external_id=external_message_id
-        )
-        db.add(user_message)
+        db.add_all(user_messages)
         await db.commit()
 
         return {
@@ -959,28 +1182,19 @@ async def process_message(
         }
     
     # =========================================================================
-    # 13. DETECÇÃO DE CONTEXTO IMOBILIÁRIO (PORTAL)
+    # 13. CONTEXTO EM PARALELO (IMÓVEL, BUSCA, RAG, SENTIMENTO)
     # =========================================================================
-    imovel_portal = await detect_property_context(
-        db=db,
-        content=content,
-        lead=lead,
-        history=history,
-    )
-    
+    # As etapas rodam ao mesmo tempo que os passos 14-19; cada resultado é
+    # aguardado só onde é usado. Retornos antecipados cancelam o restante.
+    context_stages = build_context_stages(
+        tenant, lead, content, history, product_detected
+    ).start()
+
+    # DETECÇÃO DE CONTEXTO IMOBILIÁRIO (PORTAL)
+    imovel_portal, portal_product = await context_stages.get("imovel_portal")
     if imovel_portal:
         logger.info(f"🏠 Imóvel portal: {imovel_portal.get('codigo')}")
-    else:
-        # 1. Tira por critérios (bairro, preço, quartos)
-        imoveis_sugeridos = await buscar_imoveis_por_criterios(content, db=db, tenant_id=tenant.id)
-        
-        # 2. SE não achou por critérios, TENTA BUSCA SEMÂNTICA (RAG)
-        if not imoveis_sugeridos and len(content.strip()) > 10:
-            logger.info("🧠 Critérios não retornaram nada. Iniciando busca semântica...")
-            imoveis_sugeridos = await buscar_imoveis_semantico(content, db=db, tenant_id=tenant.id)
-            
-        if imoveis_sugeridos:
-            logger.info(f"🔎 Encontrados {len(imoveis_sugeridos)} imóveis para sugestão")
+        apply_property_context(lead, imovel_portal, portal_product)
     
     # =========================================================================
     # 14. HANDOFF TRIGGERS
@@ -992,15 +1206,9 @@ async def process_message(
     
     if trigger_found:
         logger.info(f"🔔 Handoff trigger: {trigger_matched}")
+        context_stages.cancel()
         
-        user_message = Message(
-            lead_id=lead.id, 
-            role="user", 
-            content=content, 
-            tokens_used=0,
-            external_id=external_message_id
-        )
-        db.add(user_message)
+        db.add_all(user_messages)
         await db.flush()
         
         handoff_result = await execute_handoff(lead, tenant, "user_requested", db)
@@ -1037,14 +1245,7 @@ async def process_message(
     # =========================================================================
     # 16. SALVA MENSAGEM DO USUÁRIO
     # =========================================================================
-    user_message = Message(
-        lead_id=lead.id, 
-        role="user", 
-        content=content, 
-        tokens_used=0,
-        external_id=external_message_id
-    )
-    db.add(user_message)
+    db.add_all(user_messages)
     await db.flush()
 
     await mark_lead_activity(db, lead)
@@ -1090,7 +1291,7 @@ async def process_message(
     # =========================================================================
     # 18. DETECÇÃO DE SENTIMENTO
     # =========================================================================
-    sentiment = await detect_sentiment(content)
+    sentiment = await context_stages.get("sentiment")
     
     # =========================================================================
     # 18.7. NOTIFICAÇÃO DE INTERESSE EM IMÓVEL (RAIO-X)
@@ -1165,6 +1366,7 @@ async def process_message(
     # =========================================================================
     spam_response = check_spam_repetition(history, message_count)
     if spam_response:
+        context_stages.cancel()
         assistant_message = Message(
             lead_id=lead.id,
             role="assistant",
@@ -1227,6 +1429,7 @@ async def process_message(
 
     # 3. Lógica de Handoff para Leads Quentes
     if is_hot_lead and old_qualification != "quente":
+        context_stages.cancel()
         if lead.name:
             first_name = lead.name.split()[0]
             hot_response = f"Perfeito, {first_name}! Vou te passar pro corretor agora mesmo!"
@@ -1270,9 +1473,8 @@ async def process_message(
     # =========================================================================
     jailbreak_reply = check_jailbreak_attempt(content, settings["company_name"])
     if jailbreak_reply:
-        # Salva histórico básico e breca
-        user_message = Message(lead_id=lead.id, role="user", content=content, tokens_used=0)
-        db.add(user_message)
+        context_stages.cancel()
+        # Mensagem do usuário já foi salva no passo 16; só registra a resposta
         assistant_message = Message(lead_id=lead.id, role="assistant", content=jailbreak_reply, tokens_used=0)
         db.add(assistant_message)
         await db.commit()
@@ -1289,24 +1491,17 @@ async def process_message(
     # =========================================================================
     logger.info(f"🤖 Preparando contexto centralizado...")
     
-    # --- NOVO: Busca o Template do Nicho no Banco ---
-    niche_template = None
-    niche_slug = tenant.settings.get("basic", {}).get("niche") or tenant.settings.get("niche") or "services"
-    
-    try:
-        from src.domain.entities import Niche
-        res_niche = await db.execute(select(Niche).where(Niche.slug == niche_slug))
-        niche_obj = res_niche.scalar_one_or_none()
-        if niche_obj:
-            niche_template = niche_obj.prompt_template
-            logger.info(f"✨ Template do nicho '{niche_slug}' carregado com sucesso.")
-        else:
-            logger.warning(f"⚠️ Nicho '{niche_slug}' não encontrado no banco. Usando fallback.")
-    except Exception as e:
-        logger.error(f"❌ Erro ao buscar nicho: {e}")
+    # --- Template do Nicho e ai_context vêm do contexto do tenant (cache) ---
+    niche_slug = runtime.niche_slug
+    if not runtime.niche_template:
+        logger.warning(f"⚠️ Nicho '{niche_slug}' sem template disponível. Usando fallback.")
+
+    imoveis_sugeridos = await context_stages.get("imoveis_sugeridos")
+    if imoveis_sugeridos:
+        logger.info(f"🔎 Encontrados {len(imoveis_sugeridos)} imóveis para sugestão")
 
     # Prepara os contextos
-    ai_context = extract_ai_context(tenant.name, tenant.settings, niche_template=niche_template)
+    ai_context = runtime.ai_context
     lead_ctx = lead_to_context(lead, message_count)
     prod_ctx = product_to_context(product_detected) if product_detected else None
     imovel_ctx = imovel_dict_to_context(imovel_portal) if imovel_portal else None
@@ -1315,37 +1510,19 @@ async def process_message(
     lead_profile = lead.custom_data.get("lead_profile") if lead.custom_data else None
 
     # =========================================================================
-    # 20.5. BUSCA RAG NA BASE DE CONHECIMENTO
+    # FIM DA FASE 1: GRAVA O CONTEXTO E DEVOLVE A CONEXÃO AO POOL
     # =========================================================================
-    rag_context = None
-
-    # Busca RAG apenas se NÃO tem imóvel específico ou produto (evita poluir contexto)
-    if not imovel_portal and not product_detected:
-        try:
-            from src.infrastructure.services.knowledge_rag_service import (
-                search_knowledge,
-                build_rag_context,
-            )
+    # Até a fase 3 a sessão principal fica sem transação: a chamada da IA
+    # (até ai_turn_timeout_seconds) não segura conexão. RAG e tools usam sessões curtas.
+    lead_id = lead.id
+    lead_version = await get_lead_version(db, lead_id)
+    await db.commit()
 
-            rag_results = await search_knowledge(
-                db=db,
-                tenant_id=tenant.id,
-                query=content,
-                top_k=3,
-                min_similarity=0.6,
-                source_types=["faq", "document", "rule"],
-            )
-
-            if rag_results:
-                rag_context = build_rag_context(rag_results)
-                logger.info(f"📚 RAG: {len(rag_results)} resultados relevantes encontrados")
-
-        except Exception as e:
-            logger.warning(f"⚠️ Erro na busca RAG (não crítico): {e}")
-            try:
-                await db.rollback()
-            except Exception:
-                pass
+    # =========================================================================
+    # 20.5. BUSCA RAG NA BASE DE CONHECIMENTO (etapa paralela do passo 13)
+    # =========================================================================
+    rag_context = await context_stages.get("rag")
+    logger.info(f"⏱️ Etapas de contexto (ms): {context_stages.timings}")
 
     # Constrói o prompt completo (V2 - Prioriza contextos dinâmicos)
     prompt_result = build_complete_prompt(
@@ -1358,7 +1535,11 @@ async def process_message(
     )
     
     system_prompt = prompt_result.system_prompt
-    logger.info(f"✅ Prompt centralizado gerado ({len(system_prompt)} chars)")
+    logger.info(
+        f"✅ Prompt centralizado gerado ({len(system_prompt)} chars) | "
+        f"tokens: prefixo {prompt_result.prefix_tokens} + sufixo {prompt_result.suffix_tokens} "
+        f"{prompt_result.section_tokens}"
+    )
     
     # ═══════════════════════════════════════════════════════════════
     # ⚠️ CRITICAL FIX: ADICIONA MENSAGEM ATUAL AO HISTÓRICO!
@@ -1370,7 +1551,6 @@ async def process_message(
 
     final_response = ""
     tokens_used = 0
-
     # =========================================================================
     # 20.7. PREPARA FUNCTION CALLING (TOOLS)
     # =========================================================================
@@ -1399,66 +1579,76 @@ async def process_message(
     MAX_TOOL_ITERATIONS = 3  # Evita loops infinitos
 
     try:
-        for iteration in range(MAX_TOOL_ITERATIONS + 1):
-            # 🔄 CHAMA COM RETRY E TIMEOUT!
-            ai_response = await chat_completion_com_retry(
-                messages=messages,
-                temperature=0.7,
-                max_tokens=200,
-                tools=available_tools,
-                tool_choice="auto" if available_tools else None,
-            )
-
-            tokens_used += ai_response.get("tokens_used", 0)
-            tool_calls = ai_response.get("tool_calls")
+        # Orçamento do turno inteiro: várias tentativas × iterações de tools
+        # não podem passar do timeout do job (a resposta se perderia)
+        async with asyncio.timeout(settings.ai_turn_timeout_seconds):
+            for iteration in range(MAX_TOOL_ITERATIONS + 1):
+                # 🔄 CHAMA COM RETRY E TIMEOUT!
+                ai_response = await chat_completion_com_retry(
+                    messages=messages,
+                    temperature=0.7,
+                    max_tokens=200,
+                    tools=available_tools,
+                    tool_choice="auto" if available_tools else None,
+                )
 
-            # Se não tem tool_calls, é resposta final
-            if not tool_calls:
-                final_response = ai_response.get("content", "")
-                break
+                tokens_used += ai_response.get("tokens_used", 0)
+                if ai_response.get("cached_tokens"):
+                    logger.info(
+                        f"🧱 Cache de prompt: {ai_response['cached_tokens']}/"
+                        f"{ai_response.get('prompt_tokens', 0)} tokens reaproveitados"
+                    )
+                tool_calls = ai_response.get("tool_calls")
 
-            # Processa cada tool_call
-            logger.info(f"🔧 Iteração {iteration + 1}: {len(tool_calls)} tool(s) solicitada(s)")
+                # Se não tem tool_calls, é resposta final
+                if not tool_calls:
+                    final_response = ai_response.get("content", "")
+                    break
 
-            for tc in tool_calls:
-                func_name = tc["function"]["name"]
-                try:
-                    func_args = json.loads(tc["function"]["arguments"])
-                except json.JSONDecodeError:
-                    func_args = {}
-
-                # Executa a tool
-                result = await execute_tool(
-                    tool_name=func_name,
-                    arguments=func_args,
-                    db=db,
-                    tenant_id=tenant.id,
-                    lead_id=lead.id,
-                )
+                # Processa cada tool_call
+                logger.info(f"🔧 Iteração {iteration + 1}: {len(tool_calls)} tool(s) solicitada(s)")
 
-                # Formata resultado para contexto da IA
-                result_text = format_tool_result_for_ai(func_name, result)
-
-                # Adiciona ao histórico de mensagens para próxima iteração
-                # 1. Adiciona a resposta da IA com tool_calls
-                messages.append({
-                    "role": "assistant",
-                    "content": None,
-                    "tool_calls": [tc],
-                })
-
-                # 2. Adiciona resultado da tool
-                messages.append({
-                    "role": "tool",
-                    "tool_call_id": tc["id"],
-                    "content": result_text,
-                })
-
-            # Se chegou na última iteração sem resposta, força uma resposta
-            if iteration == MAX_TOOL_ITERATIONS:
-                logger.warning(f"⚠️ Máximo de iterações de tools atingido ({MAX_TOOL_ITERATIONS})")
-                final_response = ai_response.get("content") or "Desculpe, não consegui processar sua solicitação. Pode tentar de novo?"
-                break
+                for tc in tool_calls:
+                    func_name = tc["function"]["name"]
+                    try:
+                        func_args = json.loads(tc["function"]["arguments"])
+                    except json.JSONDecodeError:
+                        func_args = {}
+
+                    # Executa a tool (sessão curta: não reabre a transação principal)
+                    async with async_session() as tool_db:
+                        result = await execute_tool(
+                            tool_name=func_name,
+                            arguments=func_args,
+                            db=tool_db,
+                            tenant_id=tenant.id,
+                            lead_id=lead_id,
+                        )
+                        await tool_db.commit()
+
+                    # Formata resultado para contexto da IA
+                    result_text = format_tool_result_for_ai(func_name, result)
+
+                    # Adiciona ao histórico de mensagens para próxima iteração
+                    # 1. Adiciona a resposta da IA com tool_calls
+                    messages.append({
+                        "role": "assistant",
+                        "content": None,
+                        "tool_calls": [tc],
+                    })
+
+                    # 2. Adiciona resultado da tool
+                    messages.append({
+                        "role": "tool",
+                        "tool_call_id": tc["id"],
+                        "content": result_text,
+                    })
+
+                # Se chegou na última iteração sem resposta, força uma resposta
+                if iteration == MAX_TOOL_ITERATIONS:
+                    logger.warning(f"⚠️ Máximo de iterações de tools atingido ({MAX_TOOL_ITERATIONS})")
+                    final_response = ai_response.get("content") or "Desculpe, não consegui processar sua solicitação. Pode tentar de novo?"
+                    break
 
     except Exception as e:
         logger.error(f"❌ Erro chamando IA (após {settings.openai_max_retries + 1} tentativas): {e}")
@@ -1472,6 +1662,25 @@ async def process_message(
         else:
             final_response = "Olá! Como posso ajudar?"
 
+    # =========================================================================
+    # FASE 3: PERSISTÊNCIA (TRANSAÇÃO CURTA, LEAD TRAVADO)
+    # =========================================================================
+    lead, lead_changed = await reload_lead_for_update(db, lead_id, lead_version)
+    if lead_changed:
+        logger.warning(f"⚠️ Lead {lead_id} alterado durante a geração da resposta, revalidando")
+        blocked_reason = lead_ai_blocked_reason(lead)
+        if blocked_reason:
+            await db.commit()
+            logger.warning(f"⚠️ Resposta da IA descartada para lead {lead_id}: {blocked_reason}")
+            return {
+                "success": True,
+                "reply": None,
+                "lead_id": lead_id,
+                "is_new_lead": is_new,
+                "status": blocked_reason,
+                "message": "Lead alterado durante a geração da resposta",
+            }
+
     # =========================================================================
     # 21. VERIFICA HANDOFF SUGERIDO PELA IA
     # =========================================================================
@@ -1489,13 +1698,6 @@ async def process_message(
     )
     db.add(assistant_message)
     
-    # ✨ NOVO: Atualiza resumo automático (em background, não bloqueia)
-    try:
-        from src.infrastructure.services.conversation_summary_service import update_lead_summary
-        await update_lead_summary(db, lead)
-    except Exception as e:
-        logger.warning(f"⚠️ Erro ao atualizar resumo (não crítico): {e}")
-    
     await log_ai_action(
         db=db, tenant_id=tenant.id, lead_id=lead.id,
         action_type="response",
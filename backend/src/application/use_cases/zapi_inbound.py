@@ -0,0 +1,384 @@
+"""
+CASO DE USO: MENSAGENS Z-API VIA FILA DE ENTRADA
+================================================
+
+O webhook só valida, deduplica e enfileira. Os workers da fila executam:
+
+1. zapi.message → extrai texto (transcrição / visão), processa com a IA
+   dentro da fila da conversa e agenda a resposta após o "digitando"
+2. zapi.reply   → envia a resposta (texto ou áudio Voice-First) e o GPS
+
+Mensagens seguidas da mesma conversa são agrupadas (janela de
+inbound_coalesce_window_seconds): o webhook só adiciona ao buffer e um
+único zapi.message por janela processa o grupo como um turno da IA,
+gravando cada mensagem separadamente.
+
+A sessão do banco fica aberta só durante o process_message; transcrição,
+TTS, o atraso de digitação e o envio não seguram conexão do pool.
+"""
+
+import asyncio
+import base64
+import logging
+from typing import Any, Dict, List, Optional
+
+from src.config import get_settings
+from src.domain.entities import Tenant, Channel
+from src.infrastructure.database import async_session
+from src.infrastructure.queue import InboundWorkerPool, QueueMessage, get_inbound_queue
+from src.infrastructure.services import (
+    transcribe_audio_url,
+    analyze_property_image,
+)
+from src.infrastructure.services.zapi_service import get_zapi_client
+from src.infrastructure.services.tts_service import get_tts_service
+from src.infrastructure.services.webhook_idempotency_service import conversation_lock
+from src.infrastructure.services.message_coalescing_service import (
+    buffer_inbound,
+    flush_delay,
+    peek_buffer,
+    trim_buffer,
+)
+
+from .process_message import process_message
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+ZAPI_MESSAGE_JOB = "zapi.message"
+ZAPI_REPLY_JOB = "zapi.reply"
+
+# Acima do teto da IA (ai_turn_timeout_seconds, que já cai no fallback) +
+# etapas de contexto e gravação: o timeout do job nunca corta a resposta
+PROCESS_OVERHEAD_SECONDS = 30.0
+PROCESS_TIMEOUT_SECONDS = settings.ai_turn_timeout_seconds + PROCESS_OVERHEAD_SECONDS
+MAX_TYPING_DELAY_SECONDS = 5
+
+WHISPER_PROMPT = "Industrial, São Luís, Mathias Velho, Harmonia, Mato Grande, Fátima, Rio Branco, Ilha das Garças, Centro, Marechal Rondon, Nossa Senhora das Graças, Niterói, Brigadeira, São José, Igara, Guajuviras, Estância Velha, Olaria, Canoas, Rio Grande do Sul, imobiliária, corretor, apartamento, casa, FGTS, financiamento."
+
+GOOGLE_VOICES = ["camila", "vitoria", "ricardo", "ana", "carlos"]
+
+
+def conversation_key(tenant_id: int, phone: str) -> str:
+    return f"zapi:{tenant_id}:{phone}"
+
+
+# ============================================
+# CONTEÚDO DA MENSAGEM
+# ============================================
+
+def raw_content_signature(payload: Dict[str, Any]) -> Optional[str]:
+    """
+    Identifica o conteúdo da mensagem sem processá-lo (sem Whisper/visão).
+
+    Usado no webhook para descartar payloads sem conteúdo suportado e
+    como base da deduplicação quando não há messageId.
+    """
+    if payload.get("text"):
+        return payload["text"].get("message")
+    if payload.get("image"):
+        return payload["image"].get("imageUrl") or payload["image"].get("caption") or "[Imagem recebida]"
+    if payload.get("audio"):
+        return payload["audio"].get("audioUrl") or "[Áudio recebido]"
+    for media in ("document", "video"):
+        if payload.get(media):
+            return payload[media].get("caption") or f"[{media}]"
+    for kind in ("sticker", "location", "contact"):
+        if payload.get(kind):
+            return f"[{kind}]"
+    if payload.get("buttonsResponseMessage"):
+        return payload["buttonsResponseMessage"].get("selectedButtonId") or "[Botao clicado]"
+    if payload.get("listResponseMessage"):
+        return payload["listResponseMessage"].get("title") or "[Opcao selecionada]"
+    return None
+
+
+async def extract_message_text(payload: Dict[str, Any], company_name: Optional[str] = None) -> Optional[str]:
+    """Extrai o texto da mensagem (pode vir em diferentes formatos)."""
+    if payload.get("text"):
+        return payload["text"].get("message")
+
+    if payload.get("image"):
+        image_url = payload["image"].get("imageUrl")
+        caption = payload["image"].get("caption") or ""
+
+        if image_url:
+            logger.info("📸 Imagem detectada! Analisando com GPT-4o Vision...")
+            analysis = await analyze_property_image(image_url)
+            return f"[Imagem: {analysis}] {caption}".strip()
+        return caption or "[Imagem recebida]"
+
+    if payload.get("audio"):
+        audio_url = payload["audio"].get("audioUrl")
+        if not audio_url:
+            return "[Áudio recebido]"
+
+        logger.info("🎙️ Áudio detectado! Iniciando transcrição Whisper...")
+
+        # Build context-aware prompt for Whisper
+        whisper_prompt = WHISPER_PROMPT
+        if company_name:
+            whisper_prompt = f"{company_name}, {whisper_prompt}"
+
+        transcription = await transcribe_audio_url(audio_url, prompt=whisper_prompt)
+        if transcription:
+            logger.info(f"✅ Áudio transcrito: {transcription[:50]}...")
+            return transcription
+        return "[Áudio recebido (falha na transcrição)]"
+
+    if payload.get("document"):
+        return payload["document"].get("caption") or "[Documento recebido]"
+    if payload.get("video"):
+        return payload["video"].get("caption") or "[Video recebido]"
+    if payload.get("sticker"):
+        return "[Sticker recebido]"
+    if payload.get("location"):
+        return "[Localizacao recebida]"
+    if payload.get("contact"):
+        return "[Contato recebido]"
+    if payload.get("buttonsResponseMessage"):
+        return payload["buttonsResponseMessage"].get("selectedButtonId") or "[Botao clicado]"
+    if payload.get("listResponseMessage"):
+        return payload["listResponseMessage"].get("title") or "[Opcao selecionada]"
+    return None
+
+
+# ============================================
+# ENFILEIRAMENTO (WEBHOOK)
+# ============================================
+
+async def enqueue_zapi_message(tenant: Tenant, channel: Channel, payload: Dict[str, Any]) -> Optional[str]:
+    """
+    Enfileira a mensagem recebida. Devolve o job_id, ou None quando a
+    mensagem entrou num grupo que já tem processamento agendado.
+    """
+    phone = payload["phone"]
+    key = conversation_key(tenant.id, phone)
+    job = {
+        "tenant_id": tenant.id,
+        "tenant_slug": tenant.slug,
+        "channel_id": channel.id,
+        "company_name": (tenant.settings or {}).get("company_name"),
+    }
+
+    window = settings.inbound_coalesce_window_seconds
+    if window <= 0:
+        return await get_inbound_queue().enqueue(
+            ZAPI_MESSAGE_JOB, {**job, "payload": payload}, conversation_key=key,
+        )
+
+    if not await buffer_inbound(key, payload):
+        logger.info(f"🧩 Mensagem de {phone} agrupada com as anteriores")
+        return None
+
+    try:
+        return await _schedule_flush({**job, "phone": phone, "coalesced": True}, window)
+    except Exception:
+        # Sem flush agendado o buffer ficaria parado: desfaz para o retry do provedor
+        await trim_buffer(key, 1)
+        raise
+
+
+async def _schedule_flush(data: Dict[str, Any], delay_seconds: float) -> str:
+    return await get_inbound_queue().enqueue(
+        ZAPI_MESSAGE_JOB,
+        data,
+        conversation_key=conversation_key(data["tenant_id"], data["phone"]),
+        delay_seconds=delay_seconds,
+    )
+
+
+# ============================================
+# JOB 1: PROCESSAMENTO
+# ============================================
+
+async def handle_zapi_message(job: QueueMessage):
+    """Processa a mensagem (ou o grupo de mensagens) e agenda a resposta."""
+    data = job.payload
+    if not data.get("coalesced"):
+        await _process_turn(data, [data["payload"]])
+        return
+
+    key = conversation_key(data["tenant_id"], data["phone"])
+    wait = await flush_delay(
+        key,
+        settings.inbound_coalesce_window_seconds,
+        settings.inbound_coalesce_max_wait_seconds,
+    )
+    if wait > 0:
+        # Chegou mensagem nova dentro da janela: adia o flush
+        await _schedule_flush(data, wait)
+        return
+
+    # Só remove do buffer depois de processar: falha → retry relê o grupo
+    payloads = await peek_buffer(key)
+    if payloads:
+        await _process_turn(data, payloads)
+
+    remaining = await trim_buffer(key, len(payloads))
+    if remaining:
+        await _schedule_flush(data, settings.inbound_coalesce_window_seconds)
+
+
+async def _process_turn(data: Dict[str, Any], payloads: List[Dict[str, Any]]):
+    """Processa as mensagens como um único turno da IA e agenda a resposta."""
+    last_payload = payloads[-1]
+    phone = last_payload["phone"]
+
+    texts = await asyncio.gather(*(
+        extract_message_text(payload, data.get("company_name")) for payload in payloads
+    ))
+    fragments = [
+        {"content": text, "external_id": payload.get("messageId")}
+        for payload, text in zip(payloads, texts)
+        if text
+    ]
+    if not fragments:
+        logger.warning(f"Payload sem conteúdo: phone={phone}")
+        return
+
+    if len(fragments) > 1:
+        logger.info(f"🧩 {len(fragments)} mensagens de {phone} agrupadas num turno")
+
+    key = conversation_key(data["tenant_id"], phone)
+    async with conversation_lock(key):
+        logger.info(f"🔒 Lock adquirido para {phone}")
+        try:
+            async with async_session() as db:
+                result = await asyncio.wait_for(
+                    process_message(
+                        db=db,
+                        tenant_slug=data["tenant_slug"],
+                        channel_type="whatsapp",
+                        external_id=phone,
+                        content="\n".join(fragment["content"] for fragment in fragments),
+                        sender_name=last_payload.get("pushName") or last_payload.get("senderName"),
+                        sender_phone=phone,
+                        external_message_id=fragments[-1]["external_id"],
+                        coalesced_messages=fragments if len(fragments) > 1 else None,
+                    ),
+                    timeout=PROCESS_TIMEOUT_SECONDS,
+                )
+                await db.commit()
+        finally:
+            logger.info(f"🔓 Lock liberado para {phone}")
+
+    logger.info(f"✅ Processamento concluído para {phone} (lead {result.get('lead_id')})")
+
+    if not result.get("reply"):
+        return
+
+    # Resposta sai após o "digitando", sem ocupar worker durante a espera
+    typing_delay = min(result.get("typing_delay", 2) or 0, MAX_TYPING_DELAY_SECONDS)
+    await get_inbound_queue().enqueue(
+        ZAPI_REPLY_JOB,
+        {
+            "tenant_id": data["tenant_id"],
+            "channel_id": data["channel_id"],
+            "phone": phone,
+            "reply": result["reply"],
+            "location": result.get("location"),
+            "is_audio_message": last_payload.get("audio") is not None,
+        },
+        conversation_key=key,
+        delay_seconds=max(typing_delay, 0),
+    )
+
+
+# ============================================
+# JOB 2: ENVIO (COM VOICE-FIRST)
+# ============================================
+
+async def _send_audio_reply(zapi, phone: str, reply_text: str, voice_settings: dict) -> Optional[dict]:
+    """Gera áudio com TTS e envia. Devolve None quando o TTS não gerou áudio."""
+    voice = voice_settings.get("voice", "camila")  # Padrão: voz brasileira
+    speed = voice_settings.get("speed", 0.95)
+
+    # Detecta qual provedor usar baseado na voz
+    provider = "google" if voice in GOOGLE_VOICES else "openai"
+    logger.info(f"🎤 Iniciando TTS ({provider}): voz={voice}, speed={speed}, chars={len(reply_text)}")
+
+    if provider == "google":
+        from src.infrastructure.services.google_tts_service import get_google_tts_service
+        tts = get_google_tts_service()
+        audio_bytes = await tts.generate_audio_bytes(text=reply_text, voice=voice, speed=speed)
+    else:
+        tts = get_tts_service()
+        audio_bytes = await tts.generate_audio_bytes(
+            text=reply_text, voice=voice, speed=speed, output_format="mp3"
+        )
+
+    logger.info(f"✅ TTS retornou {len(audio_bytes) if audio_bytes else 0} bytes")
+    if not audio_bytes:
+        return None
+
+    audio_b64 = base64.b64encode(audio_bytes).decode("utf-8")
+    return await zapi.send_audio_base64(phone=phone, audio_base64=audio_b64, mime_type="audio/mpeg")
+
+
+async def handle_zapi_reply(job: QueueMessage):
+    """Envia a resposta da IA (áudio quando configurado, senão texto)."""
+    data = job.payload
+    phone = data["phone"]
+    reply_text = data["reply"]
+
+    async with async_session() as db:
+        tenant = await db.get(Tenant, data["tenant_id"])
+        channel = await db.get(Channel, data["channel_id"])
+
+    channel_config = (channel.config if channel else None) or {}
+    zapi = get_zapi_client(
+        instance_id=channel_config.get("instance_id") or channel_config.get("zapi_instance_id"),
+        token=channel_config.get("token") or channel_config.get("zapi_token"),
+    )
+
+    voice_settings = ((tenant.settings if tenant else None) or {}).get("voice_response", {})
+    should_send_audio = False
+    if voice_settings.get("enabled", False):
+        if voice_settings.get("always_audio", False) or data.get("is_audio_message"):
+            # Só envia áudio se a resposta não for muito longa
+            if len(reply_text) <= voice_settings.get("max_chars_for_audio", 500):
+                should_send_audio = True
+                logger.info("🎙️ Voice-First ATIVADO: Respondendo com áudio")
+            else:
+                logger.info(f"🎙️ Resposta muito longa ({len(reply_text)} chars), enviando texto")
+
+    send_result = None
+    if should_send_audio:
+        try:
+            send_result = await _send_audio_reply(zapi, phone, reply_text, voice_settings)
+            if send_result is not None and not send_result.get("success"):
+                logger.warning(f"⚠️ Falha no áudio, enviando texto: {send_result.get('error')}")
+                send_result = None
+        except Exception as e:
+            logger.error(f"❌ Erro no TTS: {e}, enviando texto")
+
+    if send_result is None:
+        send_result = await zapi.send_text(phone=phone, message=reply_text, delay_message=2)
+
+    if not send_result.get("success"):
+        # Retry pela fila (backoff + dead-letter)
+        raise RuntimeError(f"Erro enviando resposta: {send_result.get('error')}")
+
+    logger.info(f"✅ Resposta enviada para {phone}")
+
+    # 🚀 Se houver localização, envia o GPS
+    # Texto já foi entregue: falha aqui não pode voltar para a fila (reenviaria a resposta)
+    location = data.get("location")
+    if location:
+        logger.info(f"📍 Disparando GPS para {phone}...")
+        try:
+            await zapi.send_location(
+                phone=phone,
+                latitude=location["latitude"],
+                longitude=location["longitude"],
+                title=location["title"],
+                address=location["address"]
+            )
+        except Exception as e:
+            logger.error(f"❌ Erro enviando localização para {phone}: {e}")
+
+
+def register_zapi_handlers(queue: InboundWorkerPool):
+    queue.register_handler(ZAPI_MESSAGE_JOB, handle_zapi_message)
+    queue.register_handler(ZAPI_REPLY_JOB, handle_zapi_reply)
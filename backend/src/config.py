@@ -86,7 +86,82 @@ class Settings(BaseSettings):
     max_conversation_history: int = 30
     openai_timeout_seconds: int = 30
     openai_max_retries: int = 2
+    ai_turn_timeout_seconds: int = 60  # Geração da resposta inteira (tentativas + tools); estourou → fallback
+
+    # ===========================================
+    # HISTÓRICO DA CONVERSA (orçamento de tokens)
+    # ===========================================
+    history_token_budget: int = 3000  # Padrão; tenant sobrescreve em ai_behavior.history_token_budget
+    history_summary_batch_messages: int = 10  # Mensagens fora da janela que disparam atualização do resumo
+    history_summary_max_input_tokens: int = 6000  # Mensagens novas enviadas por atualização do resumo
+    message_window_size: int = 50  # Mensagens recentes por lead em cache (≥ histórico + lote do resumo)
+    message_window_ttl_seconds: int = 21600  # Janela expira após 6h sem mensagens novas
+
+    # ===========================================
+    # EMBEDDINGS (Cache por hash de conteúdo)
+    # ===========================================
+    embedding_cache_max_entries: int = 2048  # LRU em memória (~12 KB por vetor de 1536 dims)
+    embedding_cache_ttl_seconds: int = 86400  # 24h (memória e Redis)
+    embedding_batch_size: int = 100  # Textos por requisição na indexação em massa
+    embedding_batch_concurrency: int = 4  # Requisições de lote simultâneas
     
+    # ===========================================
+    # HTTP (clientes compartilhados para upstreams)
+    # ===========================================
+    http_client_max_connections: int = 100
+    http_client_max_keepalive_connections: int = 20
+    http_client_keepalive_expiry_seconds: float = 30.0
+    http_client_timeout_seconds: float = 30.0  # Padrão; chamadas podem sobrescrever
+    http_client_connect_timeout_seconds: float = 5.0
+    http_client_http2: bool = True  # Requer pacote h2 (ignorado se ausente)
+
+    # ===========================================
+    # JOBS MULTI-TENANT (Follow-up, Phoenix)
+    # ===========================================
+    job_tenant_concurrency: int = 8  # Tenants processados em paralelo
+    job_leads_per_tenant_concurrency: int = 4  # Leads simultâneos por tenant
+    job_llm_concurrency: int = 10  # Chamadas de LLM simultâneas (todos os jobs)
+    job_whatsapp_concurrency: int = 10  # Envios de WhatsApp simultâneos (todos os jobs)
+
+    # ===========================================
+    # MÉTRICAS (Rollups do dashboard)
+    # ===========================================
+    metrics_background_refresh_seconds: int = 600  # Idade máxima de tópicos/tempo de qualificação
+    metrics_reconcile_days: int = 62  # Dias do rollup diário recalculados na reconciliação noturna
+    lead_reconcile_batch_size: int = 5000  # Leads por faixa na reconciliação dos contadores de mensagens
+
+    # ===========================================
+    # BUSCA (tsvector / pg_trgm)
+    # ===========================================
+    search_backfill_batch_size: int = 2000  # Mensagens indexadas por lote (um commit por lote)
+    search_backfill_max_batches: int = 250  # Limite de lotes por execução do job
+
+    # ===========================================
+    # EXPORTAÇÃO (CSV / Excel)
+    # ===========================================
+    export_batch_size: int = 1000  # Leads lidos por lote do cursor no servidor
+    export_jobs_path: str = "/app/storage/exports"  # Arquivos das exportações em background (local da réplica)
+    export_job_ttl_hours: int = 24  # Validade do link de download
+
+    # ===========================================
+    # WEBHOOKS (Idempotência e ordem por conversa)
+    # ===========================================
+    webhook_idempotency_ttl_seconds: int = 3600  # Janela de deduplicação por messageId
+    webhook_fallback_dedup_ttl_seconds: int = 120  # Janela para mensagens sem messageId (hash do conteúdo)
+    conversation_lock_lease_seconds: int = 30  # Lease renovado enquanto a conversa é processada
+    conversation_lock_wait_seconds: int = 60  # Espera máxima pela vez na fila da conversa
+
+    # ===========================================
+    # FILA DE ENTRADA (Webhook → workers)
+    # ===========================================
+    inbound_queue_workers: int = 8  # Jobs simultâneos por processo
+    inbound_queue_max_attempts: int = 5  # Depois disso o job vai para a dead-letter queue
+    inbound_queue_retry_base_seconds: float = 2.0  # Backoff exponencial: 2s, 4s, 8s...
+    inbound_queue_visibility_timeout_seconds: int = 120  # Job sem ack há mais que isso é reclamado por outro worker
+    inbound_queue_stream_maxlen: int = 100_000  # Tamanho máximo (aproximado) do stream no Redis
+    inbound_coalesce_window_seconds: float = 3.0  # Silêncio que fecha o agrupamento de mensagens seguidas (0 = desliga)
+    inbound_coalesce_max_wait_seconds: float = 10.0  # Espera máxima desde a primeira mensagem do grupo
+
     # ===========================================
     # EMAIL (Resend)
     # ===========================================
@@ -42,6 +42,8 @@ from .knowledge_embedding import KnowledgeEmbedding
 from .dashboard_config import DashboardConfig, SalesGoal, WIDGET_TYPES, DEFAULT_DASHBOARD_WIDGETS
 from .opportunity import Opportunity
 from .appointment import Appointment, AppointmentType, AppointmentStatus, AppointmentOutcome
+from .tenant_route import TenantRoute
+from .tenant_daily_stats import TenantDailyStats, TenantLeadCounter
 
 __all__ = [
     # Base
@@ -104,4 +106,9 @@ __all__ = [
     "AppointmentType",
     "AppointmentStatus",
     "AppointmentOutcome",
+    # Roteamento de webhooks
+    "TenantRoute",
+    # Rollups
+    "TenantDailyStats",
+    "TenantLeadCounter",
 ]
\ No newline at end of file
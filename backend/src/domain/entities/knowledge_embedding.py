@@ -12,7 +12,7 @@ Exemplo de uso:
 - IA responde usando o conhecimento encontrado
 """
 
-from sqlalchemy import Integer, String, ForeignKey, DateTime, func, ARRAY, Float, Boolean, Text
+from sqlalchemy import Integer, String, ForeignKey, DateTime, func, ARRAY, Float, Boolean, Text, Index
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.mutable import MutableDict
@@ -38,6 +38,10 @@ class KnowledgeEmbedding(Base, TimestampMixin):
     """
 
     __tablename__ = "knowledge_embeddings"
+    __table_args__ = (
+        # Uma linha por fonte: permite upsert em lote (INSERT ... ON CONFLICT)
+        Index("uq_knowledge_embeddings_source", "tenant_id", "source_type", "source_id", unique=True),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     tenant_id: Mapped[int] = mapped_column(
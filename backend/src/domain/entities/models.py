@@ -7,11 +7,11 @@ Todas as tabelas do sistema Velaris.
 CORREÇÃO: Campo settings agora usa MutableDict para
           SQLAlchemy detectar mudanças internas no JSON.
 """
-from sqlalchemy import func
+from sqlalchemy import func, text
 from datetime import datetime
 from typing import List, Optional, Dict, Any, TYPE_CHECKING
 from sqlalchemy import String, Boolean, ForeignKey, Text, Integer, DateTime, Table, Column, Index
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.ext.mutable import MutableDict  # ← ADICIONADO!
 from .product import Product  
@@ -196,6 +196,7 @@ class Lead(Base, TimestampMixin):
     # ==========================================
     summary: Mapped[Optional[str]] = mapped_column(Text)
     conversation_summary: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    summary_message_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)  # Última mensagem incorporada ao conversation_summary
     propensity_score: Mapped[int] = mapped_column(Integer, default=0)
     
     # ✨ VELARIS INTELLIGENCE SUITE (High-Value Fields)
@@ -264,6 +265,20 @@ class Lead(Base, TimestampMixin):
     total_lead_messages: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
     conversation_started_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
 
+    # ==========================================
+    # CONTADORES DE MENSAGENS (mantidos no flush por inbox_state_service)
+    # ==========================================
+    message_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    user_message_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)  # Mensagens do lead (role "user")
+
+    # ==========================================
+    # INBOX DO CORRETOR (mantido no flush por inbox_state_service)
+    # ==========================================
+    inbox_unread_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)  # Mensagens do lead desde o take-over
+    inbox_last_message_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)  # Última mensagem da conversa
+    inbox_last_message_preview: Mapped[Optional[str]] = mapped_column(String(60), nullable=True)
+    inbox_last_message_role: Mapped[Optional[str]] = mapped_column(String(20), nullable=True)
+
     # ==========================================
     # RELACIONAMENTOS
     # ==========================================
@@ -287,6 +302,12 @@ class Lead(Base, TimestampMixin):
         Index("ix_leads_tenant_created", "tenant_id", "created_at"),
         Index("ix_leads_tenant_status", "tenant_id", "status"),
         Index("ix_leads_tenant_qual", "tenant_id", "qualification"),
+        Index(
+            "ix_leads_seller_inbox",
+            "assigned_seller_id",
+            text("inbox_last_message_at DESC NULLS LAST"),
+            text("id DESC"),
+        ),
     )
 
 
@@ -346,6 +367,9 @@ class Message(Base, TimestampMixin):
         nullable=True
     )
 
+    # 🔎 BUSCA: tsvector (portuguese + unaccent), preenchido no flush por search_service
+    search_vector: Mapped[Optional[str]] = mapped_column(TSVECTOR, nullable=True, deferred=True)
+
     lead: Mapped["Lead"] = relationship(back_populates="messages")
     sender_user: Mapped[Optional["User"]] = relationship(foreign_keys=[sender_user_id])
 
@@ -357,6 +381,7 @@ class Message(Base, TimestampMixin):
         Index("ix_messages_lead_external", "lead_id", "external_id", unique=True),
         Index("ix_messages_status", "status"),
         Index("ix_messages_whatsapp_id", "whatsapp_message_id"),
+        Index("ix_messages_search_vector", "search_vector", postgresql_using="gin"),
     )
 
 
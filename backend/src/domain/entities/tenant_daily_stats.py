@@ -0,0 +1,90 @@
+"""
+TENANT DAILY STATS - Rollups de métricas por tenant
+====================================================
+
+TenantDailyStats: um registro por tenant por dia (UTC) com contadores
+de leads e mensagens daquele dia.
+
+TenantLeadCounter: distribuição ATUAL dos leads do tenant por dimensão
+(status, qualificação, canal, origem, quentes aguardando).
+
+Os dashboards (CEO e /dashboard/metrics) liam as tabelas leads/messages
+com dezenas de COUNT/MAX por requisição. Agora leem estes rollups com
+uma ou duas consultas indexadas por tenant.
+
+As linhas são atualizadas no mesmo flush que grava o Lead ou a
+Message (ver tenant_stats_service) e reconciliadas por um job noturno.
+Exclusões de leads/mensagens não são descontadas do rollup diário.
+"""
+
+from datetime import date, datetime
+from typing import Optional
+
+from sqlalchemy import BigInteger, Date, DateTime, ForeignKey, Index, Integer, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base, TimestampMixin
+
+
+class TenantDailyStats(Base, TimestampMixin):
+    """Contadores diários de um tenant."""
+
+    __tablename__ = "tenant_daily_stats"
+
+    __table_args__ = (
+        UniqueConstraint("tenant_id", "day", name="uq_tenant_daily_stats_day"),
+        Index("ix_tenant_daily_stats_day", "day"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    tenant_id: Mapped[int] = mapped_column(ForeignKey("tenants.id", ondelete="CASCADE"), nullable=False)
+    day: Mapped[date] = mapped_column(Date, nullable=False)
+
+    # Leads (pelo dia de criação do lead)
+    leads_created: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    leads_after_hours: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    leads_hot: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)  # Atualmente quentes
+    leads_handed_off: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)  # Atualmente transferidos
+    leads_engaged: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)  # 2+ mensagens do lead
+
+    # Tempo de resposta da IA (respostas a leads criados no dia)
+    response_time_seconds: Mapped[int] = mapped_column(BigInteger, default=0, server_default="0", nullable=False)
+    response_time_samples: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+
+    # Mensagens (pelo dia da mensagem)
+    messages_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    user_messages: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    assistant_messages: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    tokens_used: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    last_message_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self) -> str:
+        return f"<TenantDailyStats(tenant {self.tenant_id} @ {self.day}: {self.leads_created} leads, {self.messages_count} msgs)>"
+
+
+# Dimensões de TenantLeadCounter
+COUNTER_STATUS = "status"
+COUNTER_QUALIFICATION = "qualification"
+COUNTER_CHANNEL = "channel"
+COUNTER_SOURCE = "source"
+COUNTER_HOT_WAITING = "hot_waiting"  # valor "1": quente, não transferido e sem vendedor
+
+
+class TenantLeadCounter(Base):
+    """Quantidade atual de leads de um tenant com (dimensão = valor)."""
+
+    __tablename__ = "tenant_lead_counters"
+
+    __table_args__ = (
+        UniqueConstraint("tenant_id", "dimension", "value", name="uq_tenant_lead_counters_key"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    tenant_id: Mapped[int] = mapped_column(ForeignKey("tenants.id", ondelete="CASCADE"), nullable=False)
+    dimension: Mapped[str] = mapped_column(String(20), nullable=False)
+    value: Mapped[str] = mapped_column(String(50), nullable=False)  # "" quando o campo é nulo
+    count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self) -> str:
+        return f"<TenantLeadCounter(tenant {self.tenant_id} {self.dimension}={self.value!r}: {self.count})>"
@@ -0,0 +1,47 @@
+"""
+TENANT ROUTES - Roteamento de webhooks para o tenant correto
+=============================================================
+
+Tabela de lookup indexada que mapeia identificadores externos
+(número do WhatsApp Business, app do Gupshup, instância Z-API)
+para o tenant dono daquele canal.
+
+Antes, cada webhook carregava TODOS os tenants ativos e comparava
+o JSON de settings em Python. Agora a resolução é um único SELECT
+pela chave única (route_type, route_key).
+
+As linhas são mantidas por tenant_routing_service.sync_tenant_routes()
+sempre que settings ou canais do tenant são alterados.
+"""
+
+from sqlalchemy import String, ForeignKey, Index
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base, TimestampMixin
+
+
+# Tipos de rota suportados
+ROUTE_PHONE = "phone"                  # Número do WhatsApp Business (normalizado)
+ROUTE_GUPSHUP_APP = "gupshup_app"      # settings.gupshup_app_name
+ROUTE_ZAPI_INSTANCE = "zapi_instance"  # instanceId da Z-API
+
+
+class TenantRoute(Base, TimestampMixin):
+    """Chave externa de roteamento → tenant."""
+
+    __tablename__ = "tenant_routes"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    tenant_id: Mapped[int] = mapped_column(
+        ForeignKey("tenants.id", ondelete="CASCADE"),
+        index=True,
+    )
+    route_type: Mapped[str] = mapped_column(String(30), nullable=False)
+    route_key: Mapped[str] = mapped_column(String(150), nullable=False)
+
+    __table_args__ = (
+        Index("ix_tenant_routes_type_key", "route_type", "route_key", unique=True),
+    )
+
+    def __repr__(self) -> str:
+        return f"<TenantRoute({self.route_type}={self.route_key} → tenant {self.tenant_id})>"
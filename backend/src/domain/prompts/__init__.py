@@ -91,14 +91,16 @@ def build_system_prompt(
         ]
 
     # 2. REGRAS DE NEGÓCIO (CUSTOMIZADAS)
-    business_rules = custom_rules or []
+    # Listas novas: as de entrada vêm do AIContext (cacheado por tenant) e
+    # costumam ser o próprio identity["business_rules"]; não podem crescer
+    business_rules = list(custom_rules or [])
     if identity and identity.get("business_rules"):
-        business_rules.extend(identity.get("business_rules"))
+        business_rules.extend(r for r in identity.get("business_rules") if r not in business_rules)
     
     # 3. PERGUNTAS DE QUALIFICAÇÃO
-    questions_to_ask = custom_questions or []
+    questions_to_ask = list(custom_questions or [])
     if identity and identity.get("required_questions"):
-        questions_to_ask.extend(identity.get("required_questions"))
+        questions_to_ask.extend(q for q in identity.get("required_questions") if q not in questions_to_ask)
 
     # --- NOVO: Se houver um template de nicho, use-o como base! ---
     if niche_template:
@@ -16,6 +16,8 @@ import logging
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timezone
 
+from src.domain.services.text_patterns import PatternRule, PatternSet, keyword_rules
+
 logger = logging.getLogger(__name__)
 
 
@@ -53,6 +55,57 @@ class LeadProfileExtractor:
         "kitnet": ["kitnet", "studio", "jk"],
     }
 
+    # Características desejadas
+    CARACTERISTICAS = {
+        "churrasqueira": ["churrasqueira", "churras", "area gourmet", "área gourmet"],
+        "piscina": ["piscina"],
+        "quintal": ["quintal", "jardim", "pátio", "patio"],
+        "sacada": ["sacada", "varanda", "terraço", "terraco"],
+        "suite": ["suite", "suíte"],
+        "closet": ["closet"],
+        "lareira": ["lareira"],
+        "ar_condicionado": ["ar condicionado", "ar-condicionado", "split"],
+        "mobiliado": ["mobiliado", "com móveis", "com moveis"],
+        "novo": ["novo", "na planta", "nunca habitado"],
+        "reformado": ["reformado", "recém reformado", "recem reformado"],
+        "seguranca": ["segurança", "seguranca", "portaria", "condomínio fechado"],
+        "elevador": ["elevador"],
+        "playground": ["playground", "área kids", "area kids"],
+        "academia": ["academia", "fitness"],
+        "pet_friendly": ["aceita pet", "pet friendly", "aceita animais"],
+    }
+
+    # Motivo da mudança (keywords são regex)
+    MOTIVOS_MUDANCA = {
+        "casamento": ["casar", "casamento", "vou casar", "noivo", "noiva"],
+        "familia_crescendo": ["filho", "filha", "beb[eê]", "grav[ií]da", "grávida", "esperando"],
+        "trabalho": ["trabalho", "emprego", "transferido", "mudar de cidade"],
+        "investimento": ["investir", "investimento", "renda", "alugar"],
+        "upgrade": ["maior", "melhor", "trocar", "upgrade"],
+        "downsizing": ["menor", "reduzir", "aposentado", "aposentadoria"],
+        "primeiro_imovel": ["primeiro", "nunca tive", "sair do aluguel"],
+    }
+
+    BANCOS = ["caixa", "itau", "itaú", "bradesco", "santander", "bb", "banco do brasil"]
+
+    def __init__(self):
+        # Compilados uma vez; o texto é só minúsculo (listas já trazem as variações com acento)
+        def grouped(groups, literal=True):
+            return PatternSet(
+                [
+                    PatternRule(keyword, label=name, literal=literal)
+                    for name, keywords in groups.items()
+                    for keyword in keywords
+                ],
+                unaccent=False,
+            )
+
+        self._tipos_patterns = grouped(self.TIPOS_IMOVEL)
+        self._caracteristicas_patterns = grouped(self.CARACTERISTICAS)
+        self._motivos_patterns = grouped(self.MOTIVOS_MUDANCA, literal=False)
+        self._bairros_patterns = PatternSet(keyword_rules(self.DEFAULT_BAIRROS), unaccent=False)
+        self._bancos_patterns = PatternSet(keyword_rules(self.BANCOS), unaccent=False)
+
     def extract_from_message(
         self,
         message: str,
@@ -103,12 +156,10 @@ class LeadProfileExtractor:
         """Extrai preferências de imóvel."""
         prefs = profile.get("preferences", {})
 
-        # Tipo de imóvel
-        for tipo_nome, keywords in self.TIPOS_IMOVEL.items():
-            for keyword in keywords:
-                if keyword in msg:
-                    prefs["tipo_imovel"] = tipo_nome
-                    break
+        # Tipo de imóvel (vale o último tipo encontrado, na ordem de TIPOS_IMOVEL)
+        tipos = self._tipos_patterns.scan(msg)
+        if tipos:
+            prefs["tipo_imovel"] = tipos[-1].rule.label
 
         # Quartos
         quartos_patterns = [
@@ -144,9 +195,9 @@ class LeadProfileExtractor:
 
         # Bairros (acumula em lista)
         bairros_interesse = prefs.get("bairros_interesse", [])
-        for bairro in self.DEFAULT_BAIRROS:
-            if bairro in msg and bairro not in bairros_interesse:
-                bairros_interesse.append(bairro)
+        for match in self._bairros_patterns.scan(msg):
+            if match.rule.pattern not in bairros_interesse:
+                bairros_interesse.append(match.rule.pattern)
 
         if bairros_interesse:
             prefs["bairros_interesse"] = bairros_interesse
@@ -154,30 +205,9 @@ class LeadProfileExtractor:
         # Características desejadas
         caracteristicas = prefs.get("caracteristicas", [])
 
-        caracteristicas_map = {
-            "churrasqueira": ["churrasqueira", "churras", "area gourmet", "área gourmet"],
-            "piscina": ["piscina"],
-            "quintal": ["quintal", "jardim", "pátio", "patio"],
-            "sacada": ["sacada", "varanda", "terraço", "terraco"],
-            "suite": ["suite", "suíte"],
-            "closet": ["closet"],
-            "lareira": ["lareira"],
-            "ar_condicionado": ["ar condicionado", "ar-condicionado", "split"],
-            "mobiliado": ["mobiliado", "com móveis", "com moveis"],
-            "novo": ["novo", "na planta", "nunca habitado"],
-            "reformado": ["reformado", "recém reformado", "recem reformado"],
-            "seguranca": ["segurança", "seguranca", "portaria", "condomínio fechado"],
-            "elevador": ["elevador"],
-            "playground": ["playground", "área kids", "area kids"],
-            "academia": ["academia", "fitness"],
-            "pet_friendly": ["aceita pet", "pet friendly", "aceita animais"],
-        }
-
-        for caract, keywords in caracteristicas_map.items():
-            for keyword in keywords:
-                if keyword in msg and caract not in caracteristicas:
-                    caracteristicas.append(caract)
-                    break
+        for match in self._caracteristicas_patterns.scan(msg):
+            if match.rule.label not in caracteristicas:
+                caracteristicas.append(match.rule.label)
 
         if caracteristicas:
             prefs["caracteristicas"] = caracteristicas
@@ -270,21 +300,10 @@ class LeadProfileExtractor:
             timeline["prazo_descricao"] = "Sem pressa"
 
         # Motivo da mudança
-        motivos_map = {
-            "casamento": ["casar", "casamento", "vou casar", "noivo", "noiva"],
-            "familia_crescendo": ["filho", "filha", "beb[eê]", "grav[ií]da", "grávida", "esperando"],
-            "trabalho": ["trabalho", "emprego", "transferido", "mudar de cidade"],
-            "investimento": ["investir", "investimento", "renda", "alugar"],
-            "upgrade": ["maior", "melhor", "trocar", "upgrade"],
-            "downsizing": ["menor", "reduzir", "aposentado", "aposentadoria"],
-            "primeiro_imovel": ["primeiro", "nunca tive", "sair do aluguel"],
-        }
-
-        for motivo, keywords in motivos_map.items():
-            for keyword in keywords:
-                if re.search(keyword, msg):
-                    timeline["motivo_mudanca"] = motivo
-                    break
+        # Vale o último motivo encontrado (na ordem de MOTIVOS_MUDANCA)
+        motivos = self._motivos_patterns.scan(msg)
+        if motivos:
+            timeline["motivo_mudanca"] = motivos[-1].rule.label
 
         profile["timeline_info"] = timeline
 
@@ -362,11 +381,9 @@ class LeadProfileExtractor:
             financial["programa_habitacional"] = True
 
         # Banco de preferência
-        bancos = ["caixa", "itau", "itaú", "bradesco", "santander", "bb", "banco do brasil"]
-        for banco in bancos:
-            if banco in msg:
-                financial["banco_preferencia"] = banco
-                break
+        banco = self._bancos_patterns.first(msg)
+        if banco:
+            financial["banco_preferencia"] = banco.rule.pattern
 
         # Renda
         renda_match = re.search(r'(?:renda|ganho|salário|salario)\s*(?:de)?\s*(?:r\$)?\s*(\d+(?:\.\d+)?)\s*(?:mil|k)?', msg)
@@ -4,11 +4,12 @@ SISTEMA DE QUALIFICAÇÃO INTELIGENTE DE LEADS - VERSÃO ULTRA GENÉRICA
 CORREÇÃO FINAL: Padrões que detectam QUALQUER variação!
 """
 
-import re
 import logging
 from typing import List, Dict
 from datetime import datetime, timedelta
 
+from src.domain.services.text_patterns import PatternRule, PatternSet, normalize_text
+
 logger = logging.getLogger(__name__)
 
 
@@ -134,6 +135,13 @@ class LeadQualifier:
             r"muito\s+caro": -10,
             r"nao.*tenho.*dinheiro": -25,
         }
+
+        # Compilado uma vez: uma varredura avalia os três grupos
+        self.patterns = PatternSet(
+            [PatternRule(p, label="hot", weight=w) for p, w in self.hot_patterns.items()]
+            + [PatternRule(p, label="warm", weight=w) for p, w in self.warm_patterns.items()]
+            + [PatternRule(p, label="cold", weight=w) for p, w in self.cold_patterns.items()]
+        )
     
     def qualify(
         self,
@@ -150,10 +158,8 @@ class LeadQualifier:
                 if hasattr(m, 'content') and m.content
             ])
         
-        conversation_lower = conversation_text.lower()
-        
-        # Remove acentos para facilitar match
-        conversation_normalized = self._normalize_text(conversation_lower)
+        # Minúsculas e sem acentos para facilitar match
+        conversation_normalized = normalize_text(conversation_text)
         
         logger.info(f"🔍 Analisando texto (primeiros 200 chars): {conversation_normalized[:200]}")
         
@@ -163,32 +169,21 @@ class LeadQualifier:
         reasons = []
         matched_patterns = []
         
-        # 1. ANALISA PADRÕES QUENTES
-        for pattern, points in self.hot_patterns.items():
-            matches = re.findall(pattern, conversation_normalized, re.IGNORECASE)
-            if matches:
-                score += points
-                signals["hot"].append(pattern[:40])
+        # 1-3. ANALISA PADRÕES QUENTES, MORNOS E FRIOS (uma varredura)
+        for match in self.patterns.scan(conversation_normalized):
+            pattern, points, kind = match.rule.pattern, match.rule.weight, match.rule.label
+            score += points
+            signals[kind].append(pattern[:40])
+
+            if kind == "hot":
                 matched_patterns.append(f"HOT: {pattern[:40]} → +{points}")
-                logger.info(f"🔥 HOT: {pattern[:50]} (+{points}) | Matches: {matches[:2]}")
-        
-        # 2. ANALISA PADRÕES MORNOS
-        for pattern, points in self.warm_patterns.items():
-            matches = re.findall(pattern, conversation_normalized, re.IGNORECASE)
-            if matches:
-                score += points
-                signals["warm"].append(pattern[:40])
+                logger.info(f"🔥 HOT: {pattern[:50]} (+{points}) | Match: {match.text[:60]}")
+            elif kind == "warm":
                 matched_patterns.append(f"WARM: {pattern[:40]} → +{points}")
-                logger.info(f"🌡️ WARM: {pattern[:50]} (+{points}) | Matches: {matches[:2]}")
-        
-        # 3. ANALISA PADRÕES FRIOS
-        for pattern, points in self.cold_patterns.items():
-            matches = re.findall(pattern, conversation_normalized, re.IGNORECASE)
-            if matches:
-                score += points
-                signals["cold"].append(pattern[:40])
+                logger.info(f"🌡️ WARM: {pattern[:50]} (+{points}) | Match: {match.text[:60]}")
+            else:
                 matched_patterns.append(f"COLD: {pattern[:40]} → {points}")
-                logger.info(f"❄️ COLD: {pattern[:50]} ({points}) | Matches: {matches[:2]}")
+                logger.info(f"❄️ COLD: {pattern[:50]} ({points}) | Match: {match.text[:60]}")
         
         # 4. ANÁLISE DE ENGAJAMENTO
         engagement_score, engagement_reason = self._analyze_engagement(messages, lead)
@@ -238,20 +233,6 @@ class LeadQualifier:
         
         return result
     
-    def _normalize_text(self, text: str) -> str:
-        """Remove acentos para facilitar matching."""
-        replacements = {
-            'á': 'a', 'à': 'a', 'ã': 'a', 'â': 'a',
-            'é': 'e', 'ê': 'e', 'è': 'e',
-            'í': 'i', 'ì': 'i',
-            'ó': 'o', 'ô': 'o', 'õ': 'o', 'ò': 'o',
-            'ú': 'u', 'ü': 'u', 'ù': 'u',
-            'ç': 'c',
-        }
-        for old, new in replacements.items():
-            text = text.replace(old, new)
-        return text
-    
     def _analyze_engagement(self, messages: List, lead) -> tuple:
         """Analisa engajamento na conversa."""
         score = 0
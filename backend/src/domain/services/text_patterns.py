@@ -0,0 +1,300 @@
+"""
+TEXT PATTERNS - Motor de Classificação de Texto
+===============================================
+
+Os scanners que rodam em toda mensagem antes da IA (segurança, guards,
+qualificação, sentimento, perfil) faziam, cada um, dezenas de
+re.search / `in` sobre o texto re-normalizado a cada chamada.
+
+PatternSet compila um conjunto de regras uma única vez:
+
+1. Cada regra regex é compilada e analisada: da árvore do próprio regex
+   saem os literais obrigatórios (toda ocorrência da regra contém um
+   deles). Ex.: r"agendar.*visita" → {"agendar"}
+2. Na varredura, os literais distintos de todas as regras são buscados
+   uma vez no texto; só as regras com literal presente executam o regex
+   (a maioria das mensagens não aciona nenhuma regra de segurança)
+3. Regras de palavra-chave (literal=True) nem chegam a executar regex
+
+Regras sem literal obrigatório (ex.: r"(.)\\1{10,}") são sempre
+verificadas, então o resultado é idêntico ao de testar regra a regra.
+
+Por que não uma alternation única (ou autômato em Python puro)? O `re`
+testa cada alternativa em cada posição e um laço por caractere em Python
+custa mais que as buscas de substring em C: medido em
+scripts/benchmark_text_patterns.py.
+
+normalize_text (minúsculas, sem acento) é memoizado: os vários scanners
+da mesma mensagem normalizam o texto uma vez só.
+
+Uso:
+    INTENT_PATTERNS = PatternSet([
+        PatternRule(r"agendar.*visita", label="hot", weight=25),
+        *keyword_rules(["urgente", "pra ontem"], label="hot", weight=25),
+    ])
+
+    for match in INTENT_PATTERNS.scan(normalize_text(message)):
+        score += match.rule.weight
+"""
+
+import re
+import unicodedata
+from dataclasses import dataclass
+from functools import lru_cache
+from re import _constants as sre_constants, _parser as sre_parse  # árvore do regex (stdlib)
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+MAX_LITERAL_ALTERNATIVES = 16  # Acima disso, o conjunto de literais deixa de ser útil
+MIN_LITERAL_LENGTH = 2
+
+
+# =============================================================================
+# NORMALIZAÇÃO
+# =============================================================================
+
+def _build_accent_table() -> Dict[int, str]:
+    table = {}
+    for codepoint in range(0xC0, 0x250):  # Latin-1 + Latin Extended A/B
+        char = chr(codepoint)
+        base = "".join(
+            c for c in unicodedata.normalize("NFKD", char) if not unicodedata.combining(c)
+        )
+        if base and base != char:
+            table[codepoint] = base
+    return table
+
+
+_ACCENTS = _build_accent_table()
+
+
+def strip_accents(text: str) -> str:
+    """Remove acentos (ç → c, ã → a), preservando o resto (inclusive emojis)."""
+    return text.translate(_ACCENTS)
+
+
+@lru_cache(maxsize=512)
+def normalize_text(text: str) -> str:
+    """Minúsculas e sem acentos. Memoizado: a mesma mensagem passa por vários scanners."""
+    if not text:
+        return ""
+    return strip_accents(text.lower())
+
+
+# =============================================================================
+# REGRAS
+# =============================================================================
+
+@dataclass(frozen=True)
+class PatternRule:
+    """Regra de classificação (regex ou palavra-chave)."""
+
+    pattern: str
+    label: str = ""
+    weight: float = 0
+    literal: bool = False  # Palavra-chave (busca de substring), não regex
+
+
+@dataclass(frozen=True)
+class PatternMatch:
+    rule: PatternRule
+    start: int
+    text: str
+
+
+def keyword_rules(keywords: Iterable[str], label: str = "", weight: float = 0) -> List[PatternRule]:
+    return [PatternRule(keyword, label=label, weight=weight, literal=True) for keyword in keywords]
+
+
+# =============================================================================
+# LITERAIS OBRIGATÓRIOS (ANÁLISE DO REGEX)
+# =============================================================================
+
+# Cada nó da árvore vira (exact, factor):
+# - exact: conjunto finito com TODAS as strings que o nó casa (ou None)
+# - factor: conjunto de literais em que toda ocorrência contém um deles (ou None)
+
+_ZERO_WIDTH = {sre_constants.AT, sre_constants.ASSERT, sre_constants.ASSERT_NOT}
+_REPEATS = {sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT, sre_constants.POSSESSIVE_REPEAT}
+
+
+def _usable(literals: Optional[Set[str]]) -> bool:
+    return bool(literals) and min(map(len, literals)) >= MIN_LITERAL_LENGTH
+
+
+def _best(*candidates: Optional[Set[str]]) -> Optional[Set[str]]:
+    """Melhor conjunto: maior literal mínimo, depois menos alternativas."""
+    usable = [c for c in candidates if _usable(c)]
+    return max(usable, key=lambda c: (min(map(len, c)), -len(c)), default=None)
+
+
+def _concat(left: Set[str], right: Set[str]) -> Optional[Set[str]]:
+    if len(left) * len(right) > MAX_LITERAL_ALTERNATIVES:
+        return None
+    return {a + b for a in left for b in right}
+
+
+def _analyze_sequence(items) -> Tuple[Optional[Set[str]], Optional[Set[str]]]:
+    current: Set[str] = {""}  # Produto dos itens exatos consecutivos
+    candidates: List[Optional[Set[str]]] = []
+    exact = True
+
+    for op, av in items:
+        if op in _ZERO_WIDTH:
+            continue  # Não consome texto: os vizinhos continuam contíguos
+
+        item_exact, item_factor = _analyze_item(op, av)
+        if item_exact is not None:
+            joined = _concat(current, item_exact)
+            if joined is None:
+                candidates.append(current)
+                current = set(item_exact)
+            else:
+                current = joined
+        else:
+            exact = False
+            candidates.extend((current, item_factor))
+            current = {""}
+
+    candidates.append(current)
+    return (current if exact else None), _best(*candidates)
+
+
+def _analyze_item(op, av) -> Tuple[Optional[Set[str]], Optional[Set[str]]]:
+    if op is sre_constants.LITERAL:
+        return {chr(av).lower()}, None
+
+    if op is sre_constants.IN:
+        chars = set()
+        for item_op, item_av in av:
+            if item_op is not sre_constants.LITERAL:
+                return None, None  # Faixa, categoria ou negação
+            chars.add(chr(item_av).lower())
+        return (chars, None) if len(chars) <= MAX_LITERAL_ALTERNATIVES else (None, None)
+
+    if op is sre_constants.SUBPATTERN:
+        return _analyze_sequence(av[-1])
+
+    if op is sre_constants.BRANCH:
+        branches = [_analyze_sequence(branch) for branch in av[1]]
+
+        exact = None
+        if all(e is not None for e, _ in branches):
+            exact = set().union(*(e for e, _ in branches))
+            if len(exact) > MAX_LITERAL_ALTERNATIVES:
+                exact = None
+
+        # Toda alternativa precisa garantir algum literal
+        factors = [_best(e, f) for e, f in branches]
+        factor = set().union(*factors) if all(factors) else None
+        return exact, factor
+
+    if op in _REPEATS:
+        low, high, sub = av
+        sub_exact, sub_factor = _analyze_sequence(sub)
+        if low == high == 1:
+            return sub_exact, sub_factor
+        if low == 0:
+            if high == 1 and sub_exact is not None:
+                return sub_exact | {""}, None  # Opcional: "s?" → {"", "s"}
+            return None, None
+        return None, _best(sub_exact, sub_factor)
+
+    return None, None  # ANY, CATEGORY, GROUPREF, ...
+
+
+def required_literals(pattern: str) -> Optional[FrozenSet[str]]:
+    """
+    Literais (minúsculos) em que toda ocorrência do regex contém um deles.
+
+    None quando não há garantia útil: a regra precisa ser sempre verificada.
+    """
+    try:
+        exact, factor = _analyze_sequence(sre_parse.parse(pattern, re.IGNORECASE))
+    except Exception:
+        return None
+    best = _best(exact, factor)
+    return frozenset(best) if best else None
+
+
+# =============================================================================
+# CONJUNTO COMPILADO
+# =============================================================================
+
+class PatternSet:
+    """
+    Regras compiladas uma vez e avaliadas numa varredura só.
+
+    O texto passado a scan/first já deve estar preparado: normalize_text(texto)
+    por padrão, ou texto.lower() com unaccent=False (regras com acento).
+    """
+
+    def __init__(self, rules: Iterable[PatternRule], unaccent: bool = True):
+        self.rules: Tuple[PatternRule, ...] = tuple(rules)
+
+        self._regexes: List[Optional[re.Pattern]] = []
+        self._keywords: List[Optional[str]] = []
+        by_literal: Dict[str, List[int]] = {}
+        always: List[int] = []
+
+        for index, rule in enumerate(self.rules):
+            if rule.literal:
+                keyword = normalize_text(rule.pattern) if unaccent else rule.pattern.lower()
+                self._regexes.append(None)
+                self._keywords.append(keyword)
+                by_literal.setdefault(keyword, []).append(index)
+                continue
+
+            source = strip_accents(rule.pattern) if unaccent else rule.pattern
+            self._regexes.append(re.compile(source, re.IGNORECASE))
+            self._keywords.append(None)
+
+            literals = required_literals(source)
+            if literals is None:
+                always.append(index)
+            else:
+                for literal in literals:
+                    by_literal.setdefault(literal, []).append(index)
+
+        self._by_literal: Dict[str, Tuple[int, ...]] = {k: tuple(v) for k, v in by_literal.items()}
+        self._always: Tuple[int, ...] = tuple(always)
+
+    def _candidates(self, text: str) -> List[int]:
+        candidates = set(self._always)
+        for literal, indexes in self._by_literal.items():
+            if literal in text:
+                candidates.update(indexes)
+        return sorted(candidates)
+
+    def _match(self, index: int, text: str) -> Optional[PatternMatch]:
+        keyword = self._keywords[index]
+        if keyword is not None:
+            return PatternMatch(self.rules[index], text.find(keyword), keyword)
+
+        found = self._regexes[index].search(text)
+        if found is None:
+            return None
+        return PatternMatch(self.rules[index], found.start(), found.group(0))
+
+    def scan(self, text: str) -> List[PatternMatch]:
+        """Todas as regras que casam no texto, na ordem em que foram declaradas."""
+        if not text:
+            return []
+        matches = []
+        for index in self._candidates(text):
+            match = self._match(index, text)
+            if match is not None:
+                matches.append(match)
+        return matches
+
+    def first(self, text: str) -> Optional[PatternMatch]:
+        """Primeira regra (na ordem declarada) que casa no texto."""
+        if not text:
+            return None
+        for index in self._candidates(text):
+            match = self._match(index, text)
+            if match is not None:
+                return match
+        return None
+
+    def __len__(self) -> int:
+        return len(self.rules)
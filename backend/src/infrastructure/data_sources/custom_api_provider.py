@@ -162,25 +162,26 @@ class CustomAPIProvider(DataSourceProvider):
     ) -> Optional[Any]:
         """Faz request para a API."""
         try:
-            import httpx
-
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.request(
-                    method=method,
-                    url=url,
-                    headers=self._build_headers(),
-                    params=params,
-                    json=body if method == "POST" else None
-                )
+            from src.infrastructure.services.http_client_registry import get_http_client
+
+            client = get_http_client("custom_api")
+            response = await client.request(
+                method=method,
+                url=url,
+                headers=self._build_headers(),
+                params=params,
+                json=body if method == "POST" else None,
+                timeout=self.timeout,
+            )
 
-                if response.status_code in [200, 201]:
-                    return response.json()
-                else:
-                    logger.warning(
-                        f"[CustomAPI] HTTP {response.status_code}: "
-                        f"{response.text[:200]}"
-                    )
-                    return None
+            if response.status_code in [200, 201]:
+                return response.json()
+            else:
+                logger.warning(
+                    f"[CustomAPI] HTTP {response.status_code}: "
+                    f"{response.text[:200]}"
+                )
+                return None
 
         except Exception as e:
             logger.error(f"[CustomAPI] Request error: {type(e).__name__}: {e}")
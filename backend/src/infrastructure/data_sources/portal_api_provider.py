@@ -110,21 +110,22 @@ class PortalAPIProvider(DataSourceProvider):
         """
         Faz request HTTP com múltiplas bibliotecas como fallback.
         """
-        # Tenta com httpx primeiro (async nativo)
+        # Tenta com httpx primeiro (async nativo, cliente compartilhado)
         try:
-            import httpx
+            from src.infrastructure.services.http_client_registry import get_http_client
             logger.debug(f"[PortalAPI] Tentando httpx: {url}")
-            async with httpx.AsyncClient(
-                timeout=self.timeout,
+            client = get_http_client("portal")
+            response = await client.get(
+                url,
                 headers=self.headers,
-                follow_redirects=True
-            ) as client:
-                response = await client.get(url)
-                if response.status_code == 200:
-                    logger.debug(f"[PortalAPI] httpx OK - {len(response.json())} items")
-                    return response.json()
-                else:
-                    logger.warning(f"[PortalAPI] httpx Status: {response.status_code}")
+                timeout=self.timeout,
+                follow_redirects=True,
+            )
+            if response.status_code == 200:
+                logger.debug(f"[PortalAPI] httpx OK - {len(response.json())} items")
+                return response.json()
+            else:
+                logger.warning(f"[PortalAPI] httpx Status: {response.status_code}")
         except Exception as e:
             logger.error(f"[PortalAPI] httpx erro: {type(e).__name__}: {e}")
 
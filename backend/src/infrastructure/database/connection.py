@@ -78,6 +78,7 @@ async def init_db() -> None:
             ("reengagement_status", "VARCHAR(20) DEFAULT 'none'"),
             ("last_activity_at", "TIMESTAMP WITH TIME ZONE"),
             ("conversation_summary", "TEXT"),
+            ("summary_message_id", "INTEGER"),
             ("summary", "TEXT"),
             ("propensity_score", "INTEGER DEFAULT 0"),
             ("ai_sentiment", "VARCHAR(50)"),
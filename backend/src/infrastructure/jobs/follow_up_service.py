@@ -26,16 +26,25 @@ from datetime import datetime, timedelta
 from typing import Optional
 from zoneinfo import ZoneInfo
 
-from sqlalchemy import select, and_, or_
+from sqlalchemy import select, and_, or_, true
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
+from src.config import get_settings
 from src.infrastructure.database import async_session
 from src.domain.entities import Lead, Message, Tenant
+from src.infrastructure.jobs.tenant_fanout import (
+    TenantRunStats,
+    llm_slot,
+    run_bounded,
+    run_for_all_tenants,
+    whatsapp_slot,
+)
 from src.infrastructure.services.whatsapp_service import send_whatsapp_message
 from src.infrastructure.services.openai_service import chat_completion
 
 logger = logging.getLogger(__name__)
+app_settings = get_settings()
 
 
 # =============================================================================
@@ -89,87 +98,71 @@ class FollowUpService:
         Processa follow-ups para todos os tenants ativos.
         
         CHAMADO PELO: Scheduler (a cada hora)
+
+        Tenants rodam em paralelo, cada um com sua sessão (ver tenant_fanout).
         """
         print("=" * 60)
         print("🔄 INICIANDO JOB DE FOLLOW-UP AUTOMÁTICO")
         print("=" * 60)
         
-        self.processed_count = 0
-        self.sent_count = 0
-        self.skipped_count = 0
-        self.error_count = 0
-        
-        try:
-            async with async_session() as session:
-                # Busca todos os tenants ativos
-                result = await session.execute(
-                    select(Tenant).where(Tenant.active == True)
-                )
-                tenants = result.scalars().all()
-                
-                print(f"📊 Encontrados {len(tenants)} tenants ativos")
-                
-                for tenant in tenants:
-                    await self._process_tenant(session, tenant)
-                
-                await session.commit()
-                
-        except Exception as e:
-            print(f"❌ Erro crítico no job de follow-up: {e}")
-            logger.error(f"❌ Erro crítico no job de follow-up: {e}", exc_info=True)
+        summary = await run_for_all_tenants("follow_up", self._process_tenant)
+
+        self.processed_count = summary["processed"]
+        self.sent_count = summary["sent"]
+        self.skipped_count = summary["skipped"]
+        self.error_count = summary["errors"]
         
         # Log final
         print("=" * 60)
-        print(f"✅ JOB FINALIZADO")
+        print(f"✅ JOB FINALIZADO em {summary['duration_seconds']}s")
+        print(f"   Tenants: {summary['tenants']}")
         print(f"   Processados: {self.processed_count}")
         print(f"   Enviados: {self.sent_count}")
         print(f"   Pulados: {self.skipped_count}")
         print(f"   Erros: {self.error_count}")
         print("=" * 60)
         
-        return {
-            "processed": self.processed_count,
-            "sent": self.sent_count,
-            "skipped": self.skipped_count,
-            "errors": self.error_count,
-        }
+        return summary
     
     # =========================================================================
     # PROCESSA UM TENANT ESPECÍFICO
     # =========================================================================
     
-    async def _process_tenant(self, session: AsyncSession, tenant: Tenant):
-        """Processa follow-ups de um tenant específico."""
+    async def _process_tenant(self, session: AsyncSession, tenant: Tenant, stats: TenantRunStats):
+        """Processa follow-ups de um tenant específico (erros sobem para o executor)."""
         
-        try:
-            # Obtém configurações de follow-up do tenant
-            config = self._get_follow_up_config(tenant)
-            
-            # Verifica se follow-up está habilitado
-            if not config.get("enabled", False):
-                print(f"⏭️ Tenant {tenant.slug}: Follow-up desabilitado")
-                return
-            
-            print(f"🏢 Processando tenant: {tenant.name} ({tenant.slug})")
-            
-            # Verifica se está em horário permitido
-            if not self._is_allowed_time(tenant, config):
-                print(f"⏰ Tenant {tenant.slug}: Fora do horário permitido")
-                return
-            
-            # Busca leads elegíveis para follow-up
-            leads = await self._get_eligible_leads(session, tenant, config)
-            
-            print(f"📋 Tenant {tenant.slug}: {len(leads)} leads elegíveis")
-            
-            for lead in leads:
-                self.processed_count += 1
-                await self._process_lead(session, tenant, lead, config)
-                
-        except Exception as e:
-            print(f"❌ Erro ao processar tenant {tenant.slug}: {e}")
-            logger.error(f"❌ Erro ao processar tenant {tenant.slug}: {e}", exc_info=True)
-            self.error_count += 1
+        # Obtém configurações de follow-up do tenant
+        config = self._get_follow_up_config(tenant)
+        
+        # Verifica se follow-up está habilitado
+        if not config.get("enabled", False):
+            stats.status, stats.reason = "skipped", "desabilitado"
+            return
+        
+        # Verifica se está em horário permitido
+        if not self._is_allowed_time(tenant, config):
+            stats.status, stats.reason = "skipped", "fora do horário"
+            return
+        
+        # Busca leads elegíveis para follow-up
+        leads = await self._get_eligible_leads(session, tenant, config)
+        
+        print(f"📋 Tenant {tenant.slug}: {len(leads)} leads elegíveis")
+        
+        if not leads:
+            return
+        
+        # Contexto para a IA: só as últimas mensagens de cada lead (1 query)
+        recent_messages = await self._get_recent_messages(session, [lead.id for lead in leads])
+        
+        stats.processed += len(leads)
+        await run_bounded(
+            leads,
+            lambda lead: self._process_lead(
+                session, tenant, lead, config, stats, recent_messages.get(lead.id, [])
+            ),
+            app_settings.job_leads_per_tenant_concurrency,
+        )
     
     # =========================================================================
     # BUSCA LEADS ELEGÍVEIS
@@ -191,6 +184,11 @@ class FollowUpService:
         4. Última atividade há mais de X horas
         5. Não atingiu máximo de tentativas
         6. Último follow-up foi há mais de Y horas (se houver)
+        7. Última mensagem da conversa foi da IA (lead não respondeu)
+
+        O critério 7 é resolvido no banco com um LATERAL que lê só a
+        mensagem mais recente de cada lead (índice lead_id, created_at DESC),
+        sem carregar o histórico.
         """
         
         now = datetime.utcnow()
@@ -203,15 +201,28 @@ class FollowUpService:
         # Qualificações excluídas
         exclude_qualifications = config.get("exclude_qualifications", [])
         
+        # Mensagem mais recente do lead (role + data)
+        last_message = (
+            select(Message.role.label("role"), Message.created_at.label("created_at"))
+            .where(Message.lead_id == Lead.id)
+            .order_by(Message.created_at.desc())
+            .limit(1)
+            .correlate(Lead)
+            .lateral("last_message")
+        )
+        
         # Query base
         query = (
             select(Lead)
-            .options(selectinload(Lead.messages))
+            .join(last_message, true())
             .where(
                 and_(
                     # Pertence ao tenant
                     Lead.tenant_id == tenant.id,
                     
+                    # Última mensagem foi da IA (lead não respondeu)
+                    last_message.c.role == "assistant",
+                    
                     # Tem telefone
                     Lead.phone.isnot(None),
                     Lead.phone != "",
@@ -266,32 +277,43 @@ class FollowUpService:
         query = query.limit(100)
         
         result = await session.execute(query)
-        leads = result.scalars().all()
-        
-        # Filtro adicional: última mensagem foi da IA (lead não respondeu)
-        filtered_leads = []
-        for lead in leads:
-            if self._last_message_was_assistant(lead):
-                filtered_leads.append(lead)
-        
-        return filtered_leads
+        return list(result.scalars().all())
     
-    def _last_message_was_assistant(self, lead: Lead) -> bool:
-        """Verifica se a última mensagem foi da IA (lead não respondeu)."""
-        if not lead.messages:
-            return False
-        
-        # Ordena por data (mais recente primeiro)
-        sorted_messages = sorted(
-            lead.messages,
-            key=lambda m: m.created_at or datetime.min,
-            reverse=True
+    async def _get_recent_messages(
+        self,
+        session: AsyncSession,
+        lead_ids: list[int],
+        limit: int = 5,
+    ) -> dict[int, list]:
+        """
+        Últimas `limit` mensagens de cada lead, em ordem cronológica.
+
+        Uma única query com LATERAL ... LIMIT por lead (usa o índice
+        lead_id, created_at DESC); carrega só role, conteúdo e data.
+        """
+        if not lead_ids:
+            return {}
+        
+        recent = (
+            select(Message.role, Message.content, Message.created_at)
+            .where(Message.lead_id == Lead.id)
+            .order_by(Message.created_at.desc())
+            .limit(limit)
+            .correlate(Lead)
+            .lateral("recent_messages")
         )
         
-        if sorted_messages:
-            return sorted_messages[0].role == "assistant"
+        result = await session.execute(
+            select(Lead.id.label("lead_id"), recent.c.role, recent.c.content, recent.c.created_at)
+            .join(recent, true())
+            .where(Lead.id.in_(lead_ids))
+            .order_by(Lead.id, recent.c.created_at)
+        )
         
-        return False
+        messages: dict[int, list] = {}
+        for row in result.all():
+            messages.setdefault(row.lead_id, []).append(row)
+        return messages
     
     # =========================================================================
     # PROCESSA UM LEAD
@@ -303,31 +325,39 @@ class FollowUpService:
         tenant: Tenant,
         lead: Lead,
         config: dict,
+        stats: TenantRunStats,
+        recent_messages: list,
     ):
-        """Processa follow-up de um lead específico."""
+        """
+        Processa follow-up de um lead específico.
+
+        Roda em paralelo com outros leads do tenant: não faz I/O na sessão,
+        só adiciona/altera objetos (commit feito pelo executor).
+        """
         
         try:
             # Determina qual tentativa é essa
             attempt = (lead.reengagement_attempts or 0) + 1
             
             # Obtém mensagem personalizada (Tenta por IA primeiro)
-            message = await self._generate_ai_follow_up(lead, attempt, config)
+            message = await self._generate_ai_follow_up(lead, attempt, config, recent_messages)
             
             if not message:
                 message = self._get_personalized_message(lead, attempt, config)
             
             if not message:
                 print(f"⚠️ Lead {lead.id}: Sem mensagem para tentativa {attempt}")
-                self.skipped_count += 1
+                stats.skipped += 1
                 return
             
             # Envia mensagem via WhatsApp
             print(f"📤 Enviando follow-up #{attempt} para lead {lead.id} ({lead.name or 'Sem nome'})")
             
-            result = await send_whatsapp_message(
-                to=lead.phone,
-                message=message,
-            )
+            async with whatsapp_slot():
+                result = await send_whatsapp_message(
+                    to=lead.phone,
+                    message=message,
+                )
             
             if result.get("success"):
                 # Salva mensagem no histórico
@@ -348,18 +378,18 @@ class FollowUpService:
                 if attempt >= config["max_attempts"]:
                     lead.reengagement_status = "exhausted"
                 
-                self.sent_count += 1
+                stats.sent += 1
                 print(f"✅ Follow-up #{attempt} enviado para lead {lead.id}")
                 
             else:
                 error = result.get("error", "Erro desconhecido")
                 print(f"❌ Falha ao enviar follow-up para lead {lead.id}: {error}")
-                self.error_count += 1
+                stats.errors += 1
                 
         except Exception as e:
             print(f"❌ Erro ao processar lead {lead.id}: {e}")
             logger.error(f"❌ Erro ao processar lead {lead.id}: {e}", exc_info=True)
-            self.error_count += 1
+            stats.errors += 1
     
     # =========================================================================
     # HELPERS
@@ -450,15 +480,20 @@ class FollowUpService:
             print(f"Erro ao verificar horário permitido: {e}")
             return True
     
-    async def _generate_ai_follow_up(self, lead: Lead, attempt: int, config: dict) -> Optional[str]:
+    async def _generate_ai_follow_up(
+        self,
+        lead: Lead,
+        attempt: int,
+        config: dict,
+        recent_messages: list,
+    ) -> Optional[str]:
         """Gera uma mensagem de follow-up ultra-personalizada usando GPT-4o-mini."""
         
         try:
-            # Pega as últimas 5 mensagens para dar contexto
-            history_text = ""
-            if lead.messages:
-                recent = sorted(lead.messages, key=lambda m: m.created_at, reverse=True)[:5]
-                history_text = "\n".join([f"{'IA' if m.role == 'assistant' else 'Cliente'}: {m.content}" for m in reversed(recent)])
+            # Últimas mensagens (ordem cronológica) para dar contexto
+            history_text = "\n".join(
+                f"{'IA' if m.role == 'assistant' else 'Cliente'}: {m.content}" for m in recent_messages
+            )
             
             prompt = f"""
 Você é um corretor de imóveis sênior fazendo um follow-up (tentativa #{attempt}) com um cliente.
@@ -477,11 +512,12 @@ INTERESSE: {self._extract_interesse(lead)}
 
 RESPONDA APENAS A MENSAGEM DO WHATSAPP.
 """
-            ai_response = await chat_completion(
-                messages=[{"role": "system", "content": prompt}],
-                temperature=0.8,
-                max_tokens=100
-            )
+            async with llm_slot():
+                ai_response = await chat_completion(
+                    messages=[{"role": "system", "content": prompt}],
+                    temperature=0.8,
+                    max_tokens=100
+                )
             
             return ai_response["content"].strip().strip('"')
             
@@ -644,42 +680,7 @@ follow_up_service = FollowUpService()
 # =============================================================================
 
 async def run_follow_up_job():
-    """Função corrigida - cria sessão isolada"""
+    """Função para ser chamada pelo scheduler (roda no event loop da aplicação)."""
     print("⏰ Scheduler chamou run_follow_up_job()")
-    print("=" * 60)
-    
-    # CRIAR ENGINE E SESSÃO ISOLADAS (correção crítica)
-    from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-    from sqlalchemy.orm import sessionmaker
-    from config import DATABASE_URL
-    
-    engine = create_async_engine(
-        DATABASE_URL,
-        echo=False,
-        pool_pre_ping=True,
-        pool_recycle=3600,
-    )
-    
-    async_session_factory = sessionmaker(
-        engine,
-        class_=AsyncSession,
-        expire_on_commit=False
-    )
-    
-    result = {'processados': 0, 'enviados': 0, 'pulados': 0, 'erros': 0}
-    
-    try:
-        async with async_session_factory() as session:
-            # PASSAR SESSÃO PARA O SERVIÇO
-            result = await follow_up_service.process_all_tenants(session)
-            await session.commit()
-    except Exception as e:
-        print(f"❌ Erro: {str(e)}")
-    finally:
-        await engine.dispose()
-        print("=" * 60)
-        print("✅ JOB FINALIZADO")
-        print(f"   Enviados: {result.get('enviados', 0)}")
-        print("=" * 60)
-    
-    return result
\ No newline at end of file
+
+    return await follow_up_service.process_all_tenants()
@@ -38,12 +38,21 @@ from sqlalchemy import select, and_, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
+from src.config import get_settings
 from src.infrastructure.database import async_session
 from src.domain.entities import Lead, Message, Tenant, Seller, Product
+from src.infrastructure.jobs.tenant_fanout import (
+    TenantRunStats,
+    llm_slot,
+    run_bounded,
+    run_for_all_tenants,
+    whatsapp_slot,
+)
 from src.infrastructure.services.whatsapp_service import send_whatsapp_message
 from src.infrastructure.services.openai_service import chat_completion
 
 logger = logging.getLogger(__name__)
+app_settings = get_settings()
 
 
 # =============================================================================
@@ -93,90 +102,73 @@ class PhoenixEngineService:
         Processa reativações Phoenix para todos os tenants ativos.
 
         CHAMADO PELO: Scheduler (diariamente)
+
+        Tenants rodam em paralelo, cada um com sua sessão (ver tenant_fanout).
         """
         print("=" * 60)
         print("🔥 PHOENIX ENGINE - INICIANDO BUSCA DE LEADS INATIVOS")
         print("=" * 60)
 
-        self.processed_count = 0
-        self.sent_count = 0
-        self.skipped_count = 0
-        self.error_count = 0
         self.reactivated_count = 0
 
-        try:
-            async with async_session() as session:
-                # Busca todos os tenants ativos
-                result = await session.execute(
-                    select(Tenant).where(Tenant.active == True)
-                )
-                tenants = result.scalars().all()
-
-                print(f"📊 Encontrados {len(tenants)} tenants ativos")
-
-                for tenant in tenants:
-                    await self._process_tenant(session, tenant)
-
-                await session.commit()
+        summary = await run_for_all_tenants("phoenix_engine", self._process_tenant)
+        summary.setdefault("reactivated", self.reactivated_count)
 
-        except Exception as e:
-            print(f"❌ Erro crítico no Phoenix Engine: {e}")
-            logger.error(f"❌ Erro crítico no Phoenix Engine: {e}", exc_info=True)
+        self.processed_count = summary["processed"]
+        self.sent_count = summary["sent"]
+        self.skipped_count = summary["skipped"]
+        self.error_count = summary["errors"]
 
         # Log final
         print("=" * 60)
-        print(f"🔥 PHOENIX ENGINE FINALIZADO")
+        print(f"🔥 PHOENIX ENGINE FINALIZADO em {summary['duration_seconds']}s")
+        print(f"   Tenants: {summary['tenants']}")
         print(f"   Processados: {self.processed_count}")
         print(f"   Enviados: {self.sent_count}")
-        print(f"   Reativados: {self.reactivated_count}")
+        print(f"   Reativados: {summary['reactivated']}")
         print(f"   Pulados: {self.skipped_count}")
         print(f"   Erros: {self.error_count}")
         print("=" * 60)
 
-        return {
-            "processed": self.processed_count,
-            "sent": self.sent_count,
-            "reactivated": self.reactivated_count,
-            "skipped": self.skipped_count,
-            "errors": self.error_count,
-        }
+        return summary
 
     # =========================================================================
     # PROCESSA UM TENANT ESPECÍFICO
     # =========================================================================
 
-    async def _process_tenant(self, session: AsyncSession, tenant: Tenant):
-        """Processa reativações Phoenix de um tenant específico."""
+    async def _process_tenant(self, session: AsyncSession, tenant: Tenant, stats: TenantRunStats):
+        """Processa reativações Phoenix de um tenant específico (erros sobem para o executor)."""
 
-        try:
-            # Obtém configurações Phoenix do tenant
-            config = self._get_phoenix_config(tenant)
+        # Obtém configurações Phoenix do tenant
+        config = self._get_phoenix_config(tenant)
 
-            # Verifica se Phoenix está habilitado
-            if not config.get("enabled", False):
-                print(f"⏭️ Tenant {tenant.slug}: Phoenix Engine desabilitado")
-                return
+        # Verifica se Phoenix está habilitado
+        if not config.get("enabled", False):
+            stats.status, stats.reason = "skipped", "desabilitado"
+            return
 
-            print(f"🏢 Processando tenant: {tenant.name} ({tenant.slug})")
+        # Verifica se está em horário permitido
+        if not self._is_allowed_time(tenant, config):
+            stats.status, stats.reason = "skipped", "fora do horário"
+            return
 
-            # Verifica se está em horário permitido
-            if not self._is_allowed_time(tenant, config):
-                print(f"⏰ Tenant {tenant.slug}: Fora do horário permitido")
-                return
+        # Busca leads elegíveis para Phoenix
+        leads = await self._get_inactive_leads(session, tenant, config)
 
-            # Busca leads elegíveis para Phoenix
-            leads = await self._get_inactive_leads(session, tenant, config)
+        print(f"📋 Tenant {tenant.slug}: {len(leads)} leads inativos encontrados")
 
-            print(f"📋 Tenant {tenant.slug}: {len(leads)} leads inativos encontrados")
+        if not leads:
+            return
 
-            for lead in leads:
-                self.processed_count += 1
-                await self._process_lead(session, tenant, lead, config)
+        # Estoque atual: mesmo para todos os leads do tenant
+        products = await self._get_tenant_products(session, tenant)
 
-        except Exception as e:
-            print(f"❌ Erro ao processar tenant {tenant.slug}: {e}")
-            logger.error(f"❌ Erro ao processar tenant {tenant.slug}: {e}", exc_info=True)
-            self.error_count += 1
+        stats.processed += len(leads)
+        await run_bounded(
+            leads,
+            lambda lead: self._process_lead(session, tenant, lead, config, products, stats),
+            app_settings.job_leads_per_tenant_concurrency,
+        )
 
     # =========================================================================
     # BUSCA LEADS INATIVOS (45+ DIAS)
@@ -274,16 +266,20 @@ class PhoenixEngineService:
         tenant: Tenant,
         lead: Lead,
         config: dict,
+        products: List[Product],
+        stats: TenantRunStats,
     ):
-        """Processa reativação Phoenix de um lead específico."""
+        """
+        Processa reativação Phoenix de um lead específico.
+
+        Roda em paralelo com outros leads do tenant: não faz I/O na sessão,
+        só adiciona/altera objetos (commit feito pelo executor).
+        """
 
         try:
             # Determina qual tentativa é essa
             attempt = (lead.phoenix_attempts or 0) + 1
 
-            # Busca produtos/imóveis atuais do tenant
-            products = await self._get_tenant_products(session, tenant)
-
             # Gera análise e mensagem com IA
             print(f"🤖 Phoenix analisando lead {lead.id} ({lead.name or 'Sem nome'})...")
 
@@ -296,7 +292,7 @@ class PhoenixEngineService:
 
             if not ai_result or not ai_result.get("message"):
                 print(f"⚠️ Lead {lead.id}: IA não gerou mensagem")
-                self.skipped_count += 1
+                stats.skipped += 1
                 return
 
             message = ai_result["message"]
@@ -307,10 +303,11 @@ class PhoenixEngineService:
             # Envia mensagem via WhatsApp
             print(f"📤 Enviando Phoenix #{attempt} para lead {lead.id} (Score: {interest_score}%)")
 
-            result = await send_whatsapp_message(
-                to=lead.phone,
-                message=message,
-            )
+            async with whatsapp_slot():
+                result = await send_whatsapp_message(
+                    to=lead.phone,
+                    message=message,
+                )
 
             if result.get("success"):
                 # Salva mensagem no histórico
@@ -334,18 +331,18 @@ class PhoenixEngineService:
                 if lead.assigned_seller_id and not lead.phoenix_original_seller_id:
                     lead.phoenix_original_seller_id = lead.assigned_seller_id
 
-                self.sent_count += 1
+                stats.sent += 1
                 print(f"✅ Phoenix #{attempt} enviado para lead {lead.id}")
 
             else:
                 error = result.get("error", "Erro desconhecido")
                 print(f"❌ Falha ao enviar Phoenix para lead {lead.id}: {error}")
-                self.error_count += 1
+                stats.errors += 1
 
         except Exception as e:
             print(f"❌ Erro ao processar lead {lead.id}: {e}")
             logger.error(f"❌ Erro ao processar lead {lead.id}: {e}", exc_info=True)
-            self.error_count += 1
+            stats.errors += 1
 
     # =========================================================================
     # GERAÇÃO DE MENSAGEM COM IA
@@ -430,12 +427,13 @@ Interesse original: {original_interest}
 }}
 """
 
-            ai_response = await chat_completion(
-                messages=[{"role": "system", "content": prompt}],
-                temperature=0.7,
-                max_tokens=500,
-                response_format="json"
-            )
+            async with llm_slot():
+                ai_response = await chat_completion(
+                    messages=[{"role": "system", "content": prompt}],
+                    temperature=0.7,
+                    max_tokens=500,
+                    response_format="json"
+                )
 
             # Parse JSON response
             import json
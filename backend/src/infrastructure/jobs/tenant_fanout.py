@@ -0,0 +1,194 @@
+"""
+FAN-OUT DE TENANTS PARA JOBS
+============================
+
+Executor usado pelos jobs multi-tenant (Follow-up, Phoenix Engine).
+
+- Tenants processados em paralelo (limite global de tenants simultâneos)
+- Uma sessão de banco por tenant (commit/rollback isolados)
+- Falha em um tenant não afeta os demais
+- Leads de um tenant processados em paralelo com limite por tenant
+- Semáforos globais para chamadas de LLM e envios de WhatsApp,
+  compartilhados por todos os jobs do processo
+- Relatório final com totais e resultado por tenant
+
+Regra para os processadores: dentro da fase concorrente de leads,
+não fazer I/O na sessão (apenas LLM/WhatsApp e alterações em memória
+nos objetos já carregados). O commit acontece uma vez por tenant.
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, TypeVar
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import get_settings
+from src.domain.entities import Tenant
+from src.infrastructure.database import async_session
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+T = TypeVar("T")
+
+
+# =============================================================================
+# SEMÁFOROS GLOBAIS (LLM / WHATSAPP)
+# =============================================================================
+
+_llm_semaphore: Optional[asyncio.Semaphore] = None
+_whatsapp_semaphore: Optional[asyncio.Semaphore] = None
+
+
+@asynccontextmanager
+async def llm_slot():
+    """Reserva uma vaga de chamada ao LLM (limite global dos jobs)."""
+    global _llm_semaphore
+    if _llm_semaphore is None:
+        _llm_semaphore = asyncio.Semaphore(settings.job_llm_concurrency)
+    async with _llm_semaphore:
+        yield
+
+
+@asynccontextmanager
+async def whatsapp_slot():
+    """Reserva uma vaga de envio de WhatsApp (limite global dos jobs)."""
+    global _whatsapp_semaphore
+    if _whatsapp_semaphore is None:
+        _whatsapp_semaphore = asyncio.Semaphore(settings.job_whatsapp_concurrency)
+    async with _whatsapp_semaphore:
+        yield
+
+
+# =============================================================================
+# RELATÓRIO
+# =============================================================================
+
+@dataclass
+class TenantRunStats:
+    """Resultado do processamento de um tenant."""
+
+    tenant_id: int
+    slug: str
+    status: str = "ok"  # ok | skipped | error
+    reason: Optional[str] = None
+    processed: int = 0
+    sent: int = 0
+    skipped: int = 0
+    errors: int = 0
+    extra: Dict[str, int] = field(default_factory=dict)
+    duration_seconds: float = 0.0
+
+    def incr(self, counter: str, amount: int = 1) -> None:
+        """Incrementa um contador específico do job (ex: reactivated)."""
+        self.extra[counter] = self.extra.get(counter, 0) + amount
+
+
+def build_summary(job_name: str, results: List[TenantRunStats], duration: float) -> Dict[str, Any]:
+    """Consolida os resultados por tenant em um relatório."""
+    totals = {"processed": 0, "sent": 0, "skipped": 0, "errors": 0}
+    for stats in results:
+        totals["processed"] += stats.processed
+        totals["sent"] += stats.sent
+        totals["skipped"] += stats.skipped
+        totals["errors"] += stats.errors
+        for key, value in stats.extra.items():
+            totals[key] = totals.get(key, 0) + value
+
+    failed = [s for s in results if s.status == "error"]
+
+    return {
+        "job": job_name,
+        **totals,
+        "tenants": {
+            "total": len(results),
+            "processed": sum(1 for s in results if s.status == "ok"),
+            "skipped": sum(1 for s in results if s.status == "skipped"),
+            "failed": len(failed),
+        },
+        "failed_tenants": [
+            {"tenant_id": s.tenant_id, "slug": s.slug, "error": s.reason} for s in failed
+        ],
+        "duration_seconds": round(duration, 2),
+    }
+
+
+# =============================================================================
+# EXECUTOR
+# =============================================================================
+
+TenantProcessor = Callable[[AsyncSession, Tenant, TenantRunStats], Awaitable[None]]
+
+
+async def run_bounded(items: Iterable[T], func: Callable[[T], Awaitable[Any]], limit: int) -> List[Any]:
+    """Executa `func` para cada item com no máximo `limit` simultâneos."""
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def guarded(item: T):
+        async with semaphore:
+            return await func(item)
+
+    return await asyncio.gather(*(guarded(item) for item in items))
+
+
+async def run_for_all_tenants(
+    job_name: str,
+    process_tenant: TenantProcessor,
+    tenant_concurrency: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Executa `process_tenant(session, tenant, stats)` para cada tenant ativo.
+
+    Cada tenant recebe sua própria sessão; o commit é feito ao final
+    do tenant e qualquer exceção faz rollback apenas daquele tenant.
+    """
+    started = time.perf_counter()
+
+    async with async_session() as session:
+        result = await session.execute(
+            select(Tenant.id, Tenant.slug).where(Tenant.active == True)
+        )
+        tenant_refs = result.all()
+
+    logger.info(f"📊 {job_name}: {len(tenant_refs)} tenants ativos")
+
+    async def run_tenant(ref) -> TenantRunStats:
+        tenant_id, slug = ref
+        stats = TenantRunStats(tenant_id=tenant_id, slug=slug)
+        tenant_started = time.perf_counter()
+
+        try:
+            async with async_session() as session:
+                tenant = await session.get(Tenant, tenant_id)
+                if tenant is None or not tenant.active:
+                    stats.status, stats.reason = "skipped", "inativo"
+                    return stats
+                try:
+                    await process_tenant(session, tenant, stats)
+                    await session.commit()
+                except Exception:
+                    await session.rollback()
+                    raise
+        except Exception as e:
+            stats.status, stats.reason = "error", str(e)
+            stats.errors += 1
+            logger.error(f"❌ {job_name}: erro no tenant {slug}: {e}", exc_info=True)
+        finally:
+            stats.duration_seconds = time.perf_counter() - tenant_started
+
+        return stats
+
+    results = await run_bounded(
+        tenant_refs,
+        run_tenant,
+        tenant_concurrency or settings.job_tenant_concurrency,
+    )
+
+    summary = build_summary(job_name, results, time.perf_counter() - started)
+    logger.info(f"✅ {job_name} finalizado: {summary}")
+    return summary
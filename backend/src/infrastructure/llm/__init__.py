@@ -1,3 +1,6 @@
 from .interface import LLMProvider
 from .openai_provider import OpenAIProvider
 from .factory import LLMFactory
+from .embedding_cache import EmbeddingCache, CachedEmbeddingProvider, get_embedding_cache
+from .embedding_batch import iter_embedding_batches
+from .tokenizer import estimate_tokens, estimate_message_tokens, estimate_messages_tokens
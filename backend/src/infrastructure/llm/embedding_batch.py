@@ -0,0 +1,77 @@
+"""
+EMBEDDING BATCH - Geração de embeddings em lote
+================================================
+
+Usado na indexação em massa (catálogo de imóveis, FAQ).
+
+- Agrupa N textos por requisição à API de embeddings
+- Limita o número de requisições simultâneas (semáforo)
+- Entrega cada lote assim que fica pronto, para o chamador gravar
+  no banco sem manter todos os vetores em memória
+
+Falha em um lote não derruba os demais: os vetores do lote
+voltam como None e o chamador contabiliza como falha.
+"""
+
+import asyncio
+import logging
+from typing import AsyncIterator, List, Optional, Tuple
+
+from src.config import get_settings
+from .factory import LLMFactory
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+EMBEDDING_DIMENSIONS = 1536
+
+
+async def iter_embedding_batches(
+    texts: List[str],
+    batch_size: Optional[int] = None,
+    concurrency: Optional[int] = None,
+    model: str = "text-embedding-3-small",
+) -> AsyncIterator[Tuple[int, List[Optional[List[float]]]]]:
+    """
+    Gera embeddings para `texts` em lotes concorrentes.
+
+    Yields:
+        (offset, vetores) por lote, na ordem de conclusão. `offset` é a
+        posição do primeiro texto do lote em `texts`; vetores inválidos
+        ou de lotes que falharam vêm como None.
+    """
+    if not texts:
+        return
+
+    batch_size = max(1, batch_size or settings.embedding_batch_size)
+    semaphore = asyncio.Semaphore(max(1, concurrency or settings.embedding_batch_concurrency))
+    provider = LLMFactory.get_provider()
+
+    async def run_batch(offset: int) -> Tuple[int, List[Optional[List[float]]]]:
+        chunk = texts[offset:offset + batch_size]
+        async with semaphore:
+            try:
+                vectors = await provider.generate_embeddings_batch(chunk, model=model)
+            except Exception as e:
+                logger.error(f"❌ Lote de embeddings falhou ({offset}-{offset + len(chunk) - 1}): {e}")
+                return offset, [None] * len(chunk)
+
+        if len(vectors) != len(chunk):
+            logger.error(f"❌ Lote de embeddings incompleto: {len(vectors)}/{len(chunk)}")
+            return offset, [None] * len(chunk)
+
+        return offset, [
+            vector if vector and len(vector) == EMBEDDING_DIMENSIONS else None
+            for vector in vectors
+        ]
+
+    tasks = [
+        asyncio.create_task(run_batch(offset))
+        for offset in range(0, len(texts), batch_size)
+    ]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,242 @@
+"""
+EMBEDDING CACHE - Cache de embeddings por hash de conteúdo
+===========================================================
+
+A mesma mensagem do lead é embedada várias vezes por turno
+(RAG de FAQ + busca de imóveis + índice semântico do portal),
+e saudações/perguntas frequentes se repetem entre leads.
+
+Camadas:
+1. LRU em memória do processo (com TTL)
+2. Redis (opcional, compartilhado entre réplicas) via redis_service
+3. API de embeddings (miss)
+
+Chave: sha256(modelo + texto normalizado).
+Requisições concorrentes para o mesmo texto compartilham uma única
+chamada à API (single-flight).
+
+Uso: transparente via LLMFactory.get_provider().generate_embeddings().
+"""
+
+import array
+import asyncio
+import base64
+import hashlib
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from src.config import get_settings
+from .interface import LLMProvider
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+REDIS_KEY_PREFIX = "emb:"
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_embedding_text(text: str) -> str:
+    """Normaliza texto para a chave do cache (caixa e espaços)."""
+    return _WHITESPACE_RE.sub(" ", (text or "").strip()).lower()
+
+
+def embedding_cache_key(text: str, model: str) -> str:
+    """Chave de cache: hash do modelo + texto normalizado."""
+    digest = hashlib.sha256(f"{model}\n{normalize_embedding_text(text)}".encode("utf-8")).hexdigest()
+    return digest
+
+
+def _pack_vector(vector: List[float]) -> str:
+    """Serializa vetor como float32 em base64 (~4x menor que JSON)."""
+    return base64.b64encode(array.array("f", vector).tobytes()).decode("ascii")
+
+
+def _unpack_vector(payload: str) -> List[float]:
+    values = array.array("f")
+    values.frombytes(base64.b64decode(payload))
+    return values.tolist()
+
+
+class EmbeddingCache:
+    """LRU com TTL em memória + camada Redis opcional."""
+
+    def __init__(
+        self,
+        max_entries: int = 2048,
+        ttl_seconds: int = 86400,
+        use_redis: bool = True,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.use_redis = use_redis
+
+        self._entries: "OrderedDict[str, tuple[List[float], float]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+        self.hits_memory = 0
+        self.hits_redis = 0
+        self.misses = 0
+
+    # =========================================================================
+    # CAMADA LOCAL
+    # =========================================================================
+
+    def _get_local(self, key: str) -> Optional[List[float]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        vector, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return vector
+
+    def _set_local(self, key: str, vector: List[float]) -> None:
+        self._entries[key] = (vector, time.monotonic() + self.ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    # =========================================================================
+    # CAMADA REDIS
+    # =========================================================================
+
+    async def _get_redis(self, key: str) -> Optional[List[float]]:
+        if not self.use_redis:
+            return None
+        from src.infrastructure.services.redis_service import cache_get
+
+        payload = await cache_get(f"{REDIS_KEY_PREFIX}{key}")
+        if not payload:
+            return None
+        try:
+            return _unpack_vector(payload)
+        except Exception:
+            return None
+
+    async def _set_redis(self, key: str, vector: List[float]) -> None:
+        if not self.use_redis:
+            return
+        from src.infrastructure.services.redis_service import cache_set
+
+        await cache_set(f"{REDIS_KEY_PREFIX}{key}", _pack_vector(vector), ttl=self.ttl_seconds)
+
+    # =========================================================================
+    # API
+    # =========================================================================
+
+    async def get_or_compute(self, text: str, model: str, compute) -> List[float]:
+        """
+        Retorna o embedding do cache ou calcula com `compute()` (coroutine factory).
+        """
+        key = embedding_cache_key(text, model)
+
+        vector = self._get_local(key)
+        if vector is not None:
+            self.hits_memory += 1
+            return vector
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.hits_memory += 1
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            vector = await self._get_redis(key)
+            if vector is not None:
+                self.hits_redis += 1
+            else:
+                self.misses += 1
+                vector = await compute()
+                await self._set_redis(key, vector)
+
+            self._set_local(key, vector)
+            future.set_result(vector)
+            return vector
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # evita "exception was never retrieved"
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Métricas de hit-rate do cache."""
+        hits = self.hits_memory + self.hits_redis
+        total = hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits_memory": self.hits_memory,
+            "hits_redis": self.hits_redis,
+            "misses": self.misses,
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+        }
+
+
+class CachedEmbeddingProvider(LLMProvider):
+    """
+    Decorator de LLMProvider que cacheia generate_embeddings().
+    Demais métodos são delegados sem alteração.
+    """
+
+    def __init__(self, provider: LLMProvider, cache: EmbeddingCache):
+        self.provider = provider
+        self.embedding_cache = cache
+
+    def __getattr__(self, name: str):
+        # Atributos específicos do provider (client, default_model, ...)
+        return getattr(self.provider, name)
+
+    async def chat_completion(self, *args, **kwargs) -> Dict[str, Any]:
+        return await self.provider.chat_completion(*args, **kwargs)
+
+    async def transcribe(self, audio_file_path: str, prompt: Optional[str] = None) -> str:
+        return await self.provider.transcribe(audio_file_path, prompt=prompt)
+
+    async def analyze_image(self, image_url: str, prompt: str) -> str:
+        return await self.provider.analyze_image(image_url, prompt)
+
+    async def generate_embeddings(self, text: str, model: str = "text-embedding-3-small") -> List[float]:
+        return await self.embedding_cache.get_or_compute(
+            text,
+            model,
+            lambda: self.provider.generate_embeddings(text, model=model),
+        )
+
+    async def generate_embeddings_batch(
+        self, texts: List[str], model: str = "text-embedding-3-small"
+    ) -> List[List[float]]:
+        # Indexação em massa não passa pelo cache: os textos do catálogo
+        # raramente se repetem e expulsariam do LRU os embeddings de queries.
+        return await self.provider.generate_embeddings_batch(texts, model=model)
+
+
+_embedding_cache: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Cache global de embeddings (singleton do processo)."""
+    global _embedding_cache
+    if _embedding_cache is None:
+        _embedding_cache = EmbeddingCache(
+            max_entries=settings.embedding_cache_max_entries,
+            ttl_seconds=settings.embedding_cache_ttl_seconds,
+        )
+    return _embedding_cache
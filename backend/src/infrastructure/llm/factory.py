@@ -3,6 +3,7 @@ from typing import Optional
 from src.config import get_settings
 from .interface import LLMProvider
 from .openai_provider import OpenAIProvider
+from .embedding_cache import CachedEmbeddingProvider, get_embedding_cache
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -26,7 +27,8 @@ class LLMFactory:
         # Aqui poderíamos ler de settings.llm_provider
         if provider_type.lower() == "openai":
             logger.info("Inicializando OpenAI Provider")
-            LLMFactory._instance = OpenAIProvider()
+            # Embeddings passam pelo cache compartilhado (memória + Redis)
+            LLMFactory._instance = CachedEmbeddingProvider(OpenAIProvider(), get_embedding_cache())
             return LLMFactory._instance
         
         # Futuro: if provider_type == "anthropic": ...
@@ -37,6 +37,8 @@ class LLMProvider(ABC):
             Dict com:
             - 'content': str (resposta textual, pode ser None se tool_call)
             - 'tokens_used': int
+            - 'prompt_tokens': int (opcional)
+            - 'cached_tokens': int (opcional, tokens do prompt vindos do cache do provedor)
             - 'tool_calls': List[Dict] ou None (lista de chamadas de função)
             - 'finish_reason': str ("stop", "tool_calls", etc)
         """
@@ -60,6 +62,17 @@ class LLMProvider(ABC):
         """
         pass
 
+    async def generate_embeddings_batch(
+        self, texts: List[str], model: str = "text-embedding-3-small"
+    ) -> List[List[float]]:
+        """
+        Gera embeddings para vários textos (mesma ordem da entrada).
+
+        Implementação padrão: uma chamada por texto. Providers com
+        endpoint em lote devem sobrescrever.
+        """
+        return [await self.generate_embeddings(text, model=model) for text in texts]
+
     @abstractmethod
     async def analyze_image(self, image_url: str, prompt: str) -> str:
         """
@@ -54,10 +54,16 @@ class OpenAIProvider(LLMProvider):
             message = response.choices[0].message
             finish_reason = response.choices[0].finish_reason
 
+            # Tokens do prompt servidos pelo cache automático da OpenAI (prefixo idêntico)
+            usage = response.usage
+            prompt_details = getattr(usage, "prompt_tokens_details", None)
+
             # Monta resultado base
             result = {
                 "content": message.content or "",
-                "tokens_used": response.usage.total_tokens if response.usage else 0,
+                "tokens_used": usage.total_tokens if usage else 0,
+                "prompt_tokens": usage.prompt_tokens if usage else 0,
+                "cached_tokens": (getattr(prompt_details, "cached_tokens", 0) or 0) if prompt_details else 0,
                 "finish_reason": finish_reason,
                 "tool_calls": None,
             }
@@ -111,6 +117,24 @@ class OpenAIProvider(LLMProvider):
             logger.error(f"Erro ao gerar embeddings OpenAI: {e}")
             raise e
 
+    async def generate_embeddings_batch(
+        self, texts: List[str], model: str = "text-embedding-3-small"
+    ) -> List[List[float]]:
+        """Gera embeddings em lote (uma requisição para vários textos)."""
+        if not texts:
+            return []
+        try:
+            response = await self.client.embeddings.create(
+                input=texts,
+                model=model
+            )
+            # A API devolve um item por input, com o índice original
+            ordered = sorted(response.data, key=lambda item: item.index)
+            return [item.embedding for item in ordered]
+        except Exception as e:
+            logger.error(f"Erro ao gerar embeddings em lote OpenAI: {e}")
+            raise e
+
     async def analyze_image(self, image_url: str, prompt: str) -> str:
         """Analisa imagem usando GPT-4o Vision."""
         try:
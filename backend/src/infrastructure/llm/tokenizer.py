@@ -0,0 +1,53 @@
+"""
+TOKENIZER LOCAL
+===============
+
+Contagem de tokens sem chamar o provedor: usada para orçar o prompt
+(prefixo/sufixo) e o histórico da conversa.
+
+tiktoken se estiver instalado; senão, estimativa por caracteres.
+"""
+
+import logging
+import math
+from typing import Dict, Iterable
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 4  # Estimativa quando o tiktoken não está disponível
+TOKENIZER_ENCODING = "o200k_base"  # gpt-4o / gpt-4o-mini
+MESSAGE_OVERHEAD_TOKENS = 4  # Papel + delimitadores de cada mensagem do chat
+
+_encoding = None
+_encoding_loaded = False
+
+
+def _get_encoding():
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding(TOKENIZER_ENCODING)
+        except Exception as e:  # Não instalado ou sem o arquivo do encoding
+            logger.info(f"ℹ️ tiktoken indisponível, tokens serão estimados: {e}")
+    return _encoding
+
+
+def estimate_tokens(text: str) -> int:
+    """Tokens do texto (exato com tiktoken, senão ~4 caracteres por token)."""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def estimate_message_tokens(message: Dict) -> int:
+    """Tokens de uma mensagem do chat ({"role", "content"})."""
+    return estimate_tokens(message.get("content") or "") + MESSAGE_OVERHEAD_TOKENS
+
+
+def estimate_messages_tokens(messages: Iterable[Dict]) -> int:
+    return sum(estimate_message_tokens(message) for message in messages)
@@ -0,0 +1,25 @@
+"""
+Fila de entrada - webhooks processados por workers (Redis Streams ou memória)
+"""
+
+from .backends import (
+    QueueMessage,
+    RedisStreamQueue,
+    MemoryQueue,
+)
+from .worker_pool import (
+    InboundWorkerPool,
+    get_inbound_queue,
+    start_inbound_queue,
+    stop_inbound_queue,
+)
+
+__all__ = [
+    "QueueMessage",
+    "RedisStreamQueue",
+    "MemoryQueue",
+    "InboundWorkerPool",
+    "get_inbound_queue",
+    "start_inbound_queue",
+    "stop_inbound_queue",
+]
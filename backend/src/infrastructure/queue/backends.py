@@ -0,0 +1,243 @@
+"""
+BACKENDS DA FILA DE ENTRADA
+===========================
+
+- RedisStreamQueue: Redis Streams com consumer group (durável, várias
+  réplicas). Entregas não confirmadas de consumidores mortos são
+  reclamadas (XAUTOCLAIM) após o visibility timeout; as em andamento
+  têm o idle renovado (XCLAIM JUSTID) pelo consumidor que as processa.
+  Entregas com atraso (retries, envio agendado) ficam num ZSET até
+  vencerem.
+- MemoryQueue: substituto em memória para testes e ambiente sem Redis
+  (não sobrevive a restart).
+
+Os dois expõem a mesma interface, usada pelo InboundWorkerPool.
+"""
+
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+STREAM_KEY = "inbound:stream"
+DELAYED_KEY = "inbound:delayed"
+DEAD_LETTER_KEY = "inbound:dlq"
+GROUP_NAME = "inbound-workers"
+
+DEAD_LETTER_MAXLEN = 10_000
+
+
+@dataclass
+class QueueMessage:
+    """Job da fila de entrada."""
+
+    kind: str
+    payload: Dict[str, Any]
+    conversation_key: Optional[str] = None
+    attempts: int = 0
+    last_error: Optional[str] = None
+    job_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    enqueued_at: float = field(default_factory=time.time)
+
+    # Id da entrega no backend (para ack); não é serializado
+    delivery_id: Optional[str] = None
+
+    def dumps(self) -> str:
+        return json.dumps({
+            "kind": self.kind,
+            "payload": self.payload,
+            "conversation_key": self.conversation_key,
+            "attempts": self.attempts,
+            "last_error": self.last_error,
+            "job_id": self.job_id,
+            "enqueued_at": self.enqueued_at,
+        }, default=str)
+
+    @classmethod
+    def loads(cls, raw: str, delivery_id: Optional[str] = None) -> "QueueMessage":
+        data = json.loads(raw)
+        return cls(
+            kind=data["kind"],
+            payload=data.get("payload") or {},
+            conversation_key=data.get("conversation_key"),
+            attempts=int(data.get("attempts") or 0),
+            last_error=data.get("last_error"),
+            job_id=data.get("job_id") or uuid.uuid4().hex,
+            enqueued_at=float(data.get("enqueued_at") or time.time()),
+            delivery_id=delivery_id,
+        )
+
+
+# =============================================================================
+# REDIS STREAMS
+# =============================================================================
+
+# Move para o stream os jobs atrasados que já venceram
+_PROMOTE_DUE_SCRIPT = """
+local due = redis.call('zrangebyscore', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+for _, member in ipairs(due) do
+    redis.call('zrem', KEYS[1], member)
+    redis.call('xadd', KEYS[2], 'MAXLEN', '~', ARGV[3], '*', 'data', member)
+end
+return #due
+"""
+
+
+class RedisStreamQueue:
+    """Fila durável em Redis Streams (consumer group compartilhado entre réplicas)."""
+
+    name = "redis"
+
+    def __init__(self, redis, stream_maxlen: int = 100_000):
+        self.redis = redis
+        self.stream_maxlen = stream_maxlen
+
+    async def setup(self):
+        """Cria o consumer group (idempotente)."""
+        try:
+            await self.redis.xgroup_create(STREAM_KEY, GROUP_NAME, id="0", mkstream=True)
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def enqueue(self, message: QueueMessage, delay_seconds: float = 0) -> str:
+        if delay_seconds > 0:
+            await self.redis.zadd(DELAYED_KEY, {message.dumps(): time.time() + delay_seconds})
+            return message.job_id
+
+        await self.redis.xadd(
+            STREAM_KEY, {"data": message.dumps()},
+            maxlen=self.stream_maxlen, approximate=True,
+        )
+        return message.job_id
+
+    async def _parse(self, entries) -> List[QueueMessage]:
+        messages = []
+        for delivery_id, fields in entries:
+            try:
+                messages.append(QueueMessage.loads(fields["data"], delivery_id=delivery_id))
+            except (TypeError, ValueError, KeyError) as e:
+                # Entrada apagada ou corrompida: confirma para não voltar sempre
+                logger.error(f"❌ [Fila] Entrada inválida {delivery_id} descartada: {e}")
+                await self._discard(delivery_id)
+        return messages
+
+    async def _discard(self, delivery_id: str):
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.xack(STREAM_KEY, GROUP_NAME, delivery_id)
+            pipe.xdel(STREAM_KEY, delivery_id)
+            await pipe.execute()
+
+    async def read(self, consumer: str, count: int, block_ms: int) -> List[QueueMessage]:
+        response = await self.redis.xreadgroup(
+            GROUP_NAME, consumer, {STREAM_KEY: ">"}, count=count, block=block_ms,
+        )
+        messages = []
+        for _, entries in response or []:
+            messages.extend(await self._parse(entries))
+        return messages
+
+    async def claim_stale(self, consumer: str, min_idle_ms: int, count: int) -> List[QueueMessage]:
+        """Assume entregas pendentes de consumidores que pararam de responder."""
+        result = await self.redis.xautoclaim(
+            STREAM_KEY, GROUP_NAME, consumer, min_idle_time=min_idle_ms, start_id="0-0", count=count,
+        )
+        return await self._parse(result[1] if result else [])
+
+    async def touch(self, consumer: str, delivery_ids: List[str]):
+        """Zera o idle de entregas em andamento (sem contar nova entrega)."""
+        await self.redis.xclaim(
+            STREAM_KEY, GROUP_NAME, consumer, min_idle_time=0, message_ids=delivery_ids, justid=True,
+        )
+
+    async def ack(self, message: QueueMessage):
+        if message.delivery_id:
+            await self._discard(message.delivery_id)
+
+    async def dead_letter(self, message: QueueMessage):
+        await self.redis.xadd(
+            DEAD_LETTER_KEY, {"data": message.dumps()},
+            maxlen=DEAD_LETTER_MAXLEN, approximate=True,
+        )
+        await self.ack(message)
+
+    async def promote_due(self, limit: int = 100) -> int:
+        return int(await self.redis.eval(
+            _PROMOTE_DUE_SCRIPT, 2, DELAYED_KEY, STREAM_KEY, time.time(), limit, self.stream_maxlen,
+        ))
+
+    async def depth(self) -> Dict[str, int]:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.xlen(STREAM_KEY)
+            pipe.zcard(DELAYED_KEY)
+            pipe.xlen(DEAD_LETTER_KEY)
+            ready, delayed, dead = await pipe.execute()
+        return {"ready": ready, "delayed": delayed, "dead_letter": dead}
+
+
+# =============================================================================
+# MEMÓRIA (TESTES / SEM REDIS)
+# =============================================================================
+
+class MemoryQueue:
+    """Fila em memória do processo, com a mesma interface da RedisStreamQueue."""
+
+    name = "memory"
+
+    def __init__(self):
+        self._ready: asyncio.Queue = asyncio.Queue()
+        self._delayed: List = []
+        self._sequence = itertools.count()
+        self.dead: List[QueueMessage] = []
+
+    async def setup(self):
+        return None
+
+    async def enqueue(self, message: QueueMessage, delay_seconds: float = 0) -> str:
+        if delay_seconds > 0:
+            heapq.heappush(self._delayed, (time.time() + delay_seconds, next(self._sequence), message))
+        else:
+            self._ready.put_nowait(message)
+        return message.job_id
+
+    async def read(self, consumer: str, count: int, block_ms: int) -> List[QueueMessage]:
+        try:
+            first = await asyncio.wait_for(self._ready.get(), timeout=block_ms / 1000)
+        except asyncio.TimeoutError:
+            return []
+
+        messages = [first]
+        while len(messages) < count and not self._ready.empty():
+            messages.append(self._ready.get_nowait())
+        return messages
+
+    async def claim_stale(self, consumer: str, min_idle_ms: int, count: int) -> List[QueueMessage]:
+        return []
+
+    async def touch(self, consumer: str, delivery_ids: List[str]):
+        return None
+
+    async def ack(self, message: QueueMessage):
+        return None
+
+    async def dead_letter(self, message: QueueMessage):
+        self.dead.append(message)
+
+    async def promote_due(self, limit: int = 100) -> int:
+        now = time.time()
+        promoted = 0
+        while self._delayed and self._delayed[0][0] <= now and promoted < limit:
+            _, _, message = heapq.heappop(self._delayed)
+            self._ready.put_nowait(message)
+            promoted += 1
+        return promoted
+
+    async def depth(self) -> Dict[str, int]:
+        return {"ready": self._ready.qsize(), "delayed": len(self._delayed), "dead_letter": len(self.dead)}
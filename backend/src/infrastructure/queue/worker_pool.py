@@ -0,0 +1,344 @@
+"""
+WORKER POOL DA FILA DE ENTRADA
+==============================
+
+Consome a fila de entrada (webhooks → processamento → envio) fora do
+ciclo da requisição HTTP.
+
+- N workers por processo (inbound_queue_workers); o leitor só busca
+  novos jobs quando há worker livre
+- Jobs da mesma conversa rodam em sequência dentro do processo, na ordem
+  em que foram lidos (entre réplicas, a ordem é garantida pelo
+  conversation_lock dos handlers)
+- Falha → retry com backoff exponencial (reenfileirado com atraso)
+- Estourou inbound_queue_max_attempts → dead-letter queue
+- Entregas com atraso (retries, envio da resposta após o "digitando")
+  são promovidas para a fila quando vencem
+- Entregas em andamento (inclusive as que aguardam a anterior da
+  conversa) têm o idle renovado periodicamente e nunca são reclamadas
+  pelo próprio processo: só um consumidor parado perde seus jobs
+
+Handlers são registrados por tipo de job:
+    queue.register_handler("zapi.message", handle_zapi_message)
+"""
+
+import asyncio
+import logging
+import os
+import random
+import socket
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from src.config import get_settings
+
+from .backends import MemoryQueue, QueueMessage, RedisStreamQueue
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[QueueMessage], Awaitable[Any]]
+
+READ_BLOCK_MS = 1000
+PROMOTE_INTERVAL_SECONDS = 0.5
+CLAIM_INTERVAL_SECONDS = 30
+MAX_RETRY_DELAY_SECONDS = 300
+
+
+class InboundWorkerPool:
+    """Pool de workers asyncio sobre um backend de fila (Redis Streams ou memória)."""
+
+    def __init__(
+        self,
+        workers: int = 8,
+        max_attempts: int = 5,
+        retry_base_seconds: float = 2.0,
+        visibility_timeout_seconds: float = 120,
+    ):
+        self.workers = max(1, workers)
+        self.max_attempts = max(1, max_attempts)
+        self.retry_base_seconds = retry_base_seconds
+        self.visibility_timeout_seconds = visibility_timeout_seconds
+        self.consumer = f"{socket.gethostname()}-{os.getpid()}"
+
+        self.backend = None
+        self.handlers: Dict[str, Handler] = {}
+        self.running = False
+
+        self._loops: Set[asyncio.Task] = set()
+        self._jobs: Set[asyncio.Task] = set()
+        # conversa -> último job despachado (encadeamento em ordem)
+        self._chains: Dict[str, asyncio.Task] = {}
+        # Entregas despachadas e ainda não confirmadas (delivery_id)
+        self._in_flight: Set[str] = set()
+        self._slot_free = asyncio.Event()
+
+        self.stats: Dict[str, int] = {
+            "enqueued": 0,
+            "processed": 0,
+            "retried": 0,
+            "dead_lettered": 0,
+            "reclaimed": 0,
+        }
+
+    # =========================================================================
+    # REGISTRO / ENFILEIRAMENTO
+    # =========================================================================
+
+    def register_handler(self, kind: str, handler: Handler):
+        self.handlers[kind] = handler
+        logger.info(f"📬 Handler registrado na fila de entrada: {kind}")
+
+    async def enqueue(
+        self,
+        kind: str,
+        payload: Dict[str, Any],
+        conversation_key: Optional[str] = None,
+        delay_seconds: float = 0,
+    ) -> str:
+        """Enfileira um job. Devolve o job_id."""
+        if self.backend is None:
+            raise RuntimeError("Fila de entrada não iniciada")
+
+        message = QueueMessage(kind=kind, payload=payload, conversation_key=conversation_key)
+        job_id = await self.backend.enqueue(message, delay_seconds=delay_seconds)
+        self.stats["enqueued"] += 1
+        return job_id
+
+    # =========================================================================
+    # CICLO DE VIDA
+    # =========================================================================
+
+    async def start(self, backend=None):
+        """
+        Inicia leitor e manutenção. Sem backend explícito, usa Redis Streams
+        quando disponível e a fila em memória caso contrário.
+        """
+        if self.running:
+            return
+
+        if backend is None:
+            from src.infrastructure.services.redis_service import get_redis
+
+            redis = await get_redis()
+            if redis is not None:
+                backend = RedisStreamQueue(redis, stream_maxlen=settings.inbound_queue_stream_maxlen)
+            else:
+                logger.warning("⚠️ Redis indisponível: fila de entrada em memória (não durável)")
+                backend = MemoryQueue()
+
+        await backend.setup()
+        self.backend = backend
+        self.running = True
+
+        for loop in (self._reader_loop(), self._maintenance_loop()):
+            task = asyncio.create_task(loop, name="inbound-queue")
+            self._loops.add(task)
+
+        logger.info(f"🚀 Fila de entrada iniciada ({backend.name}, {self.workers} workers)")
+
+    async def stop(self, timeout: float = 10.0):
+        """Para de ler e aguarda (até `timeout`) os jobs em andamento."""
+        if not self.running:
+            return
+
+        self.running = False
+        loops = list(self._loops)
+        self._loops.clear()
+        for task in loops:
+            task.cancel()
+        await asyncio.gather(*loops, return_exceptions=True)
+
+        jobs = list(self._jobs)
+        if jobs:
+            _, pending = await asyncio.wait(jobs, timeout=timeout)
+            # Não confirmados: outra réplica reclama após o visibility timeout
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        logger.info("🛑 Fila de entrada parada")
+
+    async def get_status(self) -> Dict[str, Any]:
+        depth = {}
+        if self.backend is not None:
+            try:
+                depth = await self.backend.depth()
+            except Exception as e:
+                depth = {"error": str(e)}
+
+        return {
+            "running": self.running,
+            "backend": self.backend.name if self.backend else None,
+            "workers": self.workers,
+            "in_flight": len(self._jobs),
+            "consumer": self.consumer,
+            "depth": depth,
+            **self.stats,
+        }
+
+    # =========================================================================
+    # LOOPS
+    # =========================================================================
+
+    async def _reader_loop(self):
+        while self.running:
+            try:
+                free = self.workers - len(self._jobs)
+                if free <= 0:
+                    self._slot_free.clear()
+                    await self._slot_free.wait()
+                    continue
+
+                messages = await self.backend.read(self.consumer, count=free, block_ms=READ_BLOCK_MS)
+                for message in messages:
+                    self._dispatch(message)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Erro lendo fila de entrada: {e}", exc_info=True)
+                await asyncio.sleep(1)
+
+    async def _maintenance_loop(self):
+        # Renova antes de o visibility timeout vencer, mesmo se configurado baixo
+        claim_interval = min(CLAIM_INTERVAL_SECONDS, self.visibility_timeout_seconds / 3)
+        last_claim = 0.0
+        while self.running:
+            try:
+                await self.backend.promote_due()
+
+                now = time.monotonic()
+                if now - last_claim >= claim_interval:
+                    last_claim = now
+                    if self._in_flight:
+                        # Jobs longos (áudio, visão, lock da conversa) continuam nossos
+                        await self.backend.touch(self.consumer, list(self._in_flight))
+
+                    stale = await self.backend.claim_stale(
+                        self.consumer,
+                        min_idle_ms=int(self.visibility_timeout_seconds * 1000),
+                        count=self.workers,
+                    )
+                    for message in stale:
+                        if message.delivery_id in self._in_flight:
+                            continue
+                        self.stats["reclaimed"] += 1
+                        logger.warning(f"♻️ Job {message.job_id} ({message.kind}) reclamado de consumidor parado")
+                        self._dispatch(message)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Erro na manutenção da fila de entrada: {e}", exc_info=True)
+
+            await asyncio.sleep(PROMOTE_INTERVAL_SECONDS)
+
+    # =========================================================================
+    # EXECUÇÃO
+    # =========================================================================
+
+    def _dispatch(self, message: QueueMessage) -> asyncio.Task:
+        key = message.conversation_key
+        previous = self._chains.get(key) if key else None
+
+        delivery = message.delivery_id
+        if delivery:
+            self._in_flight.add(delivery)
+
+        task = asyncio.create_task(self._run(message, previous), name=f"inbound:{message.kind}")
+        self._jobs.add(task)
+        task.add_done_callback(self._on_done)
+        if delivery:
+            task.add_done_callback(lambda t, d=delivery: self._in_flight.discard(d))
+
+        if key:
+            self._chains[key] = task
+            task.add_done_callback(lambda t, k=key: self._chains.pop(k, None) if self._chains.get(k) is t else None)
+        return task
+
+    def _on_done(self, task: asyncio.Task):
+        self._jobs.discard(task)
+        self._slot_free.set()
+
+    async def _run(self, message: QueueMessage, previous: Optional[asyncio.Task]):
+        if previous is not None:
+            # Aguarda o job anterior da mesma conversa (sucesso ou falha)
+            await asyncio.wait([previous])
+
+        handler = self.handlers.get(message.kind)
+        if handler is None:
+            message.last_error = f"Sem handler para {message.kind}"
+            logger.error(f"❌ {message.last_error}, enviando para dead-letter")
+            await self.backend.dead_letter(message)
+            self.stats["dead_lettered"] += 1
+            return
+
+        try:
+            await handler(message)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await self._handle_failure(message, e)
+            return
+
+        await self.backend.ack(message)
+        self.stats["processed"] += 1
+
+    async def _handle_failure(self, message: QueueMessage, error: Exception):
+        message.attempts += 1
+        message.last_error = f"{type(error).__name__}: {error}"
+
+        if message.attempts >= self.max_attempts:
+            logger.error(
+                f"☠️ Job {message.job_id} ({message.kind}) falhou {message.attempts}x, "
+                f"enviando para dead-letter: {message.last_error}"
+            )
+            await self.backend.dead_letter(message)
+            self.stats["dead_lettered"] += 1
+            return
+
+        delay = min(self.retry_base_seconds * 2 ** (message.attempts - 1), MAX_RETRY_DELAY_SECONDS)
+        delay += random.uniform(0, delay * 0.1)
+        logger.warning(
+            f"🔁 Job {message.job_id} ({message.kind}) falhou (tentativa {message.attempts}), "
+            f"retry em {delay:.1f}s: {message.last_error}"
+        )
+
+        delivery = message.delivery_id
+        message.delivery_id = None
+        await self.backend.enqueue(message, delay_seconds=delay)
+        message.delivery_id = delivery
+        await self.backend.ack(message)
+        self.stats["retried"] += 1
+
+
+# =============================================================================
+# SINGLETON
+# =============================================================================
+
+_inbound_queue: Optional[InboundWorkerPool] = None
+
+
+def get_inbound_queue() -> InboundWorkerPool:
+    """Retorna a fila de entrada do processo."""
+    global _inbound_queue
+    if _inbound_queue is None:
+        _inbound_queue = InboundWorkerPool(
+            workers=settings.inbound_queue_workers,
+            max_attempts=settings.inbound_queue_max_attempts,
+            retry_base_seconds=settings.inbound_queue_retry_base_seconds,
+            visibility_timeout_seconds=settings.inbound_queue_visibility_timeout_seconds,
+        )
+    return _inbound_queue
+
+
+async def start_inbound_queue(backend=None) -> InboundWorkerPool:
+    queue = get_inbound_queue()
+    await queue.start(backend)
+    return queue
+
+
+async def stop_inbound_queue():
+    if _inbound_queue is not None:
+        await _inbound_queue.stop()
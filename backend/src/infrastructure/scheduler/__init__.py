@@ -1,9 +1,12 @@
 """
-Scheduler de Jobs - Versão Nativa (sem APScheduler)
+Scheduler de Jobs - asyncio nativo (roda no event loop da aplicação)
 """
 
 from .scheduler import (
-    SimpleScheduler,
+    AsyncScheduler,
+    ScheduledJob,
+    MISSED_RUN_ONCE,
+    MISSED_RUN_SKIP,
     get_scheduler,
     create_scheduler,
     start_scheduler,
@@ -11,13 +14,19 @@ from .scheduler import (
     get_scheduler_status,
     run_job_now,
 )
+from .triggers import IntervalTrigger, CronTrigger
 
 __all__ = [
-    "SimpleScheduler",
+    "AsyncScheduler",
+    "ScheduledJob",
+    "MISSED_RUN_ONCE",
+    "MISSED_RUN_SKIP",
+    "IntervalTrigger",
+    "CronTrigger",
     "get_scheduler",
     "create_scheduler",
     "start_scheduler",
     "stop_scheduler",
     "get_scheduler_status",
     "run_job_now",
-]
\ No newline at end of file
+]
@@ -1,167 +1,430 @@
 """
-SCHEDULER NATIVO - SEM DEPENDÊNCIAS EXTERNAS
-=============================================
+SCHEDULER ASYNCIO - JOBS NO EVENT LOOP DA APLICAÇÃO
+===================================================
 
-Usa apenas threading e asyncio do Python.
-Não precisa do APScheduler!
+Roda dentro do loop do FastAPI (sem thread e sem event loop por job),
+então os jobs compartilham o pool do engine do banco e a conexão Redis.
 
-ÚLTIMA ATUALIZAÇÃO: 2025-12-26
+Recursos:
+- Triggers por intervalo ou cron (ver triggers.py)
+- Limite de execuções simultâneas por job (max_instances)
+- Jitter: atraso aleatório para espalhar carga entre réplicas
+- Política de execução perdida (deploy, loop travado):
+    "run_once" → execuções perdidas viram uma única execução imediata
+    "skip"     → ignora as perdidas e espera o próximo horário
+- Lock de líder no Redis: com várias réplicas, só uma executa cada
+  ocorrência do job (o último disparo também fica no Redis)
+- Métricas de duração por job (status + increment_metric no Redis)
+
+Jobs lentos não bloqueiam os demais: cada job tem seu próprio loop
+e cada execução roda em uma task separada.
 """
 
 import asyncio
-import threading
 import logging
-from datetime import datetime
-from typing import Callable, Optional
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional, Set, Tuple, Union
+
 import pytz
 
+from .triggers import CronTrigger, IntervalTrigger
+
 logger = logging.getLogger(__name__)
 
-# ============================================
-# SCHEDULER SIMPLES
-# ============================================
+Trigger = Union[IntervalTrigger, CronTrigger]
+
+MISSED_RUN_ONCE = "run_once"
+MISSED_RUN_SKIP = "skip"
+
+LAST_FIRE_KEY = "scheduler:last_fire:{job_id}"
+LAST_FIRE_TTL_SECONDS = 30 * 24 * 3600
+
+# Limite de ocorrências percorridas ao recuperar execuções perdidas
+MAX_CATCH_UP_STEPS = 100_000
+
+
+@dataclass
+class ScheduledJob:
+    """Configuração e estado de um job agendado."""
+
+    job_id: str
+    func: Callable
+    trigger: Trigger
+    max_instances: int = 1
+    jitter_seconds: float = 0
+    missed_run_policy: str = MISSED_RUN_ONCE
+    misfire_grace_seconds: float = 60
+    run_immediately: bool = False
+    lock_ttl_seconds: float = 300
+
+    # Estado
+    last_fire: Optional[datetime] = None
+    next_run: Optional[datetime] = None
+    last_run: Optional[datetime] = None
+    running: int = 0
+
+    # Métricas
+    runs: int = 0
+    failures: int = 0
+    skipped: int = 0
+    missed: int = 0
+    last_status: Optional[str] = None
+    last_error: Optional[str] = None
+    last_duration: Optional[float] = None
+    total_duration: float = 0.0
+    max_duration: float = 0.0
+
+
+class AsyncScheduler:
+    """Scheduler asyncio com lock distribuído por job."""
 
-class SimpleScheduler:
-    """Scheduler simples usando threading nativo."""
-    
     def __init__(self, timezone: str = "America/Sao_Paulo"):
         self.timezone = pytz.timezone(timezone)
         self.running = False
-        self.thread: Optional[threading.Thread] = None
-        self.jobs: dict[str, dict] = {}
-        self._stop_event = threading.Event()
-    
+        self.jobs: Dict[str, ScheduledJob] = {}
+        self._loops: Dict[str, asyncio.Task] = {}
+        self._executions: Set[asyncio.Task] = set()
+
+    def _now(self) -> datetime:
+        return datetime.now(self.timezone)
+
+    # =========================================================================
+    # REGISTRO
+    # =========================================================================
+
     def add_job(
         self,
         job_id: str,
         func: Callable,
-        interval_minutes: int = 60,
-        run_immediately: bool = False
-    ):
-        """Adiciona um job ao scheduler."""
-        self.jobs[job_id] = {
-            "func": func,
-            "interval_minutes": interval_minutes,
-            "last_run": None,
-            "run_immediately": run_immediately,
-        }
-        print(f"📅 Job registrado: {job_id} (a cada {interval_minutes} minutos)")
-    
+        interval_minutes: Optional[float] = None,
+        cron: Optional[str] = None,
+        trigger: Optional[Trigger] = None,
+        max_instances: int = 1,
+        jitter_seconds: float = 0,
+        missed_run_policy: str = MISSED_RUN_ONCE,
+        misfire_grace_seconds: float = 60,
+        run_immediately: bool = False,
+        lock_ttl_seconds: float = 300,
+    ) -> ScheduledJob:
+        """
+        Adiciona um job. Informe `interval_minutes`, `cron` ou um `trigger` pronto.
+        """
+        if trigger is None:
+            if cron:
+                trigger = CronTrigger(cron, timezone=self.timezone.zone)
+            elif interval_minutes:
+                trigger = IntervalTrigger(minutes=interval_minutes)
+            else:
+                raise ValueError(f"Job {job_id} sem trigger (interval_minutes ou cron)")
+
+        if missed_run_policy not in (MISSED_RUN_ONCE, MISSED_RUN_SKIP):
+            raise ValueError(f"Política de execução perdida inválida: {missed_run_policy}")
+
+        job = ScheduledJob(
+            job_id=job_id,
+            func=func,
+            trigger=trigger,
+            max_instances=max(1, max_instances),
+            jitter_seconds=jitter_seconds,
+            missed_run_policy=missed_run_policy,
+            misfire_grace_seconds=misfire_grace_seconds,
+            run_immediately=run_immediately,
+            lock_ttl_seconds=lock_ttl_seconds,
+        )
+        self.jobs[job_id] = job
+        logger.info(f"📅 Job registrado: {job_id} ({trigger.describe()})")
+
+        if self.running:
+            self._loops[job_id] = asyncio.create_task(self._job_loop(job), name=f"scheduler:{job_id}")
+        return job
+
+    # =========================================================================
+    # CICLO DE VIDA
+    # =========================================================================
+
     def start(self):
-        """Inicia o scheduler em uma thread separada."""
+        """Inicia os loops dos jobs (chamar de dentro do event loop da aplicação)."""
         if self.running:
-            print("⚠️ Scheduler já está rodando")
+            logger.warning("⚠️ Scheduler já está rodando")
             return
-        
+
         self.running = True
-        self._stop_event.clear()
-        self.thread = threading.Thread(target=self._run_loop, daemon=True)
-        self.thread.start()
-        print("🚀 Scheduler nativo iniciado!")
-    
-    def stop(self):
-        """Para o scheduler."""
+        for job_id, job in self.jobs.items():
+            self._loops[job_id] = asyncio.create_task(self._job_loop(job), name=f"scheduler:{job_id}")
+        logger.info(f"🚀 Scheduler asyncio iniciado ({len(self.jobs)} jobs)")
+
+    async def stop(self, timeout: float = 10.0):
+        """Para de agendar e aguarda (até `timeout`) as execuções em andamento."""
         if not self.running:
             return
-        
+
         self.running = False
-        self._stop_event.set()
-        
-        if self.thread and self.thread.is_alive():
-            self.thread.join(timeout=5)
-        
-        print("🛑 Scheduler parado")
-    
-    def _run_loop(self):
-        """Loop principal do scheduler."""
-        print("🔄 Loop do scheduler iniciado")
-        
-        while not self._stop_event.is_set():
+        loops = list(self._loops.values())
+        self._loops.clear()
+        for task in loops:
+            task.cancel()
+        await asyncio.gather(*loops, return_exceptions=True)
+
+        executions = list(self._executions)
+        if executions:
+            _, pending = await asyncio.wait(executions, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        logger.info("🛑 Scheduler parado")
+
+    # =========================================================================
+    # AGENDAMENTO
+    # =========================================================================
+
+    async def _job_loop(self, job: ScheduledJob):
+        if job.run_immediately:
+            self._dispatch(job, self._now())
+
+        while self.running:
             try:
-                now = datetime.now(self.timezone)
-                
-                for job_id, job in self.jobs.items():
-                    should_run = False
-                    
-                    # Primeira execução
-                    if job["last_run"] is None:
-                        if job["run_immediately"]:
-                            should_run = True
-                        else:
-                            # Agenda para o próximo intervalo
-                            job["last_run"] = now
-                    else:
-                        # Verifica se passou o intervalo
-                        elapsed = (now - job["last_run"]).total_seconds() / 60
-                        if elapsed >= job["interval_minutes"]:
-                            should_run = True
-                    
-                    if should_run:
-                        print(f"⏰ Executando job: {job_id}")
-                        job["last_run"] = now
-                        
-                        try:
-                            # Executa a função (pode ser async ou sync)
-                            func = job["func"]
-                            if asyncio.iscoroutinefunction(func):
-                                # Cria novo event loop para executar async
-                                loop = asyncio.new_event_loop()
-                                asyncio.set_event_loop(loop)
-                                try:
-                                    loop.run_until_complete(func())
-                                finally:
-                                    loop.close()
-                            else:
-                                func()
-                            
-                            print(f"✅ Job {job_id} executado com sucesso")
-                        except Exception as e:
-                            print(f"❌ Erro no job {job_id}: {e}")
-                
-                # Aguarda 60 segundos antes de verificar novamente
-                self._stop_event.wait(60)
-                
+                fire_time = await self._next_fire_time(job)
+                job.next_run = fire_time
+
+                jitter = random.uniform(0, job.jitter_seconds) if job.jitter_seconds else 0.0
+                delay = (fire_time - self._now()).total_seconds() + jitter
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+                job.last_fire = fire_time
+                lateness = (self._now() - fire_time).total_seconds() - jitter
+                if lateness > job.misfire_grace_seconds and job.missed_run_policy == MISSED_RUN_SKIP:
+                    job.missed += 1
+                    logger.warning(f"⏭️ Job {job.job_id}: execução perdida ({lateness:.0f}s de atraso), pulando")
+                    continue
+
+                self._dispatch(job, fire_time)
+
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                print(f"❌ Erro no loop do scheduler: {e}")
-                self._stop_event.wait(60)
-    
-    def run_job_now(self, job_id: str) -> bool:
-        """Executa um job imediatamente."""
-        if job_id not in self.jobs:
-            print(f"❌ Job não encontrado: {job_id}")
+                logger.error(f"❌ Erro no loop do job {job.job_id}: {e}", exc_info=True)
+                await asyncio.sleep(60)
+
+    async def _next_fire_time(self, job: ScheduledJob) -> datetime:
+        """Próximo disparo, aplicando a política de execuções perdidas."""
+        now = self._now()
+
+        previous = job.last_fire
+        shared = await self._load_last_fire(job)
+        if shared and (previous is None or shared > previous):
+            previous = shared
+
+        next_time = job.trigger.next_fire_time(previous, now)
+        if next_time >= now - timedelta(seconds=job.misfire_grace_seconds):
+            return next_time
+
+        latest_missed, missed_count, upcoming = self._catch_up(job.trigger, next_time, now)
+        if job.missed_run_policy == MISSED_RUN_ONCE:
+            job.missed += missed_count - 1
+            logger.info(f"⏰ Job {job.job_id}: {missed_count} execução(ões) perdida(s), executando uma agora")
+            return latest_missed
+
+        job.missed += missed_count
+        logger.info(f"⏭️ Job {job.job_id}: {missed_count} execução(ões) perdida(s) ignorada(s)")
+        return upcoming
+
+    @staticmethod
+    def _catch_up(trigger: Trigger, first_missed: datetime, now: datetime) -> Tuple[datetime, int, datetime]:
+        """
+        Percorre as ocorrências perdidas.
+
+        Returns:
+            (última ocorrência perdida, quantidade perdida, próxima ocorrência futura)
+        """
+        latest, count = first_missed, 1
+        upcoming = trigger.next_fire_time(latest, now)
+        while upcoming <= now and count < MAX_CATCH_UP_STEPS:
+            latest, count = upcoming, count + 1
+            upcoming = trigger.next_fire_time(latest, now)
+
+        if upcoming <= now:
+            upcoming = trigger.next_fire_time(None, now)
+        return latest, count, upcoming
+
+    def _dispatch(self, job: ScheduledJob, fire_time: datetime, manual: bool = False) -> Optional[asyncio.Task]:
+        """Cria a task de execução, respeitando max_instances deste processo."""
+        if job.running >= job.max_instances:
+            job.skipped += 1
+            logger.warning(f"⏭️ Job {job.job_id} ainda em execução ({job.running}/{job.max_instances}), pulando")
+            return None
+
+        job.running += 1
+        task = asyncio.create_task(self._execute(job, fire_time, manual), name=f"job:{job.job_id}")
+        self._executions.add(task)
+        task.add_done_callback(self._executions.discard)
+        return task
+
+    # =========================================================================
+    # EXECUÇÃO
+    # =========================================================================
+
+    async def _execute(self, job: ScheduledJob, fire_time: datetime, manual: bool = False) -> bool:
+        from src.infrastructure.services.redis_service import acquire_lock, release_lock
+
+        try:
+            lock_key, token = await self._acquire_job_lock(job, acquire_lock)
+            if token is None:
+                job.skipped += 1
+                logger.info(f"🔒 Job {job.job_id} em execução em outra réplica, pulando")
+                return False
+
+            renewer = asyncio.create_task(self._renew_lock(job, lock_key, token))
+            try:
+                if not manual and await self._already_fired(job, fire_time):
+                    job.skipped += 1
+                    logger.info(f"🔒 Job {job.job_id}: ocorrência {fire_time.isoformat()} já executada por outra réplica")
+                    return False
+                if not manual:
+                    await self._store_last_fire(job, fire_time)
+
+                return await self._run(job)
+            finally:
+                renewer.cancel()
+                await release_lock(lock_key, token)
+        finally:
+            job.running -= 1
+
+    async def _acquire_job_lock(self, job: ScheduledJob, acquire_lock) -> Tuple[str, Optional[str]]:
+        """Um slot de lock por instância permitida (max_instances no cluster)."""
+        for slot in range(job.max_instances):
+            lock_key = f"scheduler:{job.job_id}:{slot}"
+            token = await acquire_lock(lock_key, job.lock_ttl_seconds)
+            if token is not None:
+                return lock_key, token
+        return "", None
+
+    async def _renew_lock(self, job: ScheduledJob, lock_key: str, token: str):
+        from src.infrastructure.services.redis_service import extend_lock
+
+        interval = max(1.0, job.lock_ttl_seconds / 3)
+        while True:
+            await asyncio.sleep(interval)
+            if not await extend_lock(lock_key, token, job.lock_ttl_seconds):
+                logger.warning(f"⚠️ Job {job.job_id}: lock perdido durante a execução")
+                return
+
+    async def _already_fired(self, job: ScheduledJob, fire_time: datetime) -> bool:
+        """Outra réplica já executou esta ocorrência (ou uma posterior)?"""
+        shared = await self._load_last_fire(job)
+        if shared is None:
             return False
-        
-        job = self.jobs[job_id]
-        print(f"🚀 Executando job manualmente: {job_id}")
-        
+        if job.trigger.next_fire_time(shared, self._now()) > fire_time:
+            job.last_fire = max(shared, job.last_fire or shared)
+            return True
+        return False
+
+    async def _run(self, job: ScheduledJob) -> bool:
+        from src.infrastructure.services.redis_service import increment_metric
+
+        logger.info(f"⏰ Executando job: {job.job_id}")
+        job.last_run = self._now()
+        started = time.perf_counter()
         try:
-            func = job["func"]
-            if asyncio.iscoroutinefunction(func):
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                try:
-                    loop.run_until_complete(func())
-                finally:
-                    loop.close()
+            if asyncio.iscoroutinefunction(job.func):
+                await job.func()
             else:
-                func()
-            
-            job["last_run"] = datetime.now(self.timezone)
-            print(f"✅ Job {job_id} executado manualmente com sucesso")
-            return True
+                await asyncio.to_thread(job.func)
+            status = "success"
+            job.last_error = None
+        except asyncio.CancelledError:
+            status = "cancelled"
+            raise
         except Exception as e:
-            print(f"❌ Erro ao executar job {job_id}: {e}")
+            status = "error"
+            job.failures += 1
+            job.last_error = str(e)
+            logger.error(f"❌ Erro no job {job.job_id}: {e}", exc_info=True)
+        finally:
+            duration = time.perf_counter() - started
+            job.runs += 1
+            job.last_status = status
+            job.last_duration = duration
+            job.total_duration += duration
+            job.max_duration = max(job.max_duration, duration)
+            if status != "cancelled":
+                await increment_metric("scheduler_job_runs", {"job": job.job_id, "status": status})
+
+        logger.info(f"✅ Job {job.job_id} finalizado ({status}) em {duration:.1f}s")
+        return status == "success"
+
+    # =========================================================================
+    # ÚLTIMO DISPARO (compartilhado entre réplicas)
+    # =========================================================================
+
+    async def _load_last_fire(self, job: ScheduledJob) -> Optional[datetime]:
+        from src.infrastructure.services.redis_service import cache_get
+
+        value = await cache_get(LAST_FIRE_KEY.format(job_id=job.job_id))
+        if not value:
+            return None
+        try:
+            return datetime.fromisoformat(value).astimezone(self.timezone)
+        except ValueError:
+            return None
+
+    async def _store_last_fire(self, job: ScheduledJob, fire_time: datetime):
+        from src.infrastructure.services.redis_service import cache_set
+
+        await cache_set(
+            LAST_FIRE_KEY.format(job_id=job.job_id),
+            fire_time.isoformat(),
+            ttl=LAST_FIRE_TTL_SECONDS,
+        )
+
+    # =========================================================================
+    # API
+    # =========================================================================
+
+    async def run_job_now(self, job_id: str) -> bool:
+        """Executa um job imediatamente (ainda respeitando locks e max_instances)."""
+        job = self.jobs.get(job_id)
+        if job is None:
+            logger.error(f"❌ Job não encontrado: {job_id}")
+            return False
+
+        logger.info(f"🚀 Executando job manualmente: {job_id}")
+        task = self._dispatch(job, self._now(), manual=True)
+        if task is None:
             return False
-    
+        return await asyncio.shield(task)
+
     def get_status(self) -> dict:
-        """Retorna status do scheduler."""
+        """Retorna status e métricas de duração dos jobs."""
         jobs_status = {}
         for job_id, job in self.jobs.items():
+            trigger = job.trigger
             jobs_status[job_id] = {
-                "interval_minutes": job["interval_minutes"],
-                "last_run": job["last_run"].isoformat() if job["last_run"] else None,
+                "trigger": trigger.describe(),
+                "interval_minutes": (
+                    trigger.interval.total_seconds() / 60 if isinstance(trigger, IntervalTrigger) else None
+                ),
+                "cron": trigger.expression if isinstance(trigger, CronTrigger) else None,
+                "max_instances": job.max_instances,
+                "missed_run_policy": job.missed_run_policy,
+                "last_run": job.last_run.isoformat() if job.last_run else None,
+                "next_run": job.next_run.isoformat() if job.next_run else None,
+                "running": job.running,
+                "runs": job.runs,
+                "failures": job.failures,
+                "skipped": job.skipped,
+                "missed": job.missed,
+                "last_status": job.last_status,
+                "last_error": job.last_error,
+                "last_duration_seconds": round(job.last_duration, 3) if job.last_duration is not None else None,
+                "avg_duration_seconds": round(job.total_duration / job.runs, 3) if job.runs else None,
+                "max_duration_seconds": round(job.max_duration, 3) if job.runs else None,
             }
-        
+
         return {
             "running": self.running,
             "timezone": str(self.timezone),
@@ -173,14 +436,14 @@ class SimpleScheduler:
 # INSTÂNCIA GLOBAL
 # ============================================
 
-_scheduler: Optional[SimpleScheduler] = None
+_scheduler: Optional[AsyncScheduler] = None
 
 
-def get_scheduler() -> SimpleScheduler:
+def get_scheduler() -> AsyncScheduler:
     """Retorna a instância do scheduler."""
     global _scheduler
     if _scheduler is None:
-        _scheduler = SimpleScheduler()
+        _scheduler = AsyncScheduler()
     return _scheduler
 
 
@@ -189,49 +452,80 @@ def create_scheduler():
     from src.infrastructure.jobs.follow_up_service import run_follow_up_job
     from src.infrastructure.jobs.phoenix_engine_service import run_phoenix_engine_job
     from src.infrastructure.jobs.morning_briefing_job import run_morning_briefing_job
-
-    print("🔧 Criando scheduler nativo...")
+    from src.infrastructure.services.tenant_stats_service import run_metrics_reconcile_job
+    from src.infrastructure.services.search_service import run_search_backfill_job
+    from src.infrastructure.services.inbox_state_service import run_lead_message_state_reconcile_job
 
     scheduler = get_scheduler()
 
-    # Registra o job de follow-up (a cada 60 minutos)
+    # Follow-up: a cada 60 minutos; após deploy/queda executa uma vez
     scheduler.add_job(
         job_id="follow_up_job",
         func=run_follow_up_job,
         interval_minutes=60,
-        run_immediately=False,
+        jitter_seconds=30,
+        missed_run_policy=MISSED_RUN_ONCE,
     )
 
-    # Registra o job do Phoenix Engine (a cada 24 horas / 1440 minutos)
+    # Phoenix Engine: uma vez por dia, em horário comercial
     scheduler.add_job(
         job_id="phoenix_engine_job",
         func=run_phoenix_engine_job,
-        interval_minutes=1440,  # Uma vez por dia
-        run_immediately=False,
+        cron="0 10 * * *",
+        missed_run_policy=MISSED_RUN_SKIP,
+        lock_ttl_seconds=600,
     )
 
-    # Registra o job de Morning Briefing (verifica a cada 60 minutos, executa apenas às 08:00)
+    # Morning Briefing: toda hora cheia (o job filtra pelo horário de cada tenant)
     scheduler.add_job(
         job_id="morning_briefing_job",
         func=run_morning_briefing_job,
-        interval_minutes=60,  # Verifica a cada hora
-        run_immediately=False,  # Não executa imediatamente, aguarda horário correto
+        cron="0 * * * *",
+        missed_run_policy=MISSED_RUN_SKIP,
+    )
+
+    # Contadores de mensagens dos leads: antes das métricas (leads engajados usam user_message_count)
+    scheduler.add_job(
+        job_id="lead_message_state_reconcile_job",
+        func=run_lead_message_state_reconcile_job,
+        cron="0 3 * * *",
+        missed_run_policy=MISSED_RUN_SKIP,
+        lock_ttl_seconds=1800,
+    )
+
+    # Reconciliação dos rollups de métricas: de madrugada, fora do pico
+    scheduler.add_job(
+        job_id="metrics_reconcile_job",
+        func=run_metrics_reconcile_job,
+        cron="30 3 * * *",
+        missed_run_policy=MISSED_RUN_SKIP,
+        lock_ttl_seconds=900,
+    )
+
+    # Backfill da busca: indexa mensagens sem search_vector (histórico e escritas via Core)
+    scheduler.add_job(
+        job_id="search_backfill_job",
+        func=run_search_backfill_job,
+        interval_minutes=30,
+        missed_run_policy=MISSED_RUN_SKIP,
+        run_immediately=True,
+        lock_ttl_seconds=900,
     )
 
-    print("✅ Scheduler configurado com 3 jobs!")
+    logger.info(f"✅ Scheduler configurado com {len(scheduler.jobs)} jobs")
     return scheduler
 
 
 def start_scheduler():
-    """Inicia o scheduler."""
+    """Inicia o scheduler (dentro do event loop da aplicação)."""
     scheduler = get_scheduler()
     scheduler.start()
 
 
-def stop_scheduler():
-    """Para o scheduler."""
+async def stop_scheduler():
+    """Para o scheduler aguardando execuções em andamento."""
     scheduler = get_scheduler()
-    scheduler.stop()
+    await scheduler.stop()
 
 
 def get_scheduler_status() -> dict:
@@ -243,4 +537,4 @@ def get_scheduler_status() -> dict:
 async def run_job_now(job_id: str) -> bool:
     """Executa um job manualmente."""
     scheduler = get_scheduler()
-    return scheduler.run_job_now(job_id)
\ No newline at end of file
+    return await scheduler.run_job_now(job_id)
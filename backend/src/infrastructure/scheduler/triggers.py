@@ -0,0 +1,124 @@
+"""
+TRIGGERS DO SCHEDULER
+=====================
+
+- IntervalTrigger: a cada N segundos/minutos
+- CronTrigger: expressão cron de 5 campos (minuto hora dia mês dia-da-semana)
+
+Cron suportado: "*", "*/n", "a", "a-b", "a-b/n" e listas "a,b,c".
+Dia da semana: 0-6 (0 = domingo; 7 também é domingo).
+Como no cron clássico, se dia do mês E dia da semana forem restritos,
+basta um dos dois bater.
+"""
+
+from datetime import datetime, timedelta
+from typing import Optional, Set
+
+import pytz
+
+
+class IntervalTrigger:
+    """Dispara a cada intervalo fixo."""
+
+    def __init__(self, minutes: float = 0, seconds: float = 0):
+        self.interval = timedelta(minutes=minutes, seconds=seconds)
+        if self.interval.total_seconds() <= 0:
+            raise ValueError("Intervalo deve ser positivo")
+
+    def next_fire_time(self, previous: Optional[datetime], now: datetime) -> datetime:
+        """Próximo disparo após `previous` (ou a partir de agora, se nunca rodou)."""
+        if previous is None:
+            return now + self.interval
+        return previous + self.interval
+
+    def describe(self) -> str:
+        return f"interval[{self.interval.total_seconds():g}s]"
+
+
+class CronTrigger:
+    """Dispara conforme expressão cron, no timezone informado."""
+
+    FIELD_RANGES = [
+        (0, 59),  # minuto
+        (0, 23),  # hora
+        (1, 31),  # dia do mês
+        (1, 12),  # mês
+        (0, 6),   # dia da semana
+    ]
+
+    def __init__(self, expression: str, timezone: str = "America/Sao_Paulo"):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"Expressão cron inválida (esperado 5 campos): {expression}")
+
+        self.expression = expression
+        self.timezone = pytz.timezone(timezone)
+
+        fields = [self._parse_field(part, low, high) for part, (low, high) in zip(parts, self.FIELD_RANGES[:4])]
+        self.minutes, self.hours, self.days, self.months = fields
+        self.weekdays = {day % 7 for day in self._parse_field(parts[4], 0, 7)}
+
+        self._dom_restricted = parts[2] != "*"
+        self._dow_restricted = parts[4] != "*"
+
+    @staticmethod
+    def _parse_field(field: str, low: int, high: int) -> Set[int]:
+        values: Set[int] = set()
+        for chunk in field.split(","):
+            step = 1
+            if "/" in chunk:
+                chunk, step_str = chunk.split("/", 1)
+                step = int(step_str)
+                if step <= 0:
+                    raise ValueError(f"Passo inválido no cron: {field}")
+
+            if chunk == "*":
+                start, end = low, high
+            elif "-" in chunk:
+                start_str, end_str = chunk.split("-", 1)
+                start, end = int(start_str), int(end_str)
+            else:
+                start = int(chunk)
+                end = high if step > 1 else start
+
+            if start < low or end > high or start > end:
+                raise ValueError(f"Valor fora do intervalo no cron: {field}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, moment: datetime) -> bool:
+        dom_ok = moment.day in self.days
+        dow_ok = (moment.weekday() + 1) % 7 in self.weekdays  # Python: segunda=0
+        if self._dom_restricted and self._dow_restricted:
+            return dom_ok or dow_ok
+        return dom_ok and dow_ok
+
+    def next_fire_time(self, previous: Optional[datetime], now: datetime) -> datetime:
+        """Primeiro horário que casa com a expressão, estritamente após `previous` (ou `now`)."""
+        reference = previous or now
+        local = reference.astimezone(self.timezone).replace(tzinfo=None)
+        candidate = local.replace(second=0, microsecond=0) + timedelta(minutes=1)
+
+        # Limite de segurança: ~5 anos (expressões como 30 de fevereiro nunca casam)
+        limit = candidate + timedelta(days=366 * 5)
+        while candidate <= limit:
+            if candidate.month not in self.months:
+                year = candidate.year + (candidate.month // 12)
+                month = candidate.month % 12 + 1
+                candidate = candidate.replace(year=year, month=month, day=1, hour=0, minute=0)
+                continue
+            if not self._day_matches(candidate):
+                candidate = (candidate + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+            if candidate.hour not in self.hours:
+                candidate = (candidate + timedelta(hours=1)).replace(minute=0)
+                continue
+            if candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+                continue
+            return self.timezone.normalize(self.timezone.localize(candidate))
+
+        raise ValueError(f"Expressão cron nunca dispara: {self.expression}")
+
+    def describe(self) -> str:
+        return f"cron[{self.expression}]"
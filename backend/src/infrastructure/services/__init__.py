@@ -105,6 +105,7 @@ from .redis_service import (
     cache_tenant_settings,
     get_cached_tenant_settings,
     invalidate_tenant_cache,
+    get_tenant_cache_version,
     rate_limit_check,
     rate_limit_reset,
     increment_metric,
@@ -266,6 +267,7 @@ __all__ = [
     "cache_tenant_settings",
     "get_cached_tenant_settings",
     "invalidate_tenant_cache",
+    "get_tenant_cache_version",
     "rate_limit_check",
     "rate_limit_reset",
     "increment_metric",
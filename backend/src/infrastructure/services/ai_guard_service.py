@@ -21,11 +21,18 @@ Regra de ouro: Se não é do nosso negócio, não importa se perguntou preço.
 """
 
 from datetime import datetime
+from functools import lru_cache
 from typing import Optional, Tuple, List
 import pytz
-import re
 import logging
 
+from src.domain.services.text_patterns import (
+    PatternRule,
+    PatternSet,
+    keyword_rules,
+    normalize_text as normalize_message,
+)
+
 logger = logging.getLogger(__name__)
 
 
@@ -93,22 +100,40 @@ def get_current_day_name() -> str:
 
 
 def normalize_text(text: str) -> str:
-    """Normaliza texto para comparação (lowercase, sem acentos básicos)."""
+    """Normaliza texto para comparação (lowercase, sem acentos)."""
     if not text:
         return ""
-    text = text.lower().strip()
-    # Normalização básica de acentos
-    replacements = {
-        'á': 'a', 'à': 'a', 'ã': 'a', 'â': 'a',
-        'é': 'e', 'ê': 'e',
-        'í': 'i',
-        'ó': 'o', 'ô': 'o', 'õ': 'o',
-        'ú': 'u', 'ü': 'u',
-        'ç': 'c',
-    }
-    for old, new in replacements.items():
-        text = text.replace(old, new)
-    return text
+    return normalize_message(text).strip()
+
+
+def _matchable(keywords: List[str]) -> List[str]:
+    """
+    Entradas que podem casar com a mensagem normalizada.
+
+    As listas são comparadas com o texto já sem acento; entradas com acento
+    nunca casaram (ex.: "código" não bloqueia "qual o código do imóvel?")
+    e continuam sem casar.
+    """
+    return [keyword for keyword in keywords if keyword == normalize_text(keyword)]
+
+
+# Compilados uma vez (ver src/domain/services/text_patterns.py)
+_FORBIDDEN_TOPIC_PATTERNS = PatternSet(keyword_rules(_matchable(UNIVERSAL_FORBIDDEN_TOPICS)))
+
+_SERVICE_CATEGORY_PATTERNS = PatternSet([
+    rule
+    for category, keywords in SERVICE_CATEGORIES.items()
+    for rule in keyword_rules(_matchable(keywords), label=category)
+])
+
+
+@lru_cache(maxsize=256)
+def _scope_patterns(
+    in_scope: Tuple[str, ...],
+    out_of_scope: Tuple[str, ...],
+) -> Tuple[PatternSet, PatternSet]:
+    """Keywords de escopo do tenant compiladas (cache pelo conteúdo)."""
+    return PatternSet(keyword_rules(in_scope)), PatternSet(keyword_rules(out_of_scope))
 
 
 # ========================================================
@@ -272,15 +297,11 @@ def detect_service_category(message: str) -> List[str]:
     Detecta a(s) categoria(s) de serviço mencionadas na mensagem.
     Retorna lista de categorias detectadas.
     """
-    msg = normalize_text(message)
     detected = []
     
-    for category, keywords in SERVICE_CATEGORIES.items():
-        for keyword in keywords:
-            if keyword in msg:
-                if category not in detected:
-                    detected.append(category)
-                break  # Não precisa checar mais keywords dessa categoria
+    for match in _SERVICE_CATEGORY_PATTERNS.scan(normalize_text(message)):
+        if match.rule.label not in detected:
+            detected.append(match.rule.label)
     
     return detected
 
@@ -330,22 +351,27 @@ def check_scope(message: str, settings: dict) -> Tuple[bool, Optional[str]]:
     logger.debug(f"Scope check - In: {in_scope_keywords[:5]}... Out: {out_of_scope_keywords[:5]}...")
     
     # 1. Verifica tópicos universalmente proibidos
-    for forbidden in UNIVERSAL_FORBIDDEN_TOPICS:
-        if forbidden in msg:
-            logger.info(f"Scope: Tópico proibido detectado: {forbidden}")
-            return False, out_of_scope_message
-    
+    forbidden = _FORBIDDEN_TOPIC_PATTERNS.first(msg)
+    if forbidden:
+        logger.info(f"Scope: Tópico proibido detectado: {forbidden.rule.pattern}")
+        return False, out_of_scope_message
+    
+    in_scope_patterns, out_of_scope_patterns = _scope_patterns(
+        tuple(sorted(in_scope_keywords)),
+        tuple(sorted(out_of_scope_keywords)),
+    )
+
     # 2. Verifica se menciona algo que NÃO oferecemos (OUT OF SCOPE) - PRIORIDADE!
-    for keyword in out_of_scope_keywords:
-        if keyword in msg:
-            logger.info(f"Scope: Keyword fora do escopo detectada: {keyword}")
-            return False, out_of_scope_message
+    keyword = out_of_scope_patterns.first(msg)
+    if keyword:
+        logger.info(f"Scope: Keyword fora do escopo detectada: {keyword.rule.pattern}")
+        return False, out_of_scope_message
     
     # 3. Verifica se menciona algo que oferecemos (IN SCOPE)
-    for keyword in in_scope_keywords:
-        if keyword in msg:
-            logger.debug(f"Scope: Keyword do negócio detectada: {keyword}")
-            return True, None
+    keyword = in_scope_patterns.first(msg)
+    if keyword:
+        logger.debug(f"Scope: Keyword do negócio detectada: {keyword.rule.pattern}")
+        return True, None
     
     # 4. Detecta categoria de serviço
     detected_categories = detect_service_category(message)
@@ -384,34 +410,35 @@ def check_scope(message: str, settings: dict) -> Tuple[bool, Optional[str]]:
 # PRICE SEMANTIC DETECTOR
 # ========================================================
 
+PRICE_PATTERNS = [
+    r"\br\$\s?\d+",           # R$ 200
+    r"\$\$+",                 # $$?
+    r"preco",                 # preço (normalizado)
+    r"valor",                 # valor?
+    r"quanto",                # quanto fica / quanto é
+    r"custa",                 # custa quanto
+    r"caro|barato",           # mais barato
+    r"faixa.{0,10}preco",     # faixa de preço
+    r"media.{0,10}preco",     # média de preço
+    r"aproximad[oa]",         # valor aproximado
+    r"tabela.{0,10}precos?",  # tabela de preços
+    r"orcamento",             # orçamento
+    r"\d+\s?reais",           # 100 reais
+    r"investimento",          # investimento (eufemismo para preço)
+    r"condicoes.{0,10}pagamento",  # condições de pagamento
+    r"parcela",               # parcela
+    r"a vista",               # à vista
+]
+
+_PRICE_PATTERNS = PatternSet([PatternRule(pattern) for pattern in PRICE_PATTERNS])
+
+
 def detect_price_semantics(message: str) -> bool:
     """
     Identifica tentativas de perguntar preço MESMO disfarçadas.
     Inclui variações, abreviações, números com R$, etc.
     """
-    msg = normalize_text(message)
-
-    patterns = [
-        r"\br\$\s?\d+",           # R$ 200
-        r"\$\$+",                 # $$?
-        r"preco",                 # preço (normalizado)
-        r"valor",                 # valor?
-        r"quanto",                # quanto fica / quanto é
-        r"custa",                 # custa quanto
-        r"caro|barato",           # mais barato
-        r"faixa.{0,10}preco",     # faixa de preço
-        r"media.{0,10}preco",     # média de preço
-        r"aproximad[oa]",         # valor aproximado
-        r"tabela.{0,10}precos?",  # tabela de preços
-        r"orcamento",             # orçamento
-        r"\d+\s?reais",           # 100 reais
-        r"investimento",          # investimento (eufemismo para preço)
-        r"condicoes.{0,10}pagamento",  # condições de pagamento
-        r"parcela",               # parcela
-        r"a vista",               # à vista
-    ]
-
-    return any(re.search(p, msg) for p in patterns)
+    return _PRICE_PATTERNS.first(normalize_text(message)) is not None
 
 
 def check_price_questions(message: str, settings: dict) -> Optional[str]:
@@ -440,6 +467,31 @@ def check_price_questions(message: str, settings: dict) -> Optional[str]:
 # INSISTENCE GUARD
 # ========================================================
 
+INSISTENCE_TRIGGERS = [
+    "só uma média",
+    "não precisa ser exato",
+    "só para eu ter uma noção",
+    "só para ter uma ideia",
+    "aproximado",
+    "mais barato ou mais caro",
+    "não quero perder tempo",
+    "só me diz",
+    "só confirma",
+    "me passa só",
+    "pelo menos uma ideia",
+    "uma faixa",
+    "por cima",
+    "por baixo",
+    "mais ou menos",
+    "na faixa de",
+    "em torno de",
+    "me dá uma base",
+    "me dá um norte",
+]
+
+_INSISTENCE_PATTERNS = PatternSet(keyword_rules(INSISTENCE_TRIGGERS))
+
+
 def check_insistence(message: str, settings: dict) -> Optional[str]:
     """Detecta insistência em obter preço."""
     
@@ -450,31 +502,7 @@ def check_insistence(message: str, settings: dict) -> Optional[str]:
     if insist_guard.get("enabled", True) == False:
         return None
 
-    triggers = [
-        "só uma média",
-        "não precisa ser exato",
-        "só para eu ter uma noção",
-        "só para ter uma ideia",
-        "aproximado",
-        "mais barato ou mais caro",
-        "não quero perder tempo",
-        "só me diz",
-        "só confirma",
-        "me passa só",
-        "pelo menos uma ideia",
-        "uma faixa",
-        "por cima",
-        "por baixo",
-        "mais ou menos",
-        "na faixa de",
-        "em torno de",
-        "me dá uma base",
-        "me dá um norte",
-    ]
-
-    msg = normalize_text(message)
-
-    if any(normalize_text(t) in msg for t in triggers):
+    if _INSISTENCE_PATTERNS.first(normalize_text(message)):
         return (
             insist_guard.get("message") or
             settings.get("insistence_guard_message") or
@@ -637,7 +665,7 @@ def analyze_message_scope(message: str, settings: dict) -> dict:
     
     matched_in_scope = [kw for kw in in_scope_keywords if kw in msg]
     matched_out_scope = [kw for kw in out_of_scope_keywords if kw in msg]
-    matched_forbidden = [t for t in UNIVERSAL_FORBIDDEN_TOPICS if t in msg]
+    matched_forbidden = [m.rule.pattern for m in _FORBIDDEN_TOPIC_PATTERNS.scan(msg)]
     
     is_price_question = detect_price_semantics(message)
     
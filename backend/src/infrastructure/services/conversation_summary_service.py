@@ -2,278 +2,342 @@
 SERVIÇO DE RESUMO AUTOMÁTICO DE CONVERSAS
 ==========================================
 
-Gera resumos inteligentes de conversas longas para:
-1. Melhorar performance (menos tokens na IA)
-2. Permitir histórico ilimitado
-3. Manter contexto mesmo após muitas mensagens
-
-Estratégia:
-- A cada 50 mensagens, gera um resumo automático
-- Usa GPT-4o-mini para resumir pontos-chave
-- Armazena no campo conversation_summary
+Monta o histórico enviado à IA dentro de um orçamento de tokens:
+
+1. Resumo acumulado (lead.conversation_summary) das mensagens até o
+   checkpoint (lead.summary_message_id)
+2. Mensagens literais depois do checkpoint, das mais recentes para as
+   mais antigas, até esgotar o orçamento (tokenizer local)
+
+Quando acumulam mensagens fora da janela literal que ainda não estão no
+resumo, ele é atualizado em background, de forma incremental: a IA
+recebe o resumo anterior + só as mensagens desde o último checkpoint, e
+o checkpoint avança. A conversa inteira nunca é relida e a requisição
+nunca espera pela IA do resumo.
+
+Orçamento: tenant.settings["ai_behavior"]["history_token_budget"], ou
+settings.history_token_budget.
 """
 
+import asyncio
 import logging
-from datetime import datetime, timezone
-from typing import Optional, List, Dict
-from sqlalchemy import select
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.config import get_settings
 from src.domain.entities import Lead, Message
 from src.infrastructure.llm import LLMFactory
+from src.infrastructure.llm.tokenizer import estimate_message_tokens
+from src.infrastructure.services.message_window_service import MessageWindow, get_message_window
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
 
-# Threshold de mensagens para gerar resumo
-SUMMARY_THRESHOLD = 50
+SUMMARY_LOCK_TTL_SECONDS = 120
+SUMMARY_MAX_MESSAGES = 200  # Teto de mensagens lidas por atualização (antes do orçamento de tokens)
 
+SUMMARY_HEADER = "📋 RESUMO DA CONVERSA ANTERIOR:\n{summary}\n\n[Retomando conversa recente...]"
 
-async def should_generate_summary(
-    db: AsyncSession,
-    lead: Lead,
-) -> bool:
+
+# =============================================================================
+# ORÇAMENTO DE TOKENS
+# =============================================================================
+
+def history_token_budget(tenant_settings: Optional[dict]) -> int:
+    """Orçamento de tokens do histórico do tenant (ou o padrão do sistema)."""
+    ai_behavior = (tenant_settings or {}).get("ai_behavior") or {}
+    try:
+        budget = int(ai_behavior.get("history_token_budget") or 0)
+    except (TypeError, ValueError):
+        budget = 0
+    return budget if budget > 0 else settings.history_token_budget
+
+
+def fit_history(messages: List[Dict], token_budget: int, reserved_tokens: int = 0) -> List[Dict]:
     """
-    Verifica se deve gerar um novo resumo automático.
-    
-    Critérios:
-    - Lead tem >= 50 mensagens
-    - Não tem conversation_summary OU
-    - Conversation_summary foi gerado há mais de 50 mensagens
+    Mensagens mais recentes que cabem no orçamento, em ordem cronológica.
+
+    A última mensagem sempre entra, mesmo que sozinha estoure o orçamento.
     """
-    try:
-        # Conta total de mensagens
-        from sqlalchemy import func
-        result = await db.execute(
-            select(func.count(Message.id))
-            .where(Message.lead_id == lead.id)
-        )
-        total_messages = result.scalar() or 0
-        
-        if total_messages < SUMMARY_THRESHOLD:
-            return False
-        
-        # Se não tem resumo, gera
-        if not lead.conversation_summary:
-            return True
-        
-        # Se tem, verifica se passou muito tempo desde o último
-        # (implementação simples: sempre que atingir múltiplos de 50)
-        return total_messages % SUMMARY_THRESHOLD == 0
-        
-    except Exception as e:
-        logger.error(f"Erro verificando necessidade de resumo: {e}")
-        return False
+    kept = []
+    used = reserved_tokens
+    for message in reversed(messages):
+        tokens = estimate_message_tokens(message)
+        if kept and used + tokens > token_budget:
+            break
+        kept.append(message)
+        used += tokens
+    kept.reverse()
+    return kept
+
 
+# =============================================================================
+# HISTÓRICO EFETIVO
+# =============================================================================
 
-async def generate_conversation_summary(
+async def _recent_after_checkpoint(
     db: AsyncSession,
     lead_id: int,
-) -> Optional[str]:
+    checkpoint: int,
+    limit: int,
+    window: Optional[MessageWindow],
+) -> List[Dict]:
+    """Últimas `limit` mensagens depois do checkpoint (janela em cache; banco se não bastar)."""
+    if window is None:
+        window = await get_message_window(db, lead_id)
+    recent = window.after(checkpoint, limit)
+    if recent is not None:
+        return recent
+
+    result = await db.execute(
+        select(Message.id, Message.role, Message.content)
+        .where(Message.lead_id == lead_id, Message.id > checkpoint)
+        .order_by(Message.id.desc())
+        .limit(limit)
+    )
+    return [{"id": row.id, "role": row.role, "content": row.content} for row in reversed(result.all())]
+
+
+async def get_effective_history(
+    db: AsyncSession,
+    lead: Lead,
+    token_budget: Optional[int] = None,
+    max_recent_messages: int = settings.max_conversation_history,
+    window: Optional[MessageWindow] = None,
+) -> List[Dict]:
     """
-    Gera resumo automático da conversa usando IA.
-    
-    Returns:
-        String com resumo ou None se falhar
+    Retorna histórico "efetivo" para a IA: resumo + mensagens recentes
+    que cabem no orçamento de tokens (no máximo max_recent_messages).
+
+    As mensagens vêm da janela em cache (message_window_service); quem já
+    buscou a janela no turno pode passá-la em `window`.
+
+    Agenda a atualização do resumo quando sobram mensagens não resumidas
+    fora da janela.
     """
+    token_budget = token_budget or settings.history_token_budget
+    batch_size = settings.history_summary_batch_messages
+    checkpoint = lead.summary_message_id or 0
+
     try:
-        # Busca TODAS as mensagens do lead
+        # Janela + um lote: basta para saber se já há mensagens suficientes para resumir
+        candidates = [
+            {"role": message["role"], "content": message["content"]}
+            for message in await _recent_after_checkpoint(
+                db, lead.id, checkpoint, max_recent_messages + batch_size, window
+            )
+        ]
+
+        history = []
+        reserved_tokens = 0
+        if lead.conversation_summary:
+            summary_message = {
+                "role": "system",
+                "content": SUMMARY_HEADER.format(summary=lead.conversation_summary),
+            }
+            history.append(summary_message)
+            reserved_tokens = estimate_message_tokens(summary_message)
+
+        recent = fit_history(candidates[-max_recent_messages:], token_budget, reserved_tokens)
+        history.extend(recent)
+
+        unsummarized = len(candidates) - len(recent)
+        if unsummarized >= batch_size:
+            schedule_summary_update(lead.id, keep_recent=len(recent))
+
+        if unsummarized or lead.conversation_summary:
+            logger.info(
+                f"📚 Histórico efetivo: {len(recent)} recentes"
+                f"{' + resumo' if lead.conversation_summary else ''} "
+                f"(orçamento {token_budget} tokens, {unsummarized} fora da janela)"
+            )
+
+        return history
+
+    except Exception as e:
+        logger.error(f"❌ Erro montando histórico efetivo: {e}")
+        # Fallback: retorna últimas N mensagens
         result = await db.execute(
             select(Message)
-            .where(Message.lead_id == lead_id)
-            .order_by(Message.created_at.asc())
+            .where(Message.lead_id == lead.id)
+            .order_by(Message.created_at.desc())
+            .limit(max_recent_messages)
         )
-        messages = result.scalars().all()
-        
-        if not messages:
-            return None
-        
-        # Converte para formato de prompt
-        conversation_text = ""
-        for msg in messages:
-            role = "Cliente" if msg.role == "user" else "IA"
-            conversation_text += f"{role}: {msg.content}\n"
-        
-        # Limita tamanho (pega últimas 100 mensagens se for muito grande)
-        if len(messages) > 100:
-            messages_subset = messages[-100:]
-            conversation_text = ""
-            for msg in messages_subset:
-                role = "Cliente" if msg.role == "user" else "IA"
-                conversation_text += f"{role}: {msg.content}\n"
-            
-            conversation_text = f"[Conversa com {len(messages) - 100} mensagens anteriores omitidas]\n\n" + conversation_text
-        
-        # Prompt otimizado para resumo
-        prompt = f"""Você é um assistente especializado em resumir conversas comerciais.
-
-Analise a conversa abaixo e crie um RESUMO EXECUTIVO focado em:
+        messages = list(reversed(result.scalars().all()))
+        return [{"role": msg.role, "content": msg.content} for msg in messages]
+
+
+# =============================================================================
+# RESUMO INCREMENTAL
+# =============================================================================
+
+def build_summary_prompt(previous_summary: Optional[str], messages: List[Dict]) -> str:
+    conversation_text = "".join(
+        f"{'Cliente' if msg['role'] == 'user' else 'IA'}: {msg['content']}\n"
+        for msg in messages
+    )
+    previous = previous_summary or "(ainda não há resumo - primeiras mensagens da conversa)"
+
+    return f"""Você é um assistente especializado em resumir conversas comerciais.
+
+Atualize o RESUMO EXECUTIVO abaixo incorporando as NOVAS MENSAGENS. Foque em:
 1. **Interesse principal** do cliente (o que ele quer)
 2. **Informações coletadas** (nome, orçamento, prazo, etc.)
 3. **Dúvidas/Objeções** levantadas
 4. **Próximos passos** ou pendências
 
-CONVERSA:
+RESUMO ATUAL:
+{previous}
+
+NOVAS MENSAGENS:
 {conversation_text}
 
 IMPORTANTE:
 - Seja CONCISO (máximo 200 palavras)
+- Mantenha do resumo atual o que continua valendo; atualize o que mudou
 - Destaque informações ACIONÁVEIS
 - Use bullets para clareza
 - Não invente informações não mencionadas
 
 RESUMO EXECUTIVO:"""
 
-        provider = LLMFactory.get_provider()
-        response = await provider.chat_completion(
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.2,  # Mais factual
-            max_tokens=400,
-        )
-        
-        summary = response["content"].strip()
-        
-        logger.info(f"✅ Resumo gerado para lead {lead_id}: {len(summary)} chars")
-        
-        return summary
-        
-    except Exception as e:
-        logger.error(f"❌ Erro gerando resumo automático: {e}")
-        return None
-
 
 async def update_lead_summary(
     db: AsyncSession,
-    lead: Lead,
+    lead_id: int,
+    keep_recent: int = 0,
 ) -> bool:
     """
-    Atualiza o resumo automático do lead se necessário.
-    
+    Incorpora ao resumo as mensagens desde o checkpoint, exceto as
+    `keep_recent` mais recentes (que ainda vão literais para a IA).
+
+    Processa no máximo history_summary_max_input_tokens por chamada; o
+    restante fica para a próxima atualização.
+
     Returns:
-        True se atualizou, False caso contrário
+        True se atualizou (quem chama faz o commit)
     """
-    try:
-        # Verifica se deve gerar
-        if not await should_generate_summary(db, lead):
-            return False
-        
-        # Gera resumo
-        summary = await generate_conversation_summary(db, lead.id)
-        
-        if not summary:
-            return False
-        
-        # Atualiza no banco
-        lead.conversation_summary = summary
-        
-        # Adiciona metadata de quando foi gerado
-        if not lead.custom_data:
-            lead.custom_data = {}
-        
-        lead.custom_data["summary_generated_at"] = datetime.now(timezone.utc).isoformat()
-        lead.custom_data["summary_message_count"] = await get_message_count(db, lead.id)
-        
-        from sqlalchemy.orm.attributes import flag_modified
-        flag_modified(lead, "custom_data")
-
-        # ❌ CRÍTICO: NÃO fazer commit aqui!
-        # Este serviço é chamado dentro de process_message.py (linha 1485)
-        # que já gerencia a transação. Fazer commit aqui quebraria a atomicidade.
-        #
-        # ✅ SOLUÇÃO: Apenas marca as mudanças. O commit será feito no final
-        # de process_message, garantindo que tudo (mensagem + resumo) seja
-        # salvo atomicamente.
-
-        await db.flush()  # Persiste na sessão, mas não commita
-
-        logger.info(f"✅ Resumo atualizado para lead {lead.id} (pendente commit)")
-
-        return True
+    result = await db.execute(
+        select(Lead.conversation_summary, Lead.summary_message_id).where(Lead.id == lead_id)
+    )
+    row = result.one_or_none()
+    if row is None:
+        return False
+    previous_summary, checkpoint = row.conversation_summary, row.summary_message_id
 
-    except Exception as e:
-        logger.error(f"❌ Erro atualizando resumo do lead: {e}")
+    # Última mensagem que pode ser resumida (antes da janela literal)
+    result = await db.execute(
+        select(Message.id)
+        .where(Message.lead_id == lead_id, Message.id > (checkpoint or 0))
+        .order_by(Message.id.desc())
+        .offset(keep_recent)
+        .limit(1)
+    )
+    boundary = result.scalar_one_or_none()
+    if boundary is None:
+        return False
 
-        # ❌ CRÍTICO: NÃO fazer rollback aqui!
-        # Isso corromperia a sessão principal de process_message, impedindo
-        # salvar a mensagem e outras operações.
-        #
-        # ✅ SOLUÇÃO: Apenas retornar False. O erro já foi logado e o processo
-        # principal pode continuar normalmente.
+    result = await db.execute(
+        select(Message.id, Message.role, Message.content)
+        .where(
+            Message.lead_id == lead_id,
+            Message.id > (checkpoint or 0),
+            Message.id <= boundary,
+        )
+        .order_by(Message.id.asc())
+        .limit(SUMMARY_MAX_MESSAGES)
+    )
 
+    messages: List[Dict] = []
+    used_tokens = 0
+    last_message_id = None
+    for msg in result.all():
+        message = {"role": msg.role, "content": msg.content}
+        tokens = estimate_message_tokens(message)
+        if messages and used_tokens + tokens > settings.history_summary_max_input_tokens:
+            break
+        messages.append(message)
+        used_tokens += tokens
+        last_message_id = msg.id
+
+    if not messages:
         return False
 
+    provider = LLMFactory.get_provider()
+    response = await provider.chat_completion(
+        messages=[{"role": "user", "content": build_summary_prompt(previous_summary, messages)}],
+        temperature=0.2,  # Mais factual
+        max_tokens=400,
+    )
+    summary = (response.get("content") or "").strip()
+    if not summary:
+        return False
 
-async def get_message_count(db: AsyncSession, lead_id: int) -> int:
-    """Conta total de mensagens do lead."""
-    from sqlalchemy import func
+    # Só avança se ninguém atualizou o resumo nesse meio tempo.
+    # updated_at é preservado: o resumo não é uma alteração do lead
+    # (não deve disparar o conflito de versão do process_message).
     result = await db.execute(
-        select(func.count(Message.id))
-        .where(Message.lead_id == lead_id)
+        update(Lead)
+        .where(Lead.id == lead_id, Lead.summary_message_id.is_not_distinct_from(checkpoint))
+        .values(
+            conversation_summary=summary,
+            summary_message_id=last_message_id,
+            updated_at=Lead.updated_at,
+        )
+        .execution_options(synchronize_session=False)
     )
-    return result.scalar() or 0
+    if result.rowcount == 0:
+        return False
 
+    logger.info(
+        f"✅ Resumo do lead {lead_id} atualizado: +{len(messages)} mensagens "
+        f"({used_tokens} tokens), checkpoint {checkpoint or 0} → {last_message_id}"
+    )
+    return True
 
-async def get_effective_history(
-    db: AsyncSession,
-    lead: Lead,
-    max_recent_messages: int = 30,
-) -> List[Dict]:
-    """
-    Retorna histórico "efetivo" para a IA.
-    
-    Estratégia:
-    - Se tem <50 mensagens: retorna todas
-    - Se tem >=50: retorna resumo + últimas 30 mensagens
-    
-    Isso permite histórico ilimitado sem estourar contexto da IA.
-    """
+
+# =============================================================================
+# BACKGROUND
+# =============================================================================
+
+_updating: Set[int] = set()
+_tasks: Set[asyncio.Task] = set()
+
+
+async def _update_summary_background(lead_id: int, keep_recent: int) -> None:
+    from src.infrastructure.database import async_session
+    from src.infrastructure.services.redis_service import acquire_lock, release_lock
+
+    lock_key = f"conversation_summary:{lead_id}"
     try:
-        # Conta mensagens
-        total = await get_message_count(db, lead.id)
-        
-        # Se tem poucas mensagens, retorna normal
-        if total < SUMMARY_THRESHOLD:
-            result = await db.execute(
-                select(Message)
-                .where(Message.lead_id == lead.id)
-                .order_by(Message.created_at.asc())
-            )
-            messages = result.scalars().all()
-            return [{"role": msg.role, "content": msg.content} for msg in messages]
-        
-        # Se tem muitas, usa resumo + recentes
-        history = []
-        
-        # 1. Adiciona resumo como contexto inicial
-        if lead.conversation_summary:
-            history.append({
-                "role": "system",
-                "content": f"📋 RESUMO DA CONVERSA ANTERIOR:\n{lead.conversation_summary}\n\n[Retomando conversa recente...]"
-            })
-        
-        # 2. Adiciona últimas N mensagens
-        result = await db.execute(
-            select(Message)
-            .where(Message.lead_id == lead.id)
-            .order_by(Message.created_at.desc())
-            .limit(max_recent_messages)
-        )
-        recent_messages = list(reversed(result.scalars().all()))
-        
-        for msg in recent_messages:
-            history.append({"role": msg.role, "content": msg.content})
-        
-        logger.info(f"📚 Histórico efetivo: {len(history)} mensagens (resumo + {len(recent_messages)} recentes)")
-        
-        return history
-        
+        token = await acquire_lock(lock_key, ttl_seconds=SUMMARY_LOCK_TTL_SECONDS)
+        if token is None:
+            return  # Outra réplica já está resumindo
+
+        try:
+            async with async_session() as session:
+                if await update_lead_summary(session, lead_id, keep_recent=keep_recent):
+                    await session.commit()
+        finally:
+            await release_lock(lock_key, token)
     except Exception as e:
-        logger.error(f"❌ Erro montando histórico efetivo: {e}")
-        # Fallback: retorna últimas N mensagens
-        result = await db.execute(
-            select(Message)
-            .where(Message.lead_id == lead.id)
-            .order_by(Message.created_at.desc())
-            .limit(max_recent_messages)
-        )
-        messages = list(reversed(result.scalars().all()))
-        return [{"role": msg.role, "content": msg.content} for msg in messages]
+        logger.warning(f"⚠️ Erro atualizando resumo do lead {lead_id} (não crítico): {e}")
+    finally:
+        _updating.discard(lead_id)
+
+
+def schedule_summary_update(lead_id: int, keep_recent: int = 0) -> None:
+    """Agenda a atualização incremental do resumo fora da requisição."""
+    if lead_id in _updating:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+
+    _updating.add(lead_id)
+    task = loop.create_task(_update_summary_background(lead_id, keep_recent))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
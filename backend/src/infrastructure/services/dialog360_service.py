@@ -1,9 +1,9 @@
 import logging
-import httpx
 from datetime import datetime, timezone
 from typing import Optional, Dict, Any, List
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.domain.entities import Lead, Product
+from src.infrastructure.services.http_client_registry import get_http_client
 
 logger = logging.getLogger(__name__)
 
@@ -39,19 +39,20 @@ class Dialog360Service:
         }
         
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.post(
-                    DIALOG360_API_URL,
-                    json=payload,
-                    headers=headers
-                )
-                
-                if response.status_code in [200, 201, 202]:
-                    return {"success": True, "data": response.json()}
-                else:
-                    logger.error(f"Erro 360Dialog ({response.status_code}): {response.text}")
-                    return {"success": False, "error": response.text}
-                    
+            client = get_http_client("dialog360")
+            response = await client.post(
+                DIALOG360_API_URL,
+                json=payload,
+                headers=headers,
+                timeout=10.0,
+            )
+
+            if response.status_code in [200, 201, 202]:
+                return {"success": True, "data": response.json()}
+            else:
+                logger.error(f"Erro 360Dialog ({response.status_code}): {response.text}")
+                return {"success": False, "error": response.text}
+
         except Exception as e:
             logger.error(f"Exceção ao enviar 360Dialog: {e}")
             return {"success": False, "error": str(e)}
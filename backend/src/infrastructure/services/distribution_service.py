@@ -12,6 +12,7 @@ from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.domain.entities import Seller, Lead, Tenant, LeadAssignment, Notification
+from src.infrastructure.services.redis_service import invalidate_tenant_cache_on_commit
 
 
 # ==========================================
@@ -90,6 +91,40 @@ async def select_by_round_robin(
     return sellers_sorted[next_index], next_index
 
 
+async def advance_round_robin(
+    db: AsyncSession,
+    tenant: Tenant,
+    sellers: List[Seller],
+) -> Optional[Seller]:
+    """
+    Rodízio com o índice lido do banco, com lock na linha do tenant.
+
+    O tenant pode vir do cache do contexto (TenantRuntimeContext): o
+    índice e o resto do settings são relidos para não repetir vendedor
+    nem sobrescrever alterações concorrentes. O cache é invalidado no commit.
+    """
+    await db.execute(
+        select(Tenant)
+        .where(Tenant.id == tenant.id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+    settings = tenant.settings or {}
+    distribution = settings.get("distribution", {})
+
+    last_index = distribution.get("last_seller_index", 0)
+    selected_seller, new_index = await select_by_round_robin(sellers, last_index)
+
+    if selected_seller:
+        tenant.settings = {
+            **settings,
+            "distribution": {**distribution, "last_seller_index": new_index},
+        }
+        invalidate_tenant_cache_on_commit(db, tenant.id)
+
+    return selected_seller
+
+
 async def select_by_city(
     sellers: List[Seller],
     lead_city: Optional[str],
@@ -284,13 +319,7 @@ async def distribute_lead(
     
     # Aplica método de distribuição
     if method == "round_robin":
-        last_index = distribution_config.get("last_seller_index", 0)
-        selected_seller, new_index = await select_by_round_robin(sellers, last_index)
-        
-        # Atualiza índice no settings
-        if selected_seller:
-            new_distribution = {**distribution_config, "last_seller_index": new_index}
-            tenant.settings = {**settings, "distribution": new_distribution}
+        selected_seller = await advance_round_robin(db, tenant, sellers)
     
     elif method == "by_city":
         selected_seller = await select_by_city(sellers, lead_city)
@@ -324,11 +353,7 @@ async def distribute_lead(
         fallback_used = True
         
         if fallback == "round_robin":
-            last_index = distribution_config.get("last_seller_index", 0)
-            selected_seller, new_index = await select_by_round_robin(sellers, last_index)
-            if selected_seller:
-                new_distribution = {**distribution_config, "last_seller_index": new_index}
-                tenant.settings = {**settings, "distribution": new_distribution}
+            selected_seller = await advance_round_robin(db, tenant, sellers)
         
         elif fallback == "manager":
             # Não atribui a nenhum vendedor, vai pro gestor
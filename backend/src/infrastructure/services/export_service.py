@@ -8,12 +8,19 @@ Exporta dados de leads e métricas em diferentes formatos:
 - PDF (.pdf) - Relatório visual para apresentações
 """
 
+import asyncio
 import io
 import csv
+import logging
+import tempfile
+import uuid
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any
+from itertools import zip_longest
+from pathlib import Path
+from typing import Optional, List, Dict, Any, AsyncIterator, BinaryIO, Tuple
 
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.utils import get_column_letter
 from openpyxl.chart import PieChart, Reference
@@ -31,7 +38,12 @@ from reportlab.lib.enums import TA_CENTER, TA_LEFT
 from sqlalchemy import select, func, and_
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.domain.entities import Lead, Message, Tenant
+from src.config import get_settings
+from src.domain.entities import Lead, Tenant
+from src.infrastructure.database import async_session
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
 
 
 # ============================================
@@ -77,58 +89,106 @@ QUALIFICATION_MAP = {
 # FUNÇÕES DE BUSCA DE DADOS
 # ============================================
 
+def _lead_filters(tenant_id: int, start_date: Optional[datetime], end_date: Optional[datetime]) -> list:
+    filters = [Lead.tenant_id == tenant_id]
+    if start_date:
+        filters.append(Lead.created_at >= start_date)
+    if end_date:
+        filters.append(Lead.created_at <= end_date)
+    return filters
+
+
+def leads_export_query(
+    tenant_id: int,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+):
+    """
+    Leads + contagem de mensagens (Lead.message_count) em uma única query.
+
+    Seleciona colunas (não entidades) para não encher o identity map
+    da sessão durante exportações grandes.
+    """
+    filters = _lead_filters(tenant_id, start_date, end_date)
+
+    return (
+        select(
+            Lead.id,
+            Lead.created_at,
+            Lead.name,
+            Lead.phone,
+            Lead.email,
+            Lead.city,
+            Lead.status,
+            Lead.qualification,
+            Lead.source,
+            Lead.custom_data,
+            Lead.summary,
+            Lead.last_activity_at,
+            Lead.updated_at,
+            Lead.message_count,
+        )
+        .where(and_(*filters))
+        .order_by(Lead.created_at.desc(), Lead.id.desc())
+    )
+
+
+def lead_export_row(row) -> Dict[str, Any]:
+    """Linha da query de exportação → dict usado pelos formatos."""
+    custom_data = row.custom_data or {}
+
+    return {
+        'id': row.id,
+        'created_at': row.created_at,
+        'name': row.name or '',
+        'phone': row.phone or '',
+        'email': row.email or '',
+        'city': row.city or '',
+        'status': STATUS_MAP.get(row.status, row.status or 'Novo'),
+        'qualification': QUALIFICATION_MAP.get(row.qualification, row.qualification or 'Frio'),
+        'source': row.source or 'Orgânico',
+        'interest': custom_data.get('interest') or custom_data.get('interest_type') or '',
+        'budget': custom_data.get('budget') or custom_data.get('budget_range') or '',
+        'urgency': custom_data.get('urgency') or custom_data.get('urgency_level') or '',
+        'summary': row.summary or '',
+        'message_count': row.message_count,
+        'last_activity': row.last_activity_at or row.updated_at,
+    }
+
+
+async def iter_leads_for_export(
+    db: AsyncSession,
+    tenant_id: int,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    batch_size: Optional[int] = None,
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Leads em lotes, lidos por cursor no servidor (yield_per):
+    memória constante independente do tamanho do tenant.
+    """
+    batch_size = batch_size or settings.export_batch_size
+    query = leads_export_query(tenant_id, start_date, end_date).execution_options(yield_per=batch_size)
+
+    result = await db.stream(query)
+    async for partition in result.partitions():
+        yield [lead_export_row(row) for row in partition]
+
+
 async def get_leads_for_export(
     db: AsyncSession,
     tenant_id: int,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
+    limit: Optional[int] = None,
 ) -> List[Dict[str, Any]]:
-    """Busca leads para exportação com contagem de mensagens."""
-    
-    # Query base
-    query = select(Lead).where(Lead.tenant_id == tenant_id)
-    
-    # Filtro de data
-    if start_date:
-        query = query.where(Lead.created_at >= start_date)
-    if end_date:
-        query = query.where(Lead.created_at <= end_date)
-    
-    # Ordena por data
-    query = query.order_by(Lead.created_at.desc())
-    
+    """Busca leads para exportação com contagem de mensagens (lista em memória)."""
+    query = leads_export_query(tenant_id, start_date, end_date)
+    if limit:
+        query = query.limit(limit)
+
     result = await db.execute(query)
-    leads = result.scalars().all()
-    
-    # Busca contagem de mensagens para cada lead
-    leads_data = []
-    for lead in leads:
-        msg_count_result = await db.execute(
-            select(func.count(Message.id)).where(Message.lead_id == lead.id)
-        )
-        msg_count = msg_count_result.scalar() or 0
-        
-        custom_data = lead.custom_data or {}
-        
-        leads_data.append({
-            'id': lead.id,
-            'created_at': lead.created_at,
-            'name': lead.name or '',
-            'phone': lead.phone or '',
-            'email': lead.email or '',
-            'city': lead.city or '',
-            'status': STATUS_MAP.get(lead.status, lead.status or 'Novo'),
-            'qualification': QUALIFICATION_MAP.get(lead.qualification, lead.qualification or 'Frio'),
-            'source': lead.source or 'Orgânico',
-            'interest': custom_data.get('interest') or custom_data.get('interest_type') or '',
-            'budget': custom_data.get('budget') or custom_data.get('budget_range') or '',
-            'urgency': custom_data.get('urgency') or custom_data.get('urgency_level') or '',
-            'summary': lead.summary or '',
-            'message_count': msg_count,
-            'last_activity': lead.last_activity_at or lead.updated_at,
-        })
-    
-    return leads_data
+    return [lead_export_row(row) for row in result.all()]
 
 
 async def get_metrics_for_export(
@@ -178,8 +238,7 @@ async def get_metrics_for_export(
     
     # Total de mensagens
     msg_result = await db.execute(
-        select(func.count(Message.id))
-        .join(Lead, Message.lead_id == Lead.id)
+        select(func.sum(Lead.message_count))
         .where(and_(*base_filter))
     )
     total_messages = msg_result.scalar() or 0
@@ -208,6 +267,174 @@ async def get_metrics_for_export(
 # EXPORTAÇÃO EXCEL
 # ============================================
 
+LEADS_HEADERS = [
+    "Data", "Nome", "Telefone", "Email", "Cidade",
+    "Status", "Temperatura", "Origem", "Interesse",
+    "Orçamento", "Urgência", "Mensagens",
+]
+
+TEMPERATURE_FILLS = {
+    'Quente': PatternFill("solid", fgColor="FFCDD2"),
+    'Morno': PatternFill("solid", fgColor="FFE0B2"),
+}
+DEFAULT_TEMPERATURE_FILL = PatternFill("solid", fgColor="BBDEFB")
+
+HEADER_FONT = Font(bold=True, color="FFFFFF", size=11)
+HEADER_FILL = PatternFill("solid", fgColor=VELLARYS_GREEN)
+HEADER_ALIGNMENT = Alignment(horizontal="center", vertical="center")
+CELL_ALIGNMENT = Alignment(horizontal="left", vertical="center")
+NUMBER_ALIGNMENT = Alignment(horizontal="center", vertical="center")
+THIN_BORDER = Border(
+    left=Side(style='thin', color='E0E0E0'),
+    right=Side(style='thin', color='E0E0E0'),
+    top=Side(style='thin', color='E0E0E0'),
+    bottom=Side(style='thin', color='E0E0E0')
+)
+
+
+def _format_date(value: Optional[datetime]) -> str:
+    return value.strftime('%d/%m/%Y %H:%M') if value else ''
+
+
+def _period_label(start_date: Optional[datetime], end_date: Optional[datetime]) -> str:
+    if start_date and end_date:
+        return f"{start_date.strftime('%d/%m/%Y')} a {end_date.strftime('%d/%m/%Y')}"
+    if start_date:
+        return f"A partir de {start_date.strftime('%d/%m/%Y')}"
+    return "Todo o período"
+
+
+def _styled_cell(ws, value, font=None, fill=None, alignment=None, border=None) -> WriteOnlyCell:
+    cell = WriteOnlyCell(ws, value=value)
+    if font:
+        cell.font = font
+    if fill:
+        cell.fill = fill
+    if alignment:
+        cell.alignment = alignment
+    if border:
+        cell.border = border
+    return cell
+
+
+def _write_summary_sheet(wb: Workbook, tenant: Tenant, metrics: Dict[str, Any], start_date, end_date) -> None:
+    """Aba Resumo (modo write-only: linhas escritas em ordem)."""
+    ws = wb.create_sheet("Resumo")
+    for column, width in (('A', 25), ('B', 15), ('D', 20), ('E', 15)):
+        ws.column_dimensions[column].width = width
+
+    bold = Font(bold=True)
+    section = Font(bold=True, size=12)
+    note = Font(italic=True, color="666666")
+
+    ws.append([_styled_cell(ws, f"📊 RELATÓRIO VELLARYS - {tenant.name}", font=Font(bold=True, size=16, color=VELLARYS_GREEN))])
+    ws.append([_styled_cell(ws, f"Período: {_period_label(start_date, end_date)}", font=note)])
+    ws.append([_styled_cell(ws, f"Gerado em: {datetime.now().strftime('%d/%m/%Y às %H:%M')}", font=note)])
+    ws.append([])
+
+    # Métricas principais
+    ws.append([_styled_cell(ws, "MÉTRICAS PRINCIPAIS", font=section)])
+    metricas = [
+        ("Total de Leads", metrics['total_leads']),
+        ("Leads Quentes 🔥", metrics['hot_leads']),
+        ("Convertidos ✅", metrics['converted']),
+        ("Taxa de Conversão", f"{metrics['conversion_rate']}%"),
+        ("Total de Mensagens", metrics['total_messages']),
+        ("Média msgs/lead", metrics['avg_messages_per_lead']),
+    ]
+    for label, value in metricas:
+        ws.append([_styled_cell(ws, label, font=bold), _styled_cell(ws, value, alignment=NUMBER_ALIGNMENT)])
+    ws.append([])
+    ws.append([])
+
+    # Por Status (A/B) e Por Qualificação (D/E), lado a lado
+    ws.append([
+        _styled_cell(ws, "POR STATUS", font=section), None, None,
+        _styled_cell(ws, "POR TEMPERATURA", font=section),
+    ])
+    by_status = [(STATUS_MAP.get(k, k), v) for k, v in metrics['by_status'].items()]
+    by_qualification = [(QUALIFICATION_MAP.get(k, k), v) for k, v in metrics['by_qualification'].items()]
+    for status_item, qual_item in zip_longest(by_status, by_qualification, fillvalue=(None, None)):
+        ws.append([status_item[0], status_item[1], None, qual_item[0], qual_item[1]])
+
+
+def _create_leads_sheet(wb: Workbook, summary_header: str):
+    ws = wb.create_sheet("Leads")
+    column_widths = [18, 25, 15, 25, 15, 15, 12, 15, 20, 15, 15, 12, 40]
+    for i, width in enumerate(column_widths, 1):
+        ws.column_dimensions[get_column_letter(i)].width = width
+    ws.freeze_panes = 'A2'
+
+    ws.append([
+        _styled_cell(ws, header, font=HEADER_FONT, fill=HEADER_FILL, alignment=HEADER_ALIGNMENT, border=THIN_BORDER)
+        for header in LEADS_HEADERS + [summary_header]
+    ])
+    return ws
+
+
+def _append_lead_rows(ws, leads: List[Dict[str, Any]]) -> None:
+    """Escreve um lote de leads (CPU; chamado em thread)."""
+    for lead in leads:
+        summary = lead['summary']
+        values = [
+            _format_date(lead['created_at']),
+            lead['name'],
+            lead['phone'],
+            lead['email'],
+            lead['city'],
+            lead['status'],
+            lead['qualification'],
+            lead['source'],
+            lead['interest'],
+            lead['budget'],
+            lead['urgency'],
+            lead['message_count'],
+            summary[:100] + '...' if len(summary) > 100 else summary,
+        ]
+        row = []
+        for col, value in enumerate(values, 1):
+            fill = None
+            if col == 7:  # Temperatura (formatação condicional)
+                fill = TEMPERATURE_FILLS.get(value, DEFAULT_TEMPERATURE_FILL)
+            row.append(_styled_cell(ws, value, fill=fill, alignment=CELL_ALIGNMENT, border=THIN_BORDER))
+        ws.append(row)
+
+
+async def write_excel(
+    db: AsyncSession,
+    tenant: Tenant,
+    fileobj: BinaryIO,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    include_metrics: bool = True,
+    include_leads: bool = True,
+) -> int:
+    """
+    Escreve o Excel em `fileobj` com o workbook em modo write-only:
+    as linhas vão para disco à medida que os lotes chegam do banco.
+
+    Returns:
+        Quantidade de leads exportados
+    """
+    wb = Workbook(write_only=True)
+
+    if include_metrics:
+        metrics = await get_metrics_for_export(db, tenant.id, start_date, end_date)
+        _write_summary_sheet(wb, tenant, metrics, start_date, end_date)
+
+    total = 0
+    if include_leads or not wb.worksheets:
+        ws = _create_leads_sheet(wb, "Resumo IA")
+        if include_leads:
+            async for batch in iter_leads_for_export(db, tenant.id, start_date, end_date):
+                await asyncio.to_thread(_append_lead_rows, ws, batch)
+                total += len(batch)
+        ws.auto_filter.ref = f"A1:M{total + 1}"
+
+    await asyncio.to_thread(wb.save, fileobj)
+    return total
+
+
 async def export_to_excel(
     db: AsyncSession,
     tenant: Tenant,
@@ -218,130 +445,41 @@ async def export_to_excel(
 ) -> bytes:
     """
     Exporta dados para Excel com múltiplas abas e formatação profissional.
-    
+
     Returns:
-        bytes do arquivo Excel
+        bytes do arquivo Excel (para arquivos grandes use stream_excel_export)
     """
-    
-    # Busca dados
-    leads = await get_leads_for_export(db, tenant.id, start_date, end_date)
-    metrics = await get_metrics_for_export(db, tenant.id, start_date, end_date) if include_metrics else None
-    
-    # Cria workbook
-    wb = Workbook()
-    
-    # Estilos
-    header_font = Font(bold=True, color="FFFFFF", size=11)
-    header_fill = PatternFill("solid", fgColor=VELLARYS_GREEN)
-    header_alignment = Alignment(horizontal="center", vertical="center")
-    
-    cell_alignment = Alignment(horizontal="left", vertical="center")
-    number_alignment = Alignment(horizontal="center", vertical="center")
-    
-    thin_border = Border(
-        left=Side(style='thin', color='E0E0E0'),
-        right=Side(style='thin', color='E0E0E0'),
-        top=Side(style='thin', color='E0E0E0'),
-        bottom=Side(style='thin', color='E0E0E0')
-    )
-    
-    # ============================================
-    # ABA 1: RESUMO
-    # ============================================
-    if include_metrics and metrics:
-        ws_resumo = wb.active
-        ws_resumo.title = "Resumo"
-        
-        # Título
-        ws_resumo['A1'] = f"📊 RELATÓRIO VELLARYS - {tenant.name}"
-        ws_resumo['A1'].font = Font(bold=True, size=16, color=VELLARYS_GREEN)
-        ws_resumo.merge_cells('A1:D1')
-        
-        # Período
-        periodo = "Todo o período"
-        if start_date and end_date:
-            periodo = f"{start_date.strftime('%d/%m/%Y')} a {end_date.strftime('%d/%m/%Y')}"
-        elif start_date:
-            periodo = f"A partir de {start_date.strftime('%d/%m/%Y')}"
-        
-        ws_resumo['A2'] = f"Período: {periodo}"
-        ws_resumo['A2'].font = Font(italic=True, color="666666")
-        
-        ws_resumo['A3'] = f"Gerado em: {datetime.now().strftime('%d/%m/%Y às %H:%M')}"
-        ws_resumo['A3'].font = Font(italic=True, color="666666")
-        
-        # Métricas principais
-        ws_resumo['A5'] = "MÉTRICAS PRINCIPAIS"
-        ws_resumo['A5'].font = Font(bold=True, size=12)
-        
-        metricas = [
-            ("Total de Leads", metrics['total_leads']),
-            ("Leads Quentes 🔥", metrics['hot_leads']),
-            ("Convertidos ✅", metrics['converted']),
-            ("Taxa de Conversão", f"{metrics['conversion_rate']}%"),
-            ("Total de Mensagens", metrics['total_messages']),
-            ("Média msgs/lead", metrics['avg_messages_per_lead']),
-        ]
-        
-        for i, (label, value) in enumerate(metricas):
-            row = 6 + i
-            ws_resumo[f'A{row}'] = label
-            ws_resumo[f'B{row}'] = value
-            ws_resumo[f'A{row}'].font = Font(bold=True)
-            ws_resumo[f'B{row}'].alignment = number_alignment
-        
-        # Por Status
-        ws_resumo['A14'] = "POR STATUS"
-        ws_resumo['A14'].font = Font(bold=True, size=12)
-        
-        row = 15
-        for status, count in metrics['by_status'].items():
-            ws_resumo[f'A{row}'] = STATUS_MAP.get(status, status)
-            ws_resumo[f'B{row}'] = count
-            row += 1
-        
-        # Por Qualificação
-        ws_resumo['D14'] = "POR TEMPERATURA"
-        ws_resumo['D14'].font = Font(bold=True, size=12)
-        
-        row = 15
-        for qual, count in metrics['by_qualification'].items():
-            ws_resumo[f'D{row}'] = QUALIFICATION_MAP.get(qual, qual)
-            ws_resumo[f'E{row}'] = count
-            row += 1
-        
-        # Ajusta largura das colunas
-        ws_resumo.column_dimensions['A'].width = 25
-        ws_resumo.column_dimensions['B'].width = 15
-        ws_resumo.column_dimensions['D'].width = 20
-        ws_resumo.column_dimensions['E'].width = 15
-    
-    # ============================================
-    # ABA 2: LEADS
-    # ============================================
-    if include_leads and leads:
-        ws_leads = wb.create_sheet("Leads") if include_metrics else wb.active
-        if not include_metrics:
-            ws_leads.title = "Leads"
-        
-        # Cabeçalho
-        headers = [
-            "Data", "Nome", "Telefone", "Email", "Cidade", 
-            "Status", "Temperatura", "Origem", "Interesse",
-            "Orçamento", "Urgência", "Mensagens", "Resumo IA"
-        ]
-        
-        for col, header in enumerate(headers, 1):
-            cell = ws_leads.cell(row=1, column=col, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = header_alignment
-            cell.border = thin_border
-        
-        # Dados
-        for row_num, lead in enumerate(leads, 2):
-            data = [
-                lead['created_at'].strftime('%d/%m/%Y %H:%M') if lead['created_at'] else '',
+    buffer = io.BytesIO()
+    await write_excel(db, tenant, buffer, start_date, end_date, include_metrics, include_leads)
+    return buffer.getvalue()
+
+
+# ============================================
+# EXPORTAÇÃO CSV
+# ============================================
+
+CSV_HEADERS = LEADS_HEADERS + ["Resumo"]
+
+
+async def _iter_csv_batches(
+    db: AsyncSession,
+    tenant_id: int,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+) -> AsyncIterator[Tuple[bytes, int]]:
+    """(pedaço do CSV, leads no pedaço); o primeiro é o cabeçalho com BOM."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=';', quotechar='"', quoting=csv.QUOTE_MINIMAL)
+
+    writer.writerow(CSV_HEADERS)
+    yield buffer.getvalue().encode('utf-8-sig'), 0  # BOM para Excel reconhecer UTF-8
+
+    async for batch in iter_leads_for_export(db, tenant_id, start_date, end_date):
+        buffer.seek(0)
+        buffer.truncate(0)
+        for lead in batch:
+            writer.writerow([
+                _format_date(lead['created_at']),
                 lead['name'],
                 lead['phone'],
                 lead['email'],
@@ -353,45 +491,41 @@ async def export_to_excel(
                 lead['budget'],
                 lead['urgency'],
                 lead['message_count'],
-                lead['summary'][:100] + '...' if len(lead['summary']) > 100 else lead['summary'],
-            ]
-            
-            for col, value in enumerate(data, 1):
-                cell = ws_leads.cell(row=row_num, column=col, value=value)
-                cell.alignment = cell_alignment
-                cell.border = thin_border
-                
-                # Formatação condicional por temperatura
-                if col == 7:  # Temperatura
-                    if value == 'Quente':
-                        cell.fill = PatternFill("solid", fgColor="FFCDD2")
-                    elif value == 'Morno':
-                        cell.fill = PatternFill("solid", fgColor="FFE0B2")
-                    else:
-                        cell.fill = PatternFill("solid", fgColor="BBDEFB")
-        
-        # Ajusta largura das colunas
-        column_widths = [18, 25, 15, 25, 15, 15, 12, 15, 20, 15, 15, 12, 40]
-        for i, width in enumerate(column_widths, 1):
-            ws_leads.column_dimensions[get_column_letter(i)].width = width
-        
-        # Congela primeira linha
-        ws_leads.freeze_panes = 'A2'
-        
-        # Filtros
-        ws_leads.auto_filter.ref = f"A1:M{len(leads) + 1}"
-    
-    # Salva em buffer
-    buffer = io.BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
-    
-    return buffer.getvalue()
+                lead['summary'],
+            ])
+        yield buffer.getvalue().encode('utf-8'), len(batch)
 
 
-# ============================================
-# EXPORTAÇÃO CSV
-# ============================================
+async def iter_csv_chunks(
+    db: AsyncSession,
+    tenant_id: int,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+) -> AsyncIterator[bytes]:
+    """CSV em pedaços, um por lote do cursor."""
+    async for chunk, _ in _iter_csv_batches(db, tenant_id, start_date, end_date):
+        yield chunk
+
+
+async def write_csv(
+    db: AsyncSession,
+    tenant_id: int,
+    fileobj: BinaryIO,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+) -> int:
+    """
+    Escreve o CSV em `fileobj` lote a lote.
+
+    Returns:
+        Quantidade de leads exportados
+    """
+    total = 0
+    async for chunk, count in _iter_csv_batches(db, tenant_id, start_date, end_date):
+        await asyncio.to_thread(fileobj.write, chunk)
+        total += count
+    return total
+
 
 async def export_to_csv(
     db: AsyncSession,
@@ -401,44 +535,198 @@ async def export_to_csv(
 ) -> bytes:
     """
     Exporta leads para CSV.
-    
+
     Returns:
-        bytes do arquivo CSV
+        bytes do arquivo CSV (para arquivos grandes use stream_csv_export)
     """
-    
-    leads = await get_leads_for_export(db, tenant.id, start_date, end_date)
-    
-    buffer = io.StringIO()
-    writer = csv.writer(buffer, delimiter=';', quotechar='"', quoting=csv.QUOTE_MINIMAL)
-    
-    # Cabeçalho
-    headers = [
-        "Data", "Nome", "Telefone", "Email", "Cidade",
-        "Status", "Temperatura", "Origem", "Interesse",
-        "Orçamento", "Urgência", "Mensagens", "Resumo"
-    ]
-    writer.writerow(headers)
-    
-    # Dados
-    for lead in leads:
-        row = [
-            lead['created_at'].strftime('%d/%m/%Y %H:%M') if lead['created_at'] else '',
-            lead['name'],
-            lead['phone'],
-            lead['email'],
-            lead['city'],
-            lead['status'],
-            lead['qualification'],
-            lead['source'],
-            lead['interest'],
-            lead['budget'],
-            lead['urgency'],
-            lead['message_count'],
-            lead['summary'],
-        ]
-        writer.writerow(row)
-    
-    return buffer.getvalue().encode('utf-8-sig')  # BOM para Excel reconhecer UTF-8
+    return b"".join([chunk async for chunk in iter_csv_chunks(db, tenant.id, start_date, end_date)])
+
+
+# ============================================
+# STREAMING (respostas HTTP)
+# ============================================
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+async def stream_csv_export(
+    tenant: Tenant,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+) -> AsyncIterator[bytes]:
+    """
+    CSV para StreamingResponse: cada lote do banco já sai para o cliente.
+    Usa sessão própria (vive enquanto a resposta é enviada).
+    """
+    async with async_session() as db:
+        async for chunk in iter_csv_chunks(db, tenant.id, start_date, end_date):
+            yield chunk
+
+
+async def stream_excel_export(
+    tenant: Tenant,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    include_metrics: bool = True,
+    include_leads: bool = True,
+) -> AsyncIterator[bytes]:
+    """
+    Excel para StreamingResponse.
+
+    O .xlsx é um zip que só fica completo no save; as linhas vão para
+    um arquivo temporário em disco (memória constante) e o arquivo é
+    enviado em pedaços ao final.
+    """
+    with tempfile.TemporaryFile() as tmp:
+        async with async_session() as db:
+            await write_excel(db, tenant, tmp, start_date, end_date, include_metrics, include_leads)
+
+        tmp.seek(0)
+        while True:
+            chunk = await asyncio.to_thread(tmp.read, STREAM_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+# ============================================
+# EXPORTAÇÃO EM BACKGROUND
+# ============================================
+
+EXPORT_JOB_KEY = "export:job:{job_id}"
+EXPORT_FORMATS = {
+    "csv": ("csv", "text/csv; charset=utf-8"),
+    "excel": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+# Fallback sem Redis (status visível só nesta réplica)
+_local_jobs: Dict[str, Dict[str, Any]] = {}
+
+
+async def save_export_job(job: Dict[str, Any]) -> None:
+    from src.infrastructure.services.redis_service import cache_set
+
+    _local_jobs[job["job_id"]] = job
+    await cache_set(EXPORT_JOB_KEY.format(job_id=job["job_id"]), job, ttl=settings.export_job_ttl_hours * 3600)
+
+
+async def get_export_job(job_id: str) -> Optional[Dict[str, Any]]:
+    from src.infrastructure.services.redis_service import cache_get_json
+
+    job = await cache_get_json(EXPORT_JOB_KEY.format(job_id=job_id))
+    return job or _local_jobs.get(job_id)
+
+
+async def create_export_job(
+    tenant: Tenant,
+    user_id: int,
+    export_format: str,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    include_metrics: bool = True,
+    include_leads: bool = True,
+) -> Dict[str, Any]:
+    """Registra uma exportação pendente (executar com run_export_job)."""
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Formato não suportado: {export_format}")
+    if export_format == "csv" and not include_leads:
+        raise ValueError("CSV contém apenas a lista de leads")
+
+    job_id = uuid.uuid4().hex
+    extension, media_type = EXPORT_FORMATS[export_format]
+    job = {
+        "job_id": job_id,
+        "tenant_id": tenant.id,
+        "user_id": user_id,
+        "format": export_format,
+        "status": "pending",
+        "filename": f"velaris_{tenant.slug}_{datetime.now().strftime('%Y%m%d_%H%M')}.{extension}",
+        "media_type": media_type,
+        "path": str(Path(settings.export_jobs_path) / str(tenant.id) / f"{job_id}.{extension}"),
+        "start_date": start_date.isoformat() if start_date else None,
+        "end_date": end_date.isoformat() if end_date else None,
+        "include_metrics": include_metrics,
+        "include_leads": include_leads,
+        "rows": None,
+        "error": None,
+        "created_at": datetime.utcnow().isoformat(),
+        "finished_at": None,
+    }
+    await save_export_job(job)
+    return job
+
+
+def _cleanup_expired_exports(directory: Path) -> None:
+    cutoff = datetime.now().timestamp() - settings.export_job_ttl_hours * 3600
+    for path in directory.glob("*"):
+        try:
+            if path.is_file() and path.stat().st_mtime < cutoff:
+                path.unlink()
+        except OSError:
+            pass
+
+
+async def run_export_job(job_id: str) -> None:
+    """Gera o arquivo da exportação em disco e atualiza o status do job."""
+    job = await get_export_job(job_id)
+    if not job:
+        logger.warning(f"⚠️ Exportação {job_id} não encontrada")
+        return
+
+    job["status"] = "running"
+    await save_export_job(job)
+
+    path = Path(job["path"])
+    start_date = datetime.fromisoformat(job["start_date"]) if job["start_date"] else None
+    end_date = datetime.fromisoformat(job["end_date"]) if job["end_date"] else None
+
+    try:
+        await asyncio.to_thread(path.parent.mkdir, parents=True, exist_ok=True)
+        await asyncio.to_thread(_cleanup_expired_exports, path.parent)
+
+        async with async_session() as db:
+            tenant = await db.get(Tenant, job["tenant_id"])
+            if job["format"] == "excel":
+                with open(path, "wb") as fileobj:
+                    job["rows"] = await write_excel(
+                        db, tenant, fileobj, start_date, end_date,
+                        include_metrics=job["include_metrics"],
+                        include_leads=job.get("include_leads", True),
+                    )
+            else:
+                with open(path, "wb") as fileobj:
+                    job["rows"] = await write_csv(db, tenant.id, fileobj, start_date, end_date)
+
+        job["status"] = "done"
+        logger.info(f"✅ Exportação {job_id} concluída ({job['rows']} leads)")
+    except Exception as e:
+        job["status"], job["error"] = "error", str(e)
+        logger.error(f"❌ Erro na exportação {job_id}: {e}", exc_info=True)
+        await asyncio.to_thread(path.unlink, missing_ok=True)
+    finally:
+        job["finished_at"] = datetime.utcnow().isoformat()
+        await save_export_job(job)
+
+
+def stream_export_job(job: Dict[str, Any], tenant: Tenant) -> AsyncIterator[bytes]:
+    """
+    Gera de novo, em streaming, o arquivo de um job concluído.
+
+    O arquivo fica no disco da réplica que rodou o job (export_jobs_path
+    não é compartilhado entre réplicas): o download que cai em outra
+    réplica, ou depois de um restart, refaz a exportação com os mesmos
+    parâmetros em vez de falhar.
+    """
+    start_date = datetime.fromisoformat(job["start_date"]) if job["start_date"] else None
+    end_date = datetime.fromisoformat(job["end_date"]) if job["end_date"] else None
+
+    if job["format"] == "excel":
+        return stream_excel_export(
+            tenant, start_date, end_date,
+            include_metrics=job["include_metrics"],
+            include_leads=job.get("include_leads", True),
+        )
+    return stream_csv_export(tenant, start_date, end_date)
 
 
 # ============================================
@@ -460,9 +748,9 @@ async def export_to_pdf(
         bytes do arquivo PDF
     """
     
-    # Busca dados
-    leads = await get_leads_for_export(db, tenant.id, start_date, end_date)
+    # Busca dados (só os leads exibidos na lista)
     metrics = await get_metrics_for_export(db, tenant.id, start_date, end_date)
+    leads = await get_leads_for_export(db, tenant.id, start_date, end_date, limit=max_leads) if include_leads else []
     
     # Cria buffer
     buffer = io.BytesIO()
@@ -601,7 +889,7 @@ async def export_to_pdf(
         story.append(PageBreak())
         story.append(Paragraph("📋 Lista de Leads", section_style))
         story.append(Paragraph(
-            f"Mostrando {min(len(leads), max_leads)} de {len(leads)} leads",
+            f"Mostrando {len(leads)} de {metrics['total_leads']} leads",
             styles['Normal']
         ))
         story.append(Spacer(1, 10))
@@ -610,7 +898,7 @@ async def export_to_pdf(
         leads_header = ['Nome', 'Telefone', 'Status', 'Temp.', 'Msgs']
         leads_data = [leads_header]
         
-        for lead in leads[:max_leads]:
+        for lead in leads:
             leads_data.append([
                 lead['name'][:20] if lead['name'] else '-',
                 lead['phone'] or '-',
@@ -28,6 +28,8 @@ from enum import Enum
 
 import httpx
 
+from src.infrastructure.services.http_client_registry import get_http_client
+
 logger = logging.getLogger(__name__)
 
 
@@ -137,29 +139,25 @@ class GupshupService:
 
     def __init__(self, config: GupshupConfig):
         self.config = config
-        self._client: Optional[httpx.AsyncClient] = None
 
     @property
     def is_configured(self) -> bool:
         """Verifica se o serviço está configurado."""
         return self.config.is_configured
 
+    def _get_headers(self) -> Dict[str, str]:
+        return {
+            "apikey": self.config.api_key,
+            "Content-Type": "application/x-www-form-urlencoded",
+        }
+
     async def _get_client(self) -> httpx.AsyncClient:
-        """Retorna cliente HTTP (lazy initialization)."""
-        if self._client is None or self._client.is_closed:
-            self._client = httpx.AsyncClient(
-                timeout=30.0,
-                headers={
-                    "apikey": self.config.api_key,
-                    "Content-Type": "application/x-www-form-urlencoded",
-                }
-            )
-        return self._client
+        """Retorna o cliente HTTP compartilhado (pool com keep-alive)."""
+        return get_http_client("gupshup")
 
     async def close(self):
-        """Fecha o cliente HTTP."""
-        if self._client and not self._client.is_closed:
-            await self._client.aclose()
+        """Mantido por compatibilidade: o pool é fechado no shutdown da aplicação."""
+        return None
 
     # ==========================================
     # ENVIO DE MENSAGENS
@@ -399,7 +397,7 @@ class GupshupService:
 
         try:
             client = await self._get_client()
-            response = await client.post(url, data=payload)
+            response = await client.post(url, data=payload, headers=self._get_headers(), timeout=30.0)
 
             response_data = response.json()
 
@@ -603,6 +601,7 @@ class GupshupService:
             client = await self._get_client()
             response = await client.get(
                 "https://api.gupshup.io/wa/health",
+                headers=self._get_headers(),
                 timeout=10.0,
             )
 
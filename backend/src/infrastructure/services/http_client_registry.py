@@ -0,0 +1,81 @@
+"""
+REGISTRO DE CLIENTES HTTP COMPARTILHADOS
+=========================================
+
+Clientes httpx.AsyncClient persistentes, um por upstream
+(Z-API, download de mídia, portais, APIs customizadas).
+
+Antes cada envio abria um AsyncClient novo e pagava handshake
+TCP + TLS; em campanhas com milhares de mensagens isso dominava
+a latência. Aqui as conexões ficam em keep-alive no pool do cliente.
+
+- Pool com keep-alive (limites configuráveis em settings)
+- HTTP/2 quando o pacote `h2` está instalado
+- Fechamento limpo no shutdown (main.lifespan)
+
+Uso:
+    client = get_http_client("zapi")
+    response = await client.post(url, json=payload, timeout=30)
+
+Não use `async with` no cliente retornado: ele é compartilhado.
+"""
+
+import importlib.util
+import logging
+from typing import Dict
+
+import httpx
+
+from src.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+_clients: Dict[str, httpx.AsyncClient] = {}
+
+
+def _build_client(name: str) -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=settings.http_client_max_connections,
+        max_keepalive_connections=settings.http_client_max_keepalive_connections,
+        keepalive_expiry=settings.http_client_keepalive_expiry_seconds,
+    )
+    timeout = httpx.Timeout(
+        settings.http_client_timeout_seconds,
+        connect=settings.http_client_connect_timeout_seconds,
+    )
+    http2 = settings.http_client_http2 and HTTP2_AVAILABLE
+
+    logger.info(f"🌐 Cliente HTTP '{name}' criado (http2={http2})")
+    return httpx.AsyncClient(limits=limits, timeout=timeout, http2=http2)
+
+
+def get_http_client(name: str = "default") -> httpx.AsyncClient:
+    """
+    Retorna o cliente compartilhado do upstream `name` (criado sob demanda).
+
+    Headers, timeout e follow_redirects específicos devem ser passados
+    por requisição.
+    """
+    client = _clients.get(name)
+    if client is None or client.is_closed:
+        client = _build_client(name)
+        _clients[name] = client
+    return client
+
+
+async def close_http_clients() -> None:
+    """Fecha todos os clientes (chamado no shutdown da aplicação)."""
+    clients = list(_clients.items())
+    _clients.clear()
+
+    for name, client in clients:
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.warning(f"⚠️ Erro fechando cliente HTTP '{name}': {e}")
+
+    if clients:
+        logger.info(f"🌐 {len(clients)} cliente(s) HTTP fechados")
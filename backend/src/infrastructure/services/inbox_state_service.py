@@ -0,0 +1,346 @@
+"""
+INBOX STATE SERVICE - Estado das mensagens do lead mantido na escrita
+=====================================================================
+
+Cada lead guarda o resumo das suas mensagens:
+
+- message_count / user_message_count: total de mensagens e mensagens do
+  lead (role "user"), no lugar de count(Message.id) na tabela messages
+- inbox_unread_count: mensagens do lead (role "user") desde o take-over
+  (sem take-over, todas as mensagens do lead)
+- inbox_last_message_at / preview / role: última mensagem da conversa
+
+Antes o /seller/inbox/leads carregava todas as mensagens de todos os
+leads do corretor para calcular isso em Python, e cada turno, exportação
+e notificação contava as mensagens do lead.
+
+Como funciona:
+1. Listener `after_flush` coleta Messages inseridas/apagadas e Leads
+   com seller_took_over_at alterado
+2. Um UPDATE por lead afetado (na mesma transação do flush) soma os
+   contadores e as não lidas e avança a última mensagem, sem voltar no
+   tempo se uma mensagem antiga chegar atrasada
+3. Take-over (ou devolução para a IA) recalcula as não lidas a partir
+   das mensagens
+4. Os valores retornados são aplicados no objeto Lead carregado na
+   sessão, para quem ler depois do commit
+
+Escritas via Core (insert(Message) sem ORM) não passam pelo listener e
+mensagens apagadas só descontam os contadores; o job noturno
+run_lead_message_state_reconcile_job corrige o que divergir de messages.
+"""
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import case, event, func, inspect, or_, select, text, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from src.config import get_settings
+from src.domain.entities import Lead, Message
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+PREVIEW_LENGTH = 50
+
+_STATE_ATTRS = (
+    "message_count",
+    "user_message_count",
+    "inbox_unread_count",
+    "inbox_last_message_at",
+    "inbox_last_message_preview",
+    "inbox_last_message_role",
+)
+
+
+def message_preview(content: Optional[str]) -> Optional[str]:
+    """Preview da mensagem como exibido no inbox (50 caracteres + "...")."""
+    if content is None:
+        return None
+    preview = content[:PREVIEW_LENGTH]
+    if len(content) > PREVIEW_LENGTH:
+        preview += "..."
+    return preview
+
+
+# =============================================================================
+# DELTAS
+# =============================================================================
+
+@dataclass
+class InboxDelta:
+    """Alterações de contadores/inbox de um lead em um flush."""
+
+    new_messages: int = 0  # Inseridas menos apagadas
+    new_user_messages: int = 0
+    new_unread: int = 0
+    last_message_at: Optional[datetime] = None
+    last_preview: Optional[str] = None
+    last_role: Optional[str] = None
+    recount_unread: bool = False
+
+
+def _as_utc(value, fallback: datetime) -> datetime:
+    if not isinstance(value, datetime):
+        return fallback
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def build_inbox_deltas(
+    new_messages: Iterable,
+    took_over_lead_ids: Iterable[int] = (),
+    now: Optional[datetime] = None,
+    deleted_messages: Iterable = (),
+) -> Dict[int, InboxDelta]:
+    """
+    Agrupa as mensagens novas (e apagadas) por lead.
+
+    Mensagens sem created_at carregado (server_default) usam `now`;
+    em empate, vale a última na ordem do flush.
+    """
+    now = now or datetime.now(timezone.utc)
+    deltas: Dict[int, InboxDelta] = {}
+
+    for message in deleted_messages:
+        lead_id = message.__dict__.get("lead_id")
+        if lead_id is None:
+            continue
+        delta = deltas.setdefault(lead_id, InboxDelta())
+        delta.new_messages -= 1
+        if message.__dict__.get("role") == "user":
+            delta.new_user_messages -= 1
+
+    for message in new_messages:
+        lead_id = message.__dict__.get("lead_id")
+        if lead_id is None:
+            continue
+        delta = deltas.setdefault(lead_id, InboxDelta())
+        delta.new_messages += 1
+        role = message.__dict__.get("role")
+        if role == "user":
+            delta.new_user_messages += 1
+            delta.new_unread += 1
+
+        created_at = _as_utc(message.__dict__.get("created_at"), now)
+        if delta.last_message_at is None or created_at >= delta.last_message_at:
+            delta.last_message_at = created_at
+            delta.last_preview = message_preview(message.__dict__.get("content"))
+            delta.last_role = role
+
+    for lead_id in took_over_lead_ids:
+        deltas.setdefault(lead_id, InboxDelta()).recount_unread = True
+
+    return deltas
+
+
+# =============================================================================
+# UPDATE
+# =============================================================================
+
+def _unread_subquery():
+    """Mensagens do lead desde o take-over (todas, se não houve take-over)."""
+    return (
+        select(func.count(Message.id))
+        .where(
+            Message.lead_id == Lead.id,
+            Message.role == "user",
+            or_(Lead.seller_took_over_at.is_(None), Message.created_at > Lead.seller_took_over_at),
+        )
+        .correlate(Lead)
+        .scalar_subquery()
+    )
+
+
+def _update_statement(lead_id: int, delta: InboxDelta):
+    values = {
+        # Não mexe em updated_at: mensagem nova não é edição do lead
+        "updated_at": Lead.updated_at,
+    }
+
+    if delta.new_messages:
+        values["message_count"] = func.greatest(Lead.message_count + delta.new_messages, 0)
+    if delta.new_user_messages:
+        values["user_message_count"] = func.greatest(Lead.user_message_count + delta.new_user_messages, 0)
+
+    if delta.recount_unread:
+        values["inbox_unread_count"] = _unread_subquery()
+    elif delta.new_unread:
+        values["inbox_unread_count"] = Lead.inbox_unread_count + delta.new_unread
+
+    if delta.last_message_at is not None:
+        is_newer = or_(
+            Lead.inbox_last_message_at.is_(None),
+            Lead.inbox_last_message_at <= delta.last_message_at,
+        )
+        values["inbox_last_message_at"] = func.greatest(
+            func.coalesce(Lead.inbox_last_message_at, delta.last_message_at), delta.last_message_at
+        )
+        values["inbox_last_message_preview"] = case(
+            (is_newer, delta.last_preview), else_=Lead.inbox_last_message_preview
+        )
+        values["inbox_last_message_role"] = case(
+            (is_newer, delta.last_role), else_=Lead.inbox_last_message_role
+        )
+
+    return (
+        update(Lead)
+        .where(Lead.id == lead_id)
+        .values(**values)
+        .returning(*(getattr(Lead, attr) for attr in _STATE_ATTRS))
+    )
+
+
+# =============================================================================
+# LISTENER DE FLUSH
+# =============================================================================
+
+def _took_over_leads(session: Session) -> List[int]:
+    lead_ids = []
+    for lead in session.dirty:
+        if isinstance(lead, Lead) and inspect(lead).attrs.seller_took_over_at.history.has_changes():
+            lead_id = lead.__dict__.get("id")
+            if lead_id is not None:
+                lead_ids.append(lead_id)
+    return lead_ids
+
+
+COUNTED_LEADS_KEY = "lead_message_counts_flush"
+
+
+def leads_counted_in_flush(session: Session, flush_context) -> Set[int]:
+    """Leads cujos contadores já incluem as mensagens deste flush."""
+    counted = session.info.get(COUNTED_LEADS_KEY)
+    if counted is None or flush_context is None or counted[0] is not flush_context:
+        return set()
+    return counted[1]
+
+
+def _after_flush(session: Session, flush_context) -> None:
+    new_messages = [obj for obj in session.new if isinstance(obj, Message)]
+    deleted_messages = [obj for obj in session.deleted if isinstance(obj, Message)]
+    took_over = _took_over_leads(session)
+    if not new_messages and not deleted_messages and not took_over:
+        return
+
+    deltas = build_inbox_deltas(new_messages, took_over, deleted_messages=deleted_messages)
+    if not deltas:
+        return
+
+    # Usa a conexão do flush: mesma transação, sem disparar novo autoflush
+    connection = session.connection()
+    session.info[COUNTED_LEADS_KEY] = (flush_context, set(deltas))
+    for lead_id in sorted(deltas):
+        row = connection.execute(_update_statement(lead_id, deltas[lead_id])).first()
+        if row is None:
+            continue
+        lead = session.identity_map.get(session.identity_key(Lead, lead_id))
+        if lead is not None:
+            for attr in _STATE_ATTRS:
+                set_committed_value(lead, attr, getattr(row, attr))
+
+
+def register_inbox_state_listener() -> None:
+    """Registra o listener de estado do inbox em todas as sessões (idempotente)."""
+    if not event.contains(Session, "after_flush", _after_flush):
+        event.listen(Session, "after_flush", _after_flush)
+        logger.info("📥 Contadores de mensagens e estado do inbox mantidos no flush")
+
+
+# =============================================================================
+# RECONSTRUÇÃO / RECONCILIAÇÃO
+# =============================================================================
+
+# Só reescreve os leads que divergem de messages (sem inchar a tabela)
+REBUILD_INBOX_STATE_SQL = f"""
+    UPDATE leads l SET
+        message_count = s.total,
+        user_message_count = s.user_total,
+        inbox_unread_count = s.unread,
+        inbox_last_message_at = s.last_at,
+        inbox_last_message_preview = CASE
+            WHEN length(s.last_content) > {PREVIEW_LENGTH}
+            THEN left(s.last_content, {PREVIEW_LENGTH}) || '...'
+            ELSE s.last_content
+        END,
+        inbox_last_message_role = s.last_role
+    FROM (
+        SELECT
+            b.id,
+            counts.total,
+            counts.user_total,
+            (SELECT COUNT(*) FROM messages m
+              WHERE m.lead_id = b.id AND m.role = 'user'
+                AND (b.seller_took_over_at IS NULL OR m.created_at > b.seller_took_over_at)
+            ) AS unread,
+            last.created_at AS last_at,
+            last.content AS last_content,
+            last.role AS last_role
+        FROM leads b
+        CROSS JOIN LATERAL (
+            SELECT COUNT(*) AS total, COUNT(*) FILTER (WHERE m.role = 'user') AS user_total
+              FROM messages m
+             WHERE m.lead_id = b.id
+        ) counts
+        LEFT JOIN LATERAL (
+            SELECT created_at, content, role FROM messages m
+             WHERE m.lead_id = b.id
+             ORDER BY m.created_at DESC, m.id DESC
+             LIMIT 1
+        ) last ON TRUE
+        {{where}}
+    ) s
+    WHERE l.id = s.id
+      AND (l.message_count, l.user_message_count, l.inbox_unread_count, l.inbox_last_message_at, l.inbox_last_message_role)
+          IS DISTINCT FROM (s.total, s.user_total, s.unread, s.last_at, s.last_role)
+"""
+
+
+async def rebuild_inbox_state(session, lead_ids: Optional[List[int]] = None) -> int:
+    """
+    Recalcula contadores e inbox a partir de messages (todos os leads ou `lead_ids`).
+
+    Returns:
+        Leads corrigidos
+    """
+    where, params = "", {}
+    if lead_ids is not None:
+        if not lead_ids:
+            return 0
+        where, params = "WHERE b.id = ANY(:lead_ids)", {"lead_ids": list(lead_ids)}
+
+    result = await session.execute(text(REBUILD_INBOX_STATE_SQL.format(where=where)), params)
+    logger.info(f"📥 Estado das mensagens recalculado ({len(lead_ids) if lead_ids is not None else 'todos'} leads)")
+    return result.rowcount
+
+
+async def reconcile_lead_message_state(session, batch_size: Optional[int] = None) -> int:
+    """Recalcula todos os leads em faixas de id (um commit por faixa)."""
+    batch_size = batch_size or settings.lead_reconcile_batch_size
+    max_id = (await session.execute(select(func.max(Lead.id)))).scalar() or 0
+
+    fixed = 0
+    sql = text(REBUILD_INBOX_STATE_SQL.format(where="WHERE b.id > :after_id AND b.id <= :until_id"))
+    for after_id in range(0, max_id, batch_size):
+        result = await session.execute(sql, {"after_id": after_id, "until_id": after_id + batch_size})
+        await session.commit()
+        fixed += result.rowcount
+
+    if fixed:
+        logger.warning(f"📥 Reconciliação: {fixed} leads com contadores/inbox divergentes de messages")
+    return fixed
+
+
+async def run_lead_message_state_reconcile_job() -> dict:
+    """Job noturno: corrige contadores e inbox que divergiram de messages."""
+    from src.infrastructure.database import async_session
+
+    async with async_session() as session:
+        fixed = await reconcile_lead_message_state(session)
+
+    return {"leads_fixed": fixed}
@@ -20,11 +20,12 @@ Performance:
 import hashlib
 import logging
 from typing import List, Dict, Optional, Any
-from sqlalchemy import select, text, delete
+from sqlalchemy import select, text, delete, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.domain.entities.knowledge_embedding import KnowledgeEmbedding
-from src.infrastructure.llm import LLMFactory
+from src.infrastructure.llm import LLMFactory, iter_embedding_batches
 
 logger = logging.getLogger(__name__)
 
@@ -96,6 +97,32 @@ def build_searchable_text(title: str, content: str, metadata: Dict = None) -> st
 # INDEXAÇÃO DE FAQ
 # =============================================================================
 
+async def _upsert_knowledge_embeddings(db: AsyncSession, rows: List[Dict]) -> None:
+    """Grava um lote de embeddings com um único INSERT ... ON CONFLICT."""
+    if not rows:
+        return
+
+    stmt = pg_insert(KnowledgeEmbedding).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[
+            KnowledgeEmbedding.tenant_id,
+            KnowledgeEmbedding.source_type,
+            KnowledgeEmbedding.source_id,
+        ],
+        set_={
+            "title": stmt.excluded.title,
+            "content": stmt.excluded.content,
+            "embedding": stmt.excluded.embedding,
+            "content_hash": stmt.excluded.content_hash,
+            "metadata": stmt.excluded["metadata"],
+            "active": True,
+            "updated_at": func.now(),
+        },
+    )
+    await db.execute(stmt)
+    await db.commit()
+
+
 async def index_faq_items(
     db: AsyncSession,
     tenant_id: int,
@@ -105,6 +132,10 @@ async def index_faq_items(
     """
     Indexa itens do FAQ no banco de embeddings.
 
+    Hashes existentes são lidos em uma única query; apenas itens
+    alterados vão para a API de embeddings, em lotes, e cada lote
+    é gravado com um único upsert.
+
     Args:
         db: Sessão do banco de dados
         tenant_id: ID do tenant
@@ -131,6 +162,16 @@ async def index_faq_items(
             await db.commit()
             logger.info(f"🗑️ FAQs antigos removidos (tenant {tenant_id})")
 
+        # Hashes já indexados (1 query)
+        result = await db.execute(
+            select(KnowledgeEmbedding.source_id, KnowledgeEmbedding.content_hash)
+            .where(KnowledgeEmbedding.tenant_id == tenant_id)
+            .where(KnowledgeEmbedding.source_type == "faq")
+        )
+        existing_hashes = {source_id: content_hash for source_id, content_hash in result.all()}
+
+        pending = []  # linhas prontas para upsert (sem o embedding)
+        texts = []
         for idx, item in enumerate(faq_items):
             question = (item.get("question") or "").strip()
             answer = (item.get("answer") or "").strip()
@@ -142,72 +183,52 @@ async def index_faq_items(
                 stats["skipped"] += 1
                 continue
 
-            try:
-                source_id = f"faq_{idx}"
-                content_hash = compute_content_hash(question, answer)
-
-                # Verifica se já existe
-                result = await db.execute(
-                    select(KnowledgeEmbedding)
-                    .where(KnowledgeEmbedding.tenant_id == tenant_id)
-                    .where(KnowledgeEmbedding.source_type == "faq")
-                    .where(KnowledgeEmbedding.source_id == source_id)
-                )
-                existing = result.scalar_one_or_none()
-
-                # Se existe e hash igual, pula (não mudou)
-                if existing and existing.content_hash == content_hash:
-                    logger.debug(f"FAQ {idx} não mudou, pulando")
-                    stats["skipped"] += 1
-                    continue
+            source_id = f"faq_{idx}"
+            content_hash = compute_content_hash(question, answer)
 
-                # Monta texto para embedding
-                metadata = {"index": idx}
-                if category:
-                    metadata["category"] = category
+            # Se existe e hash igual, pula (não mudou)
+            if existing_hashes.get(source_id) == content_hash:
+                stats["skipped"] += 1
+                continue
 
-                searchable_text = build_searchable_text(question, answer, metadata)
+            # Monta texto para embedding
+            metadata = {"index": idx}
+            if category:
+                metadata["category"] = category
 
-                # Gera embedding
-                embedding_vector = await generate_embedding(searchable_text)
-                if not embedding_vector:
-                    logger.error(f"Falha ao gerar embedding para FAQ {idx}")
+            pending.append({
+                "tenant_id": tenant_id,
+                "source_type": "faq",
+                "source_id": source_id,
+                "title": question,
+                "content": answer,
+                "content_hash": content_hash,
+                "metadata": metadata,
+            })
+            texts.append(build_searchable_text(question, answer, metadata))
+
+        async for offset, vectors in iter_embedding_batches(texts):
+            rows = []
+            for row, vector in zip(pending[offset:], vectors):
+                if vector is None:
+                    logger.error(f"Falha ao gerar embedding para FAQ {row['source_id']}")
                     stats["failed"] += 1
                     continue
+                rows.append({**row, "embedding": vector})
 
-                if existing:
-                    # Atualiza existente
-                    existing.title = question
-                    existing.content = answer
-                    existing.embedding = embedding_vector
-                    existing.content_hash = content_hash
-                    existing.metadata = metadata
-                    existing.active = True
+            try:
+                await _upsert_knowledge_embeddings(db, rows)
+            except Exception as e:
+                logger.error(f"Erro gravando lote de FAQ: {e}")
+                await db.rollback()
+                stats["failed"] += len(rows)
+                continue
+
+            for row in rows:
+                if row["source_id"] in existing_hashes:
                     stats["updated"] += 1
-                    logger.debug(f"FAQ {idx} atualizado")
                 else:
-                    # Cria novo
-                    new_embedding = KnowledgeEmbedding(
-                        tenant_id=tenant_id,
-                        source_type="faq",
-                        source_id=source_id,
-                        title=question,
-                        content=answer,
-                        embedding=embedding_vector,
-                        content_hash=content_hash,
-                        metadata=metadata,
-                    )
-                    db.add(new_embedding)
                     stats["created"] += 1
-                    logger.debug(f"FAQ {idx} criado")
-
-                # Commit a cada item para não perder progresso
-                await db.commit()
-
-            except Exception as e:
-                logger.error(f"Erro indexando FAQ item {idx}: {e}")
-                stats["failed"] += 1
-                await db.rollback()
 
         logger.info(f"📚 FAQ indexado (tenant {tenant_id}): {stats}")
         return stats
@@ -0,0 +1,171 @@
+"""
+MESSAGE COALESCING SERVICE - Agrupamento de Mensagens Seguidas
+==============================================================
+
+No WhatsApp o lead costuma mandar várias mensagens curtas em sequência
+("oi", "vi o anúncio", "do apto 722585"). Este buffer por conversa junta
+essas mensagens num único turno da IA:
+
+- buffer_inbound: o webhook adiciona a mensagem; só a primeira da janela
+  pede o agendamento do flush
+- flush_delay: quanto falta para a janela fechar (silêncio de
+  `window` segundos ou `max_wait` desde a primeira mensagem)
+- peek_buffer / trim_buffer: o worker lê o grupo e só remove o que
+  processou (mensagens que chegaram no meio ficam para o próximo flush)
+
+Existe no máximo um flush pendente por conversa: o buffer vazio agenda
+na chegada e o flush que deixa sobras agenda o próximo.
+
+Sem Redis (ou com Redis fora), usa um buffer em memória do processo.
+"""
+
+import json
+import logging
+import time
+from typing import Any, Dict, List
+
+from src.infrastructure.services.redis_service import get_redis
+
+logger = logging.getLogger(__name__)
+
+COALESCE_PREFIX = "coalesce:"
+BUFFER_TTL_SECONDS = 3600
+
+
+def _keys(key: str):
+    buffer_key = f"{COALESCE_PREFIX}{key}"
+    return buffer_key, f"{buffer_key}:meta"
+
+
+# Remove o que foi processado; se sobrou, reabre a janela a partir de agora
+_TRIM_SCRIPT = """
+redis.call('ltrim', KEYS[1], ARGV[1], -1)
+local remaining = redis.call('llen', KEYS[1])
+if remaining == 0 then
+    redis.call('del', KEYS[2])
+else
+    redis.call('hset', KEYS[2], 'first', ARGV[2], 'last', ARGV[2])
+end
+return remaining
+"""
+
+
+# =============================================================================
+# FALLBACK LOCAL
+# =============================================================================
+
+class _LocalBuffer:
+    __slots__ = ("items", "first", "last")
+
+    def __init__(self, now: float):
+        self.items: List[Dict[str, Any]] = []
+        self.first = now
+        self.last = now
+
+
+# conversa -> buffer local (removido quando esvazia)
+_local_buffers: Dict[str, _LocalBuffer] = {}
+
+
+# =============================================================================
+# API
+# =============================================================================
+
+async def buffer_inbound(key: str, item: Dict[str, Any]) -> bool:
+    """
+    Adiciona a mensagem ao buffer da conversa.
+
+    Returns:
+        True se o buffer estava vazio (quem chamou deve agendar o flush)
+    """
+    now = time.time()
+    redis = await get_redis()
+    if redis is not None:
+        buffer_key, meta_key = _keys(key)
+        try:
+            async with redis.pipeline(transaction=True) as pipe:
+                pipe.rpush(buffer_key, json.dumps(item, default=str))
+                pipe.hsetnx(meta_key, "first", now)
+                pipe.hset(meta_key, "last", now)
+                pipe.expire(buffer_key, BUFFER_TTL_SECONDS)
+                pipe.expire(meta_key, BUFFER_TTL_SECONDS)
+                length, *_ = await pipe.execute()
+            return length == 1
+        except Exception as e:
+            logger.warning(f"⚠️ Erro no buffer de agrupamento via Redis, usando memória: {e}")
+
+    entry = _local_buffers.get(key)
+    if entry is None:
+        entry = _local_buffers[key] = _LocalBuffer(now)
+    entry.items.append(item)
+    entry.last = now
+    return len(entry.items) == 1
+
+
+async def flush_delay(key: str, window_seconds: float, max_wait_seconds: float) -> float:
+    """Segundos até a janela da conversa fechar (0 = pode processar agora)."""
+    now = time.time()
+    first = last = None
+
+    redis = await get_redis()
+    if redis is not None:
+        try:
+            _, meta_key = _keys(key)
+            first, last = await redis.hmget(meta_key, "first", "last")
+        except Exception as e:
+            logger.warning(f"⚠️ Erro lendo janela de agrupamento {key}: {e}")
+    else:
+        entry = _local_buffers.get(key)
+        if entry is not None:
+            first, last = entry.first, entry.last
+
+    if first is None or last is None:
+        return 0.0
+
+    quiet_left = window_seconds - (now - float(last))
+    max_left = max_wait_seconds - (now - float(first))
+    return max(0.0, min(quiet_left, max_left))
+
+
+async def peek_buffer(key: str) -> List[Dict[str, Any]]:
+    """Mensagens agrupadas da conversa, na ordem de chegada (sem remover)."""
+    redis = await get_redis()
+    if redis is not None:
+        buffer_key, _ = _keys(key)
+        try:
+            raw_items = await redis.lrange(buffer_key, 0, -1)
+            return [json.loads(raw) for raw in raw_items]
+        except Exception as e:
+            logger.warning(f"⚠️ Erro lendo buffer de agrupamento {key}: {e}")
+
+    entry = _local_buffers.get(key)
+    return list(entry.items) if entry else []
+
+
+async def trim_buffer(key: str, processed: int) -> int:
+    """
+    Remove as `processed` primeiras mensagens do buffer.
+
+    Returns:
+        Quantidade que sobrou (chegou durante o processamento)
+    """
+    redis = await get_redis()
+    if redis is not None:
+        buffer_key, meta_key = _keys(key)
+        try:
+            return int(await redis.eval(_TRIM_SCRIPT, 2, buffer_key, meta_key, processed, time.time()))
+        except Exception as e:
+            logger.warning(f"⚠️ Erro limpando buffer de agrupamento {key}: {e}")
+
+    entry = _local_buffers.get(key)
+    if entry is None:
+        return 0
+
+    del entry.items[:processed]
+    if not entry.items:
+        if _local_buffers.get(key) is entry:
+            del _local_buffers[key]
+        return 0
+
+    entry.first = entry.last = time.time()
+    return len(entry.items)
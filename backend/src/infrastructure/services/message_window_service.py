@@ -0,0 +1,306 @@
+"""
+MESSAGE WINDOW SERVICE - Mensagens recentes do lead em cache (Redis)
+===================================================================
+
+Todo turno do process_message lia as últimas mensagens do lead no
+banco. Agora cada lead tem no Redis:
+
+- msgwin:{lead_id}        lista com as últimas N mensagens ({id, role, content})
+- msgwin:{lead_id}:count  total de mensagens do lead (marca a janela como carregada)
+- msgwin:{lead_id}:gen    geração: muda a cada escrita, protege o preenchimento
+
+Como funciona:
+1. Leitura: um pipeline (count + lista). Hit → nenhuma query no banco
+2. Miss: carrega do banco (últimas N + Lead.message_count) e preenche
+   o cache, só se a geração não mudou durante a leitura (senão uma
+   escrita concorrente seria sobrescrita por dados velhos)
+3. Escrita (write-through): listener de flush coleta as Messages
+   inseridas; no commit, elas são anexadas à janela (se carregada), que
+   é aparada em N, e o count é incrementado. Mensagens apagadas ou
+   editadas (LGPD) invalidam a janela do lead
+4. Despejo: janela limitada a settings.message_window_size mensagens e
+   TTL de settings.message_window_ttl_seconds desde a última escrita
+
+Sem Redis, tudo vem do banco (como antes). Escritas via Core
+(insert(Message) sem ORM) não passam pelo listener; o TTL limita o
+tempo de uma janela desatualizada.
+"""
+
+import asyncio
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from src.config import get_settings
+from src.domain.entities import Lead, Message
+from src.infrastructure.services.redis_service import get_redis
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+PENDING_KEY = "message_window_pending"
+
+
+def window_key(lead_id: int) -> str:
+    return f"msgwin:{lead_id}"
+
+
+def window_count_key(lead_id: int) -> str:
+    return f"msgwin:{lead_id}:count"
+
+
+def window_generation_key(lead_id: int) -> str:
+    return f"msgwin:{lead_id}:gen"
+
+
+def _keys(lead_id: int) -> List[str]:
+    return [window_key(lead_id), window_count_key(lead_id), window_generation_key(lead_id)]
+
+
+# =============================================================================
+# JANELA
+# =============================================================================
+
+@dataclass
+class MessageWindow:
+    """Últimas mensagens do lead (ordem cronológica) + total de mensagens."""
+
+    count: int
+    messages: List[Dict] = field(default_factory=list)  # {"id", "role", "content"}
+    cached: bool = False
+
+    def after(self, message_id: int, limit: int) -> Optional[List[Dict]]:
+        """
+        Últimas `limit` mensagens com id > message_id.
+
+        None quando a janela não basta para responder (há mensagens mais
+        antigas que o início da janela e menos de `limit` dentro dela).
+        """
+        selected = [m for m in self.messages if m["id"] > message_id]
+        reaches_checkpoint = len(selected) < len(self.messages)
+        holds_everything = self.count <= len(self.messages)
+        if len(selected) >= limit or reaches_checkpoint or holds_everything:
+            return selected[-limit:] if limit else []
+        return None
+
+
+def message_payload(message) -> Optional[Dict]:
+    """Formato da mensagem na janela (None se ainda não tem id)."""
+    values = message.__dict__
+    if values.get("id") is None or values.get("lead_id") is None:
+        return None
+    return {"id": values["id"], "role": values.get("role"), "content": values.get("content")}
+
+
+# =============================================================================
+# SCRIPTS REDIS
+# =============================================================================
+
+# KEYS: janela, count, geração | ARGV: ttl, tamanho, mensagens...
+_APPEND_SCRIPT = """
+redis.call('incr', KEYS[3])
+redis.call('expire', KEYS[3], ARGV[1])
+if redis.call('exists', KEYS[2]) == 0 then
+    return 0
+end
+for i = 3, #ARGV do
+    redis.call('rpush', KEYS[1], ARGV[i])
+end
+redis.call('ltrim', KEYS[1], -tonumber(ARGV[2]), -1)
+redis.call('incrby', KEYS[2], #ARGV - 2)
+redis.call('expire', KEYS[1], ARGV[1])
+redis.call('expire', KEYS[2], ARGV[1])
+return 1
+"""
+
+# KEYS: janela, count, geração | ARGV: geração esperada, ttl, count, mensagens...
+_FILL_SCRIPT = """
+if (redis.call('get', KEYS[3]) or '0') ~= ARGV[1] then
+    return 0
+end
+redis.call('del', KEYS[1])
+for i = 4, #ARGV do
+    redis.call('rpush', KEYS[1], ARGV[i])
+end
+redis.call('set', KEYS[2], ARGV[3], 'EX', ARGV[2])
+redis.call('expire', KEYS[1], ARGV[2])
+return 1
+"""
+
+# KEYS: janela, count, geração | ARGV: ttl
+_INVALIDATE_SCRIPT = """
+redis.call('del', KEYS[1], KEYS[2])
+redis.call('incr', KEYS[3])
+redis.call('expire', KEYS[3], ARGV[1])
+return 1
+"""
+
+
+# =============================================================================
+# LEITURA
+# =============================================================================
+
+async def load_message_window(db: AsyncSession, lead_id: int) -> MessageWindow:
+    """Janela direto do banco."""
+    result = await db.execute(
+        select(Message.id, Message.role, Message.content)
+        .where(Message.lead_id == lead_id)
+        .order_by(Message.id.desc())
+        .limit(settings.message_window_size)
+    )
+    messages = [{"id": row.id, "role": row.role, "content": row.content} for row in reversed(result.all())]
+
+    if len(messages) < settings.message_window_size:
+        count = len(messages)  # A janela já tem todas as mensagens
+    else:
+        result = await db.execute(select(Lead.message_count).where(Lead.id == lead_id))
+        count = result.scalar() or 0
+
+    return MessageWindow(count=count, messages=messages)
+
+
+def _has_pending_writes(db: AsyncSession, lead_id: int) -> bool:
+    """Mensagens do lead gravadas nesta sessão e ainda não commitadas."""
+    pending = db.sync_session.info.get(PENDING_KEY)
+    return bool(pending) and lead_id in pending["append"]
+
+
+async def get_message_window(db: AsyncSession, lead_id: int) -> MessageWindow:
+    """Últimas mensagens + total do lead (cache; banco no miss)."""
+    redis = await get_redis()
+    generation = "0"
+
+    if redis is not None:
+        try:
+            pipe = redis.pipeline(transaction=False)
+            pipe.get(window_count_key(lead_id))
+            pipe.lrange(window_key(lead_id), 0, -1)
+            pipe.get(window_generation_key(lead_id))
+            count, raw_messages, generation = await pipe.execute()
+            if count is not None:
+                messages = sorted((json.loads(raw) for raw in raw_messages), key=lambda m: m["id"])
+                return MessageWindow(count=int(count), messages=messages, cached=True)
+            generation = generation or "0"
+        except Exception as e:
+            logger.warning(f"⚠️ Erro lendo janela de mensagens do lead {lead_id}: {e}")
+            redis = None
+
+    window = await load_message_window(db, lead_id)
+
+    # Não publica o que ainda pode sofrer rollback
+    if redis is not None and not _has_pending_writes(db, lead_id):
+        try:
+            await redis.eval(
+                _FILL_SCRIPT, 3, *_keys(lead_id),
+                generation, settings.message_window_ttl_seconds, window.count,
+                *(json.dumps(m, ensure_ascii=False) for m in window.messages),
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Erro preenchendo janela de mensagens do lead {lead_id}: {e}")
+
+    return window
+
+
+# =============================================================================
+# ESCRITA (WRITE-THROUGH NO COMMIT)
+# =============================================================================
+
+async def invalidate_message_window(lead_id: int) -> None:
+    redis = await get_redis()
+    if redis is None:
+        return
+    try:
+        await redis.eval(_INVALIDATE_SCRIPT, 3, *_keys(lead_id), settings.message_window_ttl_seconds)
+    except Exception as e:
+        logger.warning(f"⚠️ Erro invalidando janela de mensagens do lead {lead_id}: {e}")
+
+
+async def apply_window_changes(appends: Dict[int, List[Dict]], invalidations: Set[int]) -> None:
+    """Anexa mensagens commitadas às janelas carregadas e invalida as alteradas."""
+    redis = await get_redis()
+    if redis is None:
+        return
+
+    for lead_id, messages in appends.items():
+        if lead_id in invalidations:
+            continue
+        try:
+            await redis.eval(
+                _APPEND_SCRIPT, 3, *_keys(lead_id),
+                settings.message_window_ttl_seconds, settings.message_window_size,
+                *(json.dumps(m, ensure_ascii=False) for m in messages),
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Erro atualizando janela de mensagens do lead {lead_id}: {e}")
+            await invalidate_message_window(lead_id)
+
+    for lead_id in invalidations:
+        await invalidate_message_window(lead_id)
+
+
+def collect_window_changes(session: Session, pending: Dict) -> None:
+    """Acumula em `pending` as Messages inseridas, apagadas e editadas no flush."""
+    for obj in session.new:
+        if isinstance(obj, Message):
+            payload = message_payload(obj)
+            if payload is not None:
+                pending["append"].setdefault(obj.__dict__["lead_id"], []).append(payload)
+
+    for obj in session.deleted:
+        if isinstance(obj, Message) and obj.__dict__.get("lead_id") is not None:
+            pending["invalidate"].add(obj.__dict__["lead_id"])
+
+    for obj in session.dirty:
+        if isinstance(obj, Message) and obj.__dict__.get("lead_id") is not None:
+            attrs = inspect(obj).attrs
+            if attrs.content.history.has_changes() or attrs.role.history.has_changes():
+                pending["invalidate"].add(obj.__dict__["lead_id"])
+
+
+_tasks: Set[asyncio.Task] = set()
+
+
+def _after_flush(session: Session, flush_context) -> None:
+    pending = session.info.setdefault(PENDING_KEY, {"append": {}, "invalidate": set()})
+    collect_window_changes(session, pending)
+    if not pending["append"] and not pending["invalidate"]:
+        session.info.pop(PENDING_KEY, None)
+
+
+def _after_commit(session: Session) -> None:
+    pending = session.info.pop(PENDING_KEY, None)
+    if not pending:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return  # Sessão síncrona fora do event loop (scripts): o TTL cuida
+    task = loop.create_task(apply_window_changes(pending["append"], pending["invalidate"]))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+def _after_rollback(session: Session, previous_transaction) -> None:
+    pending = session.info.get(PENDING_KEY)
+    if not pending:
+        return
+    if previous_transaction.nested:
+        # Savepoint desfeito: não dá para saber quais mensagens sobraram
+        pending["invalidate"].update(pending["append"])
+        pending["append"] = {}
+    else:
+        session.info.pop(PENDING_KEY, None)
+
+
+def register_message_window_listener() -> None:
+    """Registra o write-through da janela de mensagens em todas as sessões (idempotente)."""
+    if not event.contains(Session, "after_flush", _after_flush):
+        event.listen(Session, "after_flush", _after_flush)
+        event.listen(Session, "after_commit", _after_commit)
+        event.listen(Session, "after_soft_rollback", _after_rollback)
+        logger.info("🪟 Janela de mensagens recentes mantida no commit (Redis)")
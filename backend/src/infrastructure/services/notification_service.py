@@ -15,7 +15,7 @@ Canais de notificação:
 import logging
 from datetime import datetime, timezone, timedelta
 from typing import Optional, Dict, Any, List
-from sqlalchemy import select, func
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.domain.entities import Tenant, Lead, Notification, Seller, Message, Channel
@@ -1130,11 +1130,8 @@ async def notify_seller_when_ready(
             return results
 
         # 3. Verifica se lead está "maduro" para notificar
-        # Conta mensagens do lead
-        message_count_result = await db.execute(
-            select(func.count(Message.id)).where(Message.lead_id == lead.id)
-        )
-        message_count = message_count_result.scalar() or 0
+        # Mensagens do lead (contador mantido no flush)
+        message_count = lead.message_count or 0
 
         # Critérios de maturidade
         is_qualified = lead.qualification in ["morno", "quente", "warm", "hot"]
@@ -19,6 +19,7 @@ logger = logging.getLogger(__name__)
 # Cliente OpenAI removido (agora via LLMFactory)
 from src.infrastructure.llm import LLMFactory
 from src.config import get_settings
+from src.domain.services.text_patterns import PatternSet, keyword_rules, normalize_text
 
 settings = get_settings()
 
@@ -213,46 +214,56 @@ async def generate_lead_raiox(lead_name: str, conversation_history: list[dict])
     
     return response, was_corrected
 
-async def detect_sentiment(message: str) -> dict:
-    """
-    Detecta o sentimento/humor do lead na mensagem.
-    Análise rápida por palavras-chave (sem chamar API).
-    """
-    
-    message_lower = message.lower()
-    
+
+# Sinais do detect_sentiment (comparados sem acento: "pessimo" também conta)
+SENTIMENT_SIGNALS = {
     # Sinais de frustração/irritação
-    frustrated_signals = [
+    "frustrated": [
         "demora", "lento", "ninguém responde", "péssimo", "horrível",
         "não funciona", "problema", "reclamação", "absurdo", "vergonha",
         "desisto", "cancelar", "nunca mais", "pior", "raiva", "irritado",
         "cansado de", "toda vez", "sempre isso", "!!", "???",
-    ]
-    
+    ],
     # Sinais de pressa/urgência
-    urgent_signals = [
+    "urgent": [
         "urgente", "rápido", "agora", "hoje", "preciso logo",
         "não posso esperar", "emergência", "prazo", "deadline",
-    ]
-    
+    ],
     # Sinais positivos/animação
-    positive_signals = [
+    "positive": [
         "obrigado", "obrigada", "perfeito", "ótimo", "excelente",
         "maravilha", "adorei", "amei", "show", "top", "😊", "😄",
         "👍", "🙏", "❤️", "muito bom", "gostei",
-    ]
-    
+    ],
     # Sinais de interesse forte
-    excited_signals = [
+    "excited": [
         "quero", "preciso", "vamos fechar", "quando começa",
         "como faço", "me inscreve", "reserva", "!!",
-    ]
+    ],
+}
+
+_SENTIMENT_PATTERNS = PatternSet([
+    rule
+    for sentiment, signals in SENTIMENT_SIGNALS.items()
+    for rule in keyword_rules(signals, label=sentiment)
+])
+
+
+async def detect_sentiment(message: str) -> dict:
+    """
+    Detecta o sentimento/humor do lead na mensagem.
+    Análise rápida por palavras-chave (sem chamar API).
+    """
     
-    # Pontua cada categoria
-    frustrated_score = sum(1 for s in frustrated_signals if s in message_lower)
-    urgent_score = sum(1 for s in urgent_signals if s in message_lower)
-    positive_score = sum(1 for s in positive_signals if s in message_lower)
-    excited_score = sum(1 for s in excited_signals if s in message_lower)
+    # Pontua cada categoria (uma varredura para as quatro)
+    scores = {sentiment: 0 for sentiment in SENTIMENT_SIGNALS}
+    for match in _SENTIMENT_PATTERNS.scan(normalize_text(message)):
+        scores[match.rule.label] += 1
+
+    frustrated_score = scores["frustrated"]
+    urgent_score = scores["urgent"]
+    positive_score = scores["positive"]
+    excited_score = scores["excited"]
     
     # Determina sentimento predominante
     if frustrated_score >= 2:
@@ -0,0 +1,375 @@
+"""
+SEARCH SERVICE - Busca indexada em mensagens e leads
+=====================================================
+
+Substitui os `ILIKE '%termo%'` que varriam messages e leads inteiras.
+
+Mensagens (full-text):
+- messages.search_vector = to_tsvector('pt_unaccent', content)
+  (configuração portuguese + unaccent criada na migration), índice GIN
+- Preenchido no mesmo INSERT/UPDATE pelo listener `before_flush`
+- Mensagens antigas ou gravadas via Core ficam com search_vector NULL
+  até o job de backfill (run_search_backfill_job) indexá-las
+- Consulta com websearch_to_tsquery ("aspas", OR, -exclusão), ranking
+  por ts_rank_cd e trecho destacado por ts_headline
+
+Leads (pg_trgm):
+- Índices trigram em immutable_unaccent(lower(name)), phone e lower(email)
+- Substring sem acento/caixa no nome, dígitos no telefone, e-mail;
+  a API de busca aceita também nomes aproximados (word_similarity)
+
+Paginação por cursor opaco: (rank, id) na ordem por relevância e
+(created_at, id) na ordem por data.
+"""
+
+import base64
+import binascii
+import json
+import logging
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import Float, case, cast, event, func, inspect, literal_column, or_, select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from src.config import get_settings
+from src.domain.entities import Lead, Message
+from src.infrastructure.database import async_session
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+SEARCH_CONFIG = "pt_unaccent"
+ORDER_RELEVANCE = "relevance"
+ORDER_RECENT = "recent"
+
+HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxWords=25, MinWords=8, MaxFragments=2, FragmentDelimiter= … "
+
+# Similaridade mínima para nomes aproximados (0-1)
+NAME_SIMILARITY_THRESHOLD = 0.4
+
+
+def _config():
+    return literal_column(f"'{SEARCH_CONFIG}'::regconfig")
+
+
+def fold_text(value: str) -> str:
+    """Minúsculas e sem acentos (equivalente ao unaccent para português)."""
+    normalized = unicodedata.normalize("NFKD", value.lower())
+    return "".join(ch for ch in normalized if not unicodedata.combining(ch))
+
+
+def _like_pattern(value: str) -> str:
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def message_search_vector(content):
+    """Expressão do tsvector de uma mensagem (mesma usada no backfill)."""
+    return func.to_tsvector(_config(), func.coalesce(content, ""))
+
+
+def message_tsquery(q: str):
+    return func.websearch_to_tsquery(_config(), q)
+
+
+# =============================================================================
+# CURSOR
+# =============================================================================
+
+def encode_cursor(values: Dict[str, Any]) -> str:
+    """Cursor opaco (base64 de JSON)."""
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(",", ":")).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Inverso de encode_cursor (ValueError se inválido)."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (ValueError, UnicodeDecodeError, binascii.Error) as e:
+        raise ValueError(f"Cursor inválido: {cursor}") from e
+    if not isinstance(values, dict) or "id" not in values:
+        raise ValueError(f"Cursor inválido: {cursor}")
+    return values
+
+
+@dataclass
+class SearchPage:
+    """Página de resultados."""
+
+    items: List[Dict[str, Any]] = field(default_factory=list)
+    next_cursor: Optional[str] = None
+
+
+# =============================================================================
+# LISTENER (search_vector no INSERT/UPDATE)
+# =============================================================================
+
+def _before_flush(session: Session, flush_context, instances) -> None:
+    for obj in session.new:
+        if isinstance(obj, Message):
+            obj.search_vector = message_search_vector(obj.__dict__.get("content"))
+
+    for obj in session.dirty:
+        if isinstance(obj, Message) and inspect(obj).attrs.content.history.has_changes():
+            obj.search_vector = message_search_vector(obj.__dict__.get("content"))
+
+
+def register_search_listener() -> None:
+    """Registra o preenchimento de messages.search_vector (idempotente)."""
+    if not event.contains(Session, "before_flush", _before_flush):
+        event.listen(Session, "before_flush", _before_flush)
+        logger.info("🔎 Indexação full-text de mensagens ativa")
+
+
+# =============================================================================
+# BUSCA DE MENSAGENS
+# =============================================================================
+
+async def search_messages(
+    db: AsyncSession,
+    tenant_id: int,
+    q: str,
+    seller_id: Optional[int] = None,
+    lead_id: Optional[int] = None,
+    order: str = ORDER_RELEVANCE,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+) -> SearchPage:
+    """
+    Busca full-text nas mensagens dos leads do tenant.
+
+    Raises:
+        ValueError: cursor inválido ou de outra ordenação
+    """
+    tsquery = message_tsquery(q)
+    rank = cast(func.ts_rank_cd(Message.search_vector, tsquery), Float)
+
+    matches = (
+        select(Message.id, Message.created_at, rank.label("rank"))
+        .join(Lead, Lead.id == Message.lead_id)
+        .where(Lead.tenant_id == tenant_id)
+        .where(Message.search_vector.op("@@")(tsquery))
+    )
+    if seller_id is not None:
+        matches = matches.where(Lead.assigned_seller_id == seller_id)
+    if lead_id is not None:
+        matches = matches.where(Message.lead_id == lead_id)
+
+    after = decode_cursor(cursor) if cursor else None
+    if order == ORDER_RECENT:
+        if after:
+            if "t" not in after:
+                raise ValueError("Cursor de outra ordenação")
+            matches = matches.where(
+                tuple_(Message.created_at, Message.id) < tuple_(datetime.fromisoformat(after["t"]), after["id"])
+            )
+        matches = matches.order_by(Message.created_at.desc(), Message.id.desc())
+    else:
+        if after:
+            if "r" not in after:
+                raise ValueError("Cursor de outra ordenação")
+            matches = matches.where(tuple_(rank, Message.id) < tuple_(float(after["r"]), after["id"]))
+        matches = matches.order_by(rank.desc(), Message.id.desc())
+
+    # Só a página recebe ts_headline (custo alto por linha)
+    page = matches.limit(limit + 1).subquery()
+    stmt = (
+        select(
+            page.c.id,
+            page.c.created_at,
+            page.c.rank,
+            Message.role,
+            Message.content,
+            func.ts_headline(_config(), Message.content, tsquery, HEADLINE_OPTIONS).label("snippet"),
+            Lead.id.label("lead_id"),
+            Lead.name.label("lead_name"),
+            Lead.phone.label("lead_phone"),
+        )
+        .join(Message, Message.id == page.c.id)
+        .join(Lead, Lead.id == Message.lead_id)
+    )
+    if order == ORDER_RECENT:
+        stmt = stmt.order_by(page.c.created_at.desc(), page.c.id.desc())
+    else:
+        stmt = stmt.order_by(page.c.rank.desc(), page.c.id.desc())
+
+    rows = (await db.execute(stmt)).all()
+
+    result = SearchPage()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        result.next_cursor = encode_cursor(
+            {"t": last.created_at.isoformat(), "id": last.id}
+            if order == ORDER_RECENT
+            else {"r": last.rank, "id": last.id}
+        )
+
+    result.items = [
+        {
+            "message_id": row.id,
+            "content": row.content,
+            "snippet": row.snippet,
+            "rank": round(row.rank, 6),
+            "role": row.role,
+            "created_at": row.created_at,
+            "lead": {"id": row.lead_id, "name": row.lead_name, "phone": row.lead_phone},
+        }
+        for row in rows
+    ]
+    return result
+
+
+# =============================================================================
+# BUSCA DE LEADS
+# =============================================================================
+
+def lead_name_expr():
+    """Nome normalizado; precisa ser idêntico à expressão do índice trigram."""
+    return func.immutable_unaccent(func.lower(Lead.name))
+
+
+def lead_search_filter(q: str, fuzzy: bool = False):
+    """
+    Condição de busca de leads por nome, telefone ou e-mail
+    (substring sem acento/caixa; `fuzzy` inclui nomes aproximados).
+    """
+    term = fold_text(q.strip())
+    conditions = [
+        lead_name_expr().like(_like_pattern(term)),
+        func.lower(Lead.email).like(_like_pattern(q.strip().lower())),
+    ]
+
+    digits = re.sub(r"\D", "", q)
+    if len(digits) >= 3:
+        conditions.append(Lead.phone.like(_like_pattern(digits)))
+
+    if fuzzy:
+        # name %> termo  ≡  word_similarity(termo, name) >= limiar (usa o índice trigram)
+        conditions.append(lead_name_expr().op("%>")(term))
+
+    return or_(*conditions)
+
+
+def lead_search_rank(q: str):
+    """Relevância 0-1: telefone/e-mail exatos no topo, depois similaridade do nome."""
+    term = fold_text(q.strip())
+    digits = re.sub(r"\D", "", q)
+
+    scores = [
+        func.word_similarity(term, func.coalesce(lead_name_expr(), "")),
+        case((func.lower(Lead.email) == q.strip().lower(), 1.0), else_=0.0),
+    ]
+    if len(digits) >= 3:
+        scores.append(case((Lead.phone.like(_like_pattern(digits)), 0.9), else_=0.0))
+
+    return cast(func.greatest(*scores), Float)
+
+
+async def search_leads(
+    db: AsyncSession,
+    tenant_id: int,
+    q: str,
+    seller_id: Optional[int] = None,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+) -> SearchPage:
+    """
+    Busca leads do tenant por nome (aproximado), telefone ou e-mail,
+    ordenados por relevância.
+
+    Raises:
+        ValueError: cursor inválido
+    """
+    rank = lead_search_rank(q)
+
+    stmt = (
+        select(Lead.id, Lead.name, Lead.phone, Lead.email, Lead.status, Lead.qualification, rank.label("rank"))
+        .where(Lead.tenant_id == tenant_id)
+        .where(lead_search_filter(q, fuzzy=True))
+    )
+    if seller_id is not None:
+        stmt = stmt.where(Lead.assigned_seller_id == seller_id)
+
+    if cursor:
+        after = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(rank, Lead.id) < tuple_(float(after.get("r", 0)), after["id"]))
+
+    # Limiar do operador %> usado pelo índice trigram (vale só nesta transação)
+    await db.execute(text(f"SET LOCAL pg_trgm.word_similarity_threshold = {NAME_SIMILARITY_THRESHOLD}"))
+    rows = (await db.execute(stmt.order_by(rank.desc(), Lead.id.desc()).limit(limit + 1))).all()
+
+    page = SearchPage()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        page.next_cursor = encode_cursor({"r": rows[-1].rank, "id": rows[-1].id})
+
+    page.items = [
+        {
+            "id": row.id,
+            "name": row.name,
+            "phone": row.phone,
+            "email": row.email,
+            "status": row.status,
+            "qualification": row.qualification,
+            "rank": round(row.rank, 6),
+        }
+        for row in rows
+    ]
+    return page
+
+
+# =============================================================================
+# BACKFILL
+# =============================================================================
+
+BACKFILL_BATCH_SQL = f"""
+    UPDATE messages SET search_vector = to_tsvector('{SEARCH_CONFIG}'::regconfig, COALESCE(content, ''))
+    WHERE id IN (
+        SELECT id FROM messages
+        WHERE search_vector IS NULL
+        ORDER BY id
+        LIMIT :batch_size
+        FOR UPDATE SKIP LOCKED
+    )
+"""
+
+
+async def backfill_message_search_vectors(
+    batch_size: Optional[int] = None,
+    max_batches: Optional[int] = None,
+) -> int:
+    """
+    Indexa mensagens com search_vector NULL em lotes (um commit por lote,
+    para não segurar locks nem gerar uma transação gigante).
+
+    Returns:
+        Quantidade de mensagens indexadas
+    """
+    batch_size = batch_size or settings.search_backfill_batch_size
+    max_batches = max_batches or settings.search_backfill_max_batches
+
+    total = 0
+    for _ in range(max_batches):
+        async with async_session() as session:
+            result = await session.execute(text(BACKFILL_BATCH_SQL), {"batch_size": batch_size})
+            await session.commit()
+
+        total += result.rowcount or 0
+        if (result.rowcount or 0) < batch_size:
+            break
+
+    return total
+
+
+async def run_search_backfill_job():
+    """Job do scheduler: indexa mensagens ainda sem search_vector."""
+    total = await backfill_message_search_vectors()
+    if total:
+        logger.info(f"🔎 Backfill de busca: {total} mensagens indexadas")
+    return total
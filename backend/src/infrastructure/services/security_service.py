@@ -16,6 +16,13 @@ from typing import Tuple, List, Optional
 from datetime import datetime
 import hashlib
 
+from src.domain.services.text_patterns import (
+    PatternRule,
+    PatternSet,
+    keyword_rules,
+    normalize_text,
+)
+
 
 class ThreatLevel:
     """Níveis de ameaça detectados."""
@@ -204,6 +211,41 @@ SUSPICIOUS_KEYWORDS = [
     "password", "credential", "token", "secret", "key",
 ]
 
+SUSPICIOUS_LABEL = "suspicious"
+
+# Ordem = prioridade em run_security_check
+THREAT_PATTERNS = [
+    (ThreatType.PROMPT_INJECTION, PROMPT_INJECTION_PATTERNS),
+    (ThreatType.TOOL_EXPOSURE, TOOL_EXPOSURE_PATTERNS),
+    (ThreatType.DATA_EXTRACTION, DATA_EXTRACTION_PATTERNS),
+    (ThreatType.SYSTEM_MANIPULATION, SYSTEM_MANIPULATION_PATTERNS),
+    (ThreatType.XSS_ATTEMPT, XSS_PATTERNS),
+    (ThreatType.SPAM, SPAM_PATTERNS),
+]
+
+
+def _threat_rules(threat_type: str, patterns: List[str]) -> List[PatternRule]:
+    return [PatternRule(pattern, label=threat_type) for pattern in patterns]
+
+
+# Compilados uma vez: por tipo (check_*) e tudo junto (run_security_check)
+_PATTERNS_BY_THREAT = {
+    threat_type: PatternSet(_threat_rules(threat_type, patterns))
+    for threat_type, patterns in THREAT_PATTERNS
+}
+_SUSPICIOUS_PATTERNS = PatternSet(keyword_rules(SUSPICIOUS_KEYWORDS, label=SUSPICIOUS_LABEL))
+_SECURITY_PATTERNS = PatternSet(
+    [rule for patterns in _PATTERNS_BY_THREAT.values() for rule in patterns.rules]
+    + list(_SUSPICIOUS_PATTERNS.rules)
+)
+
+
+def _check_threat(content: str, threat_type: str) -> Tuple[bool, Optional[str]]:
+    match = _PATTERNS_BY_THREAT[threat_type].first(normalize_text(content))
+    if match is None:
+        return False, None
+    return True, match.rule.pattern
+
 
 def check_prompt_injection(content: str) -> Tuple[bool, Optional[str]]:
     """
@@ -212,13 +254,7 @@ def check_prompt_injection(content: str) -> Tuple[bool, Optional[str]]:
     Returns:
         (is_injection, matched_pattern)
     """
-    content_lower = content.lower()
-    
-    for pattern in PROMPT_INJECTION_PATTERNS:
-        if re.search(pattern, content_lower, re.IGNORECASE):
-            return True, pattern
-    
-    return False, None
+    return _check_threat(content, ThreatType.PROMPT_INJECTION)
 
 
 def check_tool_exposure(content: str) -> Tuple[bool, Optional[str]]:
@@ -228,13 +264,7 @@ def check_tool_exposure(content: str) -> Tuple[bool, Optional[str]]:
     Returns:
         (is_attempt, matched_pattern)
     """
-    content_lower = content.lower()
-    
-    for pattern in TOOL_EXPOSURE_PATTERNS:
-        if re.search(pattern, content_lower, re.IGNORECASE):
-            return True, pattern
-    
-    return False, None
+    return _check_threat(content, ThreatType.TOOL_EXPOSURE)
 
 
 def check_data_extraction(content: str) -> Tuple[bool, Optional[str]]:
@@ -244,13 +274,7 @@ def check_data_extraction(content: str) -> Tuple[bool, Optional[str]]:
     Returns:
         (is_attempt, matched_pattern)
     """
-    content_lower = content.lower()
-    
-    for pattern in DATA_EXTRACTION_PATTERNS:
-        if re.search(pattern, content_lower, re.IGNORECASE):
-            return True, pattern
-    
-    return False, None
+    return _check_threat(content, ThreatType.DATA_EXTRACTION)
 
 
 def check_system_manipulation(content: str) -> Tuple[bool, Optional[str]]:
@@ -260,11 +284,7 @@ def check_system_manipulation(content: str) -> Tuple[bool, Optional[str]]:
     Returns:
         (is_attempt, matched_pattern)
     """
-    for pattern in SYSTEM_MANIPULATION_PATTERNS:
-        if re.search(pattern, content, re.IGNORECASE):
-            return True, pattern
-    
-    return False, None
+    return _check_threat(content, ThreatType.SYSTEM_MANIPULATION)
 
 
 def check_xss(content: str) -> Tuple[bool, Optional[str]]:
@@ -274,11 +294,7 @@ def check_xss(content: str) -> Tuple[bool, Optional[str]]:
     Returns:
         (is_attempt, matched_pattern)
     """
-    for pattern in XSS_PATTERNS:
-        if re.search(pattern, content, re.IGNORECASE):
-            return True, pattern
-    
-    return False, None
+    return _check_threat(content, ThreatType.XSS_ATTEMPT)
 
 
 def check_spam(content: str) -> Tuple[bool, Optional[str]]:
@@ -288,11 +304,7 @@ def check_spam(content: str) -> Tuple[bool, Optional[str]]:
     Returns:
         (is_spam, matched_pattern)
     """
-    for pattern in SPAM_PATTERNS:
-        if re.search(pattern, content):
-            return True, pattern
-    
-    return False, None
+    return _check_threat(content, ThreatType.SPAM)
 
 
 def check_suspicious_keywords(content: str) -> List[str]:
@@ -302,14 +314,7 @@ def check_suspicious_keywords(content: str) -> List[str]:
     Returns:
         Lista de keywords encontradas
     """
-    content_lower = content.lower()
-    found = []
-    
-    for keyword in SUSPICIOUS_KEYWORDS:
-        if keyword in content_lower:
-            found.append(keyword)
-    
-    return found
+    return [match.rule.pattern for match in _SUSPICIOUS_PATTERNS.scan(normalize_text(content))]
 
 
 def sanitize_input(content: str) -> str:
@@ -353,9 +358,22 @@ def run_security_check(
     
     # Sanitiza primeiro
     sanitized = sanitize_input(content)
-    
+
+    # Uma varredura com todas as regras; abaixo, só a prioridade entre elas
+    first_by_type = {}
+    suspicious = []
+    for match in _SECURITY_PATTERNS.scan(normalize_text(sanitized)):
+        if match.rule.label == SUSPICIOUS_LABEL:
+            suspicious.append(match.rule.pattern)
+        else:
+            first_by_type.setdefault(match.rule.label, match.rule.pattern)
+
+    def found(threat_type: str) -> Tuple[bool, Optional[str]]:
+        pattern = first_by_type.get(threat_type)
+        return pattern is not None, pattern
+
     # 1. Verifica prompt injection (CRÍTICO)
-    is_injection, pattern = check_prompt_injection(sanitized)
+    is_injection, pattern = found(ThreatType.PROMPT_INJECTION)
     if is_injection:
         return SecurityCheckResult(
             is_safe=False,
@@ -369,7 +387,7 @@ def run_security_check(
         )
     
     # 2. Verifica exposição de tools (CRÍTICO)
-    is_tool_exposure, pattern = check_tool_exposure(sanitized)
+    is_tool_exposure, pattern = found(ThreatType.TOOL_EXPOSURE)
     if is_tool_exposure:
         return SecurityCheckResult(
             is_safe=False,
@@ -383,7 +401,7 @@ def run_security_check(
         )
     
     # 3. Verifica extração de dados (ALTO)
-    is_data_extract, pattern = check_data_extraction(sanitized)
+    is_data_extract, pattern = found(ThreatType.DATA_EXTRACTION)
     if is_data_extract:
         return SecurityCheckResult(
             is_safe=False,
@@ -397,7 +415,7 @@ def run_security_check(
         )
     
     # 4. Verifica manipulação do sistema (ALTO)
-    is_manipulation, pattern = check_system_manipulation(sanitized)
+    is_manipulation, pattern = found(ThreatType.SYSTEM_MANIPULATION)
     if is_manipulation:
         return SecurityCheckResult(
             is_safe=False,
@@ -411,7 +429,7 @@ def run_security_check(
         )
     
     # 5. Verifica XSS (MÉDIO)
-    is_xss, pattern = check_xss(sanitized)
+    is_xss, pattern = found(ThreatType.XSS_ATTEMPT)
     if is_xss:
         return SecurityCheckResult(
             is_safe=False,
@@ -425,7 +443,7 @@ def run_security_check(
         )
     
     # 6. Verifica spam (BAIXO)
-    is_spam, pattern = check_spam(sanitized)
+    is_spam, pattern = found(ThreatType.SPAM)
     if is_spam:
         return SecurityCheckResult(
             is_safe=False,
@@ -439,7 +457,6 @@ def run_security_check(
         )
     
     # 7. Verifica keywords suspeitas (apenas log)
-    suspicious = check_suspicious_keywords(sanitized)
     if suspicious:
         return SecurityCheckResult(
             is_safe=True,
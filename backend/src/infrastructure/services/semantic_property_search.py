@@ -19,12 +19,13 @@ Performance:
 import hashlib
 import logging
 from typing import List, Dict, Optional
-from sqlalchemy import select, text
+from sqlalchemy import select, text, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.domain.entities import Product
 from src.domain.entities.property_embedding import PropertyEmbedding
-from src.infrastructure.llm import LLMFactory
+from src.infrastructure.llm import LLMFactory, iter_embedding_batches
 
 logger = logging.getLogger(__name__)
 
@@ -40,7 +41,7 @@ async def generate_embedding(text: str) -> Optional[List[float]]:
         provider = LLMFactory.get_provider()
         
         # Chama API de embeddings
-        embedding = await provider.generate_embedding(text)
+        embedding = await provider.generate_embeddings(text)
         
         if not embedding or len(embedding) != 1536:
             logger.error(f"Embedding inválido: {len(embedding) if embedding else 0} dimensõ es")
@@ -168,7 +169,7 @@ async def create_or_update_embedding(
             # Atualiza
             existing.embedding = embedding_vector
             existing.content_hash = current_hash
-            existing.metadata = {
+            existing.extra_metadata = {
                 "text_length": len(searchable_text),
                 "regenerated": True,
             }
@@ -180,7 +181,7 @@ async def create_or_update_embedding(
                 product_id=product.id,
                 embedding=embedding_vector,
                 content_hash=current_hash,
-                metadata={
+                extra_metadata={
                     "text_length": len(searchable_text),
                 },
             )
@@ -277,6 +278,26 @@ async def search_similar_properties(
         return []
 
 
+async def _upsert_property_embeddings(db: AsyncSession, rows: List[Dict]) -> None:
+    """Grava um lote de embeddings com um único INSERT ... ON CONFLICT."""
+    if not rows:
+        return
+
+    stmt = pg_insert(PropertyEmbedding).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[PropertyEmbedding.product_id],
+        set_={
+            "tenant_id": stmt.excluded.tenant_id,
+            "embedding": stmt.excluded.embedding,
+            "content_hash": stmt.excluded.content_hash,
+            "metadata": stmt.excluded["metadata"],
+            "updated_at": func.now(),
+        },
+    )
+    await db.execute(stmt)
+    await db.commit()
+
+
 async def bulk_generate_embeddings(
     db: AsyncSession,
     tenant_id: int,
@@ -288,6 +309,11 @@ async def bulk_generate_embeddings(
     Útil para:
     - Primeira configuração
     - Re-indexação completa
+
+    Pipeline em lote:
+    1. Uma query para os hashes de conteúdo já indexados
+    2. Textos alterados enviados à API em lotes (concorrência limitada)
+    3. Cada lote gravado com um único INSERT ... ON CONFLICT
     
     Returns:
         Dict com estatísticas: created, updated, failed, skipped
@@ -302,46 +328,75 @@ async def bulk_generate_embeddings(
             .where(Product.active == True)
         )
         products = result.scalars().all()
-        
-        logger.info(f"📦 Gerando embeddings para {len(products)} produtos...")
-        
-        for idx, product in enumerate(products, 1):
-            logger.info(f"[{idx}/{len(products)}] Processando: {product.name}")
-            
-            # Verifica se precisa gerar
-            if not force_regenerate:
-                current_hash = compute_content_hash(product)
-                existing_result = await db.execute(
-                    select(PropertyEmbedding)
-                    .where(PropertyEmbedding.product_id == product.id)
-                )
-                existing = existing_result.scalar_one_or_none()
-                
-                if existing and existing.content_hash == current_hash:
-                    logger.debug(f"  ⏭️ Pulando (já atualizado)")
-                    stats["skipped"] += 1
+
+        # Hashes já indexados (1 query para o tenant inteiro)
+        result = await db.execute(
+            select(PropertyEmbedding.product_id, PropertyEmbedding.content_hash)
+            .where(PropertyEmbedding.tenant_id == tenant_id)
+        )
+        existing_hashes = {product_id: content_hash for product_id, content_hash in result.all()}
+
+        pending = []  # (product_id, hash, texto)
+        for product in products:
+            current_hash = compute_content_hash(product)
+
+            if not force_regenerate and existing_hashes.get(product.id) == current_hash:
+                stats["skipped"] += 1
+                continue
+
+            searchable_text = build_searchable_text(product)
+            if not searchable_text or len(searchable_text) < 10:
+                logger.warning(f"Texto insuficiente para produto {product.id}")
+                stats["failed"] += 1
+                continue
+
+            pending.append((product.id, current_hash, searchable_text))
+
+        logger.info(
+            f"📦 Gerando embeddings para {len(pending)} de {len(products)} produtos "
+            f"({stats['skipped']} sem alteração)..."
+        )
+
+        texts = [searchable_text for _, _, searchable_text in pending]
+        async for offset, vectors in iter_embedding_batches(texts):
+            rows = []
+            for (product_id, current_hash, searchable_text), vector in zip(pending[offset:], vectors):
+                if vector is None:
+                    stats["failed"] += 1
                     continue
-            
-            # Gera/atualiza
-            success = await create_or_update_embedding(db, product)
-            
-            if success:
-                # Check if was update or create
-                check_result = await db.execute(
-                    select(PropertyEmbedding.id)
-                    .where(PropertyEmbedding.product_id == product.id)
-                )
-                if check_result.scalar():
+
+                regenerated = product_id in existing_hashes
+                metadata = {"text_length": len(searchable_text)}
+                if regenerated:
+                    metadata["regenerated"] = True
+
+                rows.append({
+                    "tenant_id": tenant_id,
+                    "product_id": product_id,
+                    "embedding": vector,
+                    "content_hash": current_hash,
+                    "metadata": metadata,
+                })
+
+            try:
+                await _upsert_property_embeddings(db, rows)
+            except Exception as e:
+                logger.error(f"Erro gravando lote de embeddings: {e}")
+                await db.rollback()
+                stats["failed"] += len(rows)
+                continue
+
+            for row in rows:
+                if row["product_id"] in existing_hashes:
                     stats["updated"] += 1
                 else:
                     stats["created"] += 1
-            else:
-                stats["failed"] += 1
-        
+
         logger.info(f"✅ Embeddings gerados: {stats}")
         
         return stats
         
     except Exception as e:
         logger.error(f"Erro no bulk generation: {e}")
+        await db.rollback()
         return stats
@@ -13,6 +13,12 @@ Eventos suportados:
 
 Arquitetura:
 - Múltiplas conexões por lead (vários vendedores vendo mesmo lead)
+- Canais por lead (sse:lead:{id}) e por tenant (sse:tenant:{id})
+- Com Redis: eventos publicados via pub/sub e entregues por TODOS os
+  workers/réplicas (um único subscriber por processo)
+- Sem Redis: entrega direta em memória (processo único)
+- Fan-out local sem lock global; fila cheia descarta o evento mais
+  antigo e conta o descarte (backpressure)
 - Heartbeat a cada 30s para manter conexão
 - Auto-cleanup em desconexão
 """
@@ -22,16 +28,69 @@ from typing import Dict, Set, Any, Optional
 from datetime import datetime
 import logging
 
+from src.config import get_settings
+from src.infrastructure.services.redis_service import get_redis, increment_metric
+
+settings = get_settings()
 logger = logging.getLogger(__name__)
 
+LEAD_CHANNEL_PREFIX = "sse:lead:"
+TENANT_CHANNEL_PREFIX = "sse:tenant:"
+QUEUE_MAXSIZE = 50
+LISTENER_RETRY_SECONDS = 5.0
+
+
+def lead_channel(lead_id: int) -> str:
+    return f"{LEAD_CHANNEL_PREFIX}{lead_id}"
+
+
+def tenant_channel(tenant_id: int) -> str:
+    return f"{TENANT_CHANNEL_PREFIX}{tenant_id}"
+
 
 class SSEConnectionManager:
-    """Gerenciador global de conexões SSE."""
+    """
+    Gerenciador de conexões SSE do processo.
+
+    As conexões locais ficam em dicts canal -> set de queues. Todas as
+    mutações acontecem no event loop sem await intermediário, então não
+    há necessidade de lock.
+    """
 
     def __init__(self):
-        # lead_id -> set de queues
-        self._connections: Dict[int, Set[asyncio.Queue]] = {}
-        self._lock = asyncio.Lock()
+        # canal -> set de queues
+        self._connections: Dict[str, Set[asyncio.Queue]] = {}
+        self._listener_task: Optional[asyncio.Task] = None
+        self._pubsub_ready = False
+        self._metric_tasks: Set[asyncio.Task] = set()
+        self.stats: Dict[str, int] = {
+            "published": 0,
+            "delivered": 0,
+            "dropped": 0,
+            "publish_errors": 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Conexões locais
+    # ------------------------------------------------------------------
+
+    def _add(self, channel: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=QUEUE_MAXSIZE)
+        self._connections.setdefault(channel, set()).add(queue)
+        logger.info(f"[SSE] Nova conexão em {channel}. Total: {len(self._connections[channel])}")
+        return queue
+
+    def _remove(self, channel: str, queue: asyncio.Queue):
+        queues = self._connections.get(channel)
+        if queues is None:
+            return
+
+        queues.discard(queue)
+        if not queues:
+            del self._connections[channel]
+            logger.info(f"[SSE] Todas conexões removidas de {channel}")
+        else:
+            logger.info(f"[SSE] Conexão removida de {channel}. Restantes: {len(queues)}")
 
     async def connect(self, lead_id: int) -> asyncio.Queue:
         """
@@ -40,71 +99,181 @@ class SSEConnectionManager:
         Returns:
             asyncio.Queue onde eventos serão enfileirados
         """
-        async with self._lock:
-            if lead_id not in self._connections:
-                self._connections[lead_id] = set()
-
-            queue = asyncio.Queue(maxsize=50)
-            self._connections[lead_id].add(queue)
-
-            logger.info(f"[SSE] Nova conexão para lead {lead_id}. Total: {len(self._connections[lead_id])}")
-            return queue
+        return self._add(lead_channel(lead_id))
 
     async def disconnect(self, lead_id: int, queue: asyncio.Queue):
         """Remove conexão quando cliente desconecta."""
-        async with self._lock:
-            if lead_id in self._connections:
-                self._connections[lead_id].discard(queue)
+        self._remove(lead_channel(lead_id), queue)
+
+    async def connect_tenant(self, tenant_id: int) -> asyncio.Queue:
+        """Registra conexão que recebe eventos de todos os leads do tenant."""
+        return self._add(tenant_channel(tenant_id))
 
-                if not self._connections[lead_id]:
-                    del self._connections[lead_id]
-                    logger.info(f"[SSE] Todas conexões removidas para lead {lead_id}")
-                else:
-                    logger.info(f"[SSE] Conexão removida. Restantes: {len(self._connections[lead_id])}")
+    async def disconnect_tenant(self, tenant_id: int, queue: asyncio.Queue):
+        self._remove(tenant_channel(tenant_id), queue)
 
-    async def broadcast(self, lead_id: int, event_type: str, data: Dict[str, Any]):
+    async def get_active_connections_count(self, lead_id: int) -> int:
+        """Retorna número de conexões ativas para um lead."""
+        return len(self._connections.get(lead_channel(lead_id), ()))
+
+    # ------------------------------------------------------------------
+    # Entrega
+    # ------------------------------------------------------------------
+
+    def _record_drop(self, channel: str):
+        self.stats["dropped"] += 1
+        kind = "tenant" if channel.startswith(TENANT_CHANNEL_PREFIX) else "lead"
+        try:
+            task = asyncio.get_running_loop().create_task(
+                increment_metric("sse_events_dropped", {"channel": kind})
+            )
+        except RuntimeError:
+            return
+        self._metric_tasks.add(task)
+        task.add_done_callback(self._metric_tasks.discard)
+
+    def deliver_local(self, channel: str, event: Dict[str, Any]) -> int:
+        """
+        Enfileira o evento nas conexões locais do canal.
+
+        Fila cheia (cliente lento): descarta o evento mais antigo para
+        manter o mais recente, e conta o descarte.
         """
-        Envia evento para TODAS as conexões de um lead.
+        queues = self._connections.get(channel)
+        if not queues:
+            return 0
+
+        delivered = 0
+        for queue in tuple(queues):
+            if queue.full():
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    pass
+                self._record_drop(channel)
+                logger.warning(f"[SSE] Queue cheia em {channel}, descartando evento mais antigo")
+            try:
+                queue.put_nowait(event)
+                delivered += 1
+            except asyncio.QueueFull:
+                self._record_drop(channel)
+
+        self.stats["delivered"] += delivered
+        return delivered
+
+    async def broadcast(
+        self,
+        lead_id: int,
+        event_type: str,
+        data: Dict[str, Any],
+        tenant_id: Optional[int] = None,
+    ):
+        """
+        Envia evento para TODAS as conexões de um lead (em qualquer worker).
 
         Args:
             lead_id: ID do lead
             event_type: Tipo do evento (new_message, message_status, etc)
             data: Payload do evento
+            tenant_id: Se informado, publica também no canal do tenant
         """
-        async with self._lock:
-            if lead_id not in self._connections:
-                logger.debug(f"[SSE] Sem conexões ativas para lead {lead_id}")
-                return
-
-            # Formata evento SSE
-            event_data = {
-                "type": event_type,
-                "timestamp": datetime.utcnow().isoformat(),
-                "data": data
-            }
-
-            # Envia para todas as queues
-            dead_queues = []
-            for queue in self._connections[lead_id]:
+        event_data = {
+            "type": event_type,
+            "lead_id": lead_id,
+            "timestamp": datetime.utcnow().isoformat(),
+            "data": data
+        }
+        channels = [lead_channel(lead_id)]
+        if tenant_id is not None:
+            channels.append(tenant_channel(tenant_id))
+
+        self.stats["published"] += 1
+
+        if self._pubsub_ready:
+            redis = await get_redis()
+            if redis is not None:
                 try:
-                    # Non-blocking put (descarta se cheia)
-                    queue.put_nowait(event_data)
-                except asyncio.QueueFull:
-                    logger.warning(f"[SSE] Queue cheia para lead {lead_id}, dropando evento")
+                    payload = json.dumps(event_data, default=str)
+                    async with redis.pipeline(transaction=False) as pipe:
+                        for channel in channels:
+                            pipe.publish(channel, payload)
+                        await pipe.execute()
+                    return
                 except Exception as e:
-                    logger.error(f"[SSE] Erro ao enviar evento: {e}")
-                    dead_queues.append(queue)
-
-            # Limpa queues mortas
-            for queue in dead_queues:
-                self._connections[lead_id].discard(queue)
-
-            logger.debug(f"[SSE] Evento '{event_type}' enviado para {len(self._connections[lead_id])} conexões")
-
-    async def get_active_connections_count(self, lead_id: int) -> int:
-        """Retorna número de conexões ativas para um lead."""
-        async with self._lock:
-            return len(self._connections.get(lead_id, set()))
+                    self.stats["publish_errors"] += 1
+                    logger.error(f"[SSE] Erro ao publicar no Redis, entregando localmente: {e}")
+
+        # Sem Redis (ou falha): entrega direta neste processo
+        for channel in channels:
+            self.deliver_local(channel, event_data)
+
+        logger.debug(f"[SSE] Evento '{event_type}' entregue localmente para lead {lead_id}")
+
+    # ------------------------------------------------------------------
+    # Subscriber Redis (um por processo)
+    # ------------------------------------------------------------------
+
+    async def start(self):
+        """Inicia o subscriber pub/sub (no-op sem Redis)."""
+        if self._listener_task is not None:
+            return
+        if not getattr(settings, 'redis_url', None):
+            logger.info("[SSE] REDIS_URL não configurada, entrega de eventos apenas em memória")
+            return
+        self._listener_task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        """Encerra o subscriber."""
+        task, self._listener_task = self._listener_task, None
+        self._pubsub_ready = False
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def _listen(self):
+        """
+        Loop do subscriber: recebe eventos de todos os workers e faz o
+        fan-out local. Em falha, volta para entrega em memória e reconecta.
+        """
+        while True:
+            pubsub = None
+            try:
+                redis = await get_redis()
+                if redis is None:
+                    raise ConnectionError("Redis indisponível")
+
+                pubsub = redis.pubsub()
+                await pubsub.psubscribe(f"{LEAD_CHANNEL_PREFIX}*", f"{TENANT_CHANNEL_PREFIX}*")
+                self._pubsub_ready = True
+                logger.info("✅ [SSE] Subscriber pub/sub ativo")
+
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is None or message.get("type") != "pmessage":
+                        continue
+                    try:
+                        event = json.loads(message["data"])
+                    except (TypeError, ValueError):
+                        continue
+                    self.deliver_local(message["channel"], event)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._pubsub_ready = False
+                logger.error(f"❌ [SSE] Subscriber pub/sub caiu, tentando novamente em {LISTENER_RETRY_SECONDS}s: {e}")
+                await asyncio.sleep(LISTENER_RETRY_SECONDS)
+            finally:
+                self._pubsub_ready = False
+                if pubsub is not None:
+                    try:
+                        await pubsub.aclose()
+                    except Exception:
+                        pass
 
 
 # Singleton global
@@ -115,9 +284,9 @@ sse_manager = SSEConnectionManager()
 # FUNÇÕES HELPER PARA BROADCAST
 # ============================================
 
-async def broadcast_new_message(lead_id: int, message_data: Dict[str, Any]):
+async def broadcast_new_message(lead_id: int, message_data: Dict[str, Any], tenant_id: Optional[int] = None):
     """Notifica nova mensagem."""
-    await sse_manager.broadcast(lead_id, "new_message", message_data)
+    await sse_manager.broadcast(lead_id, "new_message", message_data, tenant_id=tenant_id)
 
 
 async def broadcast_message_status(lead_id: int, message_id: int, status: str, timestamp: Optional[str] = None):
@@ -137,24 +306,48 @@ async def broadcast_typing_indicator(lead_id: int, is_typing: bool, user_name: s
     })
 
 
-async def broadcast_lead_updated(lead_id: int, updated_fields: Dict[str, Any]):
+async def broadcast_lead_updated(lead_id: int, updated_fields: Dict[str, Any], tenant_id: Optional[int] = None):
     """Notifica que dados do lead foram alterados (status, tags, etc)."""
-    await sse_manager.broadcast(lead_id, "lead_updated", updated_fields)
+    await sse_manager.broadcast(lead_id, "lead_updated", updated_fields, tenant_id=tenant_id)
 
 
-async def broadcast_handoff(lead_id: int, from_type: str, to_type: str, to_user_name: Optional[str] = None):
+async def broadcast_handoff(
+    lead_id: int,
+    from_type: str,
+    to_type: str,
+    to_user_name: Optional[str] = None,
+    tenant_id: Optional[int] = None,
+):
     """Notifica transferência de atendimento."""
     await sse_manager.broadcast(lead_id, "handoff", {
         "from": from_type,
         "to": to_type,
         "to_user_name": to_user_name
-    })
+    }, tenant_id=tenant_id)
 
 
 # ============================================
 # GENERATOR PARA FASTAPI
 # ============================================
 
+async def _stream_queue(queue: asyncio.Queue, connected_event: Dict[str, Any]):
+    """Serializa eventos da queue no formato SSE, com heartbeat."""
+    # Envia evento inicial de conexão
+    yield f"data: {json.dumps(connected_event)}\n\n"
+
+    while True:
+        try:
+            # Aguarda evento ou timeout de 30s (heartbeat)
+            event = await asyncio.wait_for(queue.get(), timeout=30.0)
+
+            # Envia evento no formato SSE
+            yield f"data: {json.dumps(event, default=str)}\n\n"
+
+        except asyncio.TimeoutError:
+            # Heartbeat para manter conexão viva
+            yield f": heartbeat\n\n"
+
+
 async def event_stream_generator(lead_id: int):
     """
     Generator assíncrono para endpoint SSE do FastAPI.
@@ -171,22 +364,22 @@ async def event_stream_generator(lead_id: int):
     queue = await sse_manager.connect(lead_id)
 
     try:
-        # Envia evento inicial de conexão
-        yield f"data: {json.dumps({'type': 'connected', 'lead_id': lead_id})}\n\n"
-
-        while True:
-            try:
-                # Aguarda evento ou timeout de 30s (heartbeat)
-                event = await asyncio.wait_for(queue.get(), timeout=30.0)
+        async for chunk in _stream_queue(queue, {'type': 'connected', 'lead_id': lead_id}):
+            yield chunk
+    except asyncio.CancelledError:
+        logger.info(f"[SSE] Cliente desconectou de lead {lead_id}")
+    finally:
+        await sse_manager.disconnect(lead_id, queue)
 
-                # Envia evento no formato SSE
-                yield f"data: {json.dumps(event)}\n\n"
 
-            except asyncio.TimeoutError:
-                # Heartbeat para manter conexão viva
-                yield f": heartbeat\n\n"
+async def tenant_event_stream_generator(tenant_id: int):
+    """Generator SSE com os eventos de todos os leads do tenant."""
+    queue = await sse_manager.connect_tenant(tenant_id)
 
+    try:
+        async for chunk in _stream_queue(queue, {'type': 'connected', 'tenant_id': tenant_id}):
+            yield chunk
     except asyncio.CancelledError:
-        logger.info(f"[SSE] Cliente desconectou de lead {lead_id}")
+        logger.info(f"[SSE] Cliente desconectou do tenant {tenant_id}")
     finally:
-        await sse_manager.disconnect(lead_id, queue)
+        await sse_manager.disconnect_tenant(tenant_id, queue)
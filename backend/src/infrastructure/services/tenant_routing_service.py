@@ -0,0 +1,289 @@
+"""
+TENANT ROUTING SERVICE - Resolução O(1) de tenant nos webhooks
+===============================================================
+
+Todo webhook de WhatsApp (Gupshup, 360dialog, Z-API, Twilio) precisa
+descobrir de qual tenant é a mensagem antes de qualquer processamento.
+
+Antes:
+- Gupshup carregava TODOS os tenants ativos e comparava settings em Python
+- 360dialog fazia até 2 queries em JSONB (->>) sem índice
+
+Agora:
+1. Cache local do processo: (tipo, chave) → tenant_id
+2. Miss: SELECT na tabela tenant_routes (índice único)
+3. Tenant carregado por PK (db.get usa o identity map da sessão)
+
+As rotas são reconstruídas por sync_tenant_routes() sempre que settings
+ou canais de um tenant mudam, o que também invalida o cache local.
+Outras réplicas enxergam a mudança após o TTL do cache.
+"""
+
+import logging
+import time
+from typing import Optional, Iterable
+
+from sqlalchemy import select, delete, func, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.domain.entities import Tenant, Channel, TenantRoute
+from src.domain.entities.tenant_route import (
+    ROUTE_PHONE,
+    ROUTE_GUPSHUP_APP,
+    ROUTE_ZAPI_INSTANCE,
+)
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# CACHE LOCAL
+# =============================================================================
+
+# TTL de rotas encontradas e de misses (misses expiram rápido para
+# que um tenant recém-configurado passe a receber mensagens logo)
+ROUTE_CACHE_TTL_SECONDS = 300
+ROUTE_NEGATIVE_TTL_SECONDS = 30
+
+# {(route_type, route_key): (tenant_id | None, expires_at)}
+_route_cache: dict[tuple[str, str], tuple[Optional[int], float]] = {}
+
+
+def invalidate_route_cache(tenant_id: Optional[int] = None) -> None:
+    """
+    Invalida o cache de rotas.
+
+    Sem tenant_id limpa tudo. Com tenant_id remove as rotas daquele
+    tenant e todos os misses (a nova chave pode estar cacheada como miss).
+    """
+    if tenant_id is None:
+        _route_cache.clear()
+        return
+
+    stale = [
+        key for key, (cached_id, _) in _route_cache.items()
+        if cached_id is None or cached_id == tenant_id
+    ]
+    for key in stale:
+        _route_cache.pop(key, None)
+
+
+def _cache_get(route_type: str, route_key: str) -> tuple[bool, Optional[int]]:
+    entry = _route_cache.get((route_type, route_key))
+    if entry is None:
+        return False, None
+
+    tenant_id, expires_at = entry
+    if expires_at < time.monotonic():
+        _route_cache.pop((route_type, route_key), None)
+        return False, None
+
+    return True, tenant_id
+
+
+def _cache_set(route_type: str, route_key: str, tenant_id: Optional[int]) -> None:
+    ttl = ROUTE_CACHE_TTL_SECONDS if tenant_id is not None else ROUTE_NEGATIVE_TTL_SECONDS
+    _route_cache[(route_type, route_key)] = (tenant_id, time.monotonic() + ttl)
+
+
+# =============================================================================
+# NORMALIZAÇÃO
+# =============================================================================
+
+def normalize_route_phone(phone: Optional[str]) -> str:
+    """
+    Normaliza número de WhatsApp Business para chave de rota.
+
+    Mantém só dígitos e remove o código do Brasil (55) quando presente,
+    assim "+55 (11) 99999-9999" e "11999999999" viram a mesma chave.
+    """
+    digits = "".join(filter(str.isdigit, phone or ""))
+    if digits.startswith("55") and len(digits) in (12, 13):
+        digits = digits[2:]
+    return digits
+
+
+def normalize_route_key(route_type: str, value: Optional[str]) -> str:
+    """Normaliza a chave conforme o tipo de rota."""
+    if route_type == ROUTE_PHONE:
+        return normalize_route_phone(value)
+    return (value or "").strip()
+
+
+def extract_tenant_routes(
+    tenant: Tenant,
+    channels: Iterable[Channel] = (),
+) -> set[tuple[str, str]]:
+    """
+    Extrai as chaves de roteamento de um tenant a partir de settings e canais.
+
+    Fontes:
+    - settings.whatsapp_number / gupshup_app_name / zapi_instance_id
+    - channel.config.phone_number / instance_id / zapi_instance_id (canais WhatsApp ativos)
+    """
+    settings = tenant.settings or {}
+    candidates = [
+        (ROUTE_PHONE, settings.get("whatsapp_number")),
+        (ROUTE_GUPSHUP_APP, settings.get("gupshup_app_name")),
+        (ROUTE_ZAPI_INSTANCE, settings.get("zapi_instance_id")),
+    ]
+
+    for channel in channels:
+        if channel.type != "whatsapp" or not channel.active:
+            continue
+        config = channel.config or {}
+        candidates.append((ROUTE_PHONE, config.get("phone_number")))
+        candidates.append(
+            (ROUTE_ZAPI_INSTANCE, config.get("instance_id") or config.get("zapi_instance_id"))
+        )
+
+    routes = set()
+    for route_type, value in candidates:
+        if not isinstance(value, str):
+            continue
+        key = normalize_route_key(route_type, value)
+        if key:
+            routes.add((route_type, key))
+
+    return routes
+
+
+# =============================================================================
+# MANUTENÇÃO DAS ROTAS
+# =============================================================================
+
+async def sync_tenant_routes(db: AsyncSession, tenant_id: int) -> int:
+    """
+    Reconstrói as rotas de um tenant (chamar após alterar settings ou canais).
+
+    Não faz commit: as rotas entram na mesma transação da alteração.
+    Se outra empresa já usava a mesma chave, a rota passa para este tenant
+    (último a configurar vence) e um warning é registrado.
+
+    Returns:
+        Quantidade de rotas ativas do tenant
+    """
+    await db.flush()
+
+    tenant = await db.get(Tenant, tenant_id)
+
+    await db.execute(delete(TenantRoute).where(TenantRoute.tenant_id == tenant_id))
+    invalidate_route_cache(tenant_id)
+
+    if not tenant or not tenant.active:
+        return 0
+
+    result = await db.execute(
+        select(Channel).where(Channel.tenant_id == tenant_id)
+    )
+    routes = extract_tenant_routes(tenant, result.scalars().all())
+
+    if not routes:
+        return 0
+
+    conflicts = await db.execute(
+        select(TenantRoute.route_type, TenantRoute.route_key, TenantRoute.tenant_id).where(
+            tuple_(TenantRoute.route_type, TenantRoute.route_key).in_(list(routes))
+        )
+    )
+    for route_type, route_key, previous_tenant_id in conflicts.all():
+        logger.warning(
+            f"⚠️ Rota {route_type}={route_key} transferida do tenant "
+            f"{previous_tenant_id} para o tenant {tenant_id}"
+        )
+        # A chave pode estar cacheada para o tenant antigo
+        _route_cache.pop((route_type, route_key), None)
+
+    stmt = pg_insert(TenantRoute).values([
+        {"tenant_id": tenant_id, "route_type": route_type, "route_key": route_key}
+        for route_type, route_key in routes
+    ])
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[TenantRoute.route_type, TenantRoute.route_key],
+            set_={"tenant_id": stmt.excluded.tenant_id, "updated_at": func.now()},
+        )
+    )
+
+    logger.info(f"🧭 {len(routes)} rotas sincronizadas para tenant {tenant_id}")
+    return len(routes)
+
+
+async def backfill_tenant_routes(db: AsyncSession) -> int:
+    """
+    Popula tenant_routes a partir dos tenants existentes (se a tabela estiver vazia).
+
+    Executado no startup. É o único ponto que percorre todos os tenants.
+    """
+    existing = await db.execute(select(TenantRoute.id).limit(1))
+    if existing.scalar_one_or_none() is not None:
+        return 0
+
+    result = await db.execute(select(Tenant.id).where(Tenant.active == True))
+    tenant_ids = result.scalars().all()
+
+    total = 0
+    for tenant_id in tenant_ids:
+        total += await sync_tenant_routes(db, tenant_id)
+
+    await db.commit()
+    logger.info(f"🧭 Backfill de rotas: {total} rotas para {len(tenant_ids)} tenants")
+    return total
+
+
+# =============================================================================
+# RESOLUÇÃO
+# =============================================================================
+
+async def resolve_tenant(
+    db: AsyncSession,
+    route_type: str,
+    value: Optional[str],
+) -> Optional[Tenant]:
+    """
+    Resolve o tenant ativo dono de uma chave de roteamento.
+
+    Args:
+        route_type: ROUTE_PHONE, ROUTE_GUPSHUP_APP ou ROUTE_ZAPI_INSTANCE
+        value: Valor cru vindo do webhook (é normalizado aqui)
+    """
+    route_key = normalize_route_key(route_type, value)
+    if not route_key:
+        return None
+
+    hit, tenant_id = _cache_get(route_type, route_key)
+
+    if not hit:
+        result = await db.execute(
+            select(TenantRoute.tenant_id).where(
+                TenantRoute.route_type == route_type,
+                TenantRoute.route_key == route_key,
+            )
+        )
+        tenant_id = result.scalar_one_or_none()
+        _cache_set(route_type, route_key, tenant_id)
+
+    if tenant_id is None:
+        return None
+
+    tenant = await db.get(Tenant, tenant_id)
+    if not tenant or not tenant.active:
+        return None
+
+    return tenant
+
+
+async def get_tenant_by_phone(db: AsyncSession, phone: Optional[str]) -> Optional[Tenant]:
+    """Resolve tenant pelo número do WhatsApp Business."""
+    return await resolve_tenant(db, ROUTE_PHONE, phone)
+
+
+async def get_tenant_by_gupshup_app(db: AsyncSession, app_name: Optional[str]) -> Optional[Tenant]:
+    """Resolve tenant pelo nome do app no Gupshup."""
+    return await resolve_tenant(db, ROUTE_GUPSHUP_APP, app_name)
+
+
+async def get_tenant_by_zapi_instance(db: AsyncSession, instance_id: Optional[str]) -> Optional[Tenant]:
+    """Resolve tenant pelo instanceId da Z-API."""
+    return await resolve_tenant(db, ROUTE_ZAPI_INSTANCE, instance_id)
@@ -0,0 +1,783 @@
+"""
+TENANT STATS SERVICE - Rollup incremental de métricas por tenant
+=================================================================
+
+Mantém os rollups usados pelos dashboards:
+
+- tenant_daily_stats: contadores por tenant por dia (UTC)
+- tenant_lead_counters: distribuição atual dos leads por status,
+  qualificação, canal, origem e "quentes aguardando"
+- métricas de fundo (tópicos e tempo de qualificação), recalculadas
+  em background e servidas do cache
+
+Como funciona:
+1. Listener `after_flush` da sessão coleta Leads inseridos/alterados/
+   removidos e Messages inseridas
+2. Os deltas são somados em memória por (tenant_id, dia) e por
+   (tenant_id, dimensão, valor)
+3. Um INSERT ... ON CONFLICT DO UPDATE por tabela grava tudo, na mesma
+   transação do flush (rollback desfaz o incremento junto)
+
+Assim nenhum ponto de escrita precisa lembrar de atualizar o rollup
+(process_message, inbox do vendedor, follow-up, simulador, webhooks...).
+
+Escritas via Core (insert/update(Lead) sem ORM) e atributos alterados
+sem o valor antigo carregado não passam pelo listener; o job noturno
+de reconciliação (rebuild_daily_stats / rebuild_lead_counters) corrige
+essas divergências.
+"""
+
+import asyncio
+import logging
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import Date, cast, event, func, inspect, literal_column, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from src.config import get_settings
+from src.domain.entities import Lead, Message, TenantDailyStats, TenantLeadCounter
+from src.domain.entities.enums import LeadStatus
+from src.domain.entities.tenant_daily_stats import (
+    COUNTER_CHANNEL,
+    COUNTER_HOT_WAITING,
+    COUNTER_QUALIFICATION,
+    COUNTER_SOURCE,
+    COUNTER_STATUS,
+)
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+HOT_QUALIFICATIONS = ("quente", "hot")
+HANDED_OFF = LeadStatus.HANDED_OFF.value
+
+# Atributos do Lead que alimentam tenant_lead_counters
+_TRACKED_LEAD_ATTRS = ("tenant_id", "status", "qualification", "channel_id", "source", "assigned_seller_id")
+
+
+def is_after_hours(dt: datetime) -> bool:
+    """Fora do horário comercial (8h-22h, segunda a sexta)."""
+    hour = dt.hour
+    weekday = dt.weekday()
+    return hour < 8 or hour >= 22 or weekday >= 5
+
+
+# =============================================================================
+# DELTAS
+# =============================================================================
+
+@dataclass
+class DailyIncrement:
+    """Incremento acumulado de um (tenant, dia)."""
+
+    leads_created: int = 0
+    leads_after_hours: int = 0
+    leads_hot: int = 0
+    leads_handed_off: int = 0
+    leads_engaged: int = 0
+    response_time_seconds: int = 0
+    response_time_samples: int = 0
+    messages_count: int = 0
+    user_messages: int = 0
+    assistant_messages: int = 0
+    tokens_used: int = 0
+    last_message_at: Optional[datetime] = None
+
+
+@dataclass(frozen=True)
+class LeadSnapshot:
+    """Valores do lead relevantes para os contadores."""
+
+    tenant_id: int
+    status: Optional[str]
+    qualification: Optional[str]
+    channel_id: Optional[int]
+    source: Optional[str]
+    assigned_seller_id: Optional[int]
+
+    @property
+    def is_hot(self) -> bool:
+        return self.qualification in HOT_QUALIFICATIONS
+
+    @property
+    def is_handed_off(self) -> bool:
+        return self.status == HANDED_OFF
+
+    @property
+    def is_hot_waiting(self) -> bool:
+        return self.is_hot and not self.is_handed_off and self.assigned_seller_id is None
+
+    def counter_keys(self) -> List[Tuple[int, str, str]]:
+        keys = [
+            (self.tenant_id, COUNTER_STATUS, self.status or ""),
+            (self.tenant_id, COUNTER_QUALIFICATION, self.qualification or ""),
+            (self.tenant_id, COUNTER_CHANNEL, str(self.channel_id) if self.channel_id is not None else ""),
+            (self.tenant_id, COUNTER_SOURCE, self.source or ""),
+        ]
+        if self.is_hot_waiting:
+            keys.append((self.tenant_id, COUNTER_HOT_WAITING, "1"))
+        return keys
+
+
+@dataclass
+class LeadChange:
+    """Lead inserido (old=None), alterado ou removido (new=None)."""
+
+    created_at: datetime
+    old: Optional[LeadSnapshot]
+    new: Optional[LeadSnapshot]
+
+
+@dataclass
+class LeadInfo:
+    """Dados do lead necessários para contabilizar uma mensagem."""
+
+    tenant_id: int
+    created_at: datetime
+
+
+@dataclass
+class RollupDelta:
+    daily: Dict[Tuple[int, date], DailyIncrement] = field(default_factory=dict)
+    counters: Dict[Tuple[int, str, str], int] = field(default_factory=dict)
+
+    def __bool__(self) -> bool:
+        return bool(self.daily) or bool(self.counters)
+
+
+def _as_utc(value: Optional[datetime], fallback: datetime) -> datetime:
+    if not isinstance(value, datetime):
+        return fallback
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _created_day(obj, now: datetime) -> Tuple[date, datetime]:
+    """
+    Dia (UTC) de criação do objeto.
+
+    created_at é server_default e normalmente não está carregado após o
+    flush; nesse caso usa o horário atual. Lê direto do __dict__ para
+    nunca disparar lazy load dentro do evento.
+    """
+    created_at = _as_utc(obj.__dict__.get("created_at"), now)
+    return created_at.date(), created_at
+
+
+def build_increments(
+    lead_changes: Iterable[LeadChange],
+    new_messages: Iterable[Message],
+    lead_info: Dict[int, LeadInfo],
+    engaged_lead_ids: Iterable[int] = (),
+    now: Optional[datetime] = None,
+) -> RollupDelta:
+    """
+    Converte as escritas de um flush em deltas de rollup.
+
+    - Contadores de lead (criados, fora do horário, quentes, transferidos,
+      engajados, tempo de resposta) vão para o dia de criação do lead
+    - Contadores de mensagem vão para o dia da mensagem
+    - Mensagens de leads sem tenant conhecido são ignoradas
+    """
+    now = now or datetime.now(timezone.utc)
+    daily: Dict[Tuple[int, date], DailyIncrement] = defaultdict(DailyIncrement)
+    counters: Dict[Tuple[int, str, str], int] = defaultdict(int)
+
+    for change in lead_changes:
+        old_keys = change.old.counter_keys() if change.old else []
+        new_keys = change.new.counter_keys() if change.new else []
+        for key in old_keys:
+            counters[key] -= 1
+        for key in new_keys:
+            counters[key] += 1
+
+        # Remoções só afetam os contadores atuais
+        if change.new is None:
+            continue
+
+        inc = daily[(change.new.tenant_id, change.created_at.date())]
+        if change.old is None:
+            inc.leads_created += 1
+            if is_after_hours(change.created_at):
+                inc.leads_after_hours += 1
+        old_hot = change.old.is_hot if change.old else False
+        old_handed_off = change.old.is_handed_off if change.old else False
+        inc.leads_hot += int(change.new.is_hot) - int(old_hot)
+        inc.leads_handed_off += int(change.new.is_handed_off) - int(old_handed_off)
+
+    for message in new_messages:
+        info = lead_info.get(message.__dict__.get("lead_id"))
+        if info is None:
+            continue
+        day, created_at = _created_day(message, now)
+        inc = daily[(info.tenant_id, day)]
+        inc.messages_count += 1
+        role = message.__dict__.get("role")
+        if role == "user":
+            inc.user_messages += 1
+        elif role == "assistant":
+            inc.assistant_messages += 1
+            lead_inc = daily[(info.tenant_id, info.created_at.date())]
+            lead_inc.response_time_seconds += max(0, int((created_at - info.created_at).total_seconds()))
+            lead_inc.response_time_samples += 1
+        inc.tokens_used += message.__dict__.get("tokens_used") or 0
+        if inc.last_message_at is None or created_at > inc.last_message_at:
+            inc.last_message_at = created_at
+
+    for lead_id in engaged_lead_ids:
+        info = lead_info.get(lead_id)
+        if info is not None:
+            daily[(info.tenant_id, info.created_at.date())].leads_engaged += 1
+
+    return RollupDelta(
+        daily={key: inc for key, inc in daily.items() if inc != DailyIncrement()},
+        counters={key: delta for key, delta in counters.items() if delta != 0},
+    )
+
+
+_DAILY_COUNTERS = (
+    "leads_created",
+    "leads_after_hours",
+    "leads_hot",
+    "leads_handed_off",
+    "leads_engaged",
+    "response_time_seconds",
+    "response_time_samples",
+    "messages_count",
+    "user_messages",
+    "assistant_messages",
+    "tokens_used",
+)
+
+
+def _upsert_statement(increments: Dict[Tuple[int, date], DailyIncrement]):
+    """INSERT ... ON CONFLICT que soma os incrementos às linhas existentes."""
+    rows = [
+        {
+            "tenant_id": tenant_id,
+            "day": day,
+            **{name: getattr(inc, name) for name in _DAILY_COUNTERS},
+            "last_message_at": inc.last_message_at,
+        }
+        for (tenant_id, day), inc in sorted(increments.items())
+    ]
+
+    stmt = pg_insert(TenantDailyStats).values(rows)
+    table = TenantDailyStats.__table__
+    excluded = stmt.excluded
+
+    return stmt.on_conflict_do_update(
+        index_elements=["tenant_id", "day"],
+        set_={
+            **{name: table.c[name] + excluded[name] for name in _DAILY_COUNTERS},
+            # GREATEST ignora NULL no Postgres
+            "last_message_at": func.greatest(table.c.last_message_at, excluded.last_message_at),
+            "updated_at": func.now(),
+        },
+    )
+
+
+def _counters_upsert_statement(counters: Dict[Tuple[int, str, str], int]):
+    """INSERT ... ON CONFLICT que soma os deltas aos contadores atuais."""
+    rows = [
+        {"tenant_id": tenant_id, "dimension": dimension, "value": value[:50], "count": delta}
+        for (tenant_id, dimension, value), delta in sorted(counters.items())
+    ]
+
+    stmt = pg_insert(TenantLeadCounter).values(rows)
+    table = TenantLeadCounter.__table__
+
+    return stmt.on_conflict_do_update(
+        index_elements=["tenant_id", "dimension", "value"],
+        set_={
+            "count": table.c.count + stmt.excluded["count"],
+            "updated_at": func.now(),
+        },
+    )
+
+
+# =============================================================================
+# LISTENER DE FLUSH
+# =============================================================================
+
+def _lead_snapshot(lead: Lead, old: bool = False, inserted: bool = False) -> Optional[LeadSnapshot]:
+    """
+    Valores atuais (old=False) ou anteriores ao flush (old=True).
+
+    Em leads recém-inseridos, colunas não informadas (sem default) foram
+    gravadas como NULL. Nos demais, retorna None se algum valor necessário
+    não está carregado (o job de reconciliação corrige esses casos).
+    """
+    state = inspect(lead)
+    values = {}
+    for attr in _TRACKED_LEAD_ATTRS:
+        if old:
+            history = state.attrs[attr].history
+            if history.deleted:
+                values[attr] = history.deleted[0]
+                continue
+            if history.added:
+                return None  # Alterado sem valor antigo carregado
+        if attr not in lead.__dict__:
+            if not inserted:
+                return None
+        values[attr] = lead.__dict__.get(attr)
+
+    if values["tenant_id"] is None:
+        return None
+    return LeadSnapshot(**values)
+
+
+def _collect_lead_changes(session: Session, now: datetime) -> List[LeadChange]:
+    changes: List[LeadChange] = []
+
+    for lead in session.new:
+        if isinstance(lead, Lead):
+            snapshot = _lead_snapshot(lead, inserted=True)
+            if snapshot:
+                changes.append(LeadChange(_as_utc(lead.__dict__.get("created_at"), now), None, snapshot))
+
+    for lead in session.dirty:
+        if not isinstance(lead, Lead):
+            continue
+        state = inspect(lead)
+        if not any(state.attrs[attr].history.has_changes() for attr in _TRACKED_LEAD_ATTRS):
+            continue
+        old = _lead_snapshot(lead, old=True)
+        new = _lead_snapshot(lead)
+        if old and new:
+            changes.append(LeadChange(_as_utc(lead.__dict__.get("created_at"), now), old, new))
+
+    for lead in session.deleted:
+        if isinstance(lead, Lead):
+            snapshot = _lead_snapshot(lead)
+            if snapshot:
+                changes.append(LeadChange(_as_utc(lead.__dict__.get("created_at"), now), snapshot, None))
+
+    return changes
+
+
+def _resolve_leads(session: Session, messages: list, now: datetime) -> Dict[int, LeadInfo]:
+    """lead_id → (tenant_id, created_at), usando objetos já carregados antes de ir ao banco."""
+    lead_info: Dict[int, LeadInfo] = {}
+    missing: set = set()
+    pending = set(session.new)
+
+    for message in messages:
+        lead_id = message.__dict__.get("lead_id")
+        if lead_id is None or lead_id in lead_info:
+            continue
+
+        lead = message.__dict__.get("lead")
+        if lead is None:
+            lead = session.identity_map.get(session.identity_key(Lead, lead_id))
+
+        tenant_id = lead.__dict__.get("tenant_id") if lead is not None else None
+        created_at = lead.__dict__.get("created_at") if lead is not None else None
+        if created_at is None and lead is not None and lead in pending:
+            created_at = now  # Lead criado neste mesmo flush
+
+        if tenant_id is not None and created_at is not None:
+            lead_info[lead_id] = LeadInfo(tenant_id, _as_utc(created_at, now))
+        else:
+            missing.add(lead_id)
+
+    if missing:
+        result = session.connection().execute(
+            select(Lead.id, Lead.tenant_id, Lead.created_at).where(Lead.id.in_(missing))
+        )
+        for row in result:
+            lead_info[row.id] = LeadInfo(row.tenant_id, _as_utc(row.created_at, now))
+
+    return lead_info
+
+
+def _newly_engaged(session: Session, messages: list, flush_context=None) -> Set[int]:
+    """Leads que chegaram a 2 mensagens próprias neste flush (Lead.user_message_count)."""
+    from src.infrastructure.services.inbox_state_service import leads_counted_in_flush
+
+    new_user_messages = Counter(
+        m.__dict__.get("lead_id") for m in messages
+        if m.__dict__.get("role") == "user" and m.__dict__.get("lead_id") is not None
+    )
+    if not new_user_messages:
+        return set()
+
+    # O contador pode já ter somado as mensagens deste flush (ordem dos listeners)
+    counted = leads_counted_in_flush(session, flush_context)
+    result = session.connection().execute(
+        select(Lead.id, Lead.user_message_count).where(Lead.id.in_(list(new_user_messages)))
+    )
+
+    engaged = set()
+    for lead_id, total in result:
+        new = new_user_messages[lead_id]
+        before = total - new if lead_id in counted else total
+        if before < 2 <= before + new:
+            engaged.add(lead_id)
+    return engaged
+
+
+def _after_flush(session: Session, flush_context) -> None:
+    now = datetime.now(timezone.utc)
+    lead_changes = _collect_lead_changes(session, now)
+    new_messages = [obj for obj in session.new if isinstance(obj, Message)]
+    if not lead_changes and not new_messages:
+        return
+
+    lead_info: Dict[int, LeadInfo] = {}
+    engaged: Set[int] = set()
+    if new_messages:
+        lead_info = _resolve_leads(session, new_messages, now)
+        engaged = _newly_engaged(session, new_messages, flush_context)
+
+    delta = build_increments(lead_changes, new_messages, lead_info, engaged, now=now)
+    if not delta:
+        return
+
+    # Usa a conexão do flush: mesma transação, sem disparar novo autoflush
+    connection = session.connection()
+    if delta.daily:
+        connection.execute(_upsert_statement(delta.daily))
+    if delta.counters:
+        connection.execute(_counters_upsert_statement(delta.counters))
+
+
+def register_tenant_stats_listener() -> None:
+    """Registra o listener de rollup em todas as sessões (idempotente)."""
+    if not event.contains(Session, "after_flush", _after_flush):
+        event.listen(Session, "after_flush", _after_flush)
+        logger.info("📊 Rollups tenant_daily_stats / tenant_lead_counters ativos")
+
+
+# =============================================================================
+# RECONSTRUÇÃO
+# =============================================================================
+
+_AFTER_HOURS_SQL = """
+    CASE WHEN EXTRACT(HOUR FROM l.created_at AT TIME ZONE 'UTC') < 8
+           OR EXTRACT(HOUR FROM l.created_at AT TIME ZONE 'UTC') >= 22
+           OR EXTRACT(ISODOW FROM l.created_at AT TIME ZONE 'UTC') >= 6
+         THEN 1 ELSE 0 END
+"""
+
+
+async def rebuild_daily_stats(
+    session: AsyncSession,
+    since: date,
+    tenant_id: Optional[int] = None,
+) -> int:
+    """
+    Recalcula tenant_daily_stats a partir de leads/messages para dias >= since.
+
+    Útil após importações em massa ou para corrigir divergências.
+    Retorna o número de linhas (tenant, dia) gravadas.
+    """
+    params = {"since": since, "tenant_id": tenant_id}
+    tenant_filter = "AND l.tenant_id = :tenant_id" if tenant_id is not None else ""
+
+    delete_sql = "DELETE FROM tenant_daily_stats WHERE day >= :since"
+    if tenant_id is not None:
+        delete_sql += " AND tenant_id = :tenant_id"
+    await session.execute(text(delete_sql), params)
+
+    columns = ", ".join(_DAILY_COUNTERS)
+    sums = ", ".join(f"SUM({name})" for name in _DAILY_COUNTERS)
+    result = await session.execute(text(f"""
+        INSERT INTO tenant_daily_stats (tenant_id, day, {columns}, last_message_at)
+        SELECT tenant_id, day, {sums}, MAX(last_message_at)
+        FROM (
+            -- Leads (dia de criação do lead)
+            SELECT l.tenant_id, (l.created_at AT TIME ZONE 'UTC')::date AS day,
+                   1 AS leads_created,
+                   {_AFTER_HOURS_SQL} AS leads_after_hours,
+                   CASE WHEN l.qualification IN {HOT_QUALIFICATIONS} THEN 1 ELSE 0 END AS leads_hot,
+                   CASE WHEN l.status = '{HANDED_OFF}' THEN 1 ELSE 0 END AS leads_handed_off,
+                   CASE WHEN l.user_message_count >= 2 THEN 1 ELSE 0 END AS leads_engaged,
+                   0::bigint AS response_time_seconds, 0 AS response_time_samples,
+                   0 AS messages_count, 0 AS user_messages, 0 AS assistant_messages,
+                   0 AS tokens_used, NULL::timestamptz AS last_message_at
+            FROM leads l
+            WHERE l.created_at >= :since {tenant_filter}
+            UNION ALL
+            -- Respostas da IA (dia de criação do lead)
+            SELECT l.tenant_id, (l.created_at AT TIME ZONE 'UTC')::date,
+                   0, 0, 0, 0, 0,
+                   GREATEST(EXTRACT(EPOCH FROM m.created_at - l.created_at), 0)::bigint, 1,
+                   0, 0, 0, 0, NULL
+            FROM messages m
+            JOIN leads l ON l.id = m.lead_id
+            WHERE m.role = 'assistant' AND l.created_at >= :since {tenant_filter}
+            UNION ALL
+            -- Mensagens (dia da mensagem)
+            SELECT l.tenant_id, (m.created_at AT TIME ZONE 'UTC')::date,
+                   0, 0, 0, 0, 0, 0, 0,
+                   1,
+                   CASE WHEN m.role = 'user' THEN 1 ELSE 0 END,
+                   CASE WHEN m.role = 'assistant' THEN 1 ELSE 0 END,
+                   COALESCE(m.tokens_used, 0),
+                   m.created_at
+            FROM messages m
+            JOIN leads l ON l.id = m.lead_id
+            WHERE m.created_at >= :since {tenant_filter}
+        ) src
+        GROUP BY tenant_id, day
+    """), params)
+
+    await session.commit()
+    logger.info(f"📊 tenant_daily_stats reconstruído desde {since}: {result.rowcount} linhas")
+    return result.rowcount
+
+
+async def rebuild_lead_counters(session: AsyncSession, tenant_id: Optional[int] = None) -> int:
+    """Recalcula tenant_lead_counters a partir da tabela leads."""
+    params = {"tenant_id": tenant_id}
+    tenant_filter = "WHERE tenant_id = :tenant_id" if tenant_id is not None else ""
+    lead_filter = "AND tenant_id = :tenant_id" if tenant_id is not None else ""
+
+    await session.execute(text(f"DELETE FROM tenant_lead_counters {tenant_filter}"), params)
+    result = await session.execute(text(f"""
+        INSERT INTO tenant_lead_counters (tenant_id, dimension, value, count, updated_at)
+        SELECT tenant_id, dimension, value, COUNT(*), now()
+        FROM (
+            SELECT tenant_id, '{COUNTER_STATUS}' AS dimension, COALESCE(status, '') AS value FROM leads {tenant_filter}
+            UNION ALL
+            SELECT tenant_id, '{COUNTER_QUALIFICATION}', COALESCE(qualification, '') FROM leads {tenant_filter}
+            UNION ALL
+            SELECT tenant_id, '{COUNTER_CHANNEL}', COALESCE(channel_id::text, '') FROM leads {tenant_filter}
+            UNION ALL
+            SELECT tenant_id, '{COUNTER_SOURCE}', COALESCE(source, '') FROM leads {tenant_filter}
+            UNION ALL
+            SELECT tenant_id, '{COUNTER_HOT_WAITING}', '1' FROM leads
+            WHERE qualification IN {HOT_QUALIFICATIONS}
+              AND COALESCE(status, '') <> '{HANDED_OFF}'
+              AND assigned_seller_id IS NULL {lead_filter}
+        ) src
+        GROUP BY tenant_id, dimension, value
+    """), params)
+
+    await session.commit()
+    logger.info(f"📊 tenant_lead_counters reconstruído: {result.rowcount} linhas")
+    return result.rowcount
+
+
+async def run_metrics_reconcile_job() -> dict:
+    """Job noturno: recalcula os rollups recentes e os contadores atuais."""
+    from src.infrastructure.database import async_session
+
+    since = datetime.now(timezone.utc).date() - timedelta(days=settings.metrics_reconcile_days)
+    async with async_session() as session:
+        daily_rows = await rebuild_daily_stats(session, since)
+        counter_rows = await rebuild_lead_counters(session)
+
+    return {"daily_rows": daily_rows, "counter_rows": counter_rows, "since": since.isoformat()}
+
+
+# =============================================================================
+# LEITURA
+# =============================================================================
+
+def tenant_totals_query(since_week: date, since_month: date):
+    """
+    Totais por tenant em uma única consulta agrupada:
+    leads (total/semana/mês), mensagens e última atividade.
+    """
+    s = TenantDailyStats
+    return (
+        select(
+            s.tenant_id,
+            func.sum(s.leads_created).label("leads_total"),
+            func.coalesce(func.sum(s.leads_created).filter(s.day >= since_week), 0).label("leads_week"),
+            func.coalesce(func.sum(s.leads_created).filter(s.day >= since_month), 0).label("leads_month"),
+            func.sum(s.messages_count).label("messages_total"),
+            func.max(s.last_message_at).label("last_activity"),
+        )
+        .group_by(s.tenant_id)
+    )
+
+
+def weekly_totals_query(since: date, tenant_id: Optional[int] = None):
+    """Leads e mensagens por semana (date_trunc('week'), semanas começando na segunda)."""
+    s = TenantDailyStats
+    # 'week' literal: o mesmo texto no SELECT e no GROUP BY (bind params diferentes quebrariam o agrupamento)
+    week = cast(func.date_trunc(literal_column("'week'"), s.day), Date).label("week")
+    stmt = (
+        select(
+            week,
+            func.sum(s.leads_created).label("leads"),
+            func.sum(s.messages_count).label("messages"),
+        )
+        .where(s.day >= since)
+        .group_by(week)
+        .order_by(week)
+    )
+    if tenant_id is not None:
+        stmt = stmt.where(s.tenant_id == tenant_id)
+    return stmt
+
+
+def tenant_period_query(tenant_id: int, today: date, week_start: date, month_start: date, last_week_start: date):
+    """Contadores do tenant por período (hoje/semana/mês/semana anterior) em uma consulta."""
+    s = TenantDailyStats
+
+    def total(column, since: date, until: Optional[date] = None):
+        condition = s.day >= since if until is None else (s.day >= since) & (s.day < until)
+        return func.coalesce(func.sum(column).filter(condition), 0)
+
+    return (
+        select(
+            total(s.leads_created, today).label("leads_today"),
+            total(s.leads_created, week_start).label("leads_week"),
+            total(s.leads_created, month_start).label("leads_month"),
+            total(s.leads_created, last_week_start, week_start).label("leads_last_week"),
+            total(s.leads_after_hours, month_start).label("after_hours_month"),
+            total(s.leads_hot, month_start).label("hot_month"),
+            total(s.leads_handed_off, month_start).label("handed_off_month"),
+            total(s.leads_engaged, month_start).label("engaged_month"),
+            total(s.response_time_seconds, month_start).label("response_seconds_month"),
+            total(s.response_time_samples, month_start).label("response_samples_month"),
+        )
+        .where(s.tenant_id == tenant_id)
+        .where(s.day >= min(last_week_start, month_start))
+    )
+
+
+async def get_lead_counters(db: AsyncSession, tenant_id: int) -> Dict[str, Dict[str, int]]:
+    """Distribuição atual dos leads do tenant: {dimensão: {valor: quantidade}}."""
+    result = await db.execute(
+        select(TenantLeadCounter.dimension, TenantLeadCounter.value, TenantLeadCounter.count)
+        .where(TenantLeadCounter.tenant_id == tenant_id)
+    )
+    counters: Dict[str, Dict[str, int]] = defaultdict(dict)
+    for dimension, value, count in result.all():
+        if count > 0:
+            counters[dimension][value] = count
+    return counters
+
+
+# =============================================================================
+# MÉTRICAS DE FUNDO (TÓPICOS / TEMPO DE QUALIFICAÇÃO)
+# =============================================================================
+
+BACKGROUND_METRICS_KEY = "metrics:background:{tenant_id}"
+
+_TOPIC_STOPWORDS = {
+    'a', 'o', 'e', 'de', 'do', 'da', 'em', 'um', 'para', 'com', 'não', 'uma', 'os', 'as',
+    'no', 'na', 'por', 'mais', 'como', 'me', 'meu', 'minha', 'tem', 'quero', 'sou', 'vcs',
+    'vocês', 'boa', 'tarde', 'dia', 'noite', 'ola', 'olá', 'oi',
+}
+_PUNCTUATION_RE = re.compile(r'[^\w\s]')
+
+# Cópia local (funciona sem Redis) e recálculos em andamento neste processo
+_local_background: Dict[int, dict] = {}
+_refreshing: Set[int] = set()
+
+
+def extract_topics(messages: List[str]) -> List[dict]:
+    """Extrai tópicos frequentes das mensagens (simples heatmap)."""
+    words = Counter()
+    for msg in messages:
+        clean_msg = _PUNCTUATION_RE.sub('', msg.lower())
+        words.update(
+            word for word in clean_msg.split()
+            if len(word) > 3 and word not in _TOPIC_STOPWORDS
+        )
+    return [{"topic": word, "count": count} for word, count in words.most_common(10)]
+
+
+async def compute_background_metrics(db: AsyncSession, tenant_id: int) -> dict:
+    """Calcula as métricas caras do dashboard (tópicos e tempo médio de qualificação)."""
+    month_start = datetime.now(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+    recent_msgs_result = await db.execute(
+        select(Message.content)
+        .join(Lead, Message.lead_id == Lead.id)
+        .where(Lead.tenant_id == tenant_id)
+        .where(Message.role == "user")
+        .where(Lead.created_at >= month_start)
+        .limit(200)
+    )
+    topics = extract_topics([row[0] for row in recent_msgs_result.all()])
+
+    avg_time_result = await db.execute(
+        select(func.avg(
+            func.extract('epoch', Lead.updated_at) -
+            func.extract('epoch', Lead.created_at)
+        ))
+        .where(Lead.tenant_id == tenant_id)
+        .where(Lead.qualification.isnot(None))
+    )
+    avg_qual_seconds = avg_time_result.scalar()
+
+    return {
+        "computed_at": datetime.now(timezone.utc).isoformat(),
+        "top_topics": topics,
+        "avg_qualification_time_hours": round(float(avg_qual_seconds) / 3600, 2) if avg_qual_seconds else 1.0,
+    }
+
+
+def _is_fresh(metrics: Optional[dict]) -> bool:
+    if not metrics or "computed_at" not in metrics:
+        return False
+    computed_at = datetime.fromisoformat(metrics["computed_at"])
+    age = (datetime.now(timezone.utc) - computed_at).total_seconds()
+    return age < settings.metrics_background_refresh_seconds
+
+
+async def _refresh_background_metrics(tenant_id: int) -> None:
+    from src.infrastructure.database import async_session
+    from src.infrastructure.services.redis_service import acquire_lock, cache_set, release_lock
+
+    lock_key = f"metrics:background:refresh:{tenant_id}"
+    try:
+        token = await acquire_lock(lock_key, ttl_seconds=120)
+        if token is None:
+            return  # Outra réplica já está recalculando
+
+        try:
+            async with async_session() as session:
+                metrics = await compute_background_metrics(session, tenant_id)
+            _local_background[tenant_id] = metrics
+            # Mantido por mais tempo que o intervalo de recálculo: é servido (stale) enquanto recalcula
+            await cache_set(
+                BACKGROUND_METRICS_KEY.format(tenant_id=tenant_id),
+                metrics,
+                ttl=settings.metrics_background_refresh_seconds * 6,
+            )
+        finally:
+            await release_lock(lock_key, token)
+    except Exception as e:
+        logger.warning(f"⚠️ Erro recalculando métricas de fundo do tenant {tenant_id}: {e}")
+    finally:
+        _refreshing.discard(tenant_id)
+
+
+async def get_background_metrics(tenant_id: int) -> Optional[dict]:
+    """
+    Métricas de fundo do tenant (stale-while-revalidate).
+
+    Retorna o último valor calculado (local ou Redis) e, se estiver
+    velho ou ausente, agenda o recálculo em background.
+    Retorna None apenas antes do primeiro cálculo.
+    """
+    from src.infrastructure.services.redis_service import cache_get_json
+
+    metrics = _local_background.get(tenant_id)
+    if not _is_fresh(metrics):
+        cached = await cache_get_json(BACKGROUND_METRICS_KEY.format(tenant_id=tenant_id))
+        if isinstance(cached, dict) and (metrics is None or cached.get("computed_at", "") > metrics.get("computed_at", "")):
+            metrics = cached
+            _local_background[tenant_id] = cached
+
+    if not _is_fresh(metrics) and tenant_id not in _refreshing:
+        _refreshing.add(tenant_id)
+        asyncio.create_task(_refresh_background_metrics(tenant_id))
+
+    return metrics
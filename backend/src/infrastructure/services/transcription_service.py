@@ -7,9 +7,9 @@ Gerencia o download de áudios e a chamada para o Whisper.
 import os
 import uuid
 import logging
-import httpx
 from typing import Optional
 from src.infrastructure.llm import LLMFactory
+from src.infrastructure.services.http_client_registry import get_http_client
 
 logger = logging.getLogger(__name__)
 
@@ -26,14 +26,14 @@ async def transcribe_audio_url(url: str, prompt: Optional[str] = None) -> Option
     try:
         # 1. Download do arquivo
         logger.info(f"🎙️ Baixando áudio de: {url}")
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, timeout=30.0)
-            if response.status_code != 200:
-                logger.error(f"❌ Erro ao baixar áudio: {response.status_code}")
-                return None
-            
-            with open(temp_file, "wb") as f:
-                f.write(response.content)
+        client = get_http_client("media")
+        response = await client.get(url, timeout=30.0)
+        if response.status_code != 200:
+            logger.error(f"❌ Erro ao baixar áudio: {response.status_code}")
+            return None
+
+        with open(temp_file, "wb") as f:
+            f.write(response.content)
         
         # 2. Transcrição via LLM Provider
         logger.info(f"🎙️ Enviando para Whisper: {temp_file} | Prompt: {prompt[:50] if prompt else 'N/A'}")
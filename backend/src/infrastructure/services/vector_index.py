@@ -0,0 +1,329 @@
+"""
+VECTOR INDEX - Índice vetorial em memória (numpy)
+==================================================
+
+Índice de similaridade de cosseno para busca semântica local.
+
+Estrutura:
+- Matriz contígua float32 (N x D) com linhas já normalizadas
+- Busca = 1 matmul + argpartition (top-k), sem loop Python por item
+- Remoção por tombstone (máscara), compactação automática
+
+Persistência (sem reescrever o índice inteiro a cada alteração):
+- <base>.f32        Vetores crus float32, append-only (lidos via np.memmap)
+- <base>.log.jsonl  Log append-only de operações (add/remove + payload)
+
+Compactação reescreve os dois arquivos apenas quando a fração de
+linhas removidas passa de COMPACT_RATIO.
+"""
+
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Compacta quando mais de 25% das linhas são tombstones
+COMPACT_RATIO = 0.25
+
+# Capacidade inicial da matriz (cresce dobrando)
+INITIAL_CAPACITY = 256
+
+
+def normalize_vector(vector: Sequence[float]) -> Optional[np.ndarray]:
+    """Converte para float32 e normaliza (norma L2 = 1). Retorna None se norma 0."""
+    vec = np.asarray(vector, dtype=np.float32).ravel()
+    norm = float(np.linalg.norm(vec))
+    if norm == 0.0 or not np.isfinite(norm):
+        return None
+    return vec / norm
+
+
+class VectorIndex:
+    """
+    Índice vetorial por chave (ex: código do imóvel).
+
+    Não é thread-safe para escrita: add/remove devem ser chamados do
+    event loop. search() pode rodar em thread (asyncio.to_thread) pois
+    trabalha sobre um snapshot (matriz, máscara, chaves, contagem) lido
+    sob _lock; escritas que trocam essas referências publicam todas
+    juntas sob o mesmo lock.
+    """
+
+    def __init__(self, base_path: str):
+        self.base_path = base_path
+        self.vectors_path = f"{base_path}.f32"
+        self.log_path = f"{base_path}.log.jsonl"
+
+        self.dim: Optional[int] = None
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._count = 0
+
+        self._keys: List[Optional[str]] = []      # linha → chave
+        self._rows: Dict[str, int] = {}           # chave → linha
+        self.payloads: Dict[str, Dict[str, Any]] = {}
+
+        self._lock = threading.Lock()
+
+    # =========================================================================
+    # CONSULTA
+    # =========================================================================
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._rows
+
+    def search(
+        self,
+        query: Sequence[float],
+        limit: int = 5,
+        min_score: float = 0.0,
+    ) -> List[Tuple[str, float]]:
+        """
+        Retorna [(chave, score)] ordenado por similaridade de cosseno.
+        """
+        with self._lock:
+            matrix, alive, keys, count = self._matrix, self._alive, self._keys, self._count
+        if count == 0 or not self._rows or limit <= 0:
+            return []
+
+        query_vec = normalize_vector(query)
+        if query_vec is None or query_vec.shape[0] != self.dim:
+            return []
+
+        scores = matrix[:count] @ query_vec
+        scores[~alive[:count]] = -np.inf
+
+        k = min(limit, count)
+        if k < count:
+            top = np.argpartition(scores, -k)[-k:]
+        else:
+            top = np.arange(count)
+        top = top[np.argsort(scores[top])[::-1]]
+
+        results = []
+        for row in top:
+            score = float(scores[row])
+            if not np.isfinite(score) or score < min_score:
+                break
+            key = keys[row]
+            if key is None:
+                continue  # removido depois do snapshot
+            results.append((key, score))
+        return results
+
+    # =========================================================================
+    # ESCRITA
+    # =========================================================================
+
+    def add(self, key: str, vector: Sequence[float], payload: Optional[Dict] = None) -> bool:
+        """Adiciona (ou substitui) um vetor. Persiste incrementalmente."""
+        vec = normalize_vector(vector)
+        if vec is None:
+            return False
+
+        if self.dim is None:
+            self.init_storage(int(vec.shape[0]))
+        elif vec.shape[0] != self.dim:
+            logger.warning(f"⚠️ Dimensão inválida para {key}: {vec.shape[0]} != {self.dim}")
+            return False
+
+        if key in self._rows:
+            self._tombstone(key)
+            self._append_log({"op": "remove", "key": key})
+
+        row = self._append_row(key, vec, payload or {})
+        self._persist_row(vec)
+        self._append_log({"op": "add", "key": key, "row": row, "payload": payload or {}})
+        return True
+
+    def remove(self, key: str) -> bool:
+        """Remove um vetor (tombstone + log). Compacta se necessário."""
+        if key not in self._rows:
+            return False
+
+        self._tombstone(key)
+        self._append_log({"op": "remove", "key": key})
+        self._maybe_compact()
+        return True
+
+    def _append_row(self, key: str, vec: np.ndarray, payload: Dict) -> int:
+        self._ensure_capacity(self._count + 1)
+        row = self._count
+        self._matrix[row] = vec
+        self._alive[row] = True
+        self._keys.append(key)
+        self._rows[key] = row
+        self.payloads[key] = payload
+
+        # Linha completa antes de ficar visível para search()
+        with self._lock:
+            self._count += 1
+        return row
+
+    def _tombstone(self, key: str) -> None:
+        row = self._rows.pop(key)
+        self._alive[row] = False
+        self._keys[row] = None
+        self.payloads.pop(key, None)
+
+    def _ensure_capacity(self, needed: int) -> None:
+        capacity = self._matrix.shape[0]
+        if needed <= capacity and self._matrix.shape[1] == self.dim:
+            return
+
+        new_capacity = max(INITIAL_CAPACITY, capacity)
+        while new_capacity < needed:
+            new_capacity *= 2
+
+        matrix = np.zeros((new_capacity, self.dim), dtype=np.float32)
+        alive = np.zeros(new_capacity, dtype=bool)
+        if self._count:
+            matrix[:self._count] = self._matrix[:self._count]
+            alive[:self._count] = self._alive[:self._count]
+
+        # Troca as referências de uma vez (search em thread usa o snapshot antigo)
+        with self._lock:
+            self._matrix, self._alive = matrix, alive
+
+    # =========================================================================
+    # PERSISTÊNCIA
+    # =========================================================================
+
+    def _persist_row(self, vec: np.ndarray) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.vectors_path) or ".", exist_ok=True)
+            with open(self.vectors_path, "ab") as f:
+                f.write(vec.astype(np.float32).tobytes())
+        except Exception as e:
+            logger.error(f"❌ Erro ao persistir vetor: {e}")
+
+    def _append_log(self, entry: Dict) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        except Exception as e:
+            logger.error(f"❌ Erro ao gravar log do índice: {e}")
+
+    def load(self) -> bool:
+        """
+        Carrega o índice do disco (memmap dos vetores + replay do log).
+
+        Returns:
+            True se havia índice salvo
+        """
+        if not os.path.exists(self.log_path) or not os.path.exists(self.vectors_path):
+            return False
+
+        entries = []
+        with open(self.log_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logger.warning("⚠️ Linha corrompida no log do índice vetorial, ignorando")
+
+        header = next((e for e in entries if e.get("op") == "meta"), None)
+        if header is None:
+            logger.warning("⚠️ Índice vetorial sem cabeçalho, ignorando")
+            return False
+
+        self.dim = int(header["dim"])
+        row_bytes = self.dim * np.dtype(np.float32).itemsize
+        total_rows = os.path.getsize(self.vectors_path) // row_bytes
+        if os.path.getsize(self.vectors_path) != total_rows * row_bytes:
+            # Linha parcial (crash durante escrita): descarta para manter alinhamento
+            with open(self.vectors_path, "r+b") as f:
+                f.truncate(total_rows * row_bytes)
+
+        raw = np.memmap(self.vectors_path, dtype=np.float32, mode="r") if total_rows else np.zeros(0, dtype=np.float32)
+        stored = raw[: total_rows * self.dim].reshape(total_rows, self.dim)
+
+        self._ensure_capacity(total_rows)
+        self._matrix[:total_rows] = stored
+        with self._lock:
+            self._keys = [None] * total_rows
+            self._count = total_rows
+        del raw, stored
+
+        for entry in entries:
+            op = entry.get("op")
+            key = entry.get("key")
+            if op == "add":
+                row = entry["row"]
+                if row >= total_rows:
+                    continue  # vetor não chegou ao disco (crash no meio)
+                if key in self._rows:
+                    self._tombstone(key)
+                self._alive[row] = True
+                self._keys[row] = key
+                self._rows[key] = row
+                self.payloads[key] = entry.get("payload") or {}
+            elif op == "remove" and key in self._rows:
+                self._tombstone(key)
+
+        return True
+
+    def init_storage(self, dim: int) -> None:
+        """Cria arquivos vazios com o cabeçalho (dimensão) do índice."""
+        self.dim = dim
+        os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+        open(self.vectors_path, "wb").close()
+        with open(self.log_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"op": "meta", "dim": dim}) + "\n")
+
+    def compact(self) -> None:
+        """Reescreve os arquivos só com as linhas vivas."""
+        if self.dim is None:
+            return
+
+        live = sorted(self._rows.items(), key=lambda item: item[1])
+        rows = np.array([row for _, row in live], dtype=np.int64)
+        matrix = self._matrix[rows] if len(rows) else np.zeros((0, self.dim), dtype=np.float32)
+
+        tmp_vectors = f"{self.vectors_path}.tmp"
+        tmp_log = f"{self.log_path}.tmp"
+        with open(tmp_vectors, "wb") as f:
+            f.write(np.ascontiguousarray(matrix, dtype=np.float32).tobytes())
+        with open(tmp_log, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"op": "meta", "dim": self.dim}) + "\n")
+            for new_row, (key, _) in enumerate(live):
+                f.write(json.dumps(
+                    {"op": "add", "key": key, "row": new_row, "payload": self.payloads.get(key, {})},
+                    ensure_ascii=False,
+                ) + "\n")
+        os.replace(tmp_vectors, self.vectors_path)
+        os.replace(tmp_log, self.log_path)
+
+        # Monta o novo estado fora do índice; search em thread continua no antigo
+        capacity = max(INITIAL_CAPACITY, len(live))
+        new_matrix = np.zeros((capacity, self.dim), dtype=np.float32)
+        new_matrix[:len(live)] = matrix
+        new_alive = np.zeros(capacity, dtype=bool)
+        new_alive[:len(live)] = True
+        keys = [key for key, _ in live]
+        rows = {key: new_row for new_row, key in enumerate(keys)}
+        payloads = {key: self.payloads.get(key, {}) for key in keys}
+
+        # Matriz e linha → chave trocam juntas: nenhum snapshot mistura as duas
+        with self._lock:
+            self._matrix, self._alive = new_matrix, new_alive
+            self._keys, self._count = keys, len(keys)
+            self._rows, self.payloads = rows, payloads
+
+        logger.info(f"🧹 Índice vetorial compactado: {len(live)} itens")
+
+    def _maybe_compact(self) -> None:
+        if self._count and (self._count - len(self._rows)) / self._count > COMPACT_RATIO:
+            self.compact()
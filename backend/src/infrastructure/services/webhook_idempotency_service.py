@@ -0,0 +1,309 @@
+"""
+WEBHOOK IDEMPOTENCY SERVICE - Deduplicação e Ordem por Conversa
+===============================================================
+
+Garante, entre workers e réplicas, que cada mensagem recebida por
+webhook seja processada uma única vez e que as mensagens de uma mesma
+conversa sejam processadas na ordem de chegada.
+
+- claim_message / release_message: SET NX EX por messageId (ou hash de
+  telefone + conteúdo quando o provedor não envia messageId)
+- conversation_lock: fila FIFO por conversa (ZSET de tickets) com lease
+  renovado; quem morre segurando a vez perde o lugar quando o lease expira
+
+Sem Redis (ou com Redis fora), cai para estruturas em memória do processo
+(instância única). Locks locais sem uso são removidos, então o dicionário
+não cresce com cada telefone já visto.
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Dict, Optional, Tuple
+
+from src.config import get_settings
+from src.infrastructure.services.redis_service import get_redis
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_PREFIX = "idem:"
+CONVERSATION_PREFIX = "convq:"
+ALIVE_PREFIX = "convq:alive:"
+
+# Intervalo de polling enquanto aguarda a vez (backoff exponencial)
+POLL_MIN_SECONDS = 0.02
+POLL_MAX_SECONDS = 0.5
+
+
+class ConversationLockTimeout(Exception):
+    """A vez na fila da conversa não chegou dentro do tempo de espera."""
+
+
+# =============================================================================
+# IDEMPOTÊNCIA
+# =============================================================================
+
+# Fallback local: chave -> instante (monotonic) em que expira
+_local_claims: Dict[str, float] = {}
+_local_claims_swept_at = 0.0
+LOCAL_SWEEP_INTERVAL_SECONDS = 60
+
+
+def webhook_idempotency_key(
+    provider: str,
+    message_id: Optional[str],
+    phone: str,
+    content: str,
+) -> Tuple[str, int]:
+    """
+    Chave e TTL de deduplicação de uma mensagem recebida.
+
+    Com messageId a chave é estável entre retries do provedor. Sem ele,
+    usa hash de telefone + início do conteúdo numa janela curta.
+    """
+    if message_id:
+        return f"{provider}:msg:{message_id}", settings.webhook_idempotency_ttl_seconds
+
+    digest = hashlib.sha256(f"{phone}:{content[:100]}".encode()).hexdigest()
+    return f"{provider}:hash:{digest}", settings.webhook_fallback_dedup_ttl_seconds
+
+
+def _sweep_local_claims(now: float):
+    global _local_claims_swept_at
+    if now - _local_claims_swept_at < LOCAL_SWEEP_INTERVAL_SECONDS:
+        return
+    _local_claims_swept_at = now
+
+    expired = [key for key, expires_at in _local_claims.items() if expires_at <= now]
+    for key in expired:
+        del _local_claims[key]
+
+
+def _claim_local(key: str, ttl_seconds: int) -> bool:
+    now = time.monotonic()
+    _sweep_local_claims(now)
+
+    expires_at = _local_claims.get(key)
+    if expires_at is not None and expires_at > now:
+        return False
+
+    _local_claims[key] = now + ttl_seconds
+    return True
+
+
+async def claim_message(key: str, ttl_seconds: int) -> bool:
+    """
+    Reserva a mensagem para processamento.
+
+    Returns:
+        True se esta chamada é a primeira (deve processar),
+        False se a mensagem já foi reservada (duplicada).
+    """
+    redis = await get_redis()
+    if redis is not None:
+        try:
+            return bool(await redis.set(f"{IDEMPOTENCY_PREFIX}{key}", "1", nx=True, ex=ttl_seconds))
+        except Exception as e:
+            logger.warning(f"⚠️ Erro na deduplicação via Redis, usando cache local: {e}")
+
+    return _claim_local(key, ttl_seconds)
+
+
+async def release_message(key: str):
+    """Desfaz a reserva (processamento falhou; o retry do provedor poderá processar)."""
+    _local_claims.pop(key, None)
+
+    redis = await get_redis()
+    if redis is None:
+        return
+    try:
+        await redis.delete(f"{IDEMPOTENCY_PREFIX}{key}")
+    except Exception as e:
+        logger.warning(f"⚠️ Erro ao liberar chave de idempotência {key}: {e}")
+
+
+# =============================================================================
+# ORDEM POR CONVERSA (FILA FIFO DISTRIBUÍDA)
+# =============================================================================
+
+# Entra na fila: ticket crescente no ZSET + chave de vida (lease) do token
+_JOIN_SCRIPT = """
+local ticket = redis.call('incr', KEYS[2])
+redis.call('zadd', KEYS[1], ticket, ARGV[1])
+redis.call('set', ARGV[3] .. ARGV[1], '1', 'PX', ARGV[2])
+redis.call('pexpire', KEYS[1], ARGV[4])
+redis.call('pexpire', KEYS[2], ARGV[4])
+return ticket
+"""
+
+# 1 = é a vez do token, 0 = aguardar, -1 = token saiu da fila (lease expirou).
+# Remove da cabeça da fila tokens cujo lease expirou (worker morto).
+_TURN_SCRIPT = """
+if redis.call('exists', ARGV[3] .. ARGV[1]) == 0 or not redis.call('zscore', KEYS[1], ARGV[1]) then
+    return -1
+end
+redis.call('pexpire', ARGV[3] .. ARGV[1], ARGV[2])
+while true do
+    local head = redis.call('zrange', KEYS[1], 0, 0)[1]
+    if head == ARGV[1] then
+        return 1
+    end
+    if redis.call('exists', ARGV[3] .. head) == 1 then
+        return 0
+    end
+    redis.call('zrem', KEYS[1], head)
+end
+"""
+
+
+class _LocalConversationLock:
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+
+# conversa -> lock local (removido quando ninguém mais usa)
+_local_locks: Dict[str, _LocalConversationLock] = {}
+
+
+@asynccontextmanager
+async def _local_conversation_lock(key: str, wait_seconds: float):
+    entry = _local_locks.get(key)
+    if entry is None:
+        entry = _local_locks[key] = _LocalConversationLock()
+    entry.users += 1
+
+    try:
+        try:
+            await asyncio.wait_for(entry.lock.acquire(), timeout=wait_seconds)
+        except asyncio.TimeoutError:
+            raise ConversationLockTimeout(key)
+
+        try:
+            yield
+        finally:
+            entry.lock.release()
+    finally:
+        entry.users -= 1
+        if entry.users == 0 and _local_locks.get(key) is entry:
+            del _local_locks[key]
+
+
+def _queue_keys(key: str) -> Tuple[str, str]:
+    queue_key = f"{CONVERSATION_PREFIX}{key}"
+    return queue_key, f"{queue_key}:seq"
+
+
+async def _join_queue(redis, key: str, token: str, lease_ms: int, idle_ms: int):
+    queue_key, seq_key = _queue_keys(key)
+    await redis.eval(_JOIN_SCRIPT, 2, queue_key, seq_key, token, lease_ms, ALIVE_PREFIX, idle_ms)
+
+
+async def _leave_queue(redis, key: str, token: str):
+    queue_key, _ = _queue_keys(key)
+    try:
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.zrem(queue_key, token)
+            pipe.delete(f"{ALIVE_PREFIX}{token}")
+            await pipe.execute()
+    except Exception as e:
+        # O lease expira sozinho; o próximo da fila assume depois dele
+        logger.warning(f"⚠️ Erro ao sair da fila da conversa {key}: {e}")
+
+
+async def _acquire_turn(redis, key: str, wait_seconds: float, lease_seconds: float) -> str:
+    """Entra na fila da conversa e aguarda a vez. Devolve o token."""
+    queue_key, _ = _queue_keys(key)
+    token = uuid.uuid4().hex
+    lease_ms = int(lease_seconds * 1000)
+    idle_ms = int((wait_seconds + lease_seconds) * 2000)
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait_seconds
+    delay = POLL_MIN_SECONDS
+
+    await _join_queue(redis, key, token, lease_ms, idle_ms)
+
+    try:
+        while True:
+            state = await redis.eval(_TURN_SCRIPT, 1, queue_key, token, lease_ms, ALIVE_PREFIX)
+            if state == 1:
+                return token
+            if state == -1:
+                logger.warning(f"⚠️ Lease perdido na fila da conversa {key}, reentrando")
+                await _join_queue(redis, key, token, lease_ms, idle_ms)
+                continue
+
+            if loop.time() >= deadline:
+                raise ConversationLockTimeout(key)
+
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, POLL_MAX_SECONDS)
+    except BaseException:
+        await _leave_queue(redis, key, token)
+        raise
+
+
+async def _keep_alive(redis, key: str, token: str, lease_seconds: float):
+    """Renova o lease enquanto a conversa está sendo processada."""
+    queue_key, _ = _queue_keys(key)
+    lease_ms = int(lease_seconds * 1000)
+
+    while True:
+        await asyncio.sleep(lease_seconds / 3)
+        try:
+            if not await redis.pexpire(f"{ALIVE_PREFIX}{token}", lease_ms):
+                logger.warning(f"⚠️ Lease da conversa {key} expirou durante o processamento")
+                return
+            await redis.pexpire(queue_key, lease_ms * 4)
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao renovar lease da conversa {key}: {e}")
+
+
+@asynccontextmanager
+async def conversation_lock(
+    key: str,
+    wait_seconds: Optional[float] = None,
+    lease_seconds: Optional[float] = None,
+):
+    """
+    Serializa o processamento de uma conversa entre todos os workers,
+    na ordem em que as mensagens chegaram.
+
+    Uso:
+        async with conversation_lock(f"zapi:{tenant.id}:{phone}"):
+            await process_message(...)
+
+    Raises:
+        ConversationLockTimeout: a vez não chegou em `wait_seconds`
+    """
+    wait_seconds = wait_seconds or settings.conversation_lock_wait_seconds
+    lease_seconds = lease_seconds or settings.conversation_lock_lease_seconds
+
+    redis = await get_redis()
+    token = None
+    if redis is not None:
+        try:
+            token = await _acquire_turn(redis, key, wait_seconds, lease_seconds)
+        except ConversationLockTimeout:
+            raise
+        except Exception as e:
+            logger.warning(f"⚠️ Fila distribuída indisponível para {key}, usando lock local: {e}")
+
+    if token is None:
+        async with _local_conversation_lock(key, wait_seconds):
+            yield
+        return
+
+    heartbeat = asyncio.create_task(_keep_alive(redis, key, token, lease_seconds))
+    try:
+        yield
+    finally:
+        heartbeat.cancel()
+        await _leave_queue(redis, key, token)
@@ -11,6 +11,7 @@ import httpx
 import logging
 from typing import Optional
 from src.config import get_settings
+from src.infrastructure.services.http_client_registry import get_http_client
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -68,24 +69,24 @@ class ZAPIService:
         if delay_message > 0:
             payload["delayMessage"] = min(delay_message, 15)
         
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(
-                    url, 
-                    json=payload, 
-                    headers=self._get_headers(),
-                    timeout=30
-                )
-                response.raise_for_status()
-                result = response.json()
-                logger.info(f"Z-API: Mensagem enviada para {phone[:8]}***")
-                return {"success": True, "data": result}
-            except httpx.HTTPStatusError as e:
-                logger.error(f"Z-API HTTP erro: {e.response.status_code} - {e.response.text}")
-                return {"success": False, "error": f"HTTP {e.response.status_code}"}
-            except Exception as e:
-                logger.error(f"Z-API erro: {e}")
-                return {"success": False, "error": str(e)}
+        client = get_http_client("zapi")
+        try:
+            response = await client.post(
+                url, 
+                json=payload, 
+                headers=self._get_headers(),
+                timeout=30
+            )
+            response.raise_for_status()
+            result = response.json()
+            logger.info(f"Z-API: Mensagem enviada para {phone[:8]}***")
+            return {"success": True, "data": result}
+        except httpx.HTTPStatusError as e:
+            logger.error(f"Z-API HTTP erro: {e.response.status_code} - {e.response.text}")
+            return {"success": False, "error": f"HTTP {e.response.status_code}"}
+        except Exception as e:
+            logger.error(f"Z-API erro: {e}")
+            return {"success": False, "error": str(e)}
     
     async def send_image(
         self, 
@@ -105,19 +106,19 @@ class ZAPIService:
             "caption": caption
         }
         
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(
-                    url, 
-                    json=payload, 
-                    headers=self._get_headers(),
-                    timeout=30
-                )
-                response.raise_for_status()
-                return {"success": True, "data": response.json()}
-            except Exception as e:
-                logger.error(f"Z-API erro imagem: {e}")
-                return {"success": False, "error": str(e)}
+        client = get_http_client("zapi")
+        try:
+            response = await client.post(
+                url, 
+                json=payload, 
+                headers=self._get_headers(),
+                timeout=30
+            )
+            response.raise_for_status()
+            return {"success": True, "data": response.json()}
+        except Exception as e:
+            logger.error(f"Z-API erro imagem: {e}")
+            return {"success": False, "error": str(e)}
     
     async def send_document(
         self, 
@@ -137,19 +138,19 @@ class ZAPIService:
             "fileName": filename
         }
         
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(
-                    url, 
-                    json=payload, 
-                    headers=self._get_headers(),
-                    timeout=30
-                )
-                response.raise_for_status()
-                return {"success": True, "data": response.json()}
-            except Exception as e:
-                logger.error(f"Z-API erro documento: {e}")
-                return {"success": False, "error": str(e)}
+        client = get_http_client("zapi")
+        try:
+            response = await client.post(
+                url, 
+                json=payload, 
+                headers=self._get_headers(),
+                timeout=30
+            )
+            response.raise_for_status()
+            return {"success": True, "data": response.json()}
+        except Exception as e:
+            logger.error(f"Z-API erro documento: {e}")
+            return {"success": False, "error": str(e)}
 
     async def send_location(
         self, 
@@ -173,19 +174,19 @@ class ZAPIService:
             "address": address
         }
         
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(
-                    url, 
-                    json=payload, 
-                    headers=self._get_headers(),
-                    timeout=30
-                )
-                response.raise_for_status()
-                return {"success": True, "data": response.json()}
-            except Exception as e:
-                logger.error(f"Z-API erro localizacao: {e}")
-                return {"success": False, "error": str(e)}
+        client = get_http_client("zapi")
+        try:
+            response = await client.post(
+                url, 
+                json=payload, 
+                headers=self._get_headers(),
+                timeout=30
+            )
+            response.raise_for_status()
+            return {"success": True, "data": response.json()}
+        except Exception as e:
+            logger.error(f"Z-API erro localizacao: {e}")
+            return {"success": False, "error": str(e)}
     
     async def send_audio(self, phone: str, audio_url: str) -> dict:
         """Envia audio via URL."""
@@ -199,19 +200,19 @@ class ZAPIService:
             "audio": audio_url
         }
 
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(
-                    url,
-                    json=payload,
-                    headers=self._get_headers(),
-                    timeout=30
-                )
-                response.raise_for_status()
-                return {"success": True, "data": response.json()}
-            except Exception as e:
-                logger.error(f"Z-API erro audio: {e}")
-                return {"success": False, "error": str(e)}
+        client = get_http_client("zapi")
+        try:
+            response = await client.post(
+                url,
+                json=payload,
+                headers=self._get_headers(),
+                timeout=30
+            )
+            response.raise_for_status()
+            return {"success": True, "data": response.json()}
+        except Exception as e:
+            logger.error(f"Z-API erro audio: {e}")
+            return {"success": False, "error": str(e)}
 
     async def send_audio_base64(
         self,
@@ -243,23 +244,23 @@ class ZAPIService:
             "audio": audio_data
         }
 
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(
-                    url,
-                    json=payload,
-                    headers=self._get_headers(),
-                    timeout=60  # Timeout maior para audio
-                )
-                response.raise_for_status()
-                logger.info(f"Z-API: Audio enviado para {phone[:8]}***")
-                return {"success": True, "data": response.json()}
-            except httpx.HTTPStatusError as e:
-                logger.error(f"Z-API audio base64 HTTP erro: {e.response.status_code} - {e.response.text}")
-                return {"success": False, "error": f"HTTP {e.response.status_code}: {e.response.text}"}
-            except Exception as e:
-                logger.error(f"Z-API erro audio base64: {e}")
-                return {"success": False, "error": str(e)}
+        client = get_http_client("zapi")
+        try:
+            response = await client.post(
+                url,
+                json=payload,
+                headers=self._get_headers(),
+                timeout=60  # Timeout maior para audio
+            )
+            response.raise_for_status()
+            logger.info(f"Z-API: Audio enviado para {phone[:8]}***")
+            return {"success": True, "data": response.json()}
+        except httpx.HTTPStatusError as e:
+            logger.error(f"Z-API audio base64 HTTP erro: {e.response.status_code} - {e.response.text}")
+            return {"success": False, "error": f"HTTP {e.response.status_code}: {e.response.text}"}
+        except Exception as e:
+            logger.error(f"Z-API erro audio base64: {e}")
+            return {"success": False, "error": str(e)}
 
     async def send_ptt(
         self,
@@ -294,23 +295,23 @@ class ZAPIService:
             "messageId": None  # Opcional: para rastrear a mensagem
         }
 
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(
-                    url,
-                    json=payload,
-                    headers=self._get_headers(),
-                    timeout=60
-                )
-                response.raise_for_status()
-                logger.info(f"Z-API: PTT enviado para {phone[:8]}***")
-                return {"success": True, "data": response.json()}
-            except httpx.HTTPStatusError as e:
-                logger.error(f"Z-API PTT HTTP erro: {e.response.status_code}")
-                return {"success": False, "error": f"HTTP {e.response.status_code}"}
-            except Exception as e:
-                logger.error(f"Z-API erro PTT: {e}")
-                return {"success": False, "error": str(e)}
+        client = get_http_client("zapi")
+        try:
+            response = await client.post(
+                url,
+                json=payload,
+                headers=self._get_headers(),
+                timeout=60
+            )
+            response.raise_for_status()
+            logger.info(f"Z-API: PTT enviado para {phone[:8]}***")
+            return {"success": True, "data": response.json()}
+        except httpx.HTTPStatusError as e:
+            logger.error(f"Z-API PTT HTTP erro: {e.response.status_code}")
+            return {"success": False, "error": f"HTTP {e.response.status_code}"}
+        except Exception as e:
+            logger.error(f"Z-API erro PTT: {e}")
+            return {"success": False, "error": str(e)}
     
     async def send_link(
         self, 
@@ -336,19 +337,19 @@ class ZAPIService:
             "image": image_url
         }
         
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(
-                    url, 
-                    json=payload, 
-                    headers=self._get_headers(),
-                    timeout=30
-                )
-                response.raise_for_status()
-                return {"success": True, "data": response.json()}
-            except Exception as e:
-                logger.error(f"Z-API erro link: {e}")
-                return {"success": False, "error": str(e)}
+        client = get_http_client("zapi")
+        try:
+            response = await client.post(
+                url, 
+                json=payload, 
+                headers=self._get_headers(),
+                timeout=30
+            )
+            response.raise_for_status()
+            return {"success": True, "data": response.json()}
+        except Exception as e:
+            logger.error(f"Z-API erro link: {e}")
+            return {"success": False, "error": str(e)}
     
     async def send_button_list(
         self, 
@@ -386,19 +387,19 @@ class ZAPIService:
         if footer:
             payload["footer"] = footer[:60]
         
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(
-                    url, 
-                    json=payload, 
-                    headers=self._get_headers(),
-                    timeout=30
-                )
-                response.raise_for_status()
-                return {"success": True, "data": response.json()}
-            except Exception as e:
-                logger.error(f"Z-API erro botoes: {e}")
-                return {"success": False, "error": str(e)}
+        client = get_http_client("zapi")
+        try:
+            response = await client.post(
+                url, 
+                json=payload, 
+                headers=self._get_headers(),
+                timeout=30
+            )
+            response.raise_for_status()
+            return {"success": True, "data": response.json()}
+        except Exception as e:
+            logger.error(f"Z-API erro botoes: {e}")
+            return {"success": False, "error": str(e)}
     
     async def send_list_menu(
         self,
@@ -432,19 +433,19 @@ class ZAPIService:
             }
         }
         
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(
-                    url, 
-                    json=payload, 
-                    headers=self._get_headers(),
-                    timeout=30
-                )
-                response.raise_for_status()
-                return {"success": True, "data": response.json()}
-            except Exception as e:
-                logger.error(f"Z-API erro lista: {e}")
-                return {"success": False, "error": str(e)}
+        client = get_http_client("zapi")
+        try:
+            response = await client.post(
+                url, 
+                json=payload, 
+                headers=self._get_headers(),
+                timeout=30
+            )
+            response.raise_for_status()
+            return {"success": True, "data": response.json()}
+        except Exception as e:
+            logger.error(f"Z-API erro lista: {e}")
+            return {"success": False, "error": str(e)}
     
     async def check_connection(self) -> dict:
         """Verifica se instancia esta conectada."""
@@ -453,19 +454,19 @@ class ZAPIService:
 
         url = f"{self.base_url}/status"
 
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(
-                    url,
-                    headers=self._get_headers(),
-                    timeout=10
-                )
-                data = response.json()
-                connected = data.get("connected", False)
-                return {"connected": connected, "data": data}
-            except Exception as e:
-                logger.error(f"Z-API status erro: {e}")
-                return {"connected": False, "error": str(e)}
+        client = get_http_client("zapi")
+        try:
+            response = await client.get(
+                url,
+                headers=self._get_headers(),
+                timeout=10
+            )
+            data = response.json()
+            connected = data.get("connected", False)
+            return {"connected": connected, "data": data}
+        except Exception as e:
+            logger.error(f"Z-API status erro: {e}")
+            return {"connected": False, "error": str(e)}
 
     async def get_profile_picture(self, phone: str) -> dict:
         """
@@ -486,32 +487,32 @@ class ZAPIService:
             "phone": self._format_phone(phone)
         }
 
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(
-                    url,
-                    json=payload,
-                    headers=self._get_headers(),
-                    timeout=10
-                )
-                response.raise_for_status()
-                data = response.json()
-
-                # Z-API retorna: {"profilePictureURL": "https://..."}
-                profile_url = data.get("profilePictureURL") or data.get("url")
-
-                if profile_url:
-                    logger.info(f"Z-API: Foto de perfil obtida para {phone[:8]}***")
-                    return {"success": True, "url": profile_url, "data": data}
-                else:
-                    return {"success": False, "error": "Usuário sem foto de perfil"}
-
-            except httpx.HTTPStatusError as e:
-                logger.warning(f"Z-API profile pic erro HTTP: {e.response.status_code}")
-                return {"success": False, "error": f"HTTP {e.response.status_code}"}
-            except Exception as e:
-                logger.error(f"Z-API profile pic erro: {e}")
-                return {"success": False, "error": str(e)}
+        client = get_http_client("zapi")
+        try:
+            response = await client.post(
+                url,
+                json=payload,
+                headers=self._get_headers(),
+                timeout=10
+            )
+            response.raise_for_status()
+            data = response.json()
+
+            # Z-API retorna: {"profilePictureURL": "https://..."}
+            profile_url = data.get("profilePictureURL") or data.get("url")
+
+            if profile_url:
+                logger.info(f"Z-API: Foto de perfil obtida para {phone[:8]}***")
+                return {"success": True, "url": profile_url, "data": data}
+            else:
+                return {"success": False, "error": "Usuário sem foto de perfil"}
+
+        except httpx.HTTPStatusError as e:
+            logger.warning(f"Z-API profile pic erro HTTP: {e.response.status_code}")
+            return {"success": False, "error": f"HTTP {e.response.status_code}"}
+        except Exception as e:
+            logger.error(f"Z-API profile pic erro: {e}")
+            return {"success": False, "error": str(e)}
 
     async def get_qrcode(self) -> dict:
         """Obtem QR Code para conexao."""
@@ -520,18 +521,18 @@ class ZAPIService:
         
         url = f"{self.base_url}/qr-code/image"
         
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(
-                    url, 
-                    headers=self._get_headers(),
-                    timeout=30
-                )
-                data = response.json()
-                return {"success": True, "data": data}
-            except Exception as e:
-                logger.error(f"Z-API QR Code erro: {e}")
-                return {"success": False, "error": str(e)}
+        client = get_http_client("zapi")
+        try:
+            response = await client.get(
+                url, 
+                headers=self._get_headers(),
+                timeout=30
+            )
+            data = response.json()
+            return {"success": True, "data": data}
+        except Exception as e:
+            logger.error(f"Z-API QR Code erro: {e}")
+            return {"success": False, "error": str(e)}
     
     async def disconnect(self) -> dict:
         """Desconecta a instancia."""
@@ -540,17 +541,17 @@ class ZAPIService:
         
         url = f"{self.base_url}/disconnect"
         
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(
-                    url, 
-                    headers=self._get_headers(),
-                    timeout=10
-                )
-                return {"success": True, "data": response.json()}
-            except Exception as e:
-                logger.error(f"Z-API disconnect erro: {e}")
-                return {"success": False, "error": str(e)}
+        client = get_http_client("zapi")
+        try:
+            response = await client.get(
+                url, 
+                headers=self._get_headers(),
+                timeout=10
+            )
+            return {"success": True, "data": response.json()}
+        except Exception as e:
+            logger.error(f"Z-API disconnect erro: {e}")
+            return {"success": False, "error": str(e)}
     
     async def restart(self) -> dict:
         """Reinicia a instancia."""
@@ -559,17 +560,17 @@ class ZAPIService:
         
         url = f"{self.base_url}/restart"
         
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(
-                    url, 
-                    headers=self._get_headers(),
-                    timeout=30
-                )
-                return {"success": True, "data": response.json()}
-            except Exception as e:
-                logger.error(f"Z-API restart erro: {e}")
-                return {"success": False, "error": str(e)}
+        client = get_http_client("zapi")
+        try:
+            response = await client.get(
+                url, 
+                headers=self._get_headers(),
+                timeout=30
+            )
+            return {"success": True, "data": response.json()}
+        except Exception as e:
+            logger.error(f"Z-API restart erro: {e}")
+            return {"success": False, "error": str(e)}
     
     def _format_phone(self, phone: str) -> str:
         """Remove caracteres nao numericos do telefone."""
@@ -0,0 +1,85 @@
+"""
+TESTES - HISTÓRICO COM ORÇAMENTO DE TOKENS E RESUMO INCREMENTAL
+===============================================================
+
+Executar com: pytest tests/test_conversation_history.py -v
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+
+def test_history_keeps_newest_messages_within_budget():
+    from src.config import get_settings
+    from src.infrastructure.services.conversation_summary_service import fit_history, history_token_budget
+
+    messages = [{"role": "user", "content": f"mensagem {i} " + "x" * 396} for i in range(10)]  # ~104 tokens cada
+
+    kept = fit_history(messages, token_budget=350)
+    assert [m["content"][:11] for m in kept] == ["mensagem 7 ", "mensagem 8 ", "mensagem 9 "]
+    assert fit_history(messages, token_budget=350, reserved_tokens=100) == messages[-2:]
+    assert fit_history(messages[-1:], token_budget=10) == messages[-1:]  # A última sempre entra
+
+    assert history_token_budget({"ai_behavior": {"history_token_budget": 1200}}) == 1200
+    assert history_token_budget({"ai_behavior": {"history_token_budget": 0}}) == get_settings().history_token_budget
+    assert history_token_budget(None) == get_settings().history_token_budget
+
+
+class FakeResult:
+    def __init__(self, value):
+        self.value = value
+        self.rowcount = 1
+
+    def one_or_none(self):
+        return self.value
+
+    def scalar_one_or_none(self):
+        return self.value
+
+    def all(self):
+        return self.value
+
+
+class FakeSession:
+    def __init__(self, results):
+        self.results = list(results)
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        return FakeResult(self.results.pop(0))
+
+
+@pytest.mark.asyncio
+async def test_summary_update_folds_only_new_messages(monkeypatch):
+    from src.infrastructure.llm import LLMFactory
+    from src.infrastructure.services import conversation_summary_service as service
+
+    prompts = []
+
+    class FakeProvider:
+        async def chat_completion(self, messages, **kwargs):
+            prompts.append(messages[0]["content"])
+            return {"content": "- Cliente quer casa com pátio"}
+
+    monkeypatch.setattr(LLMFactory, "get_provider", classmethod(lambda cls: FakeProvider()))
+    monkeypatch.setattr(service.settings, "history_summary_max_input_tokens", 250)
+
+    rows = [SimpleNamespace(id=40 + i, role="user", content=f"msg {i} " + "y" * 390) for i in range(3)]
+    db = FakeSession([
+        SimpleNamespace(conversation_summary="- Cliente busca 3 quartos", summary_message_id=39),
+        42,  # Última mensagem antes da janela literal
+        rows,
+        None,  # UPDATE
+    ])
+
+    assert await service.update_lead_summary(db, lead_id=5, keep_recent=4)
+
+    # Resumo anterior + só as mensagens novas que cabem no orçamento da atualização
+    assert "Cliente busca 3 quartos" in prompts[0]
+    assert "msg 0" in prompts[0] and "msg 1" in prompts[0] and "msg 2" not in prompts[0]
+
+    update = db.statements[-1].compile().params
+    assert update["summary_message_id"] == 41
+    assert update["conversation_summary"] == "- Cliente quer casa com pátio"
@@ -0,0 +1,103 @@
+"""
+TESTES - CACHE DE EMBEDDINGS
+=============================
+
+Executar com: pytest tests/test_embedding_cache.py -v
+"""
+
+import asyncio
+
+import pytest
+
+
+@pytest.mark.asyncio
+async def test_normalized_text_hits_cache():
+    """Mesmo texto com caixa/espaços diferentes não chama a API de novo."""
+    from src.infrastructure.llm.embedding_cache import EmbeddingCache
+
+    cache = EmbeddingCache(max_entries=10, use_redis=False)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return [0.1, 0.2, 0.3]
+
+    first = await cache.get_or_compute("Oi, tudo bem?", "m", compute)
+    second = await cache.get_or_compute("  oi,   TUDO bem? ", "m", compute)
+
+    assert first == second
+    assert len(calls) == 1
+    assert cache.get_stats()["hit_rate"] == 0.5
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_one_api_call():
+    """RAG e busca de imóveis pedindo o mesmo embedding ao mesmo tempo = 1 chamada."""
+    from src.infrastructure.llm.embedding_cache import EmbeddingCache
+
+    cache = EmbeddingCache(max_entries=10, use_redis=False)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return [1.0]
+
+    results = await asyncio.gather(*[
+        cache.get_or_compute("apartamento 2 quartos", "m", compute) for _ in range(5)
+    ])
+
+    assert results == [[1.0]] * 5
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction_and_model_isolation():
+    """LRU respeita o limite e modelos diferentes não compartilham entradas."""
+    from src.infrastructure.llm.embedding_cache import EmbeddingCache
+
+    cache = EmbeddingCache(max_entries=2, use_redis=False)
+
+    async def compute():
+        return [0.0]
+
+    await cache.get_or_compute("a", "m1", compute)
+    await cache.get_or_compute("a", "m2", compute)
+    await cache.get_or_compute("b", "m1", compute)
+
+    stats = cache.get_stats()
+    assert stats["entries"] == 2
+    assert stats["misses"] == 3
+
+
+@pytest.mark.asyncio
+async def test_embedding_batches_bound_concurrency_and_isolate_failures(monkeypatch):
+    """Indexação em massa: N textos por chamada, concorrência limitada, lote com erro vira None."""
+    from src.infrastructure.llm import embedding_batch
+
+    active, peak, calls = 0, 0, []
+
+    class FakeProvider:
+        async def generate_embeddings_batch(self, texts, model="m"):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            calls.append(list(texts))
+            await asyncio.sleep(0.01)
+            active -= 1
+            if "falha" in texts:
+                raise RuntimeError("API fora")
+            return [[1.0] * embedding_batch.EMBEDDING_DIMENSIONS for _ in texts]
+
+    monkeypatch.setattr(embedding_batch.LLMFactory, "get_provider", lambda: FakeProvider())
+
+    texts = [f"imovel {i}" for i in range(10)] + ["falha"]
+    results = {}
+    async for offset, vectors in embedding_batch.iter_embedding_batches(texts, batch_size=3, concurrency=2):
+        for position, vector in enumerate(vectors, start=offset):
+            results[position] = vector
+
+    assert len(calls) == 4
+    assert peak <= 2
+    assert all(results[i] is not None for i in range(9))
+    assert results[9] is None and results[10] is None
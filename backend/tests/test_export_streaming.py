@@ -0,0 +1,139 @@
+"""
+TESTES - EXPORTAÇÃO EM STREAMING (CSV / EXCEL)
+==============================================
+
+Executar com: pytest tests/test_export_streaming.py -v
+"""
+
+import io
+import os
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+
+def _lead(i, qualification="Quente"):
+    return {
+        'id': i,
+        'created_at': datetime(2026, 2, 10, 9, 30),
+        'name': f"Lead {i}",
+        'phone': f"5199990000{i}",
+        'email': '',
+        'city': 'Porto Alegre',
+        'status': 'Novo',
+        'qualification': qualification,
+        'source': 'organic',
+        'interest': '',
+        'budget': '',
+        'urgency': '',
+        'summary': "linha 1\nlinha 2; com separador",
+        'message_count': i * 2,
+        'last_activity': None,
+    }
+
+
+def _fake_batches(monkeypatch, batches):
+    from src.infrastructure.services import export_service
+
+    async def fake_iter(db, tenant_id, start_date=None, end_date=None, batch_size=None):
+        for batch in batches:
+            yield batch
+
+    monkeypatch.setattr(export_service, "iter_leads_for_export", fake_iter)
+    return export_service
+
+
+def test_lead_export_row_maps_columns():
+    from src.infrastructure.services.export_service import lead_export_row
+
+    row = SimpleNamespace(
+        id=1, created_at=None, name=None, phone="51999", email=None, city=None,
+        status="qualified", qualification="hot", source=None,
+        custom_data={"interest_type": "compra", "budget": "500k"},
+        summary=None, last_activity_at=None, updated_at="u", message_count=7,
+    )
+    data = lead_export_row(row)
+
+    assert data['status'] == 'Qualificado'
+    assert data['qualification'] == 'Quente'
+    assert data['interest'] == 'compra' and data['budget'] == '500k'
+    assert data['message_count'] == 7 and data['last_activity'] == 'u'
+
+
+@pytest.mark.asyncio
+async def test_csv_is_written_batch_by_batch(monkeypatch):
+    import csv
+
+    export_service = _fake_batches(monkeypatch, [[_lead(1), _lead(2)], [_lead(3)]])
+
+    chunks = [chunk async for chunk in export_service.iter_csv_chunks(None, 1)]
+    assert len(chunks) == 3  # cabeçalho + um pedaço por lote
+    assert chunks[0].startswith(b"\xef\xbb\xbf")
+
+    buffer = io.BytesIO()
+    assert await export_service.write_csv(None, 1, buffer) == 3
+
+    rows = list(csv.reader(io.StringIO(buffer.getvalue().decode("utf-8-sig")), delimiter=';'))
+    assert rows[0][0] == "Data" and len(rows) == 4
+    assert rows[3][1] == "Lead 3" and rows[3][-1] == "linha 1\nlinha 2; com separador"
+
+
+@pytest.mark.asyncio
+async def test_excel_write_only_workbook(monkeypatch):
+    from openpyxl import load_workbook
+
+    export_service = _fake_batches(monkeypatch, [[_lead(1), _lead(2, "Morno")], [_lead(3, "Frio")]])
+    tenant = SimpleNamespace(id=1, name="Imobiliária", slug="imob")
+
+    buffer = io.BytesIO()
+    total = await export_service.write_excel(None, tenant, buffer, include_metrics=False)
+    assert total == 3
+
+    ws = load_workbook(io.BytesIO(buffer.getvalue()))["Leads"]
+    assert ws.max_row == 4
+    assert ws.auto_filter.ref == "A1:M4"
+    assert ws["B4"].value == "Lead 3"
+    assert ws["G2"].fill.fgColor.rgb.endswith("FFCDD2")
+
+
+@pytest.mark.asyncio
+async def test_export_job_honors_include_leads_and_regenerates_when_file_is_missing(monkeypatch, tmp_path):
+    from openpyxl import load_workbook
+
+    export_service = _fake_batches(monkeypatch, [[_lead(1), _lead(2)]])
+    tenant = SimpleNamespace(id=1, name="Imobiliária", slug="imob")
+
+    class FakeSession:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        async def get(self, model, pk):
+            return tenant
+
+    async def fake_metrics(db, tenant_id, start_date=None, end_date=None):
+        return {}
+
+    monkeypatch.setattr(export_service, "async_session", FakeSession)
+    monkeypatch.setattr(export_service, "get_metrics_for_export", fake_metrics)
+    monkeypatch.setattr(export_service, "_write_summary_sheet", lambda wb, *args: wb.create_sheet("Resumo"))
+    monkeypatch.setattr(export_service, "_local_jobs", {})
+    monkeypatch.setattr(export_service.settings, "export_jobs_path", str(tmp_path))
+
+    with pytest.raises(ValueError):
+        await export_service.create_export_job(tenant, 1, "csv", include_leads=False)
+
+    job = await export_service.create_export_job(tenant, 1, "excel", include_leads=False)
+    await export_service.run_export_job(job["job_id"])
+    job = await export_service.get_export_job(job["job_id"])
+
+    assert job["status"] == "done" and job["rows"] == 0
+    assert load_workbook(job["path"]).sheetnames == ["Resumo"]
+
+    # Download em outra réplica: o arquivo não existe aqui, a exportação é refeita
+    os.remove(job["path"])
+    content = b"".join([chunk async for chunk in export_service.stream_export_job(job, tenant)])
+    assert load_workbook(io.BytesIO(content)).sheetnames == ["Resumo"]
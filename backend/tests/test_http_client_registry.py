@@ -0,0 +1,28 @@
+"""
+TESTES - CLIENTES HTTP COMPARTILHADOS
+======================================
+
+Executar com: pytest tests/test_http_client_registry.py -v
+"""
+
+import pytest
+
+
+@pytest.mark.asyncio
+async def test_clients_are_reused_per_upstream_and_closed_on_shutdown():
+    """Mesmo upstream = mesmo pool; shutdown fecha tudo e o próximo uso recria."""
+    from src.infrastructure.services.http_client_registry import (
+        close_http_clients,
+        get_http_client,
+    )
+
+    zapi = get_http_client("zapi")
+    assert get_http_client("zapi") is zapi
+    assert get_http_client("media") is not zapi
+
+    await close_http_clients()
+
+    assert zapi.is_closed
+    recreated = get_http_client("zapi")
+    assert recreated is not zapi and not recreated.is_closed
+    await close_http_clients()
@@ -0,0 +1,186 @@
+"""
+TESTES - FILA DE ENTRADA (WORKERS, RETRY, DEAD-LETTER)
+======================================================
+
+Executar com: pytest tests/test_inbound_queue.py -v
+"""
+
+import asyncio
+
+import pytest
+
+
+async def _wait_until(condition, timeout=2.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        if loop.time() > deadline:
+            raise AssertionError("condição não atingida")
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_same_conversation_runs_in_order():
+    from src.infrastructure.queue import InboundWorkerPool, MemoryQueue
+
+    pool = InboundWorkerPool(workers=4)
+    seen = []
+
+    async def handler(job):
+        # Primeiro job da conversa é o mais lento: não pode ser ultrapassado
+        await asyncio.sleep(0.05 if job.payload["n"] == 0 else 0)
+        seen.append((job.conversation_key, job.payload["n"]))
+
+    pool.register_handler("test", handler)
+    await pool.start(MemoryQueue())
+    try:
+        for n in range(3):
+            await pool.enqueue("test", {"n": n}, conversation_key="zapi:1:5551")
+        await pool.enqueue("test", {"n": 9}, conversation_key="zapi:1:5552")
+
+        await _wait_until(lambda: pool.stats["processed"] == 4)
+    finally:
+        await pool.stop()
+
+    assert [n for key, n in seen if key == "zapi:1:5551"] == [0, 1, 2]
+    assert seen[0] == ("zapi:1:5552", 9)
+
+
+@pytest.mark.asyncio
+async def test_failures_retry_then_dead_letter():
+    from src.infrastructure.queue import InboundWorkerPool, MemoryQueue
+
+    pool = InboundWorkerPool(workers=2, max_attempts=3, retry_base_seconds=0.01)
+    backend = MemoryQueue()
+    calls = {"flaky": 0, "broken": 0}
+
+    async def flaky(job):
+        calls["flaky"] += 1
+        if calls["flaky"] < 2:
+            raise RuntimeError("instável")
+
+    async def broken(job):
+        calls["broken"] += 1
+        raise RuntimeError("sempre falha")
+
+    pool.register_handler("flaky", flaky)
+    pool.register_handler("broken", broken)
+    await pool.start(backend)
+    try:
+        await pool.enqueue("flaky", {})
+        await pool.enqueue("broken", {})
+        await _wait_until(lambda: pool.stats["processed"] == 1 and pool.stats["dead_lettered"] == 1)
+    finally:
+        await pool.stop()
+
+    assert calls == {"flaky": 2, "broken": 3}
+    assert backend.dead[0].kind == "broken"
+    assert backend.dead[0].attempts == 3
+    assert "sempre falha" in backend.dead[0].last_error
+
+
+@pytest.mark.asyncio
+async def test_in_flight_jobs_are_kept_alive_and_not_reclaimed():
+    from src.infrastructure.queue import InboundWorkerPool, MemoryQueue
+
+    class PendingQueue(MemoryQueue):
+        """Simula o PEL do Redis: toda entrega lida fica pendente até o ack."""
+
+        def __init__(self):
+            super().__init__()
+            self.pending = {}
+            self.touched = []
+
+        async def read(self, consumer, count, block_ms):
+            messages = await super().read(consumer, count, block_ms)
+            for message in messages:
+                message.delivery_id = message.job_id
+                self.pending[message.delivery_id] = message
+            return messages
+
+        async def claim_stale(self, consumer, min_idle_ms, count):
+            return list(self.pending.values())
+
+        async def touch(self, consumer, delivery_ids):
+            self.touched.extend(delivery_ids)
+
+        async def ack(self, message):
+            self.pending.pop(message.delivery_id, None)
+
+    # Visibility curto: manutenção roda a cada ~10 ms durante o job lento
+    pool = InboundWorkerPool(workers=2, visibility_timeout_seconds=0.03)
+    backend = PendingQueue()
+    calls = []
+    release = asyncio.Event()
+
+    async def slow(job):
+        calls.append(job.payload["n"])
+        if job.payload["n"] == 0:
+            await release.wait()
+
+    pool.register_handler("slow", slow)
+    await pool.start(backend)
+    try:
+        # O segundo job aguarda o primeiro (mesma conversa) e também fica pendente
+        await pool.enqueue("slow", {"n": 0}, conversation_key="zapi:1:5551")
+        await pool.enqueue("slow", {"n": 1}, conversation_key="zapi:1:5551")
+        await _wait_until(lambda: len(set(backend.touched)) == 2)
+        await asyncio.sleep(0.05)
+        release.set()
+        await _wait_until(lambda: pool.stats["processed"] == 2)
+    finally:
+        await pool.stop()
+
+    assert calls == [0, 1]
+    assert pool.stats["reclaimed"] == 0
+    assert not pool._in_flight
+
+
+def test_raw_content_signature_without_processing_media():
+    from src.application.use_cases.zapi_inbound import raw_content_signature
+
+    assert raw_content_signature({"text": {"message": "oi"}}) == "oi"
+    assert raw_content_signature({"audio": {"audioUrl": "https://x/a.ogg"}}) == "https://x/a.ogg"
+    assert raw_content_signature({"sticker": {}}) is None
+    assert raw_content_signature({"sticker": {"url": "s"}}) == "[sticker]"
+    assert raw_content_signature({"phone": "5551"}) is None
+
+
+@pytest.mark.asyncio
+async def test_reply_job_does_not_fail_when_only_the_location_fails(monkeypatch):
+    from types import SimpleNamespace
+
+    from src.application.use_cases import zapi_inbound
+    from src.infrastructure.queue import QueueMessage
+
+    sent = []
+
+    class FakeZAPI:
+        async def send_text(self, phone, message, delay_message=0):
+            sent.append(message)
+            return {"success": True}
+
+        async def send_location(self, **kwargs):
+            raise RuntimeError("timeout")
+
+    class FakeSession:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        async def get(self, model, pk):
+            return SimpleNamespace(settings={}, config={})
+
+    monkeypatch.setattr(zapi_inbound, "async_session", FakeSession)
+    monkeypatch.setattr(zapi_inbound, "get_zapi_client", lambda **kw: FakeZAPI())
+
+    job = QueueMessage(kind=zapi_inbound.ZAPI_REPLY_JOB, payload={
+        "tenant_id": 1, "channel_id": 2, "phone": "5551", "reply": "Segue o endereço",
+        "location": {"latitude": -29.9, "longitude": -51.1, "title": "Apto", "address": "Rua A"},
+    })
+
+    # Não levanta: um retry reenviaria o texto já entregue
+    await zapi_inbound.handle_zapi_reply(job)
+    assert sent == ["Segue o endereço"]
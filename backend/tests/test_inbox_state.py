@@ -0,0 +1,118 @@
+"""
+TESTES - ESTADO DO INBOX DO CORRETOR
+====================================
+
+Executar com: pytest tests/test_inbox_state.py -v
+"""
+
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+
+def test_build_inbox_deltas_counts_unread_and_keeps_latest_message():
+    from src.infrastructure.services.inbox_state_service import build_inbox_deltas
+
+    now = datetime(2026, 2, 8, 12, 0, tzinfo=timezone.utc)
+    earlier = datetime(2026, 2, 8, 11, 0, tzinfo=timezone.utc)
+
+    messages = [
+        SimpleNamespace(lead_id=1, role="user", content="Oi, tudo bem?"),
+        SimpleNamespace(lead_id=1, role="assistant", content="x" * 80),
+        SimpleNamespace(lead_id=2, role="user", content="atrasada", created_at=earlier),
+        SimpleNamespace(lead_id=None, role="user", content="sem lead"),
+    ]
+
+    deltas = build_inbox_deltas(messages, took_over_lead_ids=[3], now=now)
+
+    assert set(deltas) == {1, 2, 3}
+    assert deltas[1].new_unread == 1
+    assert deltas[1].last_role == "assistant"
+    assert deltas[1].last_preview == "x" * 50 + "..."
+    assert deltas[1].last_message_at == now
+    assert deltas[2].last_message_at == earlier
+    assert deltas[3].recount_unread and deltas[3].last_message_at is None
+
+
+def test_message_counters_follow_inserts_and_deletes():
+    from src.infrastructure.services.inbox_state_service import (
+        COUNTED_LEADS_KEY,
+        build_inbox_deltas,
+        leads_counted_in_flush,
+    )
+
+    deltas = build_inbox_deltas(
+        [
+            SimpleNamespace(lead_id=1, role="user", content="Oi"),
+            SimpleNamespace(lead_id=1, role="assistant", content="Olá!"),
+        ],
+        deleted_messages=[SimpleNamespace(lead_id=2, role="user", content="apagada")],
+    )
+    assert (deltas[1].new_messages, deltas[1].new_user_messages) == (2, 1)
+    assert (deltas[2].new_messages, deltas[2].new_user_messages, deltas[2].new_unread) == (-1, -1, 0)
+
+    flush_context = object()
+    session = SimpleNamespace(info={COUNTED_LEADS_KEY: (flush_context, {1})})
+    assert leads_counted_in_flush(session, flush_context) == {1}
+    assert leads_counted_in_flush(session, object()) == set()  # Outro flush
+
+
+def test_inbox_cursor_roundtrip():
+    from src.api.routes.seller_inbox import decode_inbox_cursor, encode_inbox_cursor
+
+    stamp = datetime(2026, 2, 8, 12, 30, tzinfo=timezone.utc)
+    assert decode_inbox_cursor(encode_inbox_cursor(stamp, 42)) == (stamp, 42)
+    assert decode_inbox_cursor(encode_inbox_cursor(None, 7)) == (None, 7)
+
+    try:
+        decode_inbox_cursor("nao-e-cursor")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("cursor inválido deveria falhar")
+
+
+class _CapturingSession:
+    """Sessão fake que guarda o SELECT executado e devolve lista vazia."""
+
+    def __init__(self):
+        self.statements = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, stmt):
+        self.statements.append(stmt)
+        return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: []))
+
+
+@pytest.mark.asyncio
+async def test_inbox_list_is_unbounded_without_limit_or_cursor(monkeypatch):
+    from fastapi import Response
+    from src.api.routes import seller_inbox
+
+    session = _CapturingSession()
+
+    async def fake_seller(user):
+        return SimpleNamespace(id=3)
+
+    monkeypatch.setattr(seller_inbox, "get_seller_from_user", fake_seller)
+    monkeypatch.setattr(seller_inbox, "async_session", lambda: session)
+    user = SimpleNamespace(tenant_id=1)
+
+    # Frontend atual não envia limit nem cursor: recebe a lista inteira
+    await seller_inbox.list_inbox_leads(
+        Response(), current_user=user, status_filter=None, attended_filter=None, limit=None, cursor=None,
+    )
+    assert session.statements[-1]._limit_clause is None
+
+    # Com cursor, a página padrão é aplicada (+1 para detectar a próxima)
+    cursor = seller_inbox.encode_inbox_cursor(None, 7)
+    await seller_inbox.list_inbox_leads(
+        Response(), current_user=user, status_filter=None, attended_filter=None, limit=None, cursor=cursor,
+    )
+    assert session.statements[-1]._limit == seller_inbox.INBOX_PAGE_SIZE + 1
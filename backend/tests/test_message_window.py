@@ -0,0 +1,97 @@
+"""
+TESTES - JANELA DE MENSAGENS RECENTES (CACHE POR LEAD)
+======================================================
+
+Executar com: pytest tests/test_message_window.py -v
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+
+def _messages(*ids):
+    return [{"id": i, "role": "user", "content": f"msg {i}"} for i in ids]
+
+
+def test_window_answers_only_when_it_covers_the_request():
+    from src.infrastructure.services.message_window_service import MessageWindow
+
+    window = MessageWindow(count=100, messages=_messages(*range(51, 101)))
+
+    assert [m["id"] for m in window.after(0, 3)] == [98, 99, 100]
+    assert [m["id"] for m in window.after(97, 10)] == [98, 99, 100]  # Checkpoint dentro da janela
+    assert window.after(0, 60) is None  # Faltam mensagens anteriores à janela: vai ao banco
+
+    short = MessageWindow(count=2, messages=_messages(1, 2))
+    assert short.after(0, 60) == _messages(1, 2)  # A janela tem a conversa inteira
+
+
+class FakeResult:
+    def __init__(self, value):
+        self.value = value
+
+    def all(self):
+        return self.value
+
+    def scalar(self):
+        return self.value
+
+
+class FakeSession:
+    def __init__(self, results):
+        self.results = list(results)
+        self.executed = 0
+        self.sync_session = SimpleNamespace(info={})
+
+    async def execute(self, statement):
+        self.executed += 1
+        return FakeResult(self.results.pop(0))
+
+
+@pytest.mark.asyncio
+async def test_window_without_redis_counts_only_when_full(monkeypatch):
+    from src.infrastructure.services import message_window_service as service
+
+    async def fake_get_redis():
+        return None
+
+    monkeypatch.setattr(service, "get_redis", fake_get_redis)
+    monkeypatch.setattr(service.settings, "message_window_size", 3)
+
+    rows = [SimpleNamespace(id=i, role="user", content=f"msg {i}") for i in (2, 1)]
+    db = FakeSession([rows])
+    window = await service.get_message_window(db, lead_id=1)
+    assert window.count == 2 and [m["id"] for m in window.messages] == [1, 2]
+    assert db.executed == 1  # Janela incompleta já é a conversa inteira
+
+    rows = [SimpleNamespace(id=i, role="user", content=f"msg {i}") for i in (9, 8, 7)]
+    db = FakeSession([rows, 9])
+    window = await service.get_message_window(db, lead_id=1)
+    assert window.count == 9 and not window.cached
+    assert db.executed == 2
+
+
+@pytest.mark.asyncio
+async def test_writes_are_published_only_after_commit(monkeypatch):
+    from src.infrastructure.services import message_window_service as service
+
+    published = []
+
+    async def fake_apply(appends, invalidations):
+        published.append((appends, invalidations))
+
+    monkeypatch.setattr(service, "apply_window_changes", fake_apply)
+
+    session = SimpleNamespace(info={service.PENDING_KEY: {"append": {1: _messages(5)}, "invalidate": set()}})
+    service._after_rollback(session, SimpleNamespace(nested=True))  # Savepoint desfeito
+    service._after_commit(session)
+    await asyncio.sleep(0)
+    assert published == [({}, {1})]  # Recarrega do banco em vez de publicar o incerto
+
+    session.info[service.PENDING_KEY] = {"append": {2: _messages(6)}, "invalidate": set()}
+    service._after_rollback(session, SimpleNamespace(nested=False))
+    service._after_commit(session)
+    await asyncio.sleep(0)
+    assert len(published) == 1
@@ -0,0 +1,78 @@
+"""
+TESTES - PROCESS_MESSAGE EM FASES (LOCK OTIMISTA DO LEAD)
+=========================================================
+
+Executar com: pytest tests/test_process_message_phases.py -v
+"""
+
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+
+def test_lead_ai_blocked_reason():
+    from src.application.use_cases.process_message import lead_ai_blocked_reason
+
+    base = dict(status="em_atendimento", handed_off_at=None, attended_by="ai")
+    assert lead_ai_blocked_reason(SimpleNamespace(**base)) is None
+    assert lead_ai_blocked_reason(SimpleNamespace(**{**base, "status": "transferido"})) == "transferido"
+    assert lead_ai_blocked_reason(
+        SimpleNamespace(**{**base, "handed_off_at": datetime.now(timezone.utc)})
+    ) == "transferido"
+    assert lead_ai_blocked_reason(SimpleNamespace(**{**base, "attended_by": "seller"})) == "corretor_atendendo"
+
+
+@pytest.mark.asyncio
+async def test_reload_lead_for_update_detects_concurrent_change():
+    from src.application.use_cases.process_message import reload_lead_for_update
+
+    version = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    current = SimpleNamespace(id=7, updated_at=version)
+    statements = []
+
+    class FakeResult:
+        def scalar_one(self):
+            return current
+
+    class FakeDB:
+        async def execute(self, stmt):
+            statements.append(stmt)
+            return FakeResult()
+
+    lead, changed = await reload_lead_for_update(FakeDB(), 7, version)
+    assert lead is current and changed is False
+    assert statements[0]._for_update_arg is not None
+    assert statements[0].get_execution_options().get("populate_existing") is True
+
+    current.updated_at = datetime(2026, 1, 2, tzinfo=timezone.utc)
+    _, changed = await reload_lead_for_update(FakeDB(), 7, version)
+    assert changed is True
+
+
+@pytest.mark.asyncio
+async def test_turn_already_answered_distinguishes_unanswered_retry():
+    from src.application.use_cases.process_message import turn_already_answered
+
+    class FakeDB:
+        def __init__(self, *results):
+            self.results = list(results)
+
+        async def execute(self, stmt):
+            value = self.results.pop(0)
+            return SimpleNamespace(scalar_one_or_none=lambda: value)
+
+    # Nunca gravada: processa normalmente
+    assert await turn_already_answered(FakeDB(None), 7, "wamid-1") is None
+    # Gravada e respondida: retry do webhook é ignorado
+    assert await turn_already_answered(FakeDB(10, 11), 7, "wamid-1") is True
+    # Gravada na fase 1, sem resposta (timeout/falha): o retry retoma o turno
+    assert await turn_already_answered(FakeDB(10, None), 7, "wamid-1") is False
+
+
+def test_job_timeout_covers_the_whole_ai_turn():
+    from src.application.use_cases import zapi_inbound
+
+    settings = zapi_inbound.settings
+    assert settings.ai_turn_timeout_seconds < zapi_inbound.PROCESS_TIMEOUT_SECONDS
+    assert zapi_inbound.PROCESS_TIMEOUT_SECONDS < settings.inbound_queue_visibility_timeout_seconds
@@ -0,0 +1,63 @@
+"""
+TESTES - PROMPT COMPILER (PREFIXO ESTÁVEL + SUFIXO DINÂMICO)
+============================================================
+
+Executar com: pytest tests/test_prompt_compiler.py -v
+"""
+
+
+def _ai_context(cache_key=None, custom_prompt=""):
+    from src.application.services.ai_context_builder import extract_ai_context
+
+    ai_context = extract_ai_context(
+        "Imob Canoas",
+        {
+            "basic": {"niche": "realestate"},
+            "identity": {"business_rules": ["Nunca prometa desconto"]},
+            "scope": {"description": "Venda de imóveis"},
+            "custom_prompt": custom_prompt,
+        },
+    )
+    ai_context.cache_key = cache_key
+    return ai_context
+
+
+def test_prefix_is_identical_across_turns():
+    from src.application.services.ai_context_builder import (
+        LeadContext,
+        build_complete_prompt,
+    )
+
+    ai_context = _ai_context(cache_key="tenant:1:v1.0")
+
+    first = build_complete_prompt(ai_context, lead_context=LeadContext(lead_id=1, name="Ana"))
+    second = build_complete_prompt(
+        ai_context,
+        lead_context=LeadContext(lead_id=2, name="Bruno"),
+        rag_context="Condomínio aceita pets.",
+    )
+
+    prefix = first.system_prompt[:first.static_prefix_length]
+    assert second.system_prompt.startswith(prefix)
+    assert "Nunca prometa desconto" in prefix
+    assert "Ana" not in prefix and "Ana" in first.system_prompt
+    assert second.prefix_cache_hit and second.prefix_stable
+    assert second.section_tokens["rag"] > 0
+    assert second.section_tokens["base"] == second.prefix_tokens
+
+
+def test_new_version_recompiles_and_large_context_shortens_base_only():
+    from src.application.services.ai_context_builder import build_complete_prompt
+
+    build_complete_prompt(_ai_context(cache_key="tenant:1:v2.0"))
+    bumped = build_complete_prompt(_ai_context(cache_key="tenant:1:v3.0"))
+    assert not bumped.prefix_cache_hit
+
+    # Prompt base grande + RAG grande: o base é encurtado neste turno, o RAG fica inteiro
+    ai_context = _ai_context(cache_key="tenant:1:v4.0", custom_prompt="Instrução do gestor.\n" * 500)
+    rag_context = "Informação da base de conhecimento. " * 200  # ~7k chars
+    result = build_complete_prompt(ai_context, rag_context=rag_context)
+    assert not result.prefix_stable
+    assert rag_context.strip() in result.system_prompt
+
+    assert build_complete_prompt(ai_context).prefix_stable
@@ -0,0 +1,108 @@
+"""
+TESTES - SCHEDULER ASYNCIO
+===========================
+
+Executar com: pytest tests/test_scheduler.py -v
+"""
+
+import asyncio
+from datetime import datetime
+
+import pytest
+import pytz
+
+
+TZ = pytz.timezone("America/Sao_Paulo")
+
+
+def test_cron_trigger_next_fire_time():
+    """Cron respeita hora, passo e dia da semana no timezone do tenant."""
+    from src.infrastructure.scheduler import CronTrigger
+
+    daily = CronTrigger("0 10 * * *")
+    now = TZ.localize(datetime(2026, 3, 2, 10, 0, 30))
+    assert daily.next_fire_time(None, now) == TZ.localize(datetime(2026, 3, 3, 10, 0))
+
+    every_15 = CronTrigger("*/15 8-9 * * *")
+    now = TZ.localize(datetime(2026, 3, 2, 9, 50))
+    assert every_15.next_fire_time(None, now) == TZ.localize(datetime(2026, 3, 3, 8, 0))
+
+    # 2026-03-07 é sábado → próximo dia útil é segunda, 09/03
+    weekdays = CronTrigger("30 8 * * 1-5")
+    now = TZ.localize(datetime(2026, 3, 6, 9, 0))
+    assert weekdays.next_fire_time(None, now) == TZ.localize(datetime(2026, 3, 9, 8, 30))
+
+
+def test_missed_runs_are_coalesced():
+    """Após ficar fora do ar, ocorrências perdidas são contadas e a última é devolvida."""
+    from src.infrastructure.scheduler import AsyncScheduler, IntervalTrigger
+
+    trigger = IntervalTrigger(minutes=60)
+    now = TZ.localize(datetime(2026, 3, 2, 12, 10))
+    first_missed = TZ.localize(datetime(2026, 3, 2, 9, 0))
+
+    latest, count, upcoming = AsyncScheduler._catch_up(trigger, first_missed, now)
+
+    assert latest == TZ.localize(datetime(2026, 3, 2, 12, 0))
+    assert count == 4
+    assert upcoming == TZ.localize(datetime(2026, 3, 2, 13, 0))
+
+
+@pytest.mark.asyncio
+async def test_slow_job_does_not_overlap_and_does_not_block_others(monkeypatch):
+    """Job lento respeita max_instances e não atrasa os outros jobs."""
+    from src.infrastructure.scheduler import AsyncScheduler, IntervalTrigger
+    from src.infrastructure.services import redis_service
+
+    async def no_redis():
+        return None
+
+    monkeypatch.setattr(redis_service, "get_redis", no_redis)
+
+    slow_active, slow_peak, fast_runs = 0, 0, 0
+
+    async def slow_job():
+        nonlocal slow_active, slow_peak
+        slow_active += 1
+        slow_peak = max(slow_peak, slow_active)
+        await asyncio.sleep(0.3)
+        slow_active -= 1
+
+    async def fast_job():
+        nonlocal fast_runs
+        fast_runs += 1
+
+    scheduler = AsyncScheduler()
+    scheduler.add_job("slow", slow_job, trigger=IntervalTrigger(seconds=0.05), misfire_grace_seconds=5)
+    scheduler.add_job("fast", fast_job, trigger=IntervalTrigger(seconds=0.05), misfire_grace_seconds=5)
+
+    scheduler.start()
+    await asyncio.sleep(0.4)
+    await scheduler.stop()
+
+    status = scheduler.get_status()["jobs"]
+    assert slow_peak == 1
+    assert status["slow"]["skipped"] > 0
+    assert fast_runs >= 4
+    assert status["fast"]["runs"] == fast_runs
+    assert status["fast"]["avg_duration_seconds"] is not None
+
+
+@pytest.mark.asyncio
+async def test_run_job_now_and_sync_functions(monkeypatch):
+    """Execução manual roda no loop da app; funções síncronas vão para thread."""
+    from src.infrastructure.scheduler import AsyncScheduler
+    from src.infrastructure.services import redis_service
+
+    async def no_redis():
+        return None
+
+    monkeypatch.setattr(redis_service, "get_redis", no_redis)
+
+    calls = []
+    scheduler = AsyncScheduler()
+    scheduler.add_job("sync_job", lambda: calls.append("ok"), interval_minutes=60)
+
+    assert await scheduler.run_job_now("sync_job") is True
+    assert calls == ["ok"]
+    assert await scheduler.run_job_now("inexistente") is False
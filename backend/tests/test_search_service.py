@@ -0,0 +1,48 @@
+"""
+TESTES - BUSCA INDEXADA (tsvector / pg_trgm)
+============================================
+
+Executar com: pytest tests/test_search_service.py -v
+"""
+
+import pytest
+
+
+def test_fold_text_removes_accents_and_case():
+    from src.infrastructure.services.search_service import fold_text
+
+    assert fold_text("João Conceição") == "joao conceicao"
+    assert fold_text("IMÓVEL À VENDA") == "imovel a venda"
+
+
+def test_cursor_roundtrip_and_invalid():
+    from src.infrastructure.services.search_service import decode_cursor, encode_cursor
+
+    values = {"r": 0.123456789, "id": 42}
+    assert decode_cursor(encode_cursor(values)) == values
+
+    with pytest.raises(ValueError):
+        decode_cursor("nao-e-cursor")
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor({"r": 1.0}))
+
+
+def test_lead_search_filter_uses_indexed_expressions():
+    from sqlalchemy.dialects import postgresql
+
+    from src.infrastructure.services.search_service import lead_search_filter
+
+    def compile_filter(q, **kwargs):
+        compiled = lead_search_filter(q, **kwargs).compile(dialect=postgresql.dialect())
+        return str(compiled), compiled.params
+
+    sql, params = compile_filter("José")
+    assert "immutable_unaccent(lower(leads.name))" in sql
+    assert "lower(leads.email)" in sql
+    assert "leads.phone" not in sql
+    assert "%jose%" in params.values()
+
+    sql, params = compile_filter("(51) 9999", fuzzy=True)
+    assert "leads.phone LIKE" in sql
+    assert "%>" in sql
+    assert "%519999%" in params.values()
@@ -0,0 +1,85 @@
+"""
+TESTES - SSE (PUB/SUB ENTRE WORKERS)
+====================================
+
+Executar com: pytest tests/test_sse_broadcast.py -v
+"""
+
+import json
+
+import pytest
+
+
+@pytest.mark.asyncio
+async def test_broadcast_without_redis_delivers_locally():
+    from src.infrastructure.services.sse_service import SSEConnectionManager
+
+    manager = SSEConnectionManager()
+    lead_queue = await manager.connect(7)
+    tenant_queue = await manager.connect_tenant(3)
+    other_tenant = await manager.connect_tenant(4)
+
+    await manager.broadcast(7, "lead_updated", {"archived": True}, tenant_id=3)
+
+    event = lead_queue.get_nowait()
+    assert event["type"] == "lead_updated" and event["lead_id"] == 7
+    assert tenant_queue.get_nowait()["data"] == {"archived": True}
+    assert other_tenant.empty()
+
+    await manager.disconnect(7, lead_queue)
+    assert await manager.get_active_connections_count(7) == 0
+
+
+@pytest.mark.asyncio
+async def test_full_queue_drops_oldest_event():
+    from src.infrastructure.services import sse_service
+
+    manager = sse_service.SSEConnectionManager()
+    queue = await manager.connect(1)
+
+    for i in range(sse_service.QUEUE_MAXSIZE + 2):
+        manager.deliver_local(sse_service.lead_channel(1), {"n": i})
+
+    assert queue.qsize() == sse_service.QUEUE_MAXSIZE
+    assert queue.get_nowait() == {"n": 2}
+    assert manager.stats["dropped"] == 2
+
+
+@pytest.mark.asyncio
+async def test_broadcast_publishes_to_redis_when_subscriber_ready(monkeypatch):
+    from src.infrastructure.services import sse_service
+
+    published = []
+
+    class FakePipeline:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        def publish(self, channel, payload):
+            published.append((channel, json.loads(payload)))
+
+        async def execute(self):
+            return [1] * len(published)
+
+    class FakeRedis:
+        def pipeline(self, transaction=False):
+            return FakePipeline()
+
+    async def fake_get_redis():
+        return FakeRedis()
+
+    monkeypatch.setattr(sse_service, "get_redis", fake_get_redis)
+
+    manager = sse_service.SSEConnectionManager()
+    manager._pubsub_ready = True
+    queue = await manager.connect(9)
+
+    await manager.broadcast(9, "new_message", {"id": 1}, tenant_id=2)
+
+    # Entrega local fica a cargo do subscriber (evita duplicar o evento)
+    assert queue.empty()
+    assert [channel for channel, _ in published] == ["sse:lead:9", "sse:tenant:2"]
+    assert published[0][1]["data"] == {"id": 1}
@@ -0,0 +1,74 @@
+"""
+TESTES - STAGE GRAPH (ETAPAS CONCORRENTES COM DEPENDÊNCIAS)
+===========================================================
+
+Executar com: pytest tests/test_stage_graph.py -v
+"""
+
+import asyncio
+import time
+
+import pytest
+
+
+@pytest.mark.asyncio
+async def test_independent_stages_run_concurrently():
+    from src.application.services.stage_graph import Stage, StageGraph
+
+    async def slow(value):
+        await asyncio.sleep(0.1)
+        return value
+
+    async def combine(deps):
+        return deps["a"] + deps["b"]
+
+    graph = StageGraph([
+        Stage("a", lambda _: slow(1)),
+        Stage("b", lambda _: slow(2)),
+        Stage("c", lambda _: slow(3)),
+        Stage("sum", combine, depends_on=("a", "b")),
+    ]).start()
+
+    started = time.perf_counter()
+    results = await graph.wait_all()
+    elapsed = time.perf_counter() - started
+
+    assert results == {"a": 1, "b": 2, "c": 3, "sum": 3}
+    assert elapsed < 0.25
+
+
+@pytest.mark.asyncio
+async def test_failed_or_slow_stage_degrades_to_default():
+    from src.application.services.stage_graph import Stage, StageGraph
+
+    async def hangs(_):
+        await asyncio.sleep(5)
+
+    async def broken(_):
+        raise RuntimeError("portal fora")
+
+    async def uses_portal(deps):
+        return deps["portal"] or "sem imóvel"
+
+    graph = StageGraph([
+        Stage("slow", hangs, timeout=0.05, default="fallback"),
+        Stage("portal", broken, default=None),
+        Stage("reply", uses_portal, depends_on=("portal",)),
+    ])
+
+    assert await graph.get("reply") == "sem imóvel"
+    assert await graph.get("slow") == "fallback"
+    assert graph.failures["slow"] == "timeout"
+    assert "portal fora" in graph.failures["portal"]
+
+
+def test_invalid_graph_is_rejected():
+    from src.application.services.stage_graph import Stage, StageGraph
+
+    async def noop(_):
+        return None
+
+    with pytest.raises(ValueError, match="Ciclo"):
+        StageGraph([Stage("a", noop, depends_on=("b",)), Stage("b", noop, depends_on=("a",))])
+    with pytest.raises(ValueError, match="desconhecida"):
+        StageGraph([Stage("a", noop, depends_on=("x",))])
@@ -0,0 +1,99 @@
+"""
+TESTES - FAN-OUT DE TENANTS (JOBS)
+===================================
+
+Executar com: pytest tests/test_tenant_fanout.py -v
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def all(self):
+        return self._rows
+
+
+class FakeSession:
+    """Sessão mínima: lista de tenants + get/commit/rollback."""
+
+    tenants = {}
+    commits = []
+    rollbacks = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, _query):
+        return FakeResult([(t.id, t.slug) for t in self.tenants.values()])
+
+    async def get(self, _model, tenant_id):
+        return self.tenants.get(tenant_id)
+
+    async def commit(self):
+        FakeSession.commits.append(1)
+
+    async def rollback(self):
+        FakeSession.rollbacks.append(1)
+
+
+@pytest.mark.asyncio
+async def test_tenants_run_in_parallel_with_failure_isolation(monkeypatch):
+    """Um tenant com erro faz rollback só dele; os demais seguem e o relatório consolida."""
+    from src.infrastructure.jobs import tenant_fanout
+
+    FakeSession.tenants = {
+        i: SimpleNamespace(id=i, slug=f"t{i}", active=True) for i in range(1, 7)
+    }
+    FakeSession.commits, FakeSession.rollbacks = [], []
+    monkeypatch.setattr(tenant_fanout, "async_session", FakeSession)
+
+    active, peak = 0, 0
+
+    async def process(session, tenant, stats):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.02)
+        active -= 1
+        if tenant.id == 3:
+            raise RuntimeError("falha no tenant 3")
+        stats.processed += 2
+        stats.sent += 1
+        stats.incr("reactivated")
+
+    summary = await tenant_fanout.run_for_all_tenants("teste", process, tenant_concurrency=3)
+
+    assert peak == 3
+    assert summary["tenants"] == {"total": 6, "processed": 5, "skipped": 0, "failed": 1}
+    assert summary["failed_tenants"][0]["slug"] == "t3"
+    assert summary["processed"] == 10 and summary["sent"] == 5 and summary["reactivated"] == 5
+    assert summary["errors"] == 1
+    assert len(FakeSession.commits) == 5 and len(FakeSession.rollbacks) == 1
+
+
+@pytest.mark.asyncio
+async def test_run_bounded_limits_concurrency():
+    """run_bounded preserva a ordem dos resultados e respeita o limite."""
+    from src.infrastructure.jobs.tenant_fanout import run_bounded
+
+    active, peak = 0, 0
+
+    async def work(item):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return item * 2
+
+    assert await run_bounded(range(10), work, 4) == [i * 2 for i in range(10)]
+    assert peak == 4
@@ -0,0 +1,142 @@
+"""
+TESTES - ROTEAMENTO DE TENANT NOS WEBHOOKS
+===========================================
+
+Executar com: pytest tests/test_tenant_routing.py -v
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+
+def test_phone_normalization_matches_with_and_without_country_code():
+    """Número com +55, máscara ou sem DDI gera a mesma chave de rota."""
+    from src.infrastructure.services.tenant_routing_service import normalize_route_phone
+
+    assert normalize_route_phone("+55 (11) 99999-9999") == "11999999999"
+    assert normalize_route_phone("5511999999999") == "11999999999"
+    assert normalize_route_phone("11999999999") == "11999999999"
+    assert normalize_route_phone("") == ""
+    assert normalize_route_phone(None) == ""
+
+
+def test_extract_routes_from_settings_and_active_channels():
+    """Rotas vêm de settings e apenas de canais WhatsApp ativos."""
+    from src.infrastructure.services.tenant_routing_service import extract_tenant_routes
+
+    tenant = SimpleNamespace(settings={
+        "whatsapp_number": "+55 51 98888-7777",
+        "gupshup_app_name": " meu-app ",
+    })
+    channels = [
+        SimpleNamespace(type="whatsapp", active=True, config={"instance_id": "INST1"}),
+        SimpleNamespace(type="whatsapp", active=False, config={"instance_id": "OLD"}),
+        SimpleNamespace(type="site", active=True, config={"phone_number": "123"}),
+    ]
+
+    routes = extract_tenant_routes(tenant, channels)
+
+    assert routes == {
+        ("phone", "51988887777"),
+        ("gupshup_app", "meu-app"),
+        ("zapi_instance", "INST1"),
+    }
+
+
+def test_route_cache_invalidation_by_tenant():
+    """Invalidar um tenant remove suas rotas e os misses, preservando os demais."""
+    from src.infrastructure.services import tenant_routing_service as routing
+
+    routing.invalidate_route_cache()
+    routing._cache_set("phone", "111", 1)
+    routing._cache_set("phone", "222", 2)
+    routing._cache_set("phone", "333", None)
+
+    routing.invalidate_route_cache(1)
+
+    assert routing._cache_get("phone", "111") == (False, None)
+    assert routing._cache_get("phone", "333") == (False, None)
+    assert routing._cache_get("phone", "222") == (True, 2)
+
+
+class FakeRoutesDB:
+    """Sessão mínima: tenant_routes em memória para as queries do roteamento."""
+
+    def __init__(self, tenant):
+        self.tenant = tenant
+        self.routes = {}  # (route_type, route_key) -> tenant_id
+
+    async def execute(self, stmt):
+        from sqlalchemy.dialects import postgresql
+        from sqlalchemy.sql.dml import Delete, Insert
+
+        params = stmt.compile(dialect=postgresql.dialect()).params
+        if isinstance(stmt, Delete):
+            self.routes = {k: v for k, v in self.routes.items() if v != params["tenant_id_1"]}
+            return None
+        if isinstance(stmt, Insert):
+            for i in range(len(params) // 3):
+                key = (params[f"route_type_m{i}"], params[f"route_key_m{i}"])
+                self.routes[key] = params[f"tenant_id_m{i}"]
+            return None
+
+        entity = stmt.column_descriptions[0]["name"]
+        if entity == "Tenant":
+            rows = [self.tenant]
+        elif entity == "tenant_id":
+            found = self.routes.get((params["route_type_1"], params["route_key_1"]))
+            rows = [found] if found is not None else []
+        else:  # canais, conflitos de rota
+            rows = []
+        return SimpleNamespace(
+            scalar_one_or_none=lambda: rows[0] if rows else None,
+            scalars=lambda: SimpleNamespace(all=lambda: rows),
+            all=lambda: rows,
+        )
+
+    async def get(self, model, pk):
+        return self.tenant if pk == self.tenant.id else None
+
+    async def flush(self):
+        pass
+
+    async def commit(self):
+        pass
+
+    async def refresh(self, obj):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_patch_whatsapp_number_moves_webhook_route(monkeypatch):
+    """PATCH no número do tenant muda o tenant resolvido pelo webhook."""
+    from src.api.routes import tenants as tenant_routes
+    from src.domain.entities.enums import UserRole
+    from src.infrastructure.services import tenant_routing_service as routing
+
+    async def noop_invalidate(tenant_id=None):
+        pass
+
+    monkeypatch.setattr(tenant_routes, "invalidate_tenant_cache", noop_invalidate)
+    routing.invalidate_route_cache()
+
+    tenant = SimpleNamespace(
+        id=7, name="Imob", slug="imob", plan="pro", active=True, created_at=None,
+        settings={"whatsapp_number": "+55 51 98888-7777"},
+    )
+    db = FakeRoutesDB(tenant)
+    admin = SimpleNamespace(role=UserRole.SUPERADMIN, tenant_id=None)
+
+    await routing.sync_tenant_routes(db, tenant.id)
+    assert (await routing.get_tenant_by_phone(db, "5551988887777")) is tenant
+
+    await tenant_routes.update_tenant(
+        "imob", {"settings": {"whatsapp_number": "51 97777-6666"}}, db=db, current_user=admin,
+    )
+
+    assert (await routing.get_tenant_by_phone(db, "5551988887777")) is None
+    assert (await routing.get_tenant_by_phone(db, "5551977776666")) is tenant
+
+    await tenant_routes.update_tenant("imob", {"active": False}, db=db, current_user=admin)
+    assert db.routes == {}
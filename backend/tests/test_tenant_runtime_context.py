@@ -0,0 +1,112 @@
+"""
+TESTES - CONTEXTO DO TENANT EM CACHE (TENANT RUNTIME CONTEXT)
+=============================================================
+
+Executar com: pytest tests/test_tenant_runtime_context.py -v
+"""
+
+from datetime import datetime, timezone
+
+import pytest
+
+
+@pytest.fixture
+def runtime_cache(monkeypatch):
+    from src.application.services import tenant_runtime_context as service
+    from src.infrastructure.services import redis_service
+
+    async def fake_get_redis():
+        return None
+
+    monkeypatch.setattr(redis_service, "get_redis", fake_get_redis)
+    monkeypatch.setattr(redis_service, "_local_tenant_versions", {})
+    monkeypatch.setattr(service, "_local_contexts", {})
+    return service
+
+
+@pytest.mark.asyncio
+async def test_context_is_reused_until_invalidated(runtime_cache, monkeypatch):
+    from src.infrastructure.services.redis_service import invalidate_tenant_cache
+
+    service = runtime_cache
+    loads = []
+
+    async def fake_load(db, tenant_slug):
+        loads.append(tenant_slug)
+        return {
+            "version": list(await service.get_tenant_cache_version(7)),
+            "tenant": {"id": 7, "name": "Imob", "slug": tenant_slug, "settings": {"basic": {"niche": "realestate"}}},
+            "channels": {"whatsapp": {"id": 3, "type": "whatsapp"}},
+            "niche_template": "Você é corretor.",
+        }
+
+    monkeypatch.setattr(service, "_load_from_db", fake_load)
+
+    first = await service.get_tenant_runtime_context(None, "imob")
+    assert first.niche_slug == "realestate"
+    assert first.ai_context.niche_template == "Você é corretor."
+    assert await service.get_tenant_runtime_context(None, "imob") is first
+    assert len(loads) == 1
+
+    await invalidate_tenant_cache(8)  # Outro tenant: não afeta
+    assert await service.get_tenant_runtime_context(None, "imob") is first
+
+    await invalidate_tenant_cache(7)
+    second = await service.get_tenant_runtime_context(None, "imob")
+    assert second is not first and len(loads) == 2
+
+    await invalidate_tenant_cache()  # Global (ex.: nicho alterado)
+    await service.get_tenant_runtime_context(None, "imob")
+    assert len(loads) == 3
+
+
+def test_redis_rows_keep_datetime_columns():
+    from src.application.services.tenant_runtime_context import _decode_row, _encode_row
+    from src.domain.entities import Tenant
+
+    created_at = datetime(2026, 1, 5, 12, 30, tzinfo=timezone.utc)
+    row = {"id": 7, "name": "Imob", "settings": {"niche": "services"}, "created_at": created_at}
+
+    encoded = _encode_row(row)
+    assert encoded["created_at"] == created_at.isoformat()
+    assert _decode_row(Tenant, encoded) == row
+
+
+def test_prompt_build_keeps_cached_context_intact():
+    from src.application.services.ai_context_builder import build_complete_prompt, extract_ai_context
+
+    settings = {"identity": {"business_rules": ["Sem desconto"], "required_questions": ["Bairro?"]}}
+    ai_context = extract_ai_context("Imob", settings)
+
+    for _ in range(3):
+        prompt = build_complete_prompt(ai_context).system_prompt
+
+    assert settings["identity"]["business_rules"] == ["Sem desconto"]
+    assert ai_context.custom_questions == ["Bairro?"]
+    assert prompt.count("- Sem desconto") == 1
+
+
+@pytest.mark.asyncio
+async def test_settings_change_invalidates_cache_only_after_commit(runtime_cache):
+    import asyncio
+
+    from sqlalchemy.orm import Session
+    from src.infrastructure.services import redis_service
+
+    session = Session()
+    redis_service.invalidate_tenant_cache_on_commit(session, 7)
+    redis_service.invalidate_tenant_cache_on_commit(session, 7)
+    assert await redis_service.get_tenant_cache_version(7) == (0, 0)
+
+    session.rollback()
+    await asyncio.sleep(0)
+    assert await redis_service.get_tenant_cache_version(7) == (0, 0)
+
+    session.commit()
+    await asyncio.sleep(0)
+    assert await redis_service.get_tenant_cache_version(7) == (1, 0)
+
+    # Commit seguinte sem alteração não invalida de novo
+    session.commit()
+    await asyncio.sleep(0)
+    assert await redis_service.get_tenant_cache_version(7) == (1, 0)
@@ -0,0 +1,144 @@
+"""
+TESTES - ROLLUPS DE MÉTRICAS POR TENANT
+========================================
+
+Executar com: pytest tests/test_tenant_stats.py -v
+"""
+
+from datetime import date, datetime, timezone
+from types import SimpleNamespace
+
+
+def _snapshot(tenant_id=1, status="new", qualification="frio", channel_id=None, source="organic", seller=None):
+    from src.infrastructure.services.tenant_stats_service import LeadSnapshot
+
+    return LeadSnapshot(
+        tenant_id=tenant_id,
+        status=status,
+        qualification=qualification,
+        channel_id=channel_id,
+        source=source,
+        assigned_seller_id=seller,
+    )
+
+
+def test_build_increments_groups_by_tenant_and_day():
+    from src.infrastructure.services.tenant_stats_service import LeadChange, LeadInfo, build_increments
+
+    now = datetime(2026, 2, 6, 15, 0, tzinfo=timezone.utc)
+    yesterday = datetime(2026, 2, 5, 23, 30, tzinfo=timezone.utc)
+
+    changes = [
+        LeadChange(now, None, _snapshot(tenant_id=1)),
+        LeadChange(now, None, _snapshot(tenant_id=1)),
+        LeadChange(now, None, _snapshot(tenant_id=2)),
+    ]
+    # Objetos recém-inseridos: created_at (server_default) ainda não carregado
+    messages = [
+        SimpleNamespace(lead_id=10, role="user", tokens_used=0),
+        SimpleNamespace(lead_id=10, role="assistant", tokens_used=120),
+        SimpleNamespace(lead_id=20, role="user", tokens_used=None, created_at=yesterday),
+        SimpleNamespace(lead_id=99, role="user", tokens_used=0),
+    ]
+    lead_info = {
+        10: LeadInfo(1, datetime(2026, 2, 6, 14, 50, tzinfo=timezone.utc)),
+        20: LeadInfo(2, datetime(2026, 2, 5, 23, 0, tzinfo=timezone.utc)),
+    }
+
+    daily = build_increments(changes, messages, lead_info, now=now).daily
+
+    today_t1 = daily[(1, date(2026, 2, 6))]
+    assert today_t1.leads_created == 2
+    assert today_t1.messages_count == 2
+    assert today_t1.user_messages == 1
+    assert today_t1.assistant_messages == 1
+    assert today_t1.tokens_used == 120
+    assert today_t1.last_message_at == now
+    assert today_t1.response_time_seconds == 600
+    assert today_t1.response_time_samples == 1
+
+    assert daily[(2, date(2026, 2, 6))].leads_created == 1
+    yesterday_t2 = daily[(2, date(2026, 2, 5))]
+    assert yesterday_t2.messages_count == 1
+    assert yesterday_t2.last_message_at == yesterday
+
+    # Mensagem de lead sem tenant conhecido é ignorada
+    assert len(daily) == 3
+
+
+def test_lead_transitions_move_current_counters():
+    from src.domain.entities.enums import LeadStatus
+    from src.infrastructure.services.tenant_stats_service import LeadChange, build_increments
+
+    created = datetime(2026, 2, 2, 12, 0, tzinfo=timezone.utc)
+    old = _snapshot(status="in_progress", qualification="morno")
+    hot = _snapshot(status="in_progress", qualification="quente")
+    handed_off = _snapshot(status=LeadStatus.HANDED_OFF.value, qualification="quente", seller=7)
+
+    delta = build_increments([LeadChange(created, old, hot)], [], {})
+    assert delta.counters == {
+        (1, "qualification", "morno"): -1,
+        (1, "qualification", "quente"): 1,
+        (1, "hot_waiting", "1"): 1,
+    }
+    assert delta.daily[(1, date(2026, 2, 2))].leads_hot == 1
+    assert delta.daily[(1, date(2026, 2, 2))].leads_created == 0
+
+    delta = build_increments([LeadChange(created, hot, handed_off)], [], {})
+    assert delta.counters == {
+        (1, "status", "in_progress"): -1,
+        (1, "status", LeadStatus.HANDED_OFF.value): 1,
+        (1, "hot_waiting", "1"): -1,
+    }
+    assert delta.daily[(1, date(2026, 2, 2))].leads_handed_off == 1
+    assert delta.daily[(1, date(2026, 2, 2))].leads_hot == 0
+
+    # Remoção só desconta os contadores atuais
+    delta = build_increments([LeadChange(created, handed_off, None)], [], {})
+    assert delta.daily == {}
+    assert delta.counters[(1, "status", LeadStatus.HANDED_OFF.value)] == -1
+
+
+def test_after_hours_and_engaged_leads():
+    from src.infrastructure.services.tenant_stats_service import LeadChange, LeadInfo, build_increments
+
+    saturday = datetime(2026, 2, 7, 10, 0, tzinfo=timezone.utc)
+    delta = build_increments(
+        [LeadChange(saturday, None, _snapshot())],
+        [],
+        {5: LeadInfo(1, saturday)},
+        engaged_lead_ids=[5],
+    )
+
+    inc = delta.daily[(1, date(2026, 2, 7))]
+    assert inc.leads_after_hours == 1
+    assert inc.leads_engaged == 1
+
+
+def test_upsert_statements_accumulate_on_conflict():
+    from sqlalchemy.dialects import postgresql
+    from src.infrastructure.services.tenant_stats_service import (
+        DailyIncrement,
+        _counters_upsert_statement,
+        _upsert_statement,
+    )
+
+    stmt = _upsert_statement({(1, date(2026, 2, 6)): DailyIncrement(leads_created=1)})
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (tenant_id, day) DO UPDATE" in sql
+    assert "tenant_daily_stats.leads_created + excluded.leads_created" in sql
+
+    stmt = _counters_upsert_statement({(1, "status", "new"): -1})
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (tenant_id, dimension, value) DO UPDATE" in sql
+    assert "tenant_lead_counters.count + excluded.count" in sql
+
+
+def test_extract_topics_ignores_stopwords_and_short_words():
+    from src.infrastructure.services.tenant_stats_service import extract_topics
+
+    topics = extract_topics(["Quero um apartamento!", "apartamento com piscina", "oi"])
+
+    assert topics[0] == {"topic": "apartamento", "count": 2}
+    assert {"topic": "piscina", "count": 1} in topics
+    assert all(t["topic"] not in {"quero", "oi", "com"} for t in topics)
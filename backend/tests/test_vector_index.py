@@ -0,0 +1,123 @@
+"""
+TESTES - ÍNDICE VETORIAL (BUSCA SEMÂNTICA)
+===========================================
+
+Executar com: pytest tests/test_vector_index.py -v
+"""
+
+import numpy as np
+
+
+def _random_vectors(n: int, dim: int = 32, seed: int = 7) -> np.ndarray:
+    return np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+
+
+def test_search_matches_brute_force_cosine(tmp_path):
+    """Top-k via matmul + argpartition bate com o cálculo ingênuo."""
+    from src.infrastructure.services.vector_index import VectorIndex
+
+    vectors = _random_vectors(300)
+    index = VectorIndex(str(tmp_path / "idx"))
+    for i, vec in enumerate(vectors):
+        index.add(f"p{i}", vec.tolist(), {"codigo": f"p{i}"})
+
+    query = vectors[42] + 0.05
+    expected = sorted(
+        ((f"p{i}", float(np.dot(query, v) / (np.linalg.norm(query) * np.linalg.norm(v))))
+         for i, v in enumerate(vectors)),
+        key=lambda item: item[1],
+        reverse=True,
+    )[:5]
+
+    results = index.search(query.tolist(), limit=5, min_score=-1.0)
+
+    assert [key for key, _ in results] == [key for key, _ in expected]
+    assert results[0][0] == "p42"
+    for (_, got), (_, want) in zip(results, expected):
+        assert abs(got - want) < 1e-4
+
+
+def test_incremental_persistence_and_removal(tmp_path):
+    """Adições e remoções sobrevivem a um reload sem reescrever o arquivo."""
+    from src.infrastructure.services.vector_index import VectorIndex
+
+    vectors = _random_vectors(10)
+    base = str(tmp_path / "idx")
+
+    index = VectorIndex(base)
+    for i, vec in enumerate(vectors):
+        index.add(f"p{i}", vec, {"n": i})
+    index.remove("p3")
+    index.add("p5", vectors[0], {"n": "replaced"})
+
+    reloaded = VectorIndex(base)
+    assert reloaded.load()
+    assert len(reloaded) == 9
+    assert "p3" not in reloaded
+    assert reloaded.payloads["p5"] == {"n": "replaced"}
+    assert {key for key, _ in reloaded.search(vectors[0], limit=2)} == {"p0", "p5"}
+
+
+def test_compaction_after_many_removals(tmp_path):
+    """Muitas remoções disparam compactação e mantêm o índice consistente."""
+    from src.infrastructure.services.vector_index import VectorIndex
+
+    vectors = _random_vectors(8)
+    base = str(tmp_path / "idx")
+    index = VectorIndex(base)
+    for i, vec in enumerate(vectors):
+        index.add(f"p{i}", vec)
+    for i in range(4):
+        index.remove(f"p{i}")
+
+    assert len(index) == 4
+    assert index._count < 8  # linhas removidas foram descartadas
+    reloaded = VectorIndex(base)
+    reloaded.load()
+    assert sorted(reloaded._rows) == ["p4", "p5", "p6", "p7"]
+    assert reloaded.search(vectors[6], limit=1)[0][0] == "p6"
+
+
+def test_search_during_compaction_keeps_keys_aligned(tmp_path):
+    """search em outra thread nunca devolve chave de uma linha com vetor de outra."""
+    import threading
+
+    from src.infrastructure.services.vector_index import VectorIndex, normalize_vector
+
+    vectors = _random_vectors(64)
+    normalized = {f"p{i}": normalize_vector(vec) for i, vec in enumerate(vectors)}
+    index = VectorIndex(str(tmp_path / "idx"))
+    for i, vec in enumerate(vectors):
+        index.add(f"p{i}", vec)
+
+    errors = []
+    done = threading.Event()
+
+    def searcher():
+        while not done.is_set():
+            for i in (3, 17, 40):
+                query = normalized[f"p{i}"]
+                try:
+                    results = index.search(query, limit=8, min_score=-1.0)
+                except Exception as e:  # ex: linha fora de _keys
+                    errors.append(repr(e))
+                    continue
+                for key, score in results:
+                    if key is None or abs(score - float(np.dot(query, normalized[key]))) > 1e-4:
+                        errors.append((key, score))
+
+    thread = threading.Thread(target=searcher)
+    thread.start()
+    try:
+        # Remove/readiciona em ciclos: cada ciclo dispara compactação
+        for _ in range(30):
+            for i in range(0, 64, 2):
+                index.remove(f"p{i}")
+            for i in range(0, 64, 2):
+                index.add(f"p{i}", vectors[i])
+    finally:
+        done.set()
+        thread.join()
+
+    assert errors == []
+    assert len(index) == 64
@@ -0,0 +1,69 @@
+"""
+TESTES - IDEMPOTÊNCIA E ORDEM POR CONVERSA (WEBHOOKS)
+=====================================================
+
+Executar com: pytest tests/test_webhook_idempotency.py -v
+"""
+
+import asyncio
+
+import pytest
+
+
+@pytest.fixture
+def no_redis(monkeypatch):
+    from src.infrastructure.services import webhook_idempotency_service as service
+
+    async def fake_get_redis():
+        return None
+
+    monkeypatch.setattr(service, "get_redis", fake_get_redis)
+    monkeypatch.setattr(service, "_local_claims", {})
+    return service
+
+
+@pytest.mark.asyncio
+async def test_claim_is_granted_once_and_released(no_redis):
+    service = no_redis
+
+    key, ttl = service.webhook_idempotency_key("zapi", "ABC123", "5551999", "oi")
+    assert key == "zapi:msg:ABC123"
+
+    assert await service.claim_message(key, ttl) is True
+    assert await service.claim_message(key, ttl) is False
+
+    await service.release_message(key)
+    assert await service.claim_message(key, ttl) is True
+
+    fallback_key, _ = service.webhook_idempotency_key("zapi", None, "5551999", "oi")
+    assert fallback_key.startswith("zapi:hash:")
+    assert fallback_key == service.webhook_idempotency_key("zapi", None, "5551999", "oi")[0]
+
+
+@pytest.mark.asyncio
+async def test_local_conversation_lock_keeps_order_and_does_not_leak(no_redis):
+    service = no_redis
+    order = []
+
+    async def handle(n):
+        async with service.conversation_lock("zapi:1:5551999", wait_seconds=5):
+            order.append(f"start-{n}")
+            await asyncio.sleep(0.01)
+            order.append(f"end-{n}")
+
+    await asyncio.gather(*(handle(n) for n in range(3)))
+
+    assert order == ["start-0", "end-0", "start-1", "end-1", "start-2", "end-2"]
+    assert "zapi:1:5551999" not in service._local_locks
+
+
+@pytest.mark.asyncio
+async def test_local_conversation_lock_times_out(no_redis):
+    service = no_redis
+
+    async with service.conversation_lock("zapi:1:5551888", wait_seconds=5):
+        with pytest.raises(service.ConversationLockTimeout):
+            async with service.conversation_lock("zapi:1:5551888", wait_seconds=0.05):
+                pass
+
+    assert not service._local_locks